@@ -0,0 +1,91 @@
+"""Numeric differences and memory use of the float32 dtype policy.
+
+Synthetic NIRCam ramps are run through the group_scale, refpix and ramp_fit
+steps, once with the default precision and once with ``dtype_policy`` set
+to "float32".  For each step, the wall clock time and the peak memory
+allocated by the step are reported for both runs, followed by the largest
+absolute and relative differences of each science array between the two.
+
+The refpix side pixel correction only applies to full-frame data, so the
+default size is a full NIRCam detector.
+
+Example::
+
+    python benchmarks/bench_dtype_policy.py --nints 2 --ngroups 10
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+from bench_multiprocessing_scaling import make_ramp, write_reference_files
+
+from jwst.group_scale import GroupScaleStep
+from jwst.lib.dtype_policy import compare_precision
+from jwst.ramp_fitting import RampFitStep
+from jwst.refpix import RefPixStep
+
+POLICIES = ('default', 'float32')
+
+
+def run_step(step_class, model, policy, **kwargs):
+    """Run a step, returning the result, the time and the peak memory in MiB.
+
+    Steps without a dtype_policy parameter are run as they are; the
+    differences in their results come from their inputs.
+    """
+    if 'dtype_policy' in step_class.spec:
+        kwargs['dtype_policy'] = policy
+    tracemalloc.start()
+    tstart = time.perf_counter()
+    result = step_class.call(model, **kwargs)
+    elapsed = time.perf_counter() - tstart
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nints', type=int, default=1)
+    parser.add_argument('--ngroups', type=int, default=5)
+    parser.add_argument('--nrows', type=int, default=2048)
+    parser.add_argument('--ncols', type=int, default=2048)
+    args = parser.parse_args()
+
+    model = make_ramp(args.nints, args.ngroups, args.nrows, args.ncols)
+    # Frame averaging that group_scale has to correct
+    model.meta.exposure.nframes = 5
+    model.meta.exposure.frame_divisor = 4
+    print(f'Ramp shape {model.data.shape}, {model.data.nbytes / 2**20:.0f} MiB of data')
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        reffiles = write_reference_files(args.nrows, args.ncols, tmpdir)
+        steps = [('group_scale', GroupScaleStep, {}),
+                 ('refpix', RefPixStep, {}),
+                 ('ramp_fit', RampFitStep, {'override_gain': reffiles['gain'],
+                                            'override_readnoise': reffiles['readnoise']})]
+
+        inputs = {policy: model for policy in POLICIES}
+        print(f'{"step":<12}{"policy":<10}{"time (s)":>10}{"peak (MiB)":>12}')
+        comparisons = []
+        for name, step_class, kwargs in steps:
+            results = {}
+            for policy in POLICIES:
+                result, elapsed, peak = run_step(step_class, inputs[policy], policy, **kwargs)
+                print(f'{name:<12}{policy:<10}{elapsed:>10.2f}{peak:>12.0f}')
+                results[policy] = result
+            comparisons.append((name, compare_precision(results['default'], results['float32'])))
+            inputs = results
+
+    print()
+    print(f'{"step":<12}{"array":<14}{"max abs":>12}{"max rel":>12}{"rms":>12}{"NaN diff":>10}')
+    for name, stats in comparisons:
+        for array, values in stats.items():
+            print(f'{name:<12}{array:<14}{values["max_abs"]:>12.3g}{values["max_rel"]:>12.3g}'
+                  f'{values["rms"]:>12.3g}{values["nan_mismatch"]:>10d}')
+
+
+if __name__ == '__main__':
+    main()
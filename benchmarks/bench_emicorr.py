@@ -0,0 +1,97 @@
+"""Time the EMI correction of MIRI ramps.
+
+Synthetic MIRI ramps with two EMI frequencies are corrected with on-the-fly
+reference waveforms (``emicorr.apply_emicorr``), for full-frame SLOW and
+FAST readouts and the MASK1550 FAST subarray.  The correction is computed
+from the ramp alone, so no reference files are read and CRDS is not needed.
+The best wall clock time and the peak traced memory are reported for each
+case.
+
+To compare with another version of the code, run the benchmark with that
+version first on the python path, then with this one::
+
+    git worktree add /tmp/jwst-before <commit>
+    PYTHONPATH=/tmp/jwst-before python benchmarks/bench_emicorr.py
+    python benchmarks/bench_emicorr.py
+"""
+
+import argparse
+import logging
+import time
+import tracemalloc
+
+import numpy as np
+from stdatamodels.jwst import datamodels
+
+from jwst.emicorr import emicorr
+
+# Frequencies corrected, in Hz
+FREQUENCIES = [390.625, 10.039216]
+
+# Name, subarray, readout pattern, shape of the frames, (nints, ngroups) to time
+CASES = [
+    ('full_slow', 'FULL', 'SLOW', (1024, 1032), [(1, 5), (2, 10)]),
+    ('full_fast', 'FULL', 'FAST', (1024, 1032), [(1, 10), (2, 20)]),
+    ('mask1550', 'MASK1550', 'FAST', (224, 288), [(2, 50), (4, 100)]),
+]
+
+
+def make_ramp(nints, ngroups, subarray, readpatt, shape, seed=5):
+    """Make a MIRI ramp with a sinusoidal signal along the rows."""
+    rng = np.random.default_rng(seed)
+    ramp = np.cumsum(rng.normal(10., 3., (nints, ngroups) + shape), axis=1, dtype=np.float32)
+    ramp += (5 * np.sin(np.arange(shape[1]) / 3.)).astype(np.float32)
+    model = datamodels.RampModel(data=ramp)
+    model.meta.instrument.name = 'MIRI'
+    model.meta.instrument.detector = 'MIRIMAGE'
+    model.meta.exposure.type = 'MIR_IMAGE'
+    model.meta.exposure.readpatt = readpatt
+    model.meta.exposure.nsamples = 9 if 'SLOW' in readpatt else 1
+    model.meta.subarray.name = subarray
+    model.meta.subarray.xstart = 1
+    model.meta.subarray.xsize = shape[1]
+    return model
+
+
+def time_correction(model, repeat):
+    """Best wall clock time in seconds, and peak traced memory in MiB, of the correction.
+
+    The peak memory is measured in one more run, since tracing slows the
+    code down.
+    """
+    best = np.inf
+    for _ in range(repeat):
+        input_model = model.copy()
+        tstart = time.perf_counter()
+        emicorr.apply_emicorr(input_model, None, FREQUENCIES, None)
+        best = min(best, time.perf_counter() - tstart)
+        input_model.close()
+
+    input_model = model.copy()
+    tracemalloc.start()
+    try:
+        emicorr.apply_emicorr(input_model, None, FREQUENCIES, None)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        input_model.close()
+    return best, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of runs per case; the best time is kept')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    print(f'{"case":<12}{"nints":>6}{"ngroups":>8}{"time (s)":>10}{"peak (MiB)":>12}')
+    for name, subarray, readpatt, shape, sizes in CASES:
+        for nints, ngroups in sizes:
+            model = make_ramp(nints, ngroups, subarray, readpatt, shape)
+            elapsed, peak = time_correction(model, args.repeat)
+            print(f'{name:<12}{nints:>6}{ngroups:>8}{elapsed:>10.2f}{peak:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""Throughput and peak memory of the pipeline hot paths.
+
+Each benchmark builds synthetic data in memory, with sizes from small to
+production-like, and times one hot path: drizzling in resample, the median
+of outlier_detection, emicorr, refpix, extract_1d, cube_build, the NIRSpec
+MOS flat field, serial and in threads, and the association generator.
+Images come from `jwst.fits_generator.synthetic`.
+
+All run offline except cube_build, which requires CRDS: it maps the MIRI
+MRS slices to the sky with the WCS of its exposures, computed from their
+distortion, regions and wavelength range reference files.  Without a CRDS
+server, or a local CRDS cache holding those files, it is skipped.  Files
+written by the benchmarks go to temporary directories, removed once timed.
+
+See `harness` for the options.  Example::
+
+    python benchmarks/bench_hot_paths.py --quick
+    python benchmarks/bench_hot_paths.py resample refpix --json after.json --compare before.json
+"""
+
+import os
+import sys
+from tempfile import TemporaryDirectory
+
+import numpy as np
+from astropy.io import fits
+from astropy.table import Table, vstack
+from stdatamodels.jwst import datamodels
+
+from bench_multiprocessing_scaling import make_ramp
+from harness import SkipBenchmark, benchmark, main
+
+import jwst.associations
+from jwst.associations import AssociationPool, AssociationRegistry, generate
+from jwst.datamodels import ModelLibrary
+from jwst.emicorr import emicorr
+from jwst.extract_1d import extract1d
+from jwst.fits_generator import synthetic
+from jwst.flatfield import flat_field
+from jwst.outlier_detection.utils import median_without_resampling
+from jwst.refpix import reference_pixels
+from jwst.resample.resample import ResampleData
+
+# Test pools covering the imaging, slit, IFU, coronagraphy, AMI and TSO rules
+ASN_POOLS = ['pool_002_image_miri', 'pool_003_image_nircam', 'pool_005_spec_niriss',
+             'pool_006_spec_nirspec', 'pool_007_spec_miri', 'pool_013_coron_nircam',
+             'pool_014_ami_niriss', 'pool_021_tso', 'pool_023_nirspec_msa_3nod',
+             'pool_027_nirspec_ifu_nods']
+POOL_DIR = os.path.join(os.path.dirname(jwst.associations.__file__), 'tests', 'data')
+
+
+def make_images(nimages, side, seed=1):
+    """Dithered NIRCam images of a star field, with WCS and variances."""
+    return synthetic.make_exposures('nrc_image', ndithers=nimages, seed=seed,
+                                    subarray=(1, 1, side, side))
+
+
+@benchmark('resample', sizes=[(2, 512), (4, 1024), (4, 2048)], unit='pixels')
+def setup_resample(size):
+    """Drizzle images onto a common output grid (ResampleData.resample_many_to_one)."""
+    nimages, side = size
+    images = make_images(nimages, side)
+    output_shape = (side + 64, side + 64)
+    output_wcs = synthetic.imaging_wcs(output_shape, synthetic.CRVAL,
+                                       synthetic.MODES['nrc_image']['pixel_scale'])
+    # as set by ResampleStep for a user supplied WCS; computed from the WCS
+    output_wcs.pixel_area = None
+
+    def run():
+        library = ModelLibrary(images, on_disk=False)
+        resamp = ResampleData(library, output='', blendheaders=False, wht_type='ivm',
+                              good_bits='~DO_NOT_USE', output_wcs=output_wcs,
+                              output_shape=output_shape[::-1])
+        resamp.resample_many_to_one(library)
+
+    return run, nimages * side**2
+
+
+def _setup_median(size, on_disk):
+    nimages, side = size
+    images = make_images(nimages, side)
+    tmpdir = TemporaryDirectory(prefix='bench_median_')
+    if on_disk:
+        # only libraries opened from an association can be kept on disk
+        images = synthetic.write_association(images, tmpdir.name, product_name='bench')
+
+    def run():
+        library = ModelLibrary(images, on_disk=on_disk, temp_directory=tmpdir.name)
+        # a buffer of one image, so the median is computed in nimages sections
+        median_without_resampling(library, 0.7, 'ivm', '~DO_NOT_USE',
+                                  buffer_size=side**2 * 4 if on_disk else None)
+
+    return run, nimages * side**2, tmpdir.cleanup
+
+
+@benchmark('outlier_median', sizes=[(5, 512), (10, 1024), (10, 2048)], unit='pixels')
+def setup_outlier_median(size):
+    """Median of the weighted images in memory (outlier_detection)."""
+    return _setup_median(size, on_disk=False)
+
+
+@benchmark('outlier_median_disk', sizes=[(5, 512), (10, 1024), (10, 2048)], unit='pixels')
+def setup_outlier_median_disk(size):
+    """Median of the weighted images, computed in sections on disk (outlier_detection)."""
+    return _setup_median(size, on_disk=True)
+
+
+@benchmark('emicorr', sizes=[(1, 10), (2, 50), (4, 100)], unit='pixels')
+def setup_emicorr(size):
+    """EMI correction of a MIRI MASK1550 ramp at two frequencies (emicorr.apply_emicorr)."""
+    nints, ngroups = size
+    rng = np.random.default_rng(2)
+    shape = (nints, ngroups, 224, 288)
+    ramp = np.cumsum(rng.normal(10., 3., shape), axis=1, dtype=np.float32)
+    model = datamodels.RampModel(data=ramp)
+    model.meta.instrument.name = 'MIRI'
+    model.meta.instrument.detector = 'MIRIMAGE'
+    model.meta.exposure.type = 'MIR_4QPM'
+    model.meta.exposure.readpatt = 'FAST'
+    model.meta.exposure.nsamples = 1
+    model.meta.subarray.name = 'MASK1550'
+    model.meta.subarray.xstart = 1
+    model.meta.subarray.xsize = 288
+
+    phase = np.linspace(0, 2 * np.pi, 500, endpoint=False)
+    emi_model = datamodels.EmiModel({
+        'frequencies': {
+            'Hz390': {'frequency': 390.625, 'phase_amplitudes': 2 * np.sin(phase)},
+            'Hz10': {'frequency': 10.039216, 'phase_amplitudes': np.sin(phase)}},
+        'subarray_cases': {
+            'MASK1550': {'frameclocks': 23968, 'rowclocks': 82,
+                         'freqs': {'FAST': ['Hz390', 'Hz10']}}}})
+
+    def run():
+        emicorr.apply_emicorr(model.copy(), emi_model, None, None)
+
+    return run, ramp.size
+
+
+@benchmark('refpix', sizes=[2, 5, 10], unit='pixels')
+def setup_refpix(ngroups):
+    """Full-frame NIRCam reference pixel correction (reference_pixels.correct_model)."""
+    model = make_ramp(1, ngroups, 2048, 2048, cr_fraction=0)
+    conv_kernel_params = {'refpix_algorithm': 'median', 'sirs_kernel_model': None,
+                          'sigreject': 4.0, 'gaussmooth': 1.0, 'halfwidth': 30}
+
+    def run():
+        reference_pixels.correct_model(model.copy(), True, True, 11, 1.0, True,
+                                       conv_kernel_params)
+
+    return run, model.data.size
+
+
+@benchmark('extract_1d', sizes=[(32, 1024), (64, 2048), (128, 4096)], unit='pixels')
+def setup_extract_1d(size):
+    """Box extraction with a fitted background, of one spectral image (extract1d)."""
+    ny, nx = size
+    rng = np.random.default_rng(3)
+    rows = np.arange(ny)[:, np.newaxis]
+    trace = np.exp(-0.5 * ((rows - ny / 2) / 2.0)**2)
+    image = 100 * trace + rng.normal(5., 1., (ny, nx))
+    profile = (np.abs(rows - ny / 2) < 4).astype(float) * np.ones(nx)
+    profile_bg = (np.abs(rows - ny / 2) > ny / 4).astype(float) * np.ones(nx)
+    variance = np.ones((ny, nx))
+
+    def run():
+        extract1d.extract1d(image, [profile], variance, variance, variance,
+                            profile_bg=profile_bg, extraction_type='box',
+                            fit_bkg=True, bkg_fit_type='poly', bkg_order=1)
+
+    return run, image.size
+
+
+@benchmark('cube_build', sizes=[1, 2, 4], unit='pixels')
+def setup_cube_build(nexposures):
+    """MIRI MRS channel 1-2 SHORT cube from dithered exposures (CubeBuildStep, ifucube).
+
+    Requires CRDS for the WCS of the exposures; see the module description.
+    """
+    from jwst.assign_wcs import AssignWcsStep
+    from jwst.cube_build import CubeBuildStep
+
+    rng = np.random.default_rng(4)
+    exposures = []
+    for i in range(nexposures):
+        model = datamodels.IFUImageModel((1024, 1032))
+        model.data = rng.normal(1., 0.1, (1024, 1032)).astype(np.float32)
+        model.meta.filename = f'bench_mrs_{i + 1:05d}_cal.fits'
+        model.meta.telescope = 'JWST'
+        model.meta.instrument.name = 'MIRI'
+        model.meta.instrument.detector = 'MIRIFUSHORT'
+        model.meta.instrument.channel = '12'
+        model.meta.instrument.band = 'SHORT'
+        model.meta.exposure.type = 'MIR_MRS'
+        model.meta.observation.date = '2023-01-01'
+        model.meta.observation.time = '00:00:00'
+        model.meta.bunit_data = 'MJy/sr'
+        model.meta.bunit_err = 'MJy/sr'
+        wcsinfo = model.meta.wcsinfo
+        wcsinfo.ra_ref = 165. + i * 1e-4
+        wcsinfo.dec_ref = 54.
+        wcsinfo.roll_ref = 37.
+        wcsinfo.v2_ref = -8.3942412
+        wcsinfo.v3_ref = -5.3123744
+        wcsinfo.v3yangle = 0.
+        wcsinfo.vparity = -1
+        try:
+            exposures.append(AssignWcsStep.call(model))
+        except (Exception, SystemExit) as err:
+            # CRDS exits when it can reach neither its server nor a cache
+            raise SkipBenchmark(f'MIRI MRS WCS reference files unavailable ({err})')
+
+    def run():
+        CubeBuildStep.call(exposures, output_type='band')
+
+    return run, nexposures * 1024 * 1032
+
+
+def write_nirspec_flats(directory, nwave, shape):
+    """Write unit f (MSA quadrants), s and d flats of ``nwave`` planes, return their paths."""
+    wavelength = np.arange(1, nwave + 1, dtype=float)
+    fast_variation = Table({'slit_name': ['ANY'], 'nelem': [nwave], 'wavelength': [wavelength],
+                            'data': [np.ones(nwave)], 'error': [np.full(nwave, 0.01)]})
+
+    def table_hdu(table, name, ver=None):
+        hdu = fits.table_to_hdu(table)
+        hdu.header['EXTNAME'] = name
+        if ver is not None:
+            hdu.header['EXTVER'] = ver
+        return hdu
+
+    def image_hdus(image_shape, ver=None):
+        rng = np.random.default_rng(ver)
+        return [fits.ImageHDU(data=rng.uniform(0.9, 1.1, image_shape).astype(np.float32),
+                              name='SCI', ver=ver),
+                fits.ImageHDU(data=np.zeros(image_shape, dtype=np.uint32), name='DQ', ver=ver),
+                fits.ImageHDU(data=np.full(image_shape, 0.01, dtype=np.float32), name='ERR', ver=ver)]
+
+    # The f flat is in MSA shutter coordinates, the s and d flats in detector pixels
+    f_flat = [fits.PrimaryHDU()]
+    for ver in range(1, 5):
+        f_flat += image_hdus((nwave, 171, 365), ver)
+        f_flat += [table_hdu(Table({'wavelength': [wavelength]}), 'WAVELENGTH', ver),
+                   table_hdu(fast_variation, 'FAST_VARIATION', ver)]
+    detector_flat = [fits.PrimaryHDU(), *image_hdus((nwave,) + shape),
+                     table_hdu(Table({'wavelength': wavelength}), 'WAVELENGTH'),
+                     table_hdu(fast_variation, 'FAST_VARIATION')]
+
+    paths = []
+    for name, hdus, model_type in [('f', f_flat, datamodels.NirspecQuadFlatModel),
+                                   ('s', detector_flat, datamodels.NirspecFlatModel),
+                                   ('d', detector_flat, datamodels.NirspecFlatModel)]:
+        with model_type(fits.HDUList(hdus)) as flat:
+            flat.meta.instrument.name = 'NIRSPEC'
+            flat.meta.subarray.xstart = 1
+            flat.meta.subarray.ystart = 1
+            paths.append(os.path.join(directory, f'{name}_flat.fits'))
+            flat.save(paths[-1])
+    return paths
+
+
+def make_mos(nslits, shape, slit_shape=(12, 1024), seed=4):
+    """NIRSpec MOS exposure of ``nslits`` extracted slits, with their wavelengths."""
+    rng = np.random.default_rng(seed)
+    model = datamodels.MultiSlitModel()
+    model.meta.instrument.name = 'NIRSPEC'
+    model.meta.exposure.type = 'NRS_MSASPEC'
+    model.meta.subarray.xstart = 1
+    model.meta.subarray.ystart = 1
+    model.meta.subarray.ysize, model.meta.subarray.xsize = shape
+    for i in range(nslits):
+        slit = datamodels.SlitModel(data=rng.uniform(1, 2, slit_shape).astype(np.float32))
+        slit.dq = np.zeros(slit_shape, dtype=np.uint32)
+        slit.err = np.full(slit_shape, 0.1, dtype=np.float32)
+        slit.var_poisson = rng.uniform(0, 0.01, slit_shape).astype(np.float32)
+        slit.var_rnoise = np.full(slit_shape, 0.001, dtype=np.float32)
+        start = 1.2 + 0.5 * rng.random()
+        slit.wavelength = np.tile(np.linspace(start, start + 3, slit_shape[1]), (slit_shape[0], 1))
+        slit.source_type = 'UNKNOWN'
+        slit.name = str(i + 1)
+        slit.quadrant = i % 4 + 1
+        slit.xcen = int(rng.integers(1, 366))
+        slit.ycen = int(rng.integers(1, 172))
+        slit.ystart = int(rng.integers(1, shape[0] - slit_shape[0] + 2))
+        slit.xstart = int(rng.integers(1, shape[1] - slit_shape[1] + 2))
+        slit.ysize, slit.xsize = slit_shape
+        model.slits.append(slit)
+    return model
+
+
+def _setup_flat_field_mos(nslits, max_cores):
+    shape = (512, 2048)
+    model = make_mos(nslits, shape)
+    directory = TemporaryDirectory(prefix='bench_flat_')
+    paths = write_nirspec_flats(directory.name, 5, shape)
+
+    def run():
+        # The flats are opened for each exposure, as in the step, so that
+        # their lazily loaded arrays and tables are read in each run
+        flats = [model_type(path) for model_type, path in zip(
+            [datamodels.NirspecQuadFlatModel, datamodels.NirspecFlatModel, datamodels.NirspecFlatModel],
+            paths)]
+        output, interpolated = flat_field.do_correction(
+            model.copy(), fflat=flats[0], sflat=flats[1], dflat=flats[2], max_cores=max_cores)
+        for result in [output, interpolated, *flats]:
+            result.close()
+
+    return run, nslits * model.slits[0].data.size, directory.cleanup
+
+
+@benchmark('flat_field_mos', sizes=[10, 50, 200], unit='pixels')
+def setup_flat_field_mos(nslits):
+    """NIRSpec MOS flat field of many slits, one slit after the other (flat_field.nirspec_fs_msa)."""
+    return _setup_flat_field_mos(nslits, '1')
+
+
+@benchmark('flat_field_mos_threads', sizes=[10, 50, 200], unit='pixels')
+def setup_flat_field_mos_threads(nslits):
+    """NIRSpec MOS flat field of many slits, in parallel threads (max_cores='all')."""
+    return _setup_flat_field_mos(nslits, 'all')
+
+
+@benchmark('asn_generate', sizes=[1, 2, 4], unit='rows')
+def setup_asn_generate(copies):
+    """Level 2 and 3 associations from copies of the test pools (associations.generate)."""
+    pools = [AssociationPool.read(os.path.join(POOL_DIR, f'{name}.csv')) for name in ASN_POOLS]
+    pool = vstack(pools * copies, metadata_conflicts='silent')
+    rules = AssociationRegistry()
+
+    def run():
+        generate(pool, rules)
+
+    return run, len(pool)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Scaling of the jump and ramp_fit steps with the number of cores.
+
+Synthetic ramps with cosmic rays are built in memory, and the jump detection
+and ramp fitting of each step are run with ``maximum_cores`` set to 1, 2, ...
+up to the requested number of cores. The reference data are given in memory,
+so no reference files are read and CRDS is not needed. The number of
+processes actually used (at most the number of cores of the machine), the
+wall clock time, the speedup relative to a single core, and the peak resident
+memory of the worker processes are reported.
+
+Example::
+
+    python benchmarks/bench_multiprocessing_scaling.py --nints 2 --ngroups 10 \\
+        --nrows 2048 --ncols 2048 --max-cores 8
+"""
+
+import argparse
+import resource
+import time
+from pathlib import Path
+
+import numpy as np
+from stcal.ramp_fitting import ramp_fit
+from stdatamodels.jwst.datamodels import GainModel, RampModel, ReadnoiseModel, dqflags
+
+from jwst.jump.jump import run_detect_jumps
+from jwst.lib.pipe_utils import compute_num_cores
+from jwst.ramp_fitting.ramp_fit_step import _ramp_fit_parallel
+
+GAIN = 4.0
+READNOISE = 10.0
+GROUP_TIME = 10.7
+
+
+def make_ramp(nints, ngroups, nrows, ncols, cr_fraction=1e-3, seed=1):
+    """Make a NIRCam-like ramp with Poisson noise, read noise and jumps."""
+    rng = np.random.default_rng(seed)
+    flux = rng.uniform(0.1, 50.0, (nrows, ncols)).astype(np.float32)
+    electrons = rng.poisson(flux * GAIN, (nints, ngroups, nrows, ncols))
+    data = np.cumsum(electrons, axis=1, dtype=np.float32) / GAIN
+    data += rng.normal(0, READNOISE, data.shape).astype(np.float32)
+
+    ncr = int(cr_fraction * data.size)
+    ints = rng.integers(0, nints, ncr)
+    groups = rng.integers(1, ngroups, ncr)
+    rows = rng.integers(0, nrows, ncr)
+    cols = rng.integers(0, ncols, ncr)
+    for i, g, y, x in zip(ints, groups, rows, cols):
+        data[i, g:, y, x] += rng.uniform(100, 2000)
+
+    model = RampModel(data=data)
+    model.groupdq = np.zeros(data.shape, dtype=np.uint8)
+    model.pixeldq = np.zeros((nrows, ncols), dtype=np.uint32)
+    model.err = np.ones(data.shape, dtype=np.float32)
+    model.meta.instrument.name = 'NIRCAM'
+    model.meta.instrument.detector = 'NRCA1'
+    model.meta.instrument.filter = 'F200W'
+    model.meta.instrument.pupil = 'CLEAR'
+    model.meta.observation.date = '2024-01-01'
+    model.meta.observation.time = '00:00:00'
+    model.meta.exposure.type = 'NRC_IMAGE'
+    model.meta.exposure.readpatt = 'MEDIUM8'
+    model.meta.exposure.nints = nints
+    model.meta.exposure.ngroups = ngroups
+    model.meta.exposure.nframes = 1
+    model.meta.exposure.groupgap = 0
+    model.meta.exposure.frame_time = GROUP_TIME
+    model.meta.exposure.group_time = GROUP_TIME
+    model.meta.exposure.drop_frames1 = 0
+    model.meta.subarray.name = 'FULL'
+    model.meta.subarray.xstart = 1
+    model.meta.subarray.ystart = 1
+    model.meta.subarray.xsize = ncols
+    model.meta.subarray.ysize = nrows
+    return model
+
+
+def make_reference_models(nrows, ncols):
+    """Make flat gain and read noise reference models matching the ramp."""
+    models = {}
+    for name, model_class, value in [('gain', GainModel, GAIN),
+                                     ('readnoise', ReadnoiseModel, READNOISE)]:
+        ref = model_class(data=np.full((nrows, ncols), value, dtype=np.float32))
+        ref.meta.instrument.name = 'NIRCAM'
+        ref.meta.subarray.xstart = 1
+        ref.meta.subarray.ystart = 1
+        ref.meta.subarray.xsize = ncols
+        ref.meta.subarray.ysize = nrows
+        models[name] = ref
+    return models
+
+
+def write_reference_files(nrows, ncols, path):
+    """Write flat gain and read noise reference files matching the ramp."""
+    filenames = {}
+    for name, ref in make_reference_models(nrows, ncols).items():
+        filenames[name] = str(Path(path) / f'{name}.fits')
+        ref.save(filenames[name])
+        ref.close()
+    return filenames
+
+
+def detect_jumps(model, refs, ncores):
+    """Flag jumps as the jump step does, with its default thresholds."""
+    return run_detect_jumps(model, refs['gain'], refs['readnoise'], 4.0, 6.0, 5.0,
+                            str(ncores), 1000, 10, True)
+
+
+def fit_ramps(model, refs, ncores):
+    """Fit ramps as the ramp_fit step does, on slices of rows with several cores."""
+    # ramp_fit scales the read noise in place
+    readnoise_2d = refs['readnoise'].data.copy()
+    gain_2d = refs['gain'].data
+    if ncores > 1:
+        return _ramp_fit_parallel(model, ramp_fit.BUFSIZE, readnoise_2d, gain_2d,
+                                  'OLS_C', 'optimal', True, ncores)
+    return ramp_fit.ramp_fit(model, ramp_fit.BUFSIZE, False, readnoise_2d, gain_2d,
+                             'OLS_C', 'optimal', '1', dqflags.pixel)
+
+
+def time_function(func, model, refs, ncores, repeat):
+    """Best wall clock time of a function on a copy of the ramp, in seconds."""
+    best = np.inf
+    for _ in range(repeat):
+        input_model = model.copy()
+        tstart = time.perf_counter()
+        result = func(input_model, refs, ncores)
+        best = min(best, time.perf_counter() - tstart)
+        del result, input_model
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nints', type=int, default=2)
+    parser.add_argument('--ngroups', type=int, default=10)
+    parser.add_argument('--nrows', type=int, default=1024)
+    parser.add_argument('--ncols', type=int, default=1024)
+    parser.add_argument('--max-cores', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Number of runs per core count; the best time is kept')
+    args = parser.parse_args()
+
+    model = make_ramp(args.nints, args.ngroups, args.nrows, args.ncols)
+    print(f'Ramp shape {model.data.shape}, {model.data.nbytes / 2**20:.0f} MiB of data')
+
+    refs = make_reference_models(args.nrows, args.ncols)
+    jumped = detect_jumps(model.copy(), refs, 1)
+
+    steps = [('jump', detect_jumps, model), ('ramp_fit', fit_ramps, jumped)]
+    print(f'{"step":<10}{"cores":>6}{"processes":>10}{"time (s)":>12}{"speedup":>10}'
+          f'{"child RSS (MiB)":>18}')
+    for name, func, step_input in steps:
+        single = None
+        for ncores in range(1, args.max_cores + 1):
+            nprocs = compute_num_cores(str(ncores), max_items=args.nrows)
+            elapsed = time_function(func, step_input, refs, nprocs, args.repeat)
+            single = single or elapsed
+            # Peak over all finished child processes so far, in KiB on Linux
+            child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+            print(f'{name:<10}{ncores:>6}{nprocs:>10}{elapsed:>12.2f}{single / elapsed:>10.2f}'
+                  f'{child_rss:>18.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""Minimal harness for the offline benchmarks.
+
+A benchmark is a setup function registered with `benchmark`.  Called with a
+size parameter, it builds its synthetic input and returns the function to
+time and the amount of work that function does, in the unit of the
+benchmark (pixels, rows...), optionally followed by a function removing
+what the setup created, called once the size is timed.  The setup itself
+is not timed.
+
+Each benchmark is timed for each of its sizes, keeping the best of a few
+runs, and run once more under `tracemalloc` for its peak memory, since
+tracing slows the code down.  Results can be written as JSON and compared
+against a previous run to catch regressions.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+import numpy as np
+
+__all__ = ["BENCHMARKS", "SkipBenchmark", "benchmark", "compare", "main", "run"]
+
+# Registered benchmarks, by name
+BENCHMARKS = {}
+
+
+class SkipBenchmark(Exception):
+    """Raised by a setup function when its benchmark can not run here."""
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: callable
+    sizes: tuple
+    unit: str
+
+
+def benchmark(name, sizes, unit):
+    """Register a benchmark setup function.
+
+    Parameters
+    ----------
+    name : str
+        Name of the benchmark.
+
+    sizes : tuple
+        Size parameters the setup function is called with, smallest first.
+
+    unit : str
+        Unit of the work reported by the setup function.
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = Benchmark(name, setup, tuple(sizes), unit)
+        return setup
+    return decorator
+
+
+def measure(func, repeat):
+    """Best wall clock time over ``repeat`` runs, and peak traced memory in MiB."""
+    best = np.inf
+    for _ in range(repeat):
+        gc.collect()
+        tstart = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - tstart)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2**20
+
+
+def run(names=None, quick=False, repeat=3):
+    """Run benchmarks.
+
+    Parameters
+    ----------
+    names : list of str or None
+        Benchmarks to run; all if None.
+
+    quick : bool
+        Only run the smallest size of each benchmark.
+
+    repeat : int
+        Number of timed runs; the best is kept.
+
+    Returns
+    -------
+    results : list of dict
+        For each benchmark and size, the time in seconds, the throughput
+        in units per second and the peak memory in MiB, or the reason it
+        was skipped.
+    """
+    results = []
+    for name, bench in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        for size in bench.sizes[:1] if quick else bench.sizes:
+            result = {'benchmark': name, 'size': str(size), 'unit': bench.unit}
+            try:
+                func, work, *teardown = bench.setup(size)
+            except SkipBenchmark as err:
+                result['skipped'] = str(err)
+                print(f'{name:<22}{str(size):>16}  skipped: {err}')
+                results.append(result)
+                break
+            try:
+                elapsed, peak = measure(func, repeat)
+            finally:
+                for cleanup in teardown:
+                    cleanup()
+            result.update(time=elapsed, throughput=work / elapsed, peak_mib=peak)
+            print(f'{name:<22}{str(size):>16}{elapsed:>10.3f}'
+                  f'{work / elapsed:>14.3g} {bench.unit + "/s":<12}{peak:>10.1f}')
+            results.append(result)
+            del func
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Find the benchmarks that got slower or use more memory than a baseline.
+
+    Parameters
+    ----------
+    results, baseline : list of dict
+        Results of `run`.
+
+    tolerance : float
+        Ratio of time or peak memory to the baseline above which a
+        benchmark is considered to have regressed.
+
+    Returns
+    -------
+    regressions : list of str
+        Description of each regression.
+    """
+    reference = {(entry['benchmark'], entry['size']): entry
+                 for entry in baseline if 'time' in entry}
+    regressions = []
+    for entry in results:
+        base = reference.get((entry['benchmark'], entry['size']))
+        if base is None or 'time' not in entry:
+            continue
+        for key, label in [('time', 'time'), ('peak_mib', 'peak memory')]:
+            if base[key] > 0 and entry[key] / base[key] > tolerance:
+                regressions.append(
+                    f"{entry['benchmark']} [{entry['size']}]: {label} "
+                    f"{base[key]:.3g} -> {entry[key]:.3g}")
+    return regressions
+
+
+def main(argv=None):
+    """Run the registered benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description='Run the offline benchmarks.')
+    parser.add_argument('names', nargs='*', help='Benchmarks to run; all by default')
+    parser.add_argument('--list', action='store_true', help='List the benchmarks and exit')
+    parser.add_argument('--quick', action='store_true',
+                        help='Only run the smallest size of each benchmark')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of timed runs; the best time is kept')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=1.2,
+                        help='Slowdown or memory growth ratio reported as a regression')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Show the log messages of the code timed, below errors')
+    args = parser.parse_args(argv)
+
+    # The code timed logs as it runs, and the association rules log every
+    # candidate; many modules set their own logger levels, so disable them
+    # globally.
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    if args.list:
+        for bench in BENCHMARKS.values():
+            print(f'{bench.name:<22}{bench.unit:<10}sizes: {", ".join(map(str, bench.sizes))}')
+        return 0
+
+    print(f'{"benchmark":<22}{"size":>16}{"time (s)":>10}{"throughput":>14} {"":<12}'
+          f'{"peak (MiB)":>10}')
+    results = run(args.names, quick=args.quick, repeat=args.repeat)
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump({'python': platform.python_version(), 'host': platform.node(),
+                       'results': results}, json_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as json_file:
+            baseline = json.load(json_file)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
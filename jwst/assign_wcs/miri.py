@@ -20,6 +20,7 @@ from . import pointing
 from .util import (not_implemented_mode, subarray_transform,
                    velocity_correction, transform_bbox_from_shape,
                    bounding_box_from_subarray)
+from ..lib.reffile_utils import open_reference_model
 
 
 log = logging.getLogger(__name__)
@@ -549,7 +550,7 @@ def detector_to_abl(input_model, reference_files):
         forward.inverse = inv
         transforms[sl] = forward
 
-    with WavelengthrangeModel(reference_files['wavelengthrange']) as f:
+    with open_reference_model(reference_files['wavelengthrange'], WavelengthrangeModel) as f:
         wr = dict(zip(f.waverange_selector, f.wavelengthrange))
 
     ch_dict = {}
@@ -593,7 +594,7 @@ def abl_to_v2v3l(input_model, reference_files):
     with DistortionMRSModel(reference_files['distortion']) as dist:
         v23 = dict(zip(dist.abv2v3_model.channel_band, dist.abv2v3_model.model))
 
-    with WavelengthrangeModel(reference_files['wavelengthrange']) as f:
+    with open_reference_model(reference_files['wavelengthrange'], WavelengthrangeModel) as f:
         wr = dict(zip(f.waverange_selector, f.wavelengthrange))
 
     dict_mapper = {}
@@ -32,6 +32,7 @@ from .util import (
 )
 from . import pointing
 from ..lib.exposure_types import is_nrs_ifu_lamp
+from ..lib.reffile_utils import open_reference_model
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -870,7 +871,7 @@ def get_spectral_order_wrange(input_model, wavelengthrange_file):
 
     is_lamp_exposure = exp_type in ['NRS_LAMP', 'NRS_AUTOWAVE', 'NRS_AUTOFLAT']
 
-    wave_range_model = WavelengthrangeModel(wavelengthrange_file)
+    wave_range_model = open_reference_model(wavelengthrange_file, WavelengthrangeModel)
     wrange_selector = wave_range_model.waverange_selector
     if filter == "OPAQUE" or is_lamp_exposure:
         keyword = lamp + '_' + grating
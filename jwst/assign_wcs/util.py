@@ -23,6 +23,7 @@ from stdatamodels.jwst.datamodels import WavelengthrangeModel
 from stdatamodels.jwst.transforms.models import GrismObject
 
 from ..lib.catalog_utils import SkyObject
+from ..lib.reffile_utils import open_reference_model
 
 
 log = logging.getLogger(__name__)
@@ -503,7 +504,7 @@ def create_grism_bbox(input_model,
             raise TypeError(message)
     else:
         # Get the list of extract_orders and lmin, lmax from the ``wavelengthrange`` reference file.
-        with WavelengthrangeModel(reference_files['wavelengthrange']) as f:
+        with open_reference_model(reference_files['wavelengthrange'], WavelengthrangeModel) as f:
             if 'WFSS' not in f.meta.exposure.type:
                 err_text = "Wavelengthrange reference file not for WFSS"
                 log.error(err_text)
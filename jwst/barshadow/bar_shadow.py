@@ -8,13 +8,16 @@ from gwcs import wcstools
 
 from stdatamodels.jwst import datamodels
 
+from ..lib.pipe_utils import map_slits
+
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 SLITRATIO = 1.15     # Ratio of slit spacing to slit height
 
 
-def do_correction(input_model, barshadow_model=None, inverse=False, source_type=None, correction_pars=None):
+def do_correction(input_model, barshadow_model=None, inverse=False, source_type=None, correction_pars=None,
+                  max_cores='1'):
     """Do the Bar Shadow Correction
 
     Parameters
@@ -34,6 +37,10 @@ def do_correction(input_model, barshadow_model=None, inverse=False, source_type=
     correction_pars : dict or None
         Correction parameters to use instead of recalculation.
 
+    max_cores : str
+        Number of slitlets to correct in parallel threads: an integer, or
+        one of 'none', 'quarter', 'half' or 'all'.
+
     Returns
     -------
     output_model, corrections : `~jwst.datamodels.MultiSlitModel`, jwst.datamodels.JwstDataModel
@@ -59,9 +66,9 @@ def do_correction(input_model, barshadow_model=None, inverse=False, source_type=
     # Create output as a copy of the input science data model
     output_model = input_model.copy()
 
-    # Loop over all the slits in the input model
-    corrections = datamodels.MultiSlitModel()
-    for slit_idx, slitlet in enumerate(output_model.slits):
+    # Process all the slits in the input model, possibly in parallel threads
+    def correct_slitlet(slit_idx_slitlet):
+        slit_idx, slitlet = slit_idx_slitlet
         slitlet_number = slitlet.slitlet_id
         log.info('Working on slitlet %d' % slitlet_number)
 
@@ -69,7 +76,6 @@ def do_correction(input_model, barshadow_model=None, inverse=False, source_type=
             correction = correction_pars.slits[slit_idx]
         else:
             correction = _calc_correction(slitlet, barshadow_model, source_type)
-        corrections.slits.append(correction)
 
         # Apply the correction by dividing into the science and uncertainty arrays:
         #     var_poisson and var_rnoise are divided by correction**2,
@@ -84,6 +90,11 @@ def do_correction(input_model, barshadow_model=None, inverse=False, source_type=
         if slitlet.var_flat is not None and np.size(slitlet.var_flat) > 0:
             slitlet.var_flat /= correction.data**2
         slitlet.barshadow = correction.data
+        return correction
+
+    corrections = datamodels.MultiSlitModel()
+    for correction in map_slits(correct_slitlet, enumerate(output_model.slits), max_cores):
+        corrections.slits.append(correction)
 
     return output_model, corrections
 
@@ -1,5 +1,6 @@
 from stdatamodels.jwst import datamodels
 
+from ..lib.reffile_utils import open_reference_model
 from ..stpipe import Step
 from . import bar_shadow
 
@@ -23,6 +24,7 @@ class BarShadowStep(Step):
     spec = """
         inverse = boolean(default=False)    # Invert the operation
         source_type = string(default=None)  # Process as specified source type.
+        maximum_cores = string(default='1')  # Number of slitlets to correct in parallel threads. Can be an integer, 'half', 'quarter', or 'all'
     """
 
     reference_file_types = ['barshadow']
@@ -68,13 +70,14 @@ class BarShadowStep(Step):
                         return result
 
                     # Open the barshadow ref file data model
-                    barshadow_model = datamodels.BarshadowModel(self.barshadow_name)
+                    barshadow_model = open_reference_model(self.barshadow_name,
+                                                           datamodels.BarshadowModel)
 
                 # Do the bar shadow correction
                 result, self.correction_pars = bar_shadow.do_correction(
                     input_model, barshadow_model,
                     inverse=self.inverse, source_type=self.source_type,
-                    correction_pars=correction_pars
+                    correction_pars=correction_pars, max_cores=self.maximum_cores
                 )
 
                 if barshadow_model:
@@ -232,3 +232,28 @@ def test_has_uniform_source():
     # Since source_type is not 'POINT', the step will assume that the
     # source is extended.
     assert bar.has_uniform_source(slitlet)
+
+
+def test_do_correction_threads():
+    """Slitlets corrected in parallel threads match the serial result."""
+    rng = rn.default_rng(3)
+    input_model = datamodels.MultiSlitModel()
+    input_model.meta.exposure.type = 'NRS_MSASPEC'
+    correction_pars = datamodels.MultiSlitModel()
+    for i in range(5):
+        shape = (6 + i, 40)
+        input_model.slits.append(datamodels.SlitModel(data=rng.uniform(1, 2, shape)))
+        input_model.slits[i].slitlet_id = i + 1
+        input_model.slits[i].err = np.ones(shape)
+        input_model.slits[i].var_poisson = np.ones(shape)
+        input_model.slits[i].var_rnoise = np.ones(shape)
+        correction_pars.slits.append(datamodels.SlitModel(data=rng.uniform(0.5, 1, shape)))
+
+    serial, _ = bar.do_correction(input_model, correction_pars=correction_pars)
+    threaded, corrections = bar.do_correction(input_model, correction_pars=correction_pars,
+                                              max_cores='3')
+
+    assert len(corrections.slits) == 5
+    for slitlet, expected in zip(threaded.slits, serial.slits):
+        for ext in ['data', 'err', 'var_poisson', 'var_rnoise', 'barshadow']:
+            np.testing.assert_array_equal(getattr(slitlet, ext), getattr(expected, ext))
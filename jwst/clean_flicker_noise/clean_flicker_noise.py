@@ -15,6 +15,8 @@ from jwst.assign_wcs import nirspec, AssignWcsStep
 from jwst.flatfield import FlatFieldStep
 from jwst.clean_flicker_noise.lib import NSClean, NSCleanSubarray
 from jwst.lib.basic_utils import LoggingContext
+from jwst.lib.pipe_utils import compute_num_cores
+from jwst.lib.shared_arrays import SharedArrays, attach_shared_arrays, shared_pool
 from jwst.msaflagopen import MSAFlagOpenStep
 from jwst.ramp_fitting import RampFitStep
 
@@ -1310,12 +1312,185 @@ def _mask_unusable(mask, dq):
     mask[jump] = False
 
 
+def _get_image_and_mask(data, groupdq, background_mask, i, j):
+    """
+    Get the image to clean and its scene mask.
+
+    Parameters
+    ----------
+    data : array-like of float
+        The input data, 2D, 3D, or 4D.
+    groupdq : array-like of int or None
+        Group DQ flags for 4D data; otherwise None.
+    background_mask : array-like of bool
+        The scene mask, 2D or 3D.
+    i : int
+        Integration index.
+    j : int
+        Group index.
+
+    Returns
+    -------
+    image : array-like of float
+        The image to clean.  For ramp data, this is the difference
+        between group `j` + 1 and group `j`.
+    mask : array-like of bool
+        A copy of the scene mask for the image, with unusable
+        pixels masked.
+    """
+    # Copy the scene mask, for further flagging
+    if background_mask.ndim == 3:
+        mask = background_mask[i].copy()
+    else:
+        mask = background_mask.copy()
+
+    # Get the relevant image data
+    if data.ndim == 2:
+        image = data
+    elif data.ndim == 3:
+        image = data[i]
+    else:
+        # Ramp data input:
+        # subtract the current group from the next one
+        image = data[i, j + 1] - data[i, j]
+        dq = groupdq[i, j + 1]
+
+        # Mask any DNU and JUMP pixels
+        _mask_unusable(mask, dq)
+
+    return image, mask
+
+
+def _clean_images_serial(input_model, background_mask, nints, ngroups,
+                         clean_args):
+    """
+    Clean all images, one at a time.
+
+    Parameters
+    ----------
+    input_model : `~jwst.datamodel.JwstDataModel`
+        The input data model.
+    background_mask : array-like of bool
+        The scene mask, 2D or 3D.
+    nints : int
+        Number of integrations.
+    ngroups : int
+        Number of group differences (or 1, for image data).
+    clean_args : tuple
+        Arguments for `_clean_one_image`, following the mask.
+
+    Yields
+    ------
+    i, j : int
+        Integration and group index.
+    cleaned_image, background, success
+        As returned by `_clean_one_image`.
+    """
+    groupdq = input_model.groupdq if input_model.data.ndim == 4 else None
+    for i in range(nints):
+        log.debug(f"Working on integration {i + 1}")
+        for j in range(ngroups):
+            log.debug(f"Working on group {j + 1}")
+            image, mask = _get_image_and_mask(
+                input_model.data, groupdq, background_mask, i, j)
+            yield (i, j) + _clean_one_image(image, mask, *clean_args)
+
+
+# Shared arrays and cleaning parameters, in each worker process
+_worker_arrays = {}
+
+
+def _init_worker(specs, clean_args):
+    """Attach a worker process to the shared arrays."""
+    _worker_arrays.update(attach_shared_arrays(specs))
+    _worker_arrays['clean_args'] = clean_args
+
+
+def _clean_shared_image(index):
+    """Clean one image in a worker process, storing the result in shared memory."""
+    i, j = index
+    arrays = _worker_arrays
+    image, mask = _get_image_and_mask(
+        arrays['data'], arrays['groupdq'], arrays['mask'], i, j)
+    cleaned_image, background, success = _clean_one_image(
+        image, mask, *arrays['clean_args'])
+    if not success:
+        return index, -1
+    if cleaned_image is None:
+        return index, 0
+    arrays['cleaned'][i, j] = cleaned_image
+    if arrays['background'] is not None:
+        arrays['background'][i, j] = background
+    return index, 1
+
+
+def _clean_images_parallel(input_model, background_mask, nints, ngroups,
+                           clean_args, save_background, ncores):
+    """
+    Clean all images in a pool of processes.
+
+    The input data, DQ and mask are copied once into shared memory,
+    and the cleaned images are written by the worker processes into
+    shared output arrays.
+
+    Parameters
+    ----------
+    input_model : `~jwst.datamodel.JwstDataModel`
+        The input data model.
+    background_mask : array-like of bool
+        The scene mask, 2D or 3D.
+    nints : int
+        Number of integrations.
+    ngroups : int
+        Number of group differences (or 1, for image data).
+    clean_args : tuple
+        Arguments for `_clean_one_image`, following the mask.
+    save_background : bool
+        If set, the fit backgrounds are returned.
+    ncores : int
+        Number of processes.
+
+    Yields
+    ------
+    i, j : int
+        Integration and group index.
+    cleaned_image, background, success
+        As returned by `_clean_one_image`, in the same order as
+        `_clean_images_serial`.
+    """
+    image_shape = input_model.data.shape[-2:]
+    out_shape = (nints, ngroups) + image_shape
+    groupdq = input_model.groupdq if input_model.data.ndim == 4 else None
+    inputs = {'data': input_model.data, 'mask': background_mask, 'groupdq': groupdq}
+    outputs = {'cleaned': (out_shape, np.float32)}
+    if save_background:
+        outputs['background'] = (out_shape, np.float32)
+    else:
+        inputs['background'] = None
+
+    with SharedArrays(inputs, outputs) as shared:
+        log.info(f"Cleaning {nints * ngroups} images with {ncores} processes")
+        indices = [(i, j) for i in range(nints) for j in range(ngroups)]
+        with shared_pool(ncores, initializer=_init_worker,
+                         initargs=(shared.specs, clean_args)) as pool:
+            status = dict(pool.map(_clean_shared_image, indices))
+
+        for i, j in indices:
+            if status[(i, j)] < 0:
+                yield i, j, None, None, False
+            elif status[(i, j)] == 0:
+                yield i, j, None, None, True
+            else:
+                background = shared['background'][i, j] if save_background else None
+                yield i, j, shared['cleaned'][i, j], background, True
+
+
 def do_correction(input_model, input_dir=None, fit_method='median',
                   fit_by_channel=False, background_method='median',
                   background_box_size=None,
                   mask_science_regions=False, n_sigma=2.0, fit_histogram=False,
                   single_mask=True, user_mask=None, save_mask=False,
-                  save_background=False, save_noise=False):
+                  save_background=False, save_noise=False, maximum_cores='1'):
     """
     Apply the 1/f noise correction.
 
@@ -1378,6 +1553,11 @@ def do_correction(input_model, input_dir=None, fit_method='median',
     save_noise : bool, optional
         Switch to indicate whether the fit noise should be saved.
 
+    maximum_cores : str or int, optional
+        Number of processes used to clean the images (integrations and
+        group differences) in parallel: an integer, 'quarter', 'half',
+        or 'all'.
+
     Returns
     -------
     output_model : `~jwst.datamodel.JwstDataModel`
@@ -1448,69 +1628,52 @@ def do_correction(input_model, input_dir=None, fit_method='median',
     else:
         background_to_save = None
 
-    # Loop over integrations and groups (even if there's only 1)
-    for i in range(nints):
-        log.debug(f"Working on integration {i + 1}")
-        for j in range(ngroups):
-            log.debug(f"Working on group {j + 1}")
-
-            # Copy the scene mask, for further flagging
-            if background_mask.ndim == 3:
-                mask = background_mask[i].copy()
-            else:
-                mask = background_mask.copy()
-
-            # Get the relevant image data
-            if ndim == 2:
-                image = input_model.data
-            elif ndim == 3:
-                image = input_model.data[i]
-            else:
-                # Ramp data input:
-                # subtract the current group from the next one
-                image = input_model.data[i, j+1] - input_model.data[i, j]
-                dq = input_model.groupdq[i, j+1]
-
-                # Mask any DNU and JUMP pixels
-                _mask_unusable(mask, dq)
-
-            # Clean the image
-            cleaned_image, background, success = _clean_one_image(
-                image, mask, background_method, background_box_size, n_sigma,
-                fit_method, detector, fc, axis_to_correct, fit_by_channel)
-
-            if not success:
-                # Cleaning failed for internal reasons - probably the
-                # mask is not a good match to the data.
-                log.error(f'Cleaning failed for integration {i + 1}, group {j + 1}')
-
-                # Restore input data to make sure any partial changes
-                # are thrown away
-                output_model.data = input_model.data.copy()
-                return output_model, None, None, None, status
-
-            if cleaned_image is None:
-                # Cleaning did not proceed because the image is bad:
-                # leave it as is but continue correcting the rest
-                log.warning(f'No usable data in integration {i+1}, group {j+1}. '
-                            f'Skipping correction for this image.')
-                continue
-
-            # Store the cleaned image in the output model
-            if ndim == 2:
-                output_model.data = cleaned_image
-                if save_background:
-                    background_to_save[:] = background
-            elif ndim == 3:
-                output_model.data[i] = cleaned_image
-                if save_background:
-                    background_to_save[i] = background
-            else:
-                # Add the cleaned data diff to the previously cleaned group,
-                # rather than the noisy input group
-                output_model.data[i, j+1] = output_model.data[i, j] + cleaned_image
-                if save_background:
-                    background_to_save[i, j+1] = background
+    # Loop over integrations and groups (even if there's only 1).
+    # The images are independent, so they may be cleaned in parallel.
+    clean_args = (background_method, background_box_size, n_sigma,
+                  fit_method, detector, fc, axis_to_correct, fit_by_channel)
+    ncores = compute_num_cores(maximum_cores, max_items=nints * ngroups)
+    if ncores > 1:
+        cleaned_images = _clean_images_parallel(
+            input_model, background_mask, nints, ngroups, clean_args,
+            save_background, ncores)
+    else:
+        cleaned_images = _clean_images_serial(
+            input_model, background_mask, nints, ngroups, clean_args)
+
+    for i, j, cleaned_image, background, success in cleaned_images:
+        if not success:
+            # Cleaning failed for internal reasons - probably the
+            # mask is not a good match to the data.
+            log.error(f'Cleaning failed for integration {i + 1}, group {j + 1}')
+
+            # Restore input data to make sure any partial changes
+            # are thrown away
+            output_model.data = input_model.data.copy()
+            return output_model, None, None, None, status
+
+        if cleaned_image is None:
+            # Cleaning did not proceed because the image is bad:
+            # leave it as is but continue correcting the rest
+            log.warning(f'No usable data in integration {i+1}, group {j+1}. '
+                        f'Skipping correction for this image.')
+            continue
+
+        # Store the cleaned image in the output model
+        if ndim == 2:
+            output_model.data = cleaned_image
+            if save_background:
+                background_to_save[:] = background
+        elif ndim == 3:
+            output_model.data[i] = cleaned_image
+            if save_background:
+                background_to_save[i] = background
+        else:
+            # Add the cleaned data diff to the previously cleaned group,
+            # rather than the noisy input group
+            output_model.data[i, j+1] = output_model.data[i, j] + cleaned_image
+            if save_background:
+                background_to_save[i, j+1] = background
 
     # Store the background image in a model, if requested
     if save_background:
@@ -1,7 +1,6 @@
 from stdatamodels.jwst import datamodels
 
 from ..stpipe import Step
-from . import clean_flicker_noise
 
 __all__ = ["CleanFlickerNoiseStep"]
 
@@ -37,6 +36,7 @@ class CleanFlickerNoiseStep(Step):
         save_mask = boolean(default=False)  # Save the created mask
         save_background = boolean(default=False)  # Save the fit background
         save_noise = boolean(default=False)  # Save the fit noise
+        maximum_cores = string(default='1')  # cores for multiprocessing. Can be an integer, 'half', 'quarter', or 'all'
         skip = boolean(default=True)  # By default, skip the step
     """
 
@@ -99,12 +99,20 @@ class CleanFlickerNoiseStep(Step):
         save_noise : bool, optional
             Save the computed noise image.
 
+        maximum_cores : str, optional
+            Number of processes used to clean integrations and groups in
+            parallel: an integer, 'quarter', 'half', or 'all'.
+
         Returns
         -------
         output_model : DataModel
             The flicker noise corrected datamodel
         """
 
+        # The correction imports photutils and several other steps; it is
+        # only imported when run, since the step is skipped by default
+        from . import clean_flicker_noise
+
         # Open the input data model
         with datamodels.open(input) as input_model:
 
@@ -113,7 +121,8 @@ class CleanFlickerNoiseStep(Step):
                 self.background_method, self.background_box_size,
                 self.mask_science_regions, self.n_sigma, self.fit_histogram,
                 self.single_mask, self.user_mask,
-                self.save_mask, self.save_background, self.save_noise)
+                self.save_mask, self.save_background, self.save_noise,
+                self.maximum_cores)
             output_model, mask_model, background_model, noise_model, status = result
 
             # Save the mask, if requested
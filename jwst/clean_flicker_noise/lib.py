@@ -1,5 +1,20 @@
+import hashlib
+import threading
+import warnings
+from collections import OrderedDict
+
 import numpy as np
 
+# Fit operators depend only on the background mask and the filter
+# parameters, not on the data, so they are kept for reuse by later images
+# with the same mask: usually the other groups and integrations of the
+# same exposure.  Least recently used operators are dropped when the total
+# size exceeds OPERATOR_CACHE_BYTES.
+OPERATOR_CACHE_BYTES = 512 * 1024**2
+_operator_cache = OrderedDict()
+_operator_cache_lock = threading.Lock()
+operator_cache_stats = {'hits': 0, 'misses': 0}
+
 
 class NSClean:
     """
@@ -78,6 +93,17 @@ class NSClean:
         self.apodizer = np.array(make_lowpass_filter(self.fc, self.kill_width, self.nx))
         self.nvec = np.sum(self.apodizer > 0)  # Project out this many frequencies
 
+        # The mask-dependent weights and the buffing kernel are cached
+        self.mask_key = mask_hash(self.mask)
+        self.P = cached_operator(
+            ('weights', self.mask_key, self.detector, self.weights_kernel_sigma),
+            self._make_weights)
+        self.fgkern = cached_operator(
+            ('buffer', self.mask.shape, self.buffer_sigma),
+            self._make_buffer_kernel)
+
+    def _make_weights(self):
+        """Compute the fit weights from the background mask."""
         # Only MASK mode uses a weighted fit. Compute the weights here. The aim is
         # to weight by the reciprocal of the local background sample density along
         # each line. Roughly approximate the local density, P, using the reciprocal of
@@ -90,9 +116,11 @@ class NSClean:
         W[self.ny//2+1] = np.exp(-(_x - _mu)**2 / _sigma**2/2) / _sigma / np.sqrt(2*np.pi)
         FW = np.fft.rfft2(np.fft.ifftshift(W))
         with np.errstate(divide='ignore'):
-            self.P = 1 / np.fft.irfft2(np.fft.rfft2(np.array(self.mask, dtype=np.float32)) * FW, (self.ny,self.nx))
-        self.P = np.where(self.mask, self.P, 0.) # Illuminated areas carry no weight
+            P = 1 / np.fft.irfft2(np.fft.rfft2(np.array(self.mask, dtype=np.float32)) * FW, (self.ny,self.nx))
+        return np.where(self.mask, P, 0.) # Illuminated areas carry no weight
 
+    def _make_buffer_kernel(self):
+        """Compute the Fourier transform of the buffing kernel."""
         # Build a 1-dimensional Gaussian kernel for "buffing". Buffing is in the
         # dispersion direction only. In detector coordinates, this is axis zero. Even though
         # the kernel is 1-dimensional, we must still use a 2-dimensional array to 
@@ -105,8 +133,43 @@ class NSClean:
         gkern = np.zeros((self.ny, self.nx), dtype=np.float32)  # 2D kernel template
         gkern[:, _mu] = _gkern  # Copy in the kernel. Normalization is already correct.
         gkern = np.fft.ifftshift(gkern)  # Shift for Numpy
-        self.fgkern = np.array(np.fft.rfft2(gkern), dtype=np.complex64)  # FFT for fast convolution
+        return np.array(np.fft.rfft2(gkern), dtype=np.complex64)  # FFT for fast convolution
+
+    def _make_fit_operator(self):
+        """
+        Build the weighted least squares operator for each line.
 
+        For the masked Fourier basis B of a line and weights p, the fit
+        is ``(A^H A)^{-1} A^H p d`` with ``A = diag(p) B``.  Since
+        ``A^H p d = B^H (p^2 d)`` is a Fourier transform of the weighted
+        line, only the small normal matrix ``A^H A`` has to be inverted.
+        Its elements depend only on the frequency difference, so they are
+        also taken from the Fourier transform of ``p^2``.  The inverse is
+        returned with the normalization and apodization folded in.
+
+        Returns
+        -------
+        operator : complex array
+            Operators for lines 4 to ny-4, shape (ny - 8, nvec, nvec).
+        """
+        # The normal matrix is inverted in double precision, as the
+        # weights may be single precision.
+        used = np.any(self.mask[4:-4], axis=1)
+        H = np.fft.rfft(np.float64(self.P[4:-4])**2, axis=1)[:, :self.nvec]
+        k = np.arange(self.nvec)
+        dk = k.reshape((-1, 1)) - k.reshape((1, -1))
+        AHA = H[:, np.abs(dk)]
+        AHA = np.where(dk < 0, np.conjugate(AHA), AHA)
+
+        # Lines with no usable pixels are skipped
+        AHA[~used] = np.identity(self.nvec)
+        operator = np.linalg.inv(AHA) * self.nx
+        operator[~used] = 0.
+
+        # Apodize if necessary
+        if self.kill_width > 0:
+            operator *= self.apodizer[:self.nvec].reshape((-1, 1))
+        return operator
 
     def fit(self, data):
         """
@@ -128,65 +191,39 @@ class NSClean:
         -----
         Fitting is done line by line because the matrices get very big if one
         tries to project out Fourier vectors from the entire 2K x 2K image area.
+        The fit operators depend only on the mask, so they are cached and
+        all lines are fit at once.
         """
         model = np.zeros((self.ny, self.nx), dtype=np.float32)  # Build the model here
-        for y in np.arange(self.ny)[4:-4]:
-            
-            # Get data and weights for this line
-            d = data[y][self.mask[y]]  # unmasked (useable) data
-            # The line below uses a vector to represent a diagonal weight matrix.
-            # Multiplications by this vector later on may be viewed as
-            # equivalent formulations to multiplication by diag(p).
-            p = self.P[y][self.mask[y]]  # Weights
-
-            # If none of the pixels in this line is useable (all masked out),
-            # skip and move on to the next line.
-            if len(d) == 0:
-                continue
-
-            # Fill statistical outliers with line median. We know that the rolling
-            # median cleaning technique worked reasonably well, so this is a fast
-            # justifiable approximation.
-            _mu = np.median(d)  # Robust estimate of mean
-            _sigma = 1.4826 * np.median(np.abs(d - _mu))  # Robust estimate of standard deviation
-
-            # Fill outliers
-            d = np.where(np.logical_and(_mu - self.sigrej * _sigma <= d,
-                                        d <= _mu + self.sigrej * _sigma), d, _mu)
-
-            # Build the Fourier basis matrix for this line
-            m = np.arange(self.nx)[self.mask[y]].reshape((-1, 1))  # Must be a column vector to broadcast
-            k = np.arange(self.nvec).reshape((1,-1))  # Must be a row vector to broadcast. We can optimize
-                                                      # the code later by putting this into object instantiation
-                                                      # since it is the same for every line. For now, leave it
-                                                      # here since the cost is negligible and it may aid 
-                                                      # comprehension.
-
-            # Build the basis matrix
-            B = np.array(np.exp(2 * np.pi * 1J * m * k / self.nx) / m.shape[0], dtype=np.complex64)
-
-            # Compute the Moore-Penrose inverse of A = P*B.
-            #     $A^+ = (A^H A)^{-1} A^H$
-            A = B*p[:, np.newaxis]
-            AH = np.conjugate(A.transpose())  # Hermitian transpose of A
-            pinv_PB = np.matmul(np.linalg.inv(np.matmul(AH, A)), AH)
-
-            # Solve for the Fourier transform of this line's background samples.
-            # The way that we have done it, this multiplies the input data by the 
-            # number of samples used for the fit.
-            rfft = np.zeros(self.nx//2 + 1, dtype=np.complex64)
-            rfft[:k.shape[1]] = np.matmul(pinv_PB, p*d)
-
-            # Numpy requires that the forward transform multiply
-            # the data by n. Correct normalization.
-            rfft *= self.nx / m.shape[0]
-
-            # Apodize if necessary
-            if self.kill_width > 0:
-                rfft[:self.nvec] *= self.apodizer[:self.nvec]
-
-            # Invert the FFT to build the background model for this line
-            model[y] = np.fft.irfft(rfft, self.nx)
+        if self.ny <= 8 or self.nvec == 0:
+            return model
+
+        operator = cached_operator(
+            ('fit', self.mask_key, self.detector, self.weights_kernel_sigma,
+             self.fc, self.kill_width),
+            self._make_fit_operator)
+
+        # Fill statistical outliers with line median. We know that the rolling
+        # median cleaning technique worked reasonably well, so this is a fast
+        # justifiable approximation.
+        mask = self.mask[4:-4]
+        d = np.where(mask, data[4:-4], np.nan)
+        with warnings.catch_warnings():
+            # lines with no usable pixels are skipped
+            warnings.simplefilter('ignore', RuntimeWarning)
+            _mu = np.nanmedian(d, axis=1, keepdims=True)  # Robust estimate of mean
+            _sigma = 1.4826 * np.nanmedian(np.abs(d - _mu), axis=1, keepdims=True)  # Robust estimate of standard deviation
+        d = np.where(np.logical_and(_mu - self.sigrej * _sigma <= d,
+                                    d <= _mu + self.sigrej * _sigma), d, _mu)
+        d[~mask] = 0.
+
+        # Solve for the Fourier transform of each line's background samples.
+        rfft = np.zeros((d.shape[0], self.nx//2 + 1), dtype=np.complex128)
+        weighted = np.fft.rfft(self.P[4:-4]**2 * d, axis=1)[:, :self.nvec]
+        rfft[:, :self.nvec] = np.matmul(operator, weighted[:, :, np.newaxis])[:, :, 0]
+
+        # Invert the FFT to build the background model for each line
+        model[4:-4] = np.fft.irfft(rfft, self.nx, axis=1)
 
         # Done!
         return model
@@ -323,6 +360,75 @@ def med_abs_deviation(d, median=True):
         return(mad)
 
 
+def mask_hash(mask):
+    """
+    Hash a background mask, for use in operator cache keys.
+
+    Parameters
+    ----------
+    mask : bool array
+        The background mask.
+
+    Returns
+    -------
+    key : tuple
+        Mask shape and digest of the mask values.
+    """
+    mask = np.ascontiguousarray(mask, dtype=np.bool_)
+    return mask.shape, hashlib.sha1(np.packbits(mask), usedforsecurity=False).hexdigest()
+
+
+def cached_operator(key, build):
+    """
+    Get a fit operator from the cache, building it if necessary.
+
+    Cached arrays are shared by all images with the same key, so they
+    are made read-only.
+
+    Parameters
+    ----------
+    key : tuple
+        Cache key: the mask hash and all parameters the operator depends on.
+
+    build : callable
+        Called with no arguments to build the operator on a cache miss.
+        It may return an array or a tuple of arrays.
+
+    Returns
+    -------
+    operator : array or tuple of arrays
+        The cached operator.
+    """
+    with _operator_cache_lock:
+        if key in _operator_cache:
+            _operator_cache.move_to_end(key)
+            operator_cache_stats['hits'] += 1
+            return _operator_cache[key][0]
+        operator_cache_stats['misses'] += 1
+
+    operator = build()
+    arrays = operator if isinstance(operator, tuple) else (operator,)
+    for array in arrays:
+        array.flags.writeable = False
+    nbytes = sum(array.nbytes for array in arrays)
+
+    with _operator_cache_lock:
+        _operator_cache[key] = (operator, nbytes)
+        total = sum(entry[1] for entry in _operator_cache.values())
+        while total > OPERATOR_CACHE_BYTES and len(_operator_cache) > 1:
+            _, (_, dropped) = _operator_cache.popitem(last=False)
+            total -= dropped
+    return operator
+
+
+def clear_operator_cache():
+    """Remove all cached fit operators and reset the cache statistics."""
+    with _operator_cache_lock:
+        _operator_cache.clear()
+        operator_cache_stats['hits'] = 0
+        operator_cache_stats['misses'] = 0
+
+
 class NSCleanSubarray:
     """
     NSCleanSubarray is the base class for removing residual correlated
@@ -441,25 +547,30 @@ class NSCleanSubarray:
         self.apodizer[self.rfftfreq >= self.fc[3]] = 1.0
 
 
-    def fit(self, return_fit=False, weight_fit=False):
+    def _make_fit_operator(self, weight_fit):
         """
-        Fit a background model to the data.
+        Build the least squares operator for the background mask.
+
+        For the weighted fit, ``A = diag(P) B`` for the incomplete Fourier
+        matrix B and weights P.  The fit ``(A^H A)^{-1} A^H P d`` needs only
+        ``A^H P d = B^H (P^2 d)``, which is a Fourier transform of the
+        weighted samples, and the small normal matrix ``A^H A``, whose
+        elements depend only on the frequency difference.  The weighted
+        operator is returned as the fitted frequency indices, the squared
+        weights of the background samples, and the inverse normal matrix
+        with the normalization folded in.  The unweighted operator is the
+        normalized pseudo-inverse of B.
 
         Parameters
         ----------
-        return_fit : bool
-            Return the Fourier transform.
-
         weight_fit : bool
-            Use weighted least squares as described in the NSClean paper.
-            Turn off by default. For subarrays it is TBD if this is necessary.
+            Build the operator for the weighted fit.
 
         Returns
         -------
-        rfft : numpy array
-            The computed Fourier transform.
+        operator : tuple of arrays or array
+            The fit operator.
         """
-
         # To build the incomplete Fourier matrix, we require the index of each
         # clock tick of each valid pixel in the background samples. For consistency with
         # numpy's notation, we call this 'm' and require it to be a column vector.
@@ -468,10 +579,7 @@ class NSCleanSubarray:
         m = (_y*(self.nx+self.nloh) + _x)[self.mask].reshape((-1,1))
 
         # Define which Fourier vectors to fit. For consistency with numpy, call this k.
-        k = np.arange(len(self.rfftfreq))[self.apodizer>0.].reshape((1,-1))
-
-        # Build the incomplete Fourier matrix
-        B = np.array(np.exp(2*np.pi*1J*m*k/self.n)/m.shape[0], dtype=np.complex64)
+        k = np.arange(len(self.rfftfreq))[self.apodizer>0.]
 
         # Weighted NSClean fitting
         if weight_fit:
@@ -487,28 +595,59 @@ class NSCleanSubarray:
             _M = np.hstack((self.mask, np.zeros((self.ny,self.nloh), dtype=np.bool_))).flatten() # Add new line overhead to mask
             with np.errstate(divide='ignore'):
                 P = 1/np.fft.irfft(np.fft.rfft(np.array(_M, dtype=np.float32)) * FW, self.n) # Compute weights
-            P = P[_M] # Keep only background samples
+            P2 = np.where(_M, P, 0.)**2
 
-            # NSClean's weighting requires the Moore-Penrose invers of A = P*B.
-            #     $A^+ = (A^H A)^{-1} A^H$
-            A = P.reshape((-1,1)) * B # P is diagonal. Hadamard product is most RAM efficient
-            AH = np.conjugate(A.transpose()) # Hermitian transpose of A
-            pinv_PB = np.matmul(np.linalg.inv(np.matmul(AH, A)), AH)
+            # Normal matrix, from the transform of the squared weights.
+            # The sample count normalization of B cancels in the solution.
+            H = np.fft.rfft(np.float64(P2))
+            dk = k.reshape((-1,1)) - k.reshape((1,-1))
+            AHA = H[np.abs(dk)]
+            AHA = np.where(dk < 0, np.conjugate(AHA), AHA)
+            return k, P2[_M], np.linalg.inv(AHA) * self.n
 
         else:
-            # Unweighted fit
-            pinvB = np.linalg.pinv(B)
+            # Unweighted fit: Numpy requires that the forward transform
+            # multiply the data by n. Correct normalization.
+            B = np.array(np.exp(2*np.pi*1J*m*k.reshape((1,-1))/self.n)/m.shape[0], dtype=np.complex64)
+            return np.linalg.pinv(B) * np.float32(self.n / m.shape[0])
+
+    def fit(self, return_fit=False, weight_fit=False):
+        """
+        Fit a background model to the data.
+
+        Parameters
+        ----------
+        return_fit : bool
+            Return the Fourier transform.
+
+        weight_fit : bool
+            Use weighted least squares as described in the NSClean paper.
+            Turn off by default. For subarrays it is TBD if this is necessary.
+
+        Returns
+        -------
+        rfft : numpy array
+            The computed Fourier transform.
+        """
+
+        # The fit operator depends only on the mask, so it is cached
+        # for later images with the same mask.
+        key = ('subarray', mask_hash(self.mask), tuple(self.fc.tolist()),
+               float(self.weights_kernel_sigma), bool(weight_fit))
+        operator = cached_operator(key, lambda: self._make_fit_operator(weight_fit))
 
         # Solve for the (approximate) Fourier transform of the background samples.
         rfft = np.zeros(len(self.rfftfreq), dtype=np.complex64)
-        if weight_fit is True:
-            rfft[self.apodizer>0.] = np.matmul(pinv_PB * P.reshape((1,-1)), self.data[self.mask])
+        if weight_fit:
+            # The weighted fit needs the transform of the weighted samples
+            # at the fitted frequencies only.
+            k, P2 = operator[:2]
+            ticks = np.zeros((self.ny, self.nx + self.nloh), dtype=np.float64)
+            ticks[:, :self.nx][self.mask] = P2 * self.data[self.mask]
+            weighted = np.fft.rfft(ticks.ravel())[k]
+            rfft[k] = np.matmul(operator[2], weighted)
         else:
-            rfft[self.apodizer>0.] = np.matmul(pinvB, self.data[self.mask])
-
-        # Numpy requires that the forward transform multiply
-        # the data by n. Correct normalization.
-        rfft *= self.n / m.shape[0]
+            rfft[self.apodizer>0.] = np.matmul(operator, self.data[self.mask])
 
         # Invert the apodized Fourier transform to build the background model for this integration
         self.model = np.fft.irfft(rfft*self.apodizer, self.n).reshape((self.ny,-1))[:,:self.nx]
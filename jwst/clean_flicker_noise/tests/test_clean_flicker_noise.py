@@ -9,6 +9,7 @@ from jwst.assign_wcs.tests.test_nirspec import (
     create_nirspec_ifu_file, create_nirspec_fs_file)
 from jwst.msaflagopen.tests.test_msa_open import make_nirspec_mos_model, get_file_path
 from jwst.clean_flicker_noise import clean_flicker_noise as cfn
+from jwst.lib import pipe_utils
 from jwst.tests.helpers import LogWatcher
 
 
@@ -696,6 +697,33 @@ def test_do_correction_user_mask(tmp_path, ndim):
     output_mask.close()
 
 
+def test_do_correction_parallel(tmp_path, monkeypatch):
+    shape = (2, 4, 20, 20)
+    model = make_small_ramp_model(shape)
+    model.groupdq[1, 2, 5, 5] = datamodels.dqflags.group['JUMP_DET']
+    rng = np.random.default_rng(seed=123)
+    model.data += rng.normal(0, 0.1, size=model.data.shape)
+    model.data += np.arange(20)[:, None] * 0.01
+
+    mask = np.full(shape[-2:], True)
+    mask[10:12, 10:12] = False
+    user_mask = str(tmp_path / 'mask.fits')
+    datamodels.ImageModel(mask).save(user_mask)
+
+    expected = cfn.do_correction(
+        model, user_mask=user_mask, save_background=True)
+
+    # Use more processes than there are cores available here
+    monkeypatch.setattr(pipe_utils.os, 'cpu_count', lambda: 4)
+    result = cfn.do_correction(
+        model, user_mask=user_mask, save_background=True, maximum_cores='all')
+
+    assert result[4] == expected[4] == 'COMPLETE'
+    assert not np.allclose(result[0].data, model.data)
+    np.testing.assert_allclose(result[0].data, expected[0].data)
+    np.testing.assert_allclose(result[2].data, expected[2].data)
+
+
 @pytest.mark.parametrize('input_type', ['rate', 'rateints', 'ramp'])
 def test_do_correction_user_mask_mismatch(tmp_path, input_type, log_watcher):
     shape = (3, 5, 20, 20)
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from jwst.clean_flicker_noise import lib
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    lib.clear_operator_cache()
+    yield
+    lib.clear_operator_cache()
+
+
+def direct_line_fit(cleaner, data):
+    """Fit each line with an explicit weighted pseudo-inverse"""
+    model = np.zeros((cleaner.ny, cleaner.nx))
+    for y in range(4, cleaner.ny - 4):
+        d = data[y][cleaner.mask[y]]
+        p = cleaner.P[y][cleaner.mask[y]]
+        if len(d) == 0:
+            continue
+        mu = np.median(d)
+        sigma = 1.4826 * np.median(np.abs(d - mu))
+        d = np.where((mu - cleaner.sigrej * sigma <= d) & (d <= mu + cleaner.sigrej * sigma), d, mu)
+        m = np.arange(cleaner.nx)[cleaner.mask[y]].reshape((-1, 1))
+        k = np.arange(cleaner.nvec).reshape((1, -1))
+        A = np.exp(2 * np.pi * 1J * m * k / cleaner.nx) * p[:, np.newaxis]
+        rfft = np.zeros(cleaner.nx // 2 + 1, dtype=complex)
+        rfft[:cleaner.nvec] = np.linalg.pinv(A) @ (p * d) * cleaner.nx
+        rfft[:cleaner.nvec] *= cleaner.apodizer[:cleaner.nvec]
+        model[y] = np.fft.irfft(rfft, cleaner.nx)
+    return model
+
+
+def direct_subarray_fit(cleaner):
+    """Weighted subarray fit with an explicit pseudo-inverse"""
+    ticks = np.arange(cleaner.n).reshape((cleaner.ny, -1))[:, :cleaner.nx]
+    m = ticks[cleaner.mask].reshape((-1, 1))
+    k = np.arange(len(cleaner.rfftfreq))[cleaner.apodizer > 0].reshape((1, -1))
+    P = np.sqrt(cleaner._make_fit_operator(True)[1])
+    A = np.exp(2 * np.pi * 1J * m * k / cleaner.n) * P[:, np.newaxis]
+    rfft = np.zeros(len(cleaner.rfftfreq), dtype=complex)
+    rfft[k[0]] = np.linalg.pinv(A) @ (P * cleaner.data[cleaner.mask]) * cleaner.n
+    return np.fft.irfft(rfft * cleaner.apodizer, cleaner.n).reshape((cleaner.ny, -1))[:, :cleaner.nx]
+
+
+@pytest.fixture
+def image_and_mask():
+    rng = np.random.default_rng(42)
+    shape = (64, 48)
+    image = rng.normal(size=shape) + np.sin(np.arange(shape[1]) / 5.)
+    mask = rng.random(shape) > 0.3
+    mask[:, 20:30] = False
+    mask[10] = False
+    return image, mask
+
+
+@pytest.mark.parametrize('detector', ['NRS1', 'NRS2'])
+def test_nsclean_fit(image_and_mask, detector):
+    image, mask = image_and_mask
+    cleaner = lib.NSClean(detector, mask, fc=0.1, kill_width=0.04)
+    data = image.T if detector == 'NRS1' else image.T[::-1]
+
+    model = cleaner.fit(data)
+    np.testing.assert_allclose(model, direct_line_fit(cleaner, data), atol=1e-5)
+
+
+def test_nsclean_cache(image_and_mask):
+    image, mask = image_and_mask
+    first = lib.NSClean('NRS1', mask).clean(image.copy())
+    misses = lib.operator_cache_stats['misses']
+    assert lib.operator_cache_stats['hits'] == 0
+
+    # Later images with the same mask reuse all operators
+    second = lib.NSClean('NRS1', mask).clean(image.copy())
+    assert lib.operator_cache_stats['misses'] == misses
+    assert lib.operator_cache_stats['hits'] == misses
+    np.testing.assert_array_equal(first, second)
+
+    # A different mask builds new weights and fit operators
+    mask[0, 0] = not mask[0, 0]
+    lib.NSClean('NRS1', mask).clean(image.copy())
+    assert lib.operator_cache_stats['misses'] == misses + 2
+
+    # Cached operators are shared, so they are read-only
+    cleaner = lib.NSClean('NRS1', mask)
+    with pytest.raises(ValueError):
+        cleaner.P[0, 0] = 1.0
+
+
+@pytest.mark.parametrize('weight_fit', [True, False])
+def test_nsclean_subarray_fit(image_and_mask, weight_fit):
+    image, mask = image_and_mask
+    fc = (1061, 1211, 49943, 49957)
+    cleaner = lib.NSCleanSubarray(image, mask, fc=fc, exclude_outliers=False)
+    model = cleaner.clean(weight_fit=weight_fit, return_model=True)
+
+    if weight_fit:
+        expected = direct_subarray_fit(cleaner)
+    else:
+        pinv = np.linalg.pinv(np.exp(
+            2 * np.pi * 1J * np.arange(cleaner.n).reshape((cleaner.ny, -1))[:, :cleaner.nx][mask][:, None]
+            * np.nonzero(cleaner.apodizer > 0)[0][None, :] / cleaner.n))
+        rfft = np.zeros(len(cleaner.rfftfreq), dtype=complex)
+        rfft[cleaner.apodizer > 0] = pinv @ cleaner.data[mask] * cleaner.n
+        expected = np.fft.irfft(rfft * cleaner.apodizer, cleaner.n).reshape((cleaner.ny, -1))[:, :cleaner.nx]
+    np.testing.assert_allclose(model, expected, atol=1e-5)
+
+    # Same mask: the operator is reused
+    lib.NSCleanSubarray(image, mask, fc=fc, exclude_outliers=False).clean(weight_fit=weight_fit)
+    assert lib.operator_cache_stats == {'hits': 1, 'misses': 1}
+
+
+def test_cache_eviction(monkeypatch):
+    monkeypatch.setattr(lib, 'OPERATOR_CACHE_BYTES', 2000)
+    for i in range(4):
+        lib.cached_operator(('test', i), lambda: np.zeros(100))
+    assert list(lib._operator_cache) == [('test', 2), ('test', 3)]
+
+    # Least recently used entry is dropped first
+    lib.cached_operator(('test', 2), lambda: np.zeros(100))
+    lib.cached_operator(('test', 4), lambda: np.zeros(100))
+    assert list(lib._operator_cache) == [('test', 2), ('test', 4)]
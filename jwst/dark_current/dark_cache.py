@@ -0,0 +1,205 @@
+#
+#  On-disk cache of frame-averaged dark reference data
+#
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+
+import numpy as np
+from stdatamodels.jwst import datamodels
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ["DarkCache"]
+
+
+class DarkCache:
+    """
+    Directory of dark frames already averaged to match science readouts.
+
+    Each entry holds the dark frames averaged for one combination of dark
+    reference file, read pattern, nframes, groupgap and subarray, as numpy
+    ``.npy`` files that are opened memory-mapped, with the metadata and
+    average dark current of the reference file in a small FITS file. Only
+    the groups needed by an exposure are then read from disk, and the
+    reference file itself is not opened. When the number of entries
+    exceeds ``max_entries``, the least recently used ones are removed.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding the cached darks; created if needed.
+
+    max_entries : int
+        Maximum number of averaged darks to keep.
+    """
+
+    suffix = '_darkavg'
+    arrays = ('data', 'dq', 'err')
+
+    def __init__(self, cache_dir, max_entries=10):
+        self.cache_dir = os.path.expanduser(os.path.expandvars(cache_dir))
+        self.max_entries = max_entries
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(dark_file, input_model):
+        """Make the cache key for the dark averaged to match an exposure.
+
+        Parameters
+        ----------
+        dark_file : str
+            Path of the dark reference file.
+
+        input_model : `~jwst.datamodels.RampModel`
+            The science data.
+
+        Returns
+        -------
+        key : str or None
+            Key usable as a directory name, or None if the dark is not
+            a file that can be cached.
+        """
+        if not isinstance(dark_file, (str, os.PathLike)):
+            return None
+        try:
+            stat = os.stat(dark_file)
+        except OSError:
+            return None
+
+        exposure = input_model.meta.exposure
+        subarray = input_model.meta.subarray
+        ident = (os.path.abspath(dark_file), stat.st_mtime_ns, stat.st_size,
+                 exposure.readpatt, exposure.nframes, exposure.groupgap,
+                 subarray.name, subarray.xstart, subarray.ystart,
+                 subarray.xsize, subarray.ysize)
+        digest = hashlib.sha1(repr(ident).encode(), usedforsecurity=False).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(dark_file))[0]
+        key = f'{name}_{exposure.readpatt}_{digest}'
+        return re.sub(r'[^A-Za-z0-9_.-]', '-', key)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def get(self, key, ngroups):
+        """Retrieve a cached averaged dark.
+
+        Parameters
+        ----------
+        key : str
+            Key from `make_key`.
+
+        ngroups : int
+            Number of groups needed. Entries with fewer groups are ignored.
+
+        Returns
+        -------
+        averaged_dark : `~jwst.datamodels.DarkModel` or None
+            The averaged dark, trimmed to ``ngroups`` and backed by the
+            cached files, or None if not found or unreadable.
+        """
+        path = self._path(key)
+        if not os.path.isdir(path):
+            log.debug('No cached averaged dark for %s', key)
+            return None
+        try:
+            # Copy-on-write, so that callers may modify the arrays
+            # without changing the cached files
+            arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='c')
+                      for name in self.arrays}
+            nframes, groupgap = np.load(os.path.join(path, 'exposure.npy'))
+        except Exception as err:
+            log.warning('Could not read cached averaged dark %s: %s', path, err)
+            return None
+
+        if arrays['data'].shape[0] < ngroups:
+            log.debug('Cached averaged dark %s has too few groups', path)
+            return None
+
+        try:
+            averaged_dark = datamodels.DarkModel(os.path.join(path, 'meta.fits'))
+        except Exception as err:
+            log.warning('Could not read cached averaged dark %s: %s', path, err)
+            return None
+        averaged_dark.data = arrays['data'][:ngroups]
+        averaged_dark.dq = arrays['dq'][:ngroups] if arrays['dq'].ndim == 3 else arrays['dq']
+        averaged_dark.err = arrays['err'][:ngroups] if arrays['err'].ndim == 3 else arrays['err']
+        averaged_dark.meta.exposure.nframes = int(nframes)
+        averaged_dark.meta.exposure.ngroups = ngroups
+        averaged_dark.meta.exposure.groupgap = int(groupgap)
+
+        # mark as recently used
+        os.utime(path)
+        log.info('Using cached averaged dark %s', path)
+        return averaged_dark
+
+    def put(self, key, dark_data, ngroups, dark_model):
+        """Store an averaged dark in the cache, evicting old entries as needed.
+
+        Parameters
+        ----------
+        key : str
+            Key from `make_key`.
+
+        dark_data : `~stcal.dark_current.dark_class.DarkData`
+            The dark data subtracted from the science data, averaged to
+            match its nframes and groupgap.
+
+        ngroups : int
+            Number of groups to store.
+
+        dark_model : `~jwst.datamodels.DarkModel`
+            The dark reference model, providing the metadata and the
+            average dark current.
+        """
+        path = self._path(key)
+
+        # write to a temporary directory first so that concurrent readers
+        # never see a partial entry
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        os.makedirs(tmp_path, exist_ok=True)
+        arrays = {'data': dark_data.data, 'dq': dark_data.groupdq, 'err': dark_data.err}
+        for name in self.arrays:
+            array = np.asarray(arrays[name])
+            if array.ndim == 3:
+                array = array[:ngroups]
+            np.save(os.path.join(tmp_path, f'{name}.npy'), array)
+        np.save(os.path.join(tmp_path, 'exposure.npy'),
+                np.array([dark_data.exp_nframes, dark_data.exp_groupgap]))
+        with datamodels.DarkModel() as meta_model:
+            meta_model.update(dark_model)
+            if 'average_dark_current' in dark_model.instance:
+                meta_model.average_dark_current = dark_model.average_dark_current
+            meta_model.save(os.path.join(tmp_path, 'meta.fits'))
+
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Written by another process in the meantime
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+        log.info('Cached averaged dark written as %s', path)
+        self.evict()
+
+    def entries(self):
+        """List the cached averaged darks, least recently used first."""
+        paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                 if name.endswith(self.suffix)]
+        return sorted(paths, key=os.path.getmtime)
+
+    def evict(self):
+        """Remove the least recently used averaged darks beyond ``max_entries``."""
+        paths = self.entries()
+        for path in paths[:max(len(paths) - self.max_entries, 0)]:
+            shutil.rmtree(path, ignore_errors=True)
+            log.debug('Evicted cached averaged dark %s', path)
+
+    def clear(self):
+        """Remove all cached averaged darks."""
+        for path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
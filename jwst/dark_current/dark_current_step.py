@@ -1,6 +1,7 @@
 from stdatamodels.jwst import datamodels
 
 from ..stpipe import Step
+from .dark_cache import DarkCache
 from stcal.dark_current import dark_sub
 import numpy as np
 
@@ -19,6 +20,8 @@ class DarkCurrentStep(Step):
     spec = """
         dark_output = output_file(default = None) # Dark model or averaged dark subtracted
         average_dark_current = float(default=None) # The average dark current for this detector in units of e-/sec.
+        dark_cache_dir = string(default=None) # Directory to cache frame-averaged darks for later exposures
+        dark_cache_size = integer(default=10) # Maximum number of cached frame-averaged darks
     """
 
     reference_file_types = ['dark']
@@ -50,9 +53,18 @@ class DarkCurrentStep(Step):
                     suffix=False
                 )
 
+            # Use the dark frames averaged for an earlier exposure, if cached,
+            # rather than opening the full dark reference file
+            dark_cache, cache_key = self.get_dark_cache(result)
+            averaged_dark = None
+            if cache_key is not None:
+                averaged_dark = dark_cache.get(cache_key, result.data.shape[1])
+
             # Open the dark ref file data model - based on Instrument
             instrument = result.meta.instrument.name
-            if instrument == 'MIRI':
+            if averaged_dark is not None:
+                dark_model = averaged_dark
+            elif instrument == 'MIRI':
                 dark_model = datamodels.DarkMIRIModel(self.dark_name)
             else:
                 dark_model = datamodels.DarkModel(self.dark_name)
@@ -63,14 +75,19 @@ class DarkCurrentStep(Step):
             self.set_average_dark_current(result, dark_model)
 
             # Do the dark correction
-            correction = dark_sub.do_correction(
-                result, dark_model, dark_output
-            )
+            correction = dark_sub.do_correction(result, dark_model, dark_output)
 
             out_data, dark_data = correction
 
-            if dark_data is not None and dark_data.save:
-                save_dark_data_as_dark_model(dark_data, dark_model, instrument)
+            if averaged_dark is not None:
+                if dark_output is not None:
+                    averaged_dark.save(dark_output)
+                averaged_dark.close()
+            elif dark_data is not None:
+                if dark_data.save:
+                    save_dark_data_as_dark_model(dark_data, dark_model, instrument)
+                if cache_key is not None and out_data.cal_step != 'SKIPPED':
+                    dark_cache.put(cache_key, dark_data, result.data.shape[1], dark_model)
 
             out_ramp = dark_output_data_2_ramp_model(out_data, result)
 
@@ -80,6 +97,30 @@ class DarkCurrentStep(Step):
 
         return out_ramp
 
+    def get_dark_cache(self, input_model):
+        """Get the cache of frame-averaged darks, if enabled.
+
+        MIRI darks have planes for each integration and are never
+        frame-averaged, so they are not cached.
+
+        Parameters
+        ----------
+        input_model : stdatamodels.jwst.datamodels.RampModel
+            The input datamodel containing the 4-D ramp array
+
+        Returns
+        -------
+        dark_cache : DarkCache or None
+            The cache, or None if not enabled.
+        cache_key : str or None
+            The key of the averaged dark for the input data, or None if
+            it is not cached.
+        """
+        if self.dark_cache_dir is None or input_model.meta.instrument.name == 'MIRI':
+            return None, None
+        dark_cache = DarkCache(self.dark_cache_dir, max_entries=self.dark_cache_size)
+        return dark_cache, DarkCache.make_key(self.dark_name, input_model)
+
     def set_average_dark_current(self, input_model, dark_model):
         """Take the three possible locations specifying
         the average dark current and assign them to the
@@ -126,6 +167,32 @@ def save_dark_data_as_dark_model(dark_data, dark_model, instrument):
     instrument: str
         The instrument name.
     """
+    out_dark_model = dark_data_to_dark_model(dark_data, dark_model, instrument)
+    out_dark_model.save(dark_data.output_name)
+    out_dark_model.close()
+
+
+def dark_data_to_dark_model(dark_data, dark_model, instrument):
+    """
+    Convert dark data from the dark current step to the appropriate dark model.
+
+    Parameters
+    ----------
+    dark_data: DarkData
+        Dark data used in the dark current step.
+
+    dark_model: DarkMIRIModel or DarkModel
+        The input dark model from reference.
+
+    instrument: str
+        The instrument name.
+
+    Return
+    ------
+    out_dark_model: DarkMIRIModel or DarkModel
+        The dark data, with the exposure metadata of the science data
+        it was averaged to match.
+    """
     if instrument == "MIRI":
         out_dark_model = datamodels.DarkMIRIModel(
             data=dark_data.data,
@@ -141,8 +208,7 @@ def save_dark_data_as_dark_model(dark_data, dark_model, instrument):
     out_dark_model.meta.exposure.nframes = dark_data.exp_nframes
     out_dark_model.meta.exposure.ngroups = dark_data.exp_ngroups
     out_dark_model.meta.exposure.groupgap = dark_data.exp_groupgap
-    out_dark_model.save(dark_data.output_name)
-    out_dark_model.close()
+    return out_dark_model
 
 
 def dark_output_data_2_ramp_model(out_data, out_model):
@@ -11,7 +11,9 @@ from stcal.dark_current.dark_sub import do_correction as darkcorr
 from stcal.dark_current.dark_class import DarkData
 
 from stdatamodels.jwst.datamodels import RampModel, DarkModel, DarkMIRIModel, dqflags
+from stdatamodels.jwst import datamodels
 
+from jwst.dark_current.dark_cache import DarkCache
 from jwst.dark_current.dark_current_step import DarkCurrentStep
 
 
@@ -467,6 +469,71 @@ def test_average_dark_current(make_rampmodel, make_darkmodel):
     assert dark_output.average_dark_current[nrows - 1, ncols - 1] == pytest.approx(average_current)
 
 
+def test_dark_cache(setup_nrc_cube, tmp_path, monkeypatch):
+    """
+    Check that a cached frame-averaged dark gives the same result as
+    averaging the dark reference file, without opening the reference file.
+    """
+    ngroups, nframes, groupgap, nrows, ncols = 3, 2, 1, 20, 20
+    data, _ = setup_nrc_cube('SHALLOW2', ngroups, nframes, groupgap, nrows, ncols)
+    data.meta.exposure.readpatt = 'SHALLOW2'
+    data.data[:] = 100.
+
+    dark = DarkModel((NGROUPS_DARK, nrows, ncols))
+    dark.meta.description = 'Fake dark'
+    dark.meta.reftype = 'DARK'
+    dark.meta.author = 'test'
+    dark.meta.pedigree = 'DUMMY'
+    dark.meta.useafter = '2015-10-01T00:00:00'
+    dark.meta.instrument.name = 'NIRCAM'
+    dark.meta.subarray.xstart = 1
+    dark.meta.subarray.ystart = 1
+    dark.meta.subarray.xsize = ncols
+    dark.meta.subarray.ysize = nrows
+    dark.meta.exposure.ngroups = NGROUPS_DARK
+    dark.meta.exposure.nframes = 1
+    dark.meta.exposure.groupgap = 0
+    dark.data[:] = np.arange(NGROUPS_DARK)[:, None, None]
+    dark.data[:, 5, 5] = np.nan
+    dark.average_dark_current = np.full((nrows, ncols), 0.5, dtype=np.float32)
+    dark_file = str(tmp_path / 'dark.fits')
+    dark.save(dark_file)
+
+    cache_dir = str(tmp_path / 'cache')
+    expected = DarkCurrentStep.call(data, override_dark=dark_file)
+    first = DarkCurrentStep.call(data, override_dark=dark_file, dark_cache_dir=cache_dir)
+
+    # The reference file is not opened when the averaged dark is cached
+    opened = []
+
+    def dark_model_class(init=None, **kwargs):
+        opened.append(init)
+        return DarkModel(init, **kwargs)
+
+    monkeypatch.setattr(datamodels, 'DarkModel', dark_model_class)
+    second = DarkCurrentStep.call(data, override_dark=dark_file, dark_cache_dir=cache_dir)
+    monkeypatch.undo()
+    assert dark_file not in opened
+
+    dark_cache = DarkCache(cache_dir)
+    assert len(dark_cache.entries()) == 1
+    key = DarkCache.make_key(dark_file, data)
+    averaged_dark = dark_cache.get(key, ngroups)
+    assert averaged_dark.data.shape == (ngroups, nrows, ncols)
+    assert averaged_dark.meta.exposure.nframes == nframes
+    assert averaged_dark.meta.exposure.groupgap == groupgap
+    assert averaged_dark.meta.instrument.name == 'NIRCAM'
+
+    for result in (first, second):
+        assert result.meta.cal_step.dark_sub == 'COMPLETE'
+        np.testing.assert_allclose(result.data, expected.data)
+        np.testing.assert_array_equal(result.groupdq, expected.groupdq)
+        np.testing.assert_array_equal(result.average_dark_current, expected.average_dark_current)
+
+    # An exposure with more groups than cached averages the dark again
+    assert dark_cache.get(key, ngroups + 1) is None
+
+
 @pytest.fixture(scope='function')
 def make_rampmodel():
     '''Make MIRI Ramp model for testing'''
@@ -79,7 +79,8 @@ class DQInitStep(Step):
         mask_model = datamodels.MaskModel(self.mask_filename)
 
         # Apply the step
-        result = dq_initialization.correct_model(result, mask_model)
+        result = dq_initialization.correct_model(result, mask_model,
+                                                 ref_file=self.mask_filename)
 
         # Cleanup
         del mask_model
@@ -16,7 +16,7 @@ guider_list = ['FGS_ID-IMAGE', 'FGS_ID-STACK', 'FGS_ACQ1', 'FGS_ACQ2',
                'FGS_TRACK', 'FGS_FINEGUIDE']
 
 
-def correct_model(input_model, mask_model):
+def correct_model(input_model, mask_model, ref_file=None):
     """Perform the dq_init step on a JWST datamodel
 
     Parameters
@@ -27,18 +27,22 @@ def correct_model(input_model, mask_model):
     mask_model : mask datamodel
         The mask model to use in the correction
 
+    ref_file : str, optional
+        Path of the mask reference file, used to cache the subarray
+        extracted from it
+
     Returns
     -------
     output_model : JWST datamodel
         The corrected JWST datamodel
     """
 
-    output_model = do_dqinit(input_model, mask_model)
+    output_model = do_dqinit(input_model, mask_model, ref_file=ref_file)
 
     return output_model
 
 
-def do_dqinit(output_model, mask_model):
+def do_dqinit(output_model, mask_model, ref_file=None):
     """Perform the dq_init step on a JWST datamodel
 
     Parameters
@@ -49,6 +53,10 @@ def do_dqinit(output_model, mask_model):
     mask_model : mask datamodel
         The mask model to use in the correction
 
+    ref_file : str, optional
+        Path of the mask reference file, used to cache the subarray
+        extracted from it
+
     Returns
     -------
     output_model : JWST datamodel
@@ -64,7 +72,8 @@ def do_dqinit(output_model, mask_model):
     else:
         log.info('Extracting mask subarray to match science data')
         mask_sub_model = reffile_utils.get_subarray_model(output_model,
-                                                          mask_model)
+                                                          mask_model,
+                                                          ref_file=ref_file)
         mask_array = mask_sub_model.dq.copy()
         mask_sub_model.close()
 
@@ -3,6 +3,7 @@
 from stdatamodels.jwst import datamodels
 from ..stpipe import Step
 from . import emicorr
+from .waveform_cache import WaveformCache
 
 
 __all__ = ["EmiCorrStep"]
@@ -24,6 +25,8 @@ class EmiCorrStep(Step):
         skip = boolean(default=True)  # Skip the step
         onthefly_corr_freq = float_list(default=None)  # Frequencies to use for correction
         use_n_cycles = integer(default=3)  # Use N cycles to calculate the phase, to use all integrations set to None
+        onthefly_cache_dir = string(default=None)  # Directory to cache on-the-fly waveforms for later exposures
+        onthefly_cache_size = integer(default=100)  # Maximum number of cached on-the-fly waveforms
     """
 
     reference_file_types = ['emicorr']
@@ -57,7 +60,8 @@ class EmiCorrStep(Step):
                 'nbins': self.nbins,
                 'scale_reference': self.scale_reference,
                 'onthefly_corr_freq': self.onthefly_corr_freq,
-                'use_n_cycles': self.use_n_cycles
+                'use_n_cycles': self.use_n_cycles,
+                'waveform_cache': None
             }
 
             # Get the reference file
@@ -65,6 +69,10 @@ class EmiCorrStep(Step):
             if self.onthefly_corr_freq is not None:
                 emicorr_ref_filename = None
                 self.log.info('Correcting with reference file created on-the-fly.')
+                if self.onthefly_cache_dir is not None:
+                    self.log.info('Using on-the-fly waveform cache in {}'.format(self.onthefly_cache_dir))
+                    pars['waveform_cache'] = WaveformCache(self.onthefly_cache_dir,
+                                                           max_entries=self.onthefly_cache_size)
 
             elif self.user_supplied_reffile is None:
                 emicorr_ref_filename = self.get_reference_file(result, 'emicorr')
@@ -6,7 +6,10 @@ Unit tests for EMI correction
 
 
 import numpy as np
+import pytest
+from astropy.stats import sigma_clipped_stats as scs
 from jwst.emicorr import emicorr, emicorr_step
+from jwst.emicorr.waveform_cache import WaveformCache
 from stdatamodels.jwst.datamodels import RampModel, EmiModel
 
 
@@ -136,3 +139,98 @@ def test_rebin():
     compare_arr = np.array([1., 0.55, 1., 1., 1.55, 1., 1.])
 
     assert compare_arr.all() == rebinned_data.all()
+
+
+@pytest.mark.parametrize('readpatt, colstop', [('FAST', 72), ('SLOWR1', 258)])
+def test_get_pixel_times(readpatt, colstop):
+    nints, ngroups, ny, nx = 3, 4, 6, 16
+    nsamples, rowclocks, frameclocks = 9, 82, 23968
+    times = emicorr.get_pixel_times(nints, ngroups, ny, nx, nsamples, rowclocks,
+                                    frameclocks, readpatt, colstop)
+
+    # compare to stepping through every row of every group
+    nx4 = nx // 4
+    expected = np.zeros((nints, ngroups, ny, nx4), dtype='ulonglong')
+    start_time = 0
+    for i in range(nints):
+        for k in range(ngroups):
+            for j in range(ny):
+                expected[i, k, j, :] = np.arange(nx4) * nsamples + start_time
+                if colstop == 258:
+                    expected[i, k, j, -1] += 3 + 2**32
+                start_time += rowclocks
+            start_time += (1024 - ny) * 7
+        if readpatt.endswith('R1'):
+            start_time += frameclocks
+
+    assert times.dtype == np.ulonglong
+    np.testing.assert_array_equal(times, expected)
+
+
+def test_bin_phase_amplitudes():
+    rng = np.random.default_rng(0)
+    phase = rng.random((2, 3, 20, 30))
+    dd = np.sin(2 * np.pi * phase) + rng.normal(0, 0.1, phase.shape)
+    # outliers and bad values should be ignored
+    dd[0, 0, 0, :5] = 100.
+    dd[1, 1, 1, :5] = np.nan
+    nbins = 25
+
+    pa = emicorr.bin_phase_amplitudes(phase, dd, nbins)
+
+    # compare to sigma-clipping every bin separately
+    expected = np.zeros(nbins)
+    for nb in range(nbins):
+        u = np.where((phase > nb / nbins) & (phase <= (nb + 1) / nbins))
+        expected[nb], _, _ = scs(dd[u])
+
+    np.testing.assert_allclose(pa, expected, rtol=1e-10)
+
+
+def test_apply_emicorr_multiple_frequencies():
+    rng = np.random.default_rng(1)
+    data = rng.normal(100, 5, (2, 5, 32, 64)) + 10 * np.sin(np.arange(64) / 3.)
+    input_model = mk_data_mdl(data, 'MASK1550', 'FAST', 'MIRIMAGE')
+    outmdl = emicorr.apply_emicorr(input_model.copy(), None, [390.625, 218.3], None,
+                                   nints_to_phase=None, use_n_cycles=None)
+
+    assert outmdl.data.shape == input_model.data.shape
+    assert np.all(np.isfinite(outmdl.data))
+    assert not np.allclose(outmdl.data, input_model.data)
+
+
+def test_waveform_cache(tmp_path):
+    cache = WaveformCache(str(tmp_path), max_entries=2)
+    key = cache.make_key('MIRIMAGE', 'MASK1550', 'FAST', 218.3, 20)
+    assert cache.get(key) is None
+
+    cache.put(key, np.arange(20.), frequency=218.3)
+    np.testing.assert_array_equal(cache.get(key), np.arange(20.))
+
+    # least recently used entries are evicted
+    for nbins in (30, 40):
+        cache.put(cache.make_key('MIRIMAGE', 'MASK1550', 'FAST', 218.3, nbins), np.zeros(nbins))
+    assert len(cache.entries()) == 2
+    assert cache.get(key) is None
+
+    cache.clear()
+    assert len(cache.entries()) == 0
+
+
+def test_apply_emicorr_waveform_cache(tmp_path):
+    rng = np.random.default_rng(2)
+    data = rng.normal(100, 1, (2, 5, 32, 64)) + 10 * np.sin(np.arange(64) / 3.)
+    cache = WaveformCache(str(tmp_path))
+
+    # the first exposure fills the cache
+    input_model = mk_data_mdl(data, 'MASK1550', 'FAST', 'MIRIMAGE')
+    emicorr.apply_emicorr(input_model.copy(), None, [218.3], None,
+                          nints_to_phase=None, use_n_cycles=None, waveform_cache=cache)
+    assert len(cache.entries()) == 1
+
+    # the second exposure uses it
+    outmdl = emicorr.apply_emicorr(input_model.copy(), None, [218.3], None,
+                                   nints_to_phase=None, use_n_cycles=None, waveform_cache=cache)
+    assert len(cache.entries()) == 1
+    assert np.all(np.isfinite(outmdl.data))
+    assert not np.allclose(outmdl.data, input_model.data)
@@ -0,0 +1,143 @@
+#
+#  On-disk cache of on-the-fly EMI phase amplitude waveforms
+#
+
+import logging
+import os
+import re
+
+import asdf
+import numpy as np
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ["WaveformCache"]
+
+
+class WaveformCache:
+    """
+    Directory of phase amplitude waveforms derived on-the-fly from the data.
+
+    Each waveform is stored in its own small ASDF file, keyed by detector,
+    subarray case, read pattern, frequency and number of bins. When the
+    number of cached waveforms exceeds ``max_entries``, the least recently
+    used files are removed.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding the cached waveforms; created if needed.
+
+    max_entries : int
+        Maximum number of waveforms to keep.
+    """
+
+    suffix = '_emiwave.asdf'
+
+    def __init__(self, cache_dir, max_entries=100):
+        self.cache_dir = os.path.expanduser(os.path.expandvars(cache_dir))
+        self.max_entries = max_entries
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(detector, subname, readpatt, frequency, nbins):
+        """Make the cache key for a waveform.
+
+        Parameters
+        ----------
+        detector, subname, readpatt : str
+            Detector, subarray case and read pattern of the data.
+
+        frequency : float
+            EMI frequency in Hz.
+
+        nbins : int
+            Number of bins in one phased wave.
+
+        Returns
+        -------
+        key : str
+            Key usable as a file name.
+        """
+        key = f'{detector}_{subname}_{readpatt}_{float(frequency):.6f}Hz_{int(nbins)}bins'
+        return re.sub(r'[^A-Za-z0-9_.-]', '-', key.upper())
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def get(self, key):
+        """Retrieve a cached waveform.
+
+        Parameters
+        ----------
+        key : str
+            Key from `make_key`.
+
+        Returns
+        -------
+        phase_amplitudes : numpy array or None
+            The cached waveform, or None if not found or unreadable.
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            log.debug('No cached waveform for %s', key)
+            return None
+        try:
+            with asdf.open(path, lazy_load=False, memmap=False) as af:
+                phase_amplitudes = np.array(af['phase_amplitudes'])
+        except Exception as err:
+            log.warning('Could not read cached waveform %s: %s', path, err)
+            return None
+
+        # mark as recently used
+        os.utime(path)
+        log.info('Using cached waveform %s', path)
+        return phase_amplitudes
+
+    def put(self, key, phase_amplitudes, frequency=None):
+        """Store a waveform in the cache, evicting old entries as needed.
+
+        Parameters
+        ----------
+        key : str
+            Key from `make_key`.
+
+        phase_amplitudes : numpy array
+            The binned phase amplitude waveform.
+
+        frequency : float, optional
+            EMI frequency, stored for reference.
+        """
+        path = self._path(key)
+        tree = {'phase_amplitudes': np.asarray(phase_amplitudes, dtype=np.float64),
+                'frequency': frequency}
+
+        # write to a temporary file first so that concurrent readers
+        # never see a partial file
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        asdf.AsdfFile(tree).write_to(tmp_path)
+        os.replace(tmp_path, path)
+        log.info('Cached waveform written as %s', path)
+        self.evict()
+
+    def entries(self):
+        """List the cached waveform files, least recently used first."""
+        paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                 if name.endswith(self.suffix)]
+        return sorted(paths, key=os.path.getmtime)
+
+    def evict(self):
+        """Remove the least recently used waveforms beyond ``max_entries``."""
+        paths = self.entries()
+        for path in paths[:max(len(paths) - self.max_entries, 0)]:
+            try:
+                os.remove(path)
+                log.debug('Evicted cached waveform %s', path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """Remove all cached waveforms."""
+        for path in self.entries():
+            os.remove(path)
@@ -4,8 +4,6 @@ from jwst.datamodels import ModelContainer, SourceModelContainer
 
 from ..stpipe import Step
 from . import extract
-from .soss_extract import soss_extract
-from .ifu import ifu_extract1d
 
 __all__ = ["Extract1dStep"]
 
@@ -267,7 +265,9 @@ class Extract1dStep(Step):
         # Set flag to output the model and the tikhonov tests
         soss_kwargs['model'] = True if self.soss_modelname else False
 
-        # Run the extraction.
+        # Run the extraction. The SOSS algorithm is only imported when needed,
+        # since it takes a while.
+        from .soss_extract import soss_extract
         result, ref_outputs, atoca_outputs = soss_extract.run_extract1d(
             model,
             pastasoss_ref_name,
@@ -309,6 +309,7 @@ class Extract1dStep(Step):
             source_type = self.ifu_set_srctype
             self.log.info(f"Overriding source type and setting it to {self.ifu_set_srctype}")
 
+        from .ifu import ifu_extract1d
         result = ifu_extract1d(
             model, extract_ref, source_type, self.subtract_background,
             self.bkg_sigma_clip, apcorr_ref, self.center_xy,
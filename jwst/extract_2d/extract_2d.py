@@ -19,7 +19,8 @@ def extract2d(input_model,
               wfss_extract_half_height=None,
               extract_orders=None,
               mmag_extract=None,
-              nbright=None):
+              nbright=None,
+              max_cores='1'):
     """
     The main extract_2d function
 
@@ -46,6 +47,9 @@ def extract2d(input_model,
         Minimum (faintest) abmag to extract for WFSS mode.
     nbright : float
         Number of brightest objects to extract, WFSS mode.
+    max_cores : str
+        Number of NIRSpec slits to extract in parallel threads: an integer,
+        or one of 'none', 'quarter', 'half' or 'all'.
 
     Returns
     -------
@@ -66,7 +70,7 @@ def extract2d(input_model,
             log.info(f'EXP_TYPE {exp_type} with grating=MIRROR not supported for extract 2D')
             input_model.meta.cal_step.extract_2d = 'SKIPPED'
             return input_model
-        output_model = nrs_extract2d(input_model, slit_name=slit_name)
+        output_model = nrs_extract2d(input_model, slit_name=slit_name, max_cores=max_cores)
     elif exp_type in slitless_modes:
         if exp_type == 'NRC_TSGRISM':
             if tsgrism_extract_height is None:
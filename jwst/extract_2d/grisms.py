@@ -18,6 +18,7 @@ from stdatamodels.jwst.transforms.models import IdealToV2V3
 from astropy.modeling import CompoundModel
 
 from ..assign_wcs import util
+from ..lib.reffile_utils import open_reference_model
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -92,7 +93,7 @@ def extract_tso_object(input_model,
     log.info("Setting extraction height to {}".format(tsgrism_extract_height))
 
     # Get the disperser parameters that have the wave limits
-    with WavelengthrangeModel(reference_files['wavelengthrange']) as f:
+    with open_reference_model(reference_files['wavelengthrange'], WavelengthrangeModel) as f:
         if (f.meta.instrument.name != 'NIRCAM' or
                 f.meta.exposure.type != 'NRC_TSGRISM'):
             raise ValueError("Wavelengthrange reference file is not for NIRCAM TSGRISM mode!")
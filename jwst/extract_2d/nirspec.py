@@ -18,7 +18,7 @@ log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 
-def nrs_extract2d(input_model, slit_name=None):
+def nrs_extract2d(input_model, slit_name=None, max_cores='1'):
     """
     Main extract_2d function for NIRSpec exposures.
 
@@ -28,6 +28,9 @@ def nrs_extract2d(input_model, slit_name=None):
         Input data model.
     slit_name : str or int
         Slit name.
+    max_cores : str
+        Number of slits to extract in parallel threads: an integer, or one of
+        'none', 'quarter', 'half' or 'all'.
     """
     exp_type = input_model.meta.exposure.type.upper()
 
@@ -78,13 +81,16 @@ def nrs_extract2d(input_model, slit_name=None):
     else:
         output_model = datamodels.MultiSlitModel()
         output_model.update(input_model)
-        slits = []
 
-        # Loop over all slit instances that are present
-        for slit in open_slits:
+        # Create any missing array of the input before the slits are
+        # extracted, possibly in parallel threads
+        for name in ('data', 'err', 'dq', 'var_rnoise', 'var_poisson'):
+            getattr(input_model, name)
+
+        # Process all slit instances that are present
+        def extract_one_slit(slit):
             new_model, xlo, xhi, ylo, yhi = process_slit(input_model, slit, exp_type)
 
-            slits.append(new_model)
             orig_s_region = new_model.meta.wcsinfo.s_region.strip()
             # set x/ystart values relative to the image (screen) frame.
             # The overall subarray offset is recorded in model.meta.subarray.
@@ -113,7 +119,9 @@ def nrs_extract2d(input_model, slit_name=None):
             # Copy BUNIT values to output slit
             new_model.meta.bunit_data = input_model.meta.bunit_data
             new_model.meta.bunit_err = input_model.meta.bunit_err
+            return new_model
 
+        slits = pipe_utils.map_slits(extract_one_slit, open_slits, max_cores)
         output_model.slits.extend(slits)
 
     return output_model
@@ -183,6 +183,23 @@ def test_extract_2d_nirspec_msa_fs(nirspec_msa_rate, nirspec_msa_metfl):
     result.close()
 
 
+def test_extract_2d_nirspec_msa_fs_threads(nirspec_msa_rate, nirspec_msa_metfl):
+    model = AssignWcsStep.call(ImageModel(nirspec_msa_rate))
+    serial = Extract2dStep.call(model)
+    threaded = Extract2dStep.call(model, maximum_cores='2')
+
+    assert [slit.name for slit in threaded.slits] == [slit.name for slit in serial.slits]
+    for slit, expected in zip(threaded.slits, serial.slits):
+        np.testing.assert_array_equal(slit.data, expected.data)
+        np.testing.assert_array_equal(slit.wavelength, expected.wavelength)
+        assert slit.xstart == expected.xstart
+        assert slit.meta.wcsinfo.s_region == expected.meta.wcsinfo.s_region
+
+    model.close()
+    serial.close()
+    threaded.close()
+
+
 def test_extract_2d_nirspec_fs(nirspec_fs_rate):
     model = ImageModel(nirspec_fs_rate)
     model_wcs = AssignWcsStep.call(model)
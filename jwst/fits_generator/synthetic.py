@@ -0,0 +1,605 @@
+"""
+Synthetic exposures and associations.
+
+Builds data models of arbitrary size for the main instrument modes, with
+the metadata and WCS needed to run them through the pipelines, without
+any input data. Ramps are level 1b exposures; images, multi-slit and IFU
+images are level 2 exposures, with a simple analytic WCS standing in for
+the one assign_wcs would compute from the reference files.
+
+Subarrays are taken from the definitions used by `create_dms_data`.
+
+Example, to write a level 3 association of four dithered NIRCam images::
+
+    from jwst.fits_generator import synthetic
+
+    images = [synthetic.make_image_model('nrc_image', dither=i) for i in range(4)]
+    asn_file = synthetic.write_association(images, 'data', product_name='bench')
+"""
+import logging
+import os
+
+import numpy as np
+from astropy import coordinates as coord
+from astropy import units as u
+from astropy.modeling import models as astmodels
+from gwcs import coordinate_frames as cf
+from gwcs import wcs as gwcs_wcs
+from gwcs.wcstools import wcs_from_fiducial
+from stdatamodels.jwst import datamodels
+
+from ..associations.asn_from_list import asn_from_list
+from ..associations.lib.rules_level2_base import DMSLevel2bBase
+from ..associations.lib.rules_level3_base import DMS_Level3_Base
+from .create_dms_data import subarrays
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ["MODES", "imaging_wcs", "spectral_wcs", "subarray_params",
+           "make_ramp_model", "make_image_model", "make_multislit_model",
+           "make_ifu_image_model", "make_exposures", "write_association"]
+
+# Instrument modes: metadata, detector shape, pixel scale in arcsec and,
+# for spectroscopic modes, the wavelength range in microns
+MODES = {
+    'nrc_image': {'instrument': 'NIRCAM', 'detector': 'NRCA1', 'exp_type': 'NRC_IMAGE',
+                  'filter': 'F200W', 'pupil': 'CLEAR', 'readpatt': 'MEDIUM8',
+                  'shape': (2048, 2048), 'pixel_scale': 0.031},
+    'nis_image': {'instrument': 'NIRISS', 'detector': 'NIS', 'exp_type': 'NIS_IMAGE',
+                  'filter': 'CLEAR', 'pupil': 'F150W', 'readpatt': 'NIS',
+                  'shape': (2048, 2048), 'pixel_scale': 0.065},
+    'mir_image': {'instrument': 'MIRI', 'detector': 'MIRIMAGE', 'exp_type': 'MIR_IMAGE',
+                  'filter': 'F770W', 'readpatt': 'FASTR1',
+                  'shape': (1024, 1032), 'pixel_scale': 0.11},
+    'nrs_msaspec': {'instrument': 'NIRSPEC', 'detector': 'NRS1', 'exp_type': 'NRS_MSASPEC',
+                    'filter': 'CLEAR', 'grating': 'PRISM', 'readpatt': 'NRSIRS2RAPID',
+                    'shape': (2048, 2048), 'pixel_scale': 0.1,
+                    'wavelength_range': (0.6, 5.3)},
+    'nrs_fixedslit': {'instrument': 'NIRSPEC', 'detector': 'NRS1', 'exp_type': 'NRS_FIXEDSLIT',
+                      'filter': 'F290LP', 'grating': 'G395H', 'readpatt': 'NRSRAPID',
+                      'shape': (2048, 2048), 'pixel_scale': 0.1,
+                      'wavelength_range': (2.87, 5.27)},
+    'nrs_ifu': {'instrument': 'NIRSPEC', 'detector': 'NRS1', 'exp_type': 'NRS_IFU',
+                'filter': 'F290LP', 'grating': 'G395H', 'readpatt': 'NRSIRS2RAPID',
+                'shape': (2048, 2048), 'pixel_scale': 0.1,
+                'wavelength_range': (2.87, 5.27)},
+    'mir_mrs': {'instrument': 'MIRI', 'detector': 'MIRIFUSHORT', 'exp_type': 'MIR_MRS',
+                'channel': '12', 'band': 'SHORT', 'readpatt': 'FASTR1',
+                'shape': (1024, 1032), 'pixel_scale': 0.196,
+                'wavelength_range': (4.9, 8.8)},
+}
+
+# Pointing of the first exposure, in degrees
+CRVAL = (150.0, 2.0)
+
+# Dither pattern, in arcsec; longer patterns are repeated with an offset
+DITHERS = ((0., 0.), (1.1, 0.7), (-0.6, 1.3), (0.4, -1.2))
+
+GROUP_TIME = 10.7
+
+
+def _get_mode(mode):
+    try:
+        return MODES[mode]
+    except KeyError:
+        raise ValueError(f"Unknown mode {mode!r}; use one of {', '.join(MODES)}")
+
+
+def subarray_params(instrument, subarray='FULL'):
+    """Position and size of a subarray.
+
+    Parameters
+    ----------
+    instrument : str
+        Instrument name.
+
+    subarray : str or tuple
+        Name of a subarray of the instrument, or a tuple
+        (xstart, ystart, xsize, ysize) of 1-indexed detector pixels.
+
+    Returns
+    -------
+    name, xstart, ystart, xsize, ysize : str, int, int, int, int
+        Name and 1-indexed position and size of the subarray; the name
+        is "GENERIC" for subarrays given as a tuple.
+    """
+    if not isinstance(subarray, str):
+        xstart, ystart, xsize, ysize = subarray
+        return 'GENERIC', xstart, ystart, xsize, ysize
+    known = subarrays.get(instrument.upper(), {})
+    if subarray.upper() not in known:
+        raise ValueError(f"Unknown {instrument} subarray {subarray!r}; "
+                         f"use one of {', '.join(known)} or a tuple")
+    colstart, colstop, rowstart, rowstop, name = known[subarray.upper()]
+    return name, colstart, rowstart, colstop - colstart + 1, rowstop - rowstart + 1
+
+
+def _pointing(dither, pixel_scale):
+    """Sky position of a dither position, in degrees."""
+    cycle, index = divmod(dither, len(DITHERS))
+    offset = np.array(DITHERS[index]) + cycle * 3 * pixel_scale
+    return (CRVAL[0] + offset[0] / 3600 / np.cos(np.deg2rad(CRVAL[1])),
+            CRVAL[1] + offset[1] / 3600)
+
+
+def imaging_wcs(shape, crval, pixel_scale):
+    """Tangent-plane imaging WCS centered on ``crval``, without distortion.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the image, (ny, nx).
+
+    crval : tuple
+        Right ascension and declination of the center of the image, in degrees.
+
+    pixel_scale : float
+        Pixel scale, in arcsec.
+
+    Returns
+    -------
+    wcs : `~gwcs.WCS`
+        WCS from detector to world coordinates.
+    """
+    pscale = pixel_scale / 3600
+    pc = astmodels.AffineTransformation2D(np.array([[-1., 0.], [0., 1.]]),
+                                          name='pc_rotation_matrix')
+    scale = astmodels.Scale(pscale, name='cdelt1') & astmodels.Scale(pscale, name='cdelt2')
+    out_frame = cf.CelestialFrame(name='world', axes_names=('lon', 'lat'),
+                                  reference_frame=coord.ICRS())
+    wcs = wcs_from_fiducial(np.array(crval), coordinate_frame=out_frame,
+                            projection=astmodels.Pix2Sky_TAN(), transform=pc | scale,
+                            input_frame=cf.Frame2D(name='detector'))
+    offsets = (astmodels.Shift(-shape[1] / 2, name='crpix1')
+               & astmodels.Shift(-shape[0] / 2, name='crpix2'))
+    wcs.insert_transform('detector', offsets, after=True)
+    wcs.bounding_box = ((-0.5, shape[1] - 0.5), (-0.5, shape[0] - 0.5))
+    wcs.array_shape = shape
+    return wcs
+
+
+def spectral_wcs(shape, crval, pixel_scale, wavelength_range, dispersion_direction=1):
+    """Linear spectral WCS, from detector to sky and wavelength.
+
+    The position on the sky follows a tangent-plane projection, and the
+    wavelength increases linearly along the dispersion direction.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the image, (ny, nx).
+
+    crval : tuple
+        Right ascension and declination of the center of the image, in degrees.
+
+    pixel_scale : float
+        Pixel scale in the cross-dispersion direction, in arcsec.
+
+    wavelength_range : tuple
+        Wavelengths at the two ends of the dispersion direction, in microns.
+
+    dispersion_direction : int
+        1 if dispersed along x, 2 if dispersed along y.
+
+    Returns
+    -------
+    wcs : `~gwcs.WCS`
+        WCS from detector to (ra, dec, wavelength).
+    """
+    sky = imaging_wcs(shape, crval, pixel_scale).forward_transform
+    axis = dispersion_direction - 1
+    wmin, wmax = wavelength_range
+    wavelength = astmodels.Linear1D(slope=(wmax - wmin) / (shape[1 - axis] - 1),
+                                    intercept=wmin, name='wavelength')
+    transform = astmodels.Mapping((0, 1, axis)) | sky & wavelength
+
+    detector = cf.Frame2D(name='detector', axes_order=(0, 1))
+    sky_frame = cf.CelestialFrame(name='sky', axes_order=(0, 1), reference_frame=coord.ICRS())
+    spec_frame = cf.SpectralFrame(name='spectral', axes_order=(2,), unit=(u.micron,),
+                                  axes_names=('wavelength',))
+    world = cf.CompositeFrame([sky_frame, spec_frame], name='world')
+    wcs = gwcs_wcs.WCS([(detector, transform), (world, None)])
+    wcs.bounding_box = ((-0.5, shape[1] - 0.5), (-0.5, shape[0] - 0.5))
+    wcs.array_shape = shape
+    return wcs
+
+
+def _file_name(config, dither, suffix):
+    return f"jw00001001001_01101_{dither + 1:05d}_{config['detector'].lower()}_{suffix}.fits"
+
+
+def _set_meta(model, mode, subarray, dither, suffix, nints=1, ngroups=1):
+    """Fill in the metadata common to all exposures of a mode."""
+    config = _get_mode(mode)
+    name, xstart, ystart, xsize, ysize = subarray_params(config['instrument'], subarray)
+
+    model.meta.filename = _file_name(config, dither, suffix)
+    model.meta.telescope = 'JWST'
+    instrument = model.meta.instrument
+    instrument.name = config['instrument']
+    instrument.detector = config['detector']
+    for key in ('filter', 'pupil', 'grating', 'channel', 'band'):
+        if key in config:
+            setattr(instrument, key, config[key])
+
+    observation = model.meta.observation
+    observation.date = '2024-01-01'
+    observation.time = f'{dither:02d}:00:00'
+    observation.program_number = '00001'
+    observation.observation_number = '001'
+    observation.visit_number = '001'
+    observation.visit_group = '01'
+    observation.sequence_id = '1'
+    observation.activity_id = '01'
+    observation.exposure_number = str(dither + 1)
+
+    exposure = model.meta.exposure
+    exposure.type = config['exp_type']
+    exposure.readpatt = config['readpatt']
+    exposure.nints = nints
+    exposure.ngroups = ngroups
+    exposure.nframes = 1
+    exposure.groupgap = 0
+    exposure.frame_time = GROUP_TIME
+    exposure.group_time = GROUP_TIME
+    exposure.drop_frames1 = 0
+    duration = nints * ngroups * GROUP_TIME
+    exposure.exposure_time = duration
+    exposure.effective_exposure_time = duration
+    exposure.measurement_time = duration - GROUP_TIME
+    exposure.duration = duration
+    exposure.start_time = 60310.0 + dither / 24
+    exposure.end_time = exposure.start_time + duration / 86400
+    exposure.mid_time = (exposure.start_time + exposure.end_time) / 2
+
+    model.meta.subarray.name = name
+    model.meta.subarray.xstart = xstart
+    model.meta.subarray.ystart = ystart
+    model.meta.subarray.xsize = xsize
+    model.meta.subarray.ysize = ysize
+
+    pointing = _pointing(dither, config['pixel_scale'])
+    model.meta.target.ra, model.meta.target.dec = CRVAL
+    if hasattr(model.meta, 'wcsinfo'):
+        _set_wcsinfo(model, pointing)
+    return config, (ysize, xsize), pointing
+
+
+def _set_wcsinfo(model, pointing):
+    wcsinfo = model.meta.wcsinfo
+    wcsinfo.ra_ref, wcsinfo.dec_ref = pointing
+    wcsinfo.roll_ref = 0.
+    wcsinfo.v3yangle = 0.
+    wcsinfo.vparity = -1
+
+
+def _scene(shape, rng, nsources=None):
+    """Sky background with point sources, in counts per second."""
+    scene = rng.uniform(0.5, 1.5) + np.zeros(shape, dtype=np.float32)
+    nsources = max(shape) if nsources is None else nsources
+    rows = rng.integers(0, shape[0], nsources)
+    cols = rng.integers(0, shape[1], nsources)
+    scene[rows, cols] += rng.uniform(10, 1000, nsources).astype(np.float32)
+    return scene
+
+
+def make_ramp_model(mode='nrc_image', nints=1, ngroups=10, subarray='FULL', dither=0,
+                    cr_fraction=1e-4, seed=None):
+    """Make an uncalibrated ramp.
+
+    Parameters
+    ----------
+    mode : str
+        Instrument mode, one of `MODES`.
+
+    nints, ngroups : int
+        Number of integrations and of groups per integration.
+
+    subarray : str or tuple
+        Subarray, as accepted by `subarray_params`.
+
+    dither : int
+        Index of the dither position, which sets the pointing, exposure
+        number and file name.
+
+    cr_fraction : float
+        Fraction of the samples hit by a cosmic ray.
+
+    seed : int or None
+        Seed of the random numbers.
+
+    Returns
+    -------
+    model : `~jwst.datamodels.RampModel`
+        Ramp in DN, with Poisson and read noise and cosmic ray jumps.
+    """
+    model = datamodels.RampModel()
+    config, shape, _ = _set_meta(model, mode, subarray, dither, 'uncal', nints, ngroups)
+    rng = np.random.default_rng(seed)
+
+    # counts per group, accumulated in place to avoid temporary copies
+    # of the full ramp
+    flux = _scene(shape, rng) * GROUP_TIME
+    data = np.empty((nints, ngroups) + shape, dtype=np.float32)
+    for integration in range(nints):
+        accumulated = np.zeros(shape, dtype=np.float32)
+        for group in range(ngroups):
+            accumulated += rng.poisson(flux)
+            data[integration, group] = accumulated
+    data += rng.normal(0, 5.0, data.shape).astype(np.float32)
+
+    ncr = int(cr_fraction * data.size)
+    if ngroups > 1 and ncr:
+        integrations = rng.integers(0, nints, ncr)
+        groups = rng.integers(1, ngroups, ncr)
+        rows = rng.integers(0, shape[0], ncr)
+        cols = rng.integers(0, shape[1], ncr)
+        for i, g, y, x in zip(integrations, groups, rows, cols):
+            data[i, g:, y, x] += rng.uniform(100, 2000)
+
+    model.data = data
+    model.pixeldq = np.zeros(shape, dtype=np.uint32)
+    model.groupdq = np.zeros(data.shape, dtype=np.uint8)
+    model.err = np.zeros(data.shape, dtype=np.float32)
+    return model
+
+
+def _set_variances(model, shape):
+    model.dq = np.zeros(shape, dtype=np.uint32)
+    model.var_poisson = np.abs(model.data) * 1e-3 + np.float32(1e-3)
+    model.var_rnoise = np.full(shape, 1e-3, dtype=np.float32)
+    model.var_flat = np.zeros(shape, dtype=np.float32)
+    model.err = np.sqrt(model.var_poisson + model.var_rnoise)
+
+
+def _set_photometry(model, pixel_scale):
+    model.meta.bunit_data = 'MJy/sr'
+    model.meta.bunit_err = 'MJy/sr'
+    model.meta.photometry.pixelarea_arcsecsq = pixel_scale**2
+    model.meta.photometry.pixelarea_steradians = (pixel_scale * u.arcsec).to_value(u.rad)**2
+
+
+def make_image_model(mode='nrc_image', subarray='FULL', dither=0, seed=None):
+    """Make a calibrated image, with an imaging WCS.
+
+    Parameters
+    ----------
+    mode : str
+        Imaging mode, one of `MODES`.
+
+    subarray : str or tuple
+        Subarray, as accepted by `subarray_params`.
+
+    dither : int
+        Index of the dither position.
+
+    seed : int or None
+        Seed of the random numbers.
+
+    Returns
+    -------
+    model : `~jwst.datamodels.ImageModel`
+        Image in MJy/sr of a star field, with variances.
+    """
+    model = datamodels.ImageModel()
+    config, shape, pointing = _set_meta(model, mode, subarray, dither, 'cal')
+    rng = np.random.default_rng(seed)
+
+    model.data = _scene(shape, rng) + rng.normal(0, 0.05, shape).astype(np.float32)
+    _set_variances(model, shape)
+    _set_photometry(model, config['pixel_scale'])
+    model.meta.background.subtracted = False
+    model.meta.wcs = imaging_wcs(shape, pointing, config['pixel_scale'])
+    model.meta.cal_step.assign_wcs = 'COMPLETE'
+    return model
+
+
+def _spectra(shape, rng, dispersion_direction, ntraces):
+    """Continuum traces over a background, in MJy/sr."""
+    cross = shape[dispersion_direction - 1]
+    positions = np.linspace(0, cross, ntraces + 2)[1:-1]
+    profile = np.zeros(cross, dtype=np.float32)
+    pixels = np.arange(cross)
+    for position in positions:
+        profile += rng.uniform(10, 100) * np.exp(-0.5 * ((pixels - position) / 1.5)**2)
+    spectra = np.full(shape, 0.5, dtype=np.float32)
+    if dispersion_direction == 1:
+        spectra += profile[:, np.newaxis]
+    else:
+        spectra += profile
+    return spectra + rng.normal(0, 0.05, shape).astype(np.float32)
+
+
+def make_multislit_model(mode='nrs_msaspec', nslits=10, slit_size=(32, 2048), dither=0,
+                         seed=None):
+    """Make a calibrated multi-slit exposure, with a spectral WCS for each slit.
+
+    The slits are stacked along the detector rows, and each holds the
+    spectrum of one source.
+
+    Parameters
+    ----------
+    mode : str
+        Slit spectroscopic mode, one of `MODES`.
+
+    nslits : int
+        Number of slits.
+
+    slit_size : tuple
+        Shape (ny, nx) of the cutout of each slit.
+
+    dither : int
+        Index of the dither (nod) position.
+
+    seed : int or None
+        Seed of the random numbers.
+
+    Returns
+    -------
+    model : `~jwst.datamodels.MultiSlitModel`
+        Slits in MJy/sr, dispersed along x.
+    """
+    model = datamodels.MultiSlitModel()
+    config, _, pointing = _set_meta(model, mode, 'FULL', dither, 'cal')
+    rng = np.random.default_rng(seed)
+    ny, nx = slit_size
+    rows_per_slit = config['shape'][0] // max(nslits, 1)
+
+    for index in range(nslits):
+        slit = datamodels.SlitModel()
+        slit.data = _spectra(slit_size, rng, 1, ntraces=1)
+        _set_variances(slit, slit_size)
+        _set_photometry(slit, config['pixel_scale'])
+        slit.name = str(index + 1)
+        slit.slitlet_id = index + 1
+        slit.source_id = index + 1
+        slit.source_name = f'{index + 1}_SYNTHETIC'
+        slit.source_type = 'POINT'
+        slit.source_xpos = 0.
+        slit.source_ypos = 0.
+        slit.shutter_state = '1x1'
+        slit.quadrant = index % 4 + 1
+        slit.xstart = 1
+        slit.xsize = nx
+        slit.ystart = index * rows_per_slit % config['shape'][0] + 1
+        slit.ysize = ny
+        # sources spread over the field, a little apart from each other
+        crval = (pointing[0], pointing[1] + (index - nslits / 2) * ny * config['pixel_scale'] / 3600)
+        slit.meta.wcs = spectral_wcs(slit_size, crval, config['pixel_scale'],
+                                     config['wavelength_range'])
+        _set_wcsinfo(slit, crval)
+        slit.meta.wcsinfo.dispersion_direction = 1
+        model.slits.append(slit)
+    model.meta.cal_step.assign_wcs = 'COMPLETE'
+    model.meta.cal_step.extract_2d = 'COMPLETE'
+    return model
+
+
+def make_ifu_image_model(mode='mir_mrs', subarray='FULL', nslices=20, dither=0, seed=None):
+    """Make a calibrated IFU image, with a spectral WCS.
+
+    The slices are evenly spaced traces across the detector. The WCS is a
+    single linear mapping, not the per-slice distortion of the instrument,
+    so the data can be run through steps working on IFU images, but not
+    through cube_build.
+
+    Parameters
+    ----------
+    mode : str
+        IFU mode, one of `MODES`.
+
+    subarray : str or tuple
+        Subarray, as accepted by `subarray_params`.
+
+    nslices : int
+        Number of slices.
+
+    dither : int
+        Index of the dither position.
+
+    seed : int or None
+        Seed of the random numbers.
+
+    Returns
+    -------
+    model : `~jwst.datamodels.IFUImageModel`
+        IFU image in MJy/sr, dispersed along y for MIRI and x for NIRSpec.
+    """
+    model = datamodels.IFUImageModel()
+    config, shape, pointing = _set_meta(model, mode, subarray, dither, 'cal')
+    rng = np.random.default_rng(seed)
+    dispersion_direction = 2 if config['instrument'] == 'MIRI' else 1
+
+    model.data = _spectra(shape, rng, dispersion_direction, ntraces=nslices)
+    _set_variances(model, shape)
+    _set_photometry(model, config['pixel_scale'])
+    model.meta.wcsinfo.dispersion_direction = dispersion_direction
+    model.meta.wcs = spectral_wcs(shape, pointing, config['pixel_scale'],
+                                  config['wavelength_range'], dispersion_direction)
+    model.meta.cal_step.assign_wcs = 'COMPLETE'
+    return model
+
+
+def make_exposures(mode, ndithers=1, level=2, seed=None, **kwargs):
+    """Make the dithered exposures of one observation.
+
+    Parameters
+    ----------
+    mode : str
+        Instrument mode, one of `MODES`.
+
+    ndithers : int
+        Number of exposures, each at its own dither position.
+
+    level : int
+        1 for ramps, 2 for calibrated exposures: images, multi-slit or
+        IFU images, depending on the mode.
+
+    seed : int or None
+        Seed of the random numbers; each exposure gets its own seed derived
+        from it.
+
+    **kwargs
+        Passed to the function making each exposure, such as ``nints``,
+        ``ngroups``, ``subarray`` or ``nslits``.
+
+    Returns
+    -------
+    models : list of `~jwst.datamodels.JwstDataModel`
+        The exposures.
+    """
+    exp_type = _get_mode(mode)['exp_type']
+    if level == 1:
+        make_model = make_ramp_model
+    elif exp_type in ('NRS_MSASPEC', 'NRS_FIXEDSLIT'):
+        make_model = make_multislit_model
+    elif exp_type in ('NRS_IFU', 'MIR_MRS'):
+        make_model = make_ifu_image_model
+    else:
+        make_model = make_image_model
+
+    seeds = np.random.SeedSequence(seed).generate_state(ndithers)
+    return [make_model(mode, dither=dither, seed=int(seeds[dither]), **kwargs)
+            for dither in range(ndithers)]
+
+
+def write_association(models, path, product_name='synthetic', level=3):
+    """Save exposures and write an association listing them.
+
+    Parameters
+    ----------
+    models : list of `~jwst.datamodels.JwstDataModel`
+        The exposures, saved under their ``meta.filename``.
+
+    path : str
+        Directory to write to; created if needed.
+
+    product_name : str
+        Name of the product of a level 3 association.
+
+    level : int
+        2 for an image2/spec2 association with one product per exposure,
+        3 for an image3/spec3 association combining them.
+
+    Returns
+    -------
+    asn_file : str
+        Path of the association file.
+    """
+    os.makedirs(path, exist_ok=True)
+    filenames = []
+    for model in models:
+        model.save(os.path.join(path, model.meta.filename))
+        filenames.append(model.meta.filename)
+
+    if level == 2:
+        asn = asn_from_list(filenames, rule=DMSLevel2bBase)
+    else:
+        asn = asn_from_list(filenames, rule=DMS_Level3_Base, product_name=product_name)
+    asn_name, serialized = asn.dump(format='json')
+    asn_file = os.path.join(path, asn_name)
+    with open(asn_file, 'w') as outfile:
+        outfile.write(serialized)
+    log.info(f'Wrote {len(filenames)} exposures and association {asn_file}')
+    return asn_file
@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+import pytest
+from stdatamodels.jwst import datamodels
+
+from jwst.fits_generator import synthetic
+
+
+def test_subarray_params():
+    assert synthetic.subarray_params('MIRI', 'MASK1550') == ('MASK1550', 1, 452, 256, 256)
+    assert synthetic.subarray_params('NIRCAM', (5, 10, 64, 32)) == ('GENERIC', 5, 10, 64, 32)
+    with pytest.raises(ValueError):
+        synthetic.subarray_params('NIRCAM', 'SUB1')
+
+
+def test_make_ramp_model():
+    model = synthetic.make_ramp_model('mir_image', nints=2, ngroups=4, subarray='SUB64', seed=1)
+    assert isinstance(model, datamodels.RampModel)
+    assert model.data.shape == (2, 4, 64, 68)
+    assert model.pixeldq.shape == (64, 68)
+    assert model.meta.subarray.name == 'SUB64'
+    assert model.meta.exposure.ngroups == 4
+    assert model.meta.filename == 'jw00001001001_01101_00001_mirimage_uncal.fits'
+    # ramps go up
+    assert np.all(np.median(np.diff(model.data, axis=1), axis=(2, 3)) > 0)
+
+
+def test_make_exposures_dithered():
+    images = synthetic.make_exposures('nrc_image', ndithers=3, subarray=(1, 1, 64, 64), seed=2)
+    assert [image.meta.observation.exposure_number for image in images] == ['1', '2', '3']
+    centers = [image.meta.wcs(31.5, 31.5) for image in images]
+    assert len({tuple(np.round(center, 8)) for center in centers}) == 3
+    assert images[0].meta.bunit_data == 'MJy/sr'
+
+
+def test_make_multislit_model():
+    model = synthetic.make_multislit_model('nrs_msaspec', nslits=3, slit_size=(16, 100))
+    assert len(model.slits) == 3
+    slit = model.slits[1]
+    assert slit.data.shape == (16, 100)
+    ra, dec, wavelength = slit.meta.wcs(np.array([0, 99]), np.array([8, 8]))
+    assert np.allclose(wavelength, (0.6, 5.3))
+    assert np.all(np.isfinite(ra)) and np.all(np.isfinite(dec))
+
+
+def test_make_ifu_image_model():
+    model = synthetic.make_ifu_image_model('mir_mrs', subarray=(1, 1, 50, 40))
+    assert model.data.shape == (40, 50)
+    assert model.meta.wcsinfo.dispersion_direction == 2
+    _, _, wavelength = model.meta.wcs(np.array([10, 10]), np.array([0, 39]))
+    assert np.allclose(wavelength, (4.9, 8.8))
+
+
+@pytest.mark.parametrize('level, nproducts', [(2, 2), (3, 1)])
+def test_write_association(tmp_path, level, nproducts):
+    images = synthetic.make_exposures('nis_image', ndithers=2, subarray=(1, 1, 32, 32))
+    asn_file = synthetic.write_association(images, str(tmp_path), level=level)
+    with open(asn_file) as asn:
+        products = json.load(asn)['products']
+    assert len(products) == nproducts
+    for image in images:
+        assert (tmp_path / image.meta.filename).exists()
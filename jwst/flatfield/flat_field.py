@@ -30,7 +30,7 @@ VERTICAL = 2
 
 def do_correction(input_model,
                   flat=None, fflat=None, sflat=None, dflat=None, user_supplied_flat=None,
-                  inverse=False):
+                  inverse=False, max_cores='1'):
     """Flat-field a JWST data model using a flat-field model
 
     Parameters
@@ -58,6 +58,10 @@ def do_correction(input_model,
     inverse : boolean
         Invert the math operations used to apply the flat field.
 
+    max_cores : str
+        Number of NIRSpec slits to flat field in parallel threads: an integer,
+        or one of 'none', 'quarter', 'half' or 'all'.
+
     Returns
     -------
     output_model : data model
@@ -78,7 +82,7 @@ def do_correction(input_model,
             (input_model.meta.instrument.lamp_mode != 'IMAGE')):
         flat_applied = do_nirspec_flat_field(output_model, fflat, sflat, dflat,
                                              user_supplied_flat=user_supplied_flat,
-                                             inverse=inverse)
+                                             inverse=inverse, max_cores=max_cores)
     else:
         if user_supplied_flat is not None:
             flat = user_supplied_flat
@@ -244,7 +248,7 @@ def apply_flat_field(science, flat, inverse=False):
 
 
 def do_nirspec_flat_field(output_model, f_flat_model, s_flat_model, d_flat_model,
-                          user_supplied_flat=None, inverse=False):
+                          user_supplied_flat=None, inverse=False, max_cores='1'):
     """Apply flat-fielding for NIRSpec data, updating in-place.
 
     Calls one of 3 functions depending on whether the data is 1) NIRSpec IFU,
@@ -271,6 +275,10 @@ def do_nirspec_flat_field(output_model, f_flat_model, s_flat_model, d_flat_model
     inverse : boolean
         Invert the math operations used to apply the flat field.
 
+    max_cores : str
+        Number of slits to flat field in parallel threads, for fixed slit
+        and MSA data.
+
     Returns
     -------
     ~jwst.datamodels.MultiSlitModel or ~jwst.datamodels.ImageModel
@@ -319,11 +327,12 @@ def do_nirspec_flat_field(output_model, f_flat_model, s_flat_model, d_flat_model
     # For datamodels with slits, MSA and Fixed slit modes:
     else:
         return nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model, dispaxis,
-                              user_supplied_flat=user_supplied_flat, inverse=inverse)
+                              user_supplied_flat=user_supplied_flat, inverse=inverse,
+                              max_cores=max_cores)
 
 
 def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model, dispaxis,
-                   user_supplied_flat=None, inverse=False):
+                   user_supplied_flat=None, inverse=False, max_cores='1'):
     """Apply flat-fielding for NIRSpec fixed slit and MSA data, in-place
 
     Parameters
@@ -350,6 +359,10 @@ def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model, dispa
     inverse : boolean
         Invert the math operations used to apply the flat field.
 
+    max_cores : str
+        Number of slits to flat field in parallel threads: an integer, or
+        one of 'none', 'quarter', 'half' or 'all'.
+
     Returns
     -------
     interpolated_flats: `~jwst.datamodels.MultiSlitModel`
@@ -357,23 +370,18 @@ def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model, dispa
     """
 
     exposure_type = output_model.meta.exposure.type
+    subarray = output_model.meta.subarray
 
-    # Create a list to hold the list of slits.  This will eventually be used
-    # to extend the MultiSlitModel.slits attribute.  We do it this way to
-    # postpone validation until the end, which is faster.
-    flat_slits = []
-
-    # A flag to make sure at least one slit was flatfielded, so we can set
-    # "COMPLETE", otherwise we set "SKIP"
-    any_updated = False
-
-    for slit_idx, slit in enumerate(output_model.slits):
+    def flat_one_slit(slit_idx_slit):
+        """Flat field one slit; return its interpolated flat, if any, and whether it was updated."""
+        slit_idx, slit = slit_idx_slit
         log.info("Working on slit %s", slit.name)
         if exposure_type == "NRS_MSASPEC":
             slit_nt = slit  # includes quadrant info
         else:
             slit_nt = None
 
+        new_flat = None
         if user_supplied_flat is not None:
             slit_flat = user_supplied_flat.slits[slit_idx]
         else:
@@ -390,7 +398,7 @@ def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model, dispa
                 # which means NOT using corrected wavelengths
                 slit_flat = flat_for_nirspec_slit(
                     slit, f_flat_model, s_flat_model, d_flat_model,
-                    dispaxis, exposure_type, slit_nt, output_model.meta.subarray,
+                    dispaxis, exposure_type, slit_nt, subarray,
                     use_wavecorr=False
                 )
 
@@ -401,7 +409,7 @@ def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model, dispa
                 # which means using corrected wavelengths
                 slit_flat = flat_for_nirspec_slit(
                     slit, f_flat_model, s_flat_model, d_flat_model,
-                    dispaxis, exposure_type, slit_nt, output_model.meta.subarray,
+                    dispaxis, exposure_type, slit_nt, subarray,
                     use_wavecorr=True
                 )
 
@@ -414,15 +422,15 @@ def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model, dispa
                 # specification for whether we want to use corrected wavelengths
                 slit_flat = flat_for_nirspec_slit(
                     slit, f_flat_model, s_flat_model, d_flat_model,
-                    dispaxis, exposure_type, slit_nt, output_model.meta.subarray,
+                    dispaxis, exposure_type, slit_nt, subarray,
                     use_wavecorr=None
                 )
                 if slit_flat is None:
                     log.debug(f'Slit {slit} flat field could not be determined.')
-                    continue
+                    return None, False
 
-            # Append the SlitDataModel to the list of slits
-            flat_slits.append(slit_flat)
+            # The SlitDataModel is appended to the list of slits
+            new_flat = slit_flat
 
         # Now let's apply the correction to science data and error arrays.  Rely
         # on array broadcasting to handle the cubes
@@ -444,7 +452,32 @@ def nirspec_fs_msa(output_model, f_flat_model, s_flat_model, d_flat_model, dispa
         # Make sure all NaNs and flags match up in the output model
         pipe_utils.match_nans_and_flags(slit)
 
-        any_updated = True
+        return new_flat, True
+
+    # Read the arrays and tables of the reference flats, shared by all
+    # slits, before the slits are processed, possibly in parallel threads
+    for flat_model in (f_flat_model, s_flat_model, d_flat_model):
+        if flat_model is None:
+            continue
+        if isinstance(flat_model, datamodels.NirspecQuadFlatModel):
+            components = flat_model.quadrants
+        else:
+            components = [flat_model]
+        for component in components:
+            for name in ('data', 'dq', 'err', 'wavelength', 'flat_table'):
+                getattr(component, name)
+
+    # The slits may be processed in parallel threads
+    outcomes = pipe_utils.map_slits(flat_one_slit, enumerate(output_model.slits), max_cores)
+
+    # Create a list to hold the list of slits.  This will eventually be used
+    # to extend the MultiSlitModel.slits attribute.  We do it this way to
+    # postpone validation until the end, which is faster.
+    flat_slits = [new_flat for new_flat, _ in outcomes if new_flat is not None]
+
+    # A flag to make sure at least one slit was flatfielded, so we can set
+    # "COMPLETE", otherwise we set "SKIP"
+    any_updated = any(updated for _, updated in outcomes)
 
     if any_updated:
         output_model.meta.cal_step.flat_field = 'COMPLETE'
@@ -1,5 +1,6 @@
 from stdatamodels.jwst import datamodels
 
+from ..lib.reffile_utils import open_reference_model
 from ..stpipe import Step
 from . import flat_field
 
@@ -60,6 +61,7 @@ class FlatFieldStep(Step):
         save_interpolated_flat = boolean(default=False) # Save interpolated NRS flat
         user_supplied_flat = string(default=None)  # User-supplied flat
         inverse = boolean(default=False)  # Invert the operation
+        maximum_cores = string(default='1')  # Number of NIRSpec slits to flat field in parallel threads. Can be an integer, 'half', 'quarter', or 'all'
     """
 
     reference_file_types = ["flat", "fflat", "sflat", "dflat"]
@@ -125,7 +127,8 @@ class FlatFieldStep(Step):
         output_model, flat_applied = flat_field.do_correction(
             input_model,
             **reference_file_models,
-            inverse=self.inverse
+            inverse=self.inverse,
+            max_cores=self.maximum_cores
         )
 
         # Close the input and reference files
@@ -196,7 +199,7 @@ class FlatFieldStep(Step):
         reference_file_models = {}
         for reftype, reffile in reference_file_names.items():
             if reffile is not None:
-                reference_file_models[reftype] = model_type[reftype](reffile)
+                reference_file_models[reftype] = open_reference_model(reffile, model_type[reftype])
                 self.log.info('Using %s reference file: %s', reftype.upper(), reffile)
             else:
                 self.log.info('No reference found for type %s', reftype.upper())
@@ -8,6 +8,7 @@ from stdatamodels.jwst import datamodels
 from jwst.assign_wcs import AssignWcsStep
 from jwst.assign_wcs.tests.test_nirspec import create_nirspec_ifu_file
 from jwst.flatfield import FlatFieldStep
+from jwst.flatfield import flat_field
 from jwst.flatfield.flat_field_step import NRS_IMAGING_MODES, NRS_SPEC_MODES
 
 
@@ -347,6 +348,54 @@ def test_nirspec_msa_flat():
         flat.close()
 
 
+def test_nirspec_msa_flat_threads():
+    """Test that slits flat fielded in parallel threads match the serial result."""
+    shape = (20, 20)
+    w_shape = (10, 20, 20)
+    rng = np.random.default_rng(42)
+
+    data = datamodels.MultiSlitModel()
+    data.meta.instrument.name = 'NIRSPEC'
+    data.meta.exposure.type = 'NRS_MSASPEC'
+    data.meta.subarray.xstart = 1
+    data.meta.subarray.ystart = 1
+    data.meta.subarray.xsize = shape[1]
+    data.meta.subarray.ysize = shape[0]
+    for i in range(6):
+        slit = datamodels.SlitModel(shape)
+        slit.data = rng.uniform(1, 2, shape)
+        slit.dq = np.zeros(shape, dtype=np.uint32)
+        slit.err = np.full(shape, 0.1)
+        slit.var_poisson = rng.uniform(0, 0.01, shape)
+        slit.var_rnoise = np.full(shape, 0.001)
+        slit.wavelength = np.tile(np.linspace(1 + 0.1 * i, 5, shape[-1]), (shape[0], 1))
+        slit.source_type = 'UNKNOWN'
+        slit.name = str(11 + i)
+        slit.quadrant = 1
+        slit.xcen = 10
+        slit.ycen = 10
+        slit.xstart = 1
+        slit.ystart = 1
+        slit.xsize = shape[1]
+        slit.ysize = shape[0]
+        data.slits.append(slit)
+
+    flats = create_nirspec_flats(w_shape, msa=True)
+    serial, serial_flat = flat_field.do_correction(
+        data, fflat=flats[0], sflat=flats[1], dflat=flats[2])
+    threaded, threaded_flat = flat_field.do_correction(
+        data, fflat=flats[0], sflat=flats[1], dflat=flats[2], max_cores='3')
+
+    assert threaded.meta.cal_step.flat_field == 'COMPLETE'
+    assert [slit.name for slit in threaded_flat.slits] == [slit.name for slit in serial_flat.slits]
+    for slit, expected in zip(threaded.slits, serial.slits):
+        for ext in ['data', 'dq', 'err', 'var_rnoise', 'var_poisson', 'var_flat']:
+            np.testing.assert_array_equal(getattr(slit, ext), getattr(expected, ext))
+
+    for model in [data, serial, serial_flat, threaded, threaded_flat, *flats]:
+        model.close()
+
+
 @pytest.mark.slow
 def test_nirspec_ifu_flat():
     """Test that the interface works for NIRSpec IFU data.
@@ -5,11 +5,13 @@
 
 import logging
 
+import numpy as np
+
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 
-def do_correction(model):
+def do_correction(model, dtype_policy="default"):
     """
     Short Summary
     -------------
@@ -24,6 +26,10 @@ def do_correction(model):
     ----------
     model: data model object
         science data to be corrected. Model is modified in place.
+
+    dtype_policy: str
+        If "float32", the data are rescaled in place as float32,
+        rather than being promoted to float64.
     """
 
     # Get the meta data values that we need
@@ -40,9 +46,12 @@ def do_correction(model):
 
     # Apply the rescaling to the entire data array
     scale = float(frame_divisor) / nframes
-    if not isinstance(type(model.data), float):
-        model.data = (model.data).astype(float)
-    model.data *= scale
+    if dtype_policy == 'float32':
+        model.data *= np.float32(scale)
+    else:
+        if not isinstance(type(model.data), float):
+            model.data = (model.data).astype(float)
+        model.data *= scale
     model.meta.cal_step.group_scale = 'COMPLETE'
 
     return
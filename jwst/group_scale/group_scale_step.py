@@ -1,5 +1,6 @@
 from stdatamodels.jwst import datamodels
 from ..stpipe import Step
+from ..lib.dtype_policy import get_dtype_policy
 from . import group_scale
 
 
@@ -16,6 +17,7 @@ class GroupScaleStep(Step):
     class_alias = "group_scale"
 
     spec = """
+        dtype_policy = option("default", "float32", default="default") # Rescale the data in float32
     """
 
     def process(self, step_input):
@@ -57,7 +59,7 @@ class GroupScaleStep(Step):
             result = input_model.copy()
 
             # Do the scaling
-            group_scale.do_correction(result)
+            group_scale.do_correction(result, dtype_policy=get_dtype_policy(self))
 
             # Cleanup
             del input_model
@@ -99,6 +99,18 @@ def test_scale_value(make_rampmodel):
     assert scale == scale_from_data[0]
 
 
+def test_float32_policy(make_rampmodel):
+    """Check that the float32 dtype policy rescales the data in float32."""
+
+    datmod = make_rampmodel(2, 3, 4, 20, 20)
+
+    expected = GroupScaleStep.call(datmod)
+    output = GroupScaleStep.call(datmod, dtype_policy='float32')
+
+    assert output.data.dtype == np.float32
+    np.testing.assert_allclose(output.data, expected.data, rtol=1e-6)
+
+
 @pytest.fixture(scope='function')
 def make_rampmodel():
     '''Make NIRSPEC IRS2 model for testing'''
@@ -59,66 +59,155 @@ def guider_cds(model, gain_model=None, readnoise_model=None):
     # get needed sizes and shapes
     imshape, n_int, grp_time, exp_type = get_dataset_info(model)
 
-    # If exp_type is 'FGS_ID', force output to have single slice, and use
-    # default GAIN and READNOISE values by setting their ref models to None
+    # If exp_type is 'FGS_ID', use default GAIN and READNOISE values by
+    # setting their ref models to None
     if exp_type[:6] == 'FGS_ID':
-        new_model = datamodels.GuiderCalModel((1,) + imshape)
         gain_model = None
         readnoise_model = None
-    else:
-        new_model = datamodels.GuiderCalModel()
 
     # get gain and readnoise arrays to calculate ERR array
     gain_arr, readnoise_arr = get_ref_arr(model, imshape, gain_model,
                                           readnoise_model)
 
-    # set up output data arrays
-    slope_int_cube = np.zeros((n_int,) + imshape, dtype=np.float32)
-    if exp_type[:6] == 'FGS_ID':
-        var_rn = np.zeros((1,) + imshape, dtype=np.float32)
-        var_pn = np.zeros((1,) + imshape, dtype=np.float32)
-    else:
-        var_rn = np.zeros((n_int,) + imshape, dtype=np.float32)
-        var_pn = np.zeros((n_int,) + imshape, dtype=np.float32)
-    new_model.dq = model.dq
+    rate, err = compute_rates(model.data[np.newaxis], exp_type, [grp_time],
+                              gain_arr, readnoise_arr)
+
+    return make_cal_model(model, rate[0], err[0])
+
+
+def guider_cds_batch(models, gain_model=None, readnoise_model=None,
+                     gain_file=None, readnoise_file=None):
+    """
+    Extended Summary
+    ----------------
+    Calculate the count rates for several guider exposures at once.
+
+    The exposures must share the same exposure type, data shape and
+    subarray, as grouped by `batch_key`, so that the reference arrays are
+    extracted once and the computation is vectorized across exposures.
+    The results are the same as those of `guider_cds` for each exposure.
+
+    Parameters
+    ----------
+    models : list of `datamodels.GuiderRawModel`
+        input data models
+
+    gain_model : `datamodels.GainModel` or None
+        Gain for all pixels
+
+    readnoise_model : `datamodels.ReadnoiseModel` or None
+        Readnoise for all pixels
+
+    gain_file, readnoise_file : str or None
+        Paths of the reference files, used to cache the subarrays
+        extracted from them
 
-    # loop over data integrations
-    for num_int in range(0, n_int):
-        data_sect = model.data[num_int, :, :, :]
-        if exp_type == 'FGS_FINEGUIDE':
-            first_4 = data_sect[:4, :, :].mean(axis=0)
-            last_4 = data_sect[-4:, :, :].mean(axis=0)
-            slope_int_cube[num_int, :, :] = last_4 - first_4
-
-            var_rn[num_int, :, :] = 2 * (readnoise_arr / grp_time)**2
-            var_pn[num_int, :, :] = slope_int_cube[num_int, :, :] / (gain_arr * grp_time)
-
-        elif exp_type[:6] == 'FGS_ID':
-            grp_last = data_sect[1, :, :]
-            grp_first = data_sect[0, :, :]
-
-            if num_int == 0:
-                diff_int0 = grp_last - grp_first
-            if num_int == 1:
-                diff_int1 = grp_last - grp_first
-
-        else:  # ACQ1, ACQ2, or TRACK
-            grp_last = data_sect[1, :, :]
-            grp_first = data_sect[0, :, :]
-            slope_int_cube[num_int, :, :] = grp_last - grp_first
-            var_rn[num_int, :, :] = 2 * (readnoise_arr / grp_time)**2
-            var_pn[num_int, :, :] = slope_int_cube[num_int, :, :] / (gain_arr * grp_time)
+    Returns
+    -------
+    new_models : list of 'datamodels.GuiderCalModel'
+        output data models, in the order of the input models
+    """
+    keys = {batch_key(model)[1:] for model in models}
+    if len(keys) > 1:
+        raise ValueError('Guider exposures in a batch must have the same '
+                         'exposure type, detector, subarray and shape')
+
+    model = models[0]
+    exp_type = model.meta.exposure.type
+    imshape = model.data.shape[-2:]
+    log.info('Computing count rates for %d %s exposures of shape %s',
+             len(models), exp_type, model.data.shape)
 
     if exp_type[:6] == 'FGS_ID':
-        new_model.data[0, :, :] = np.minimum(diff_int1, diff_int0) / grp_time
-        var_rn[0, :, :] = 2 * (readnoise_arr / grp_time)**2
-        var_pn[0, :, :] = np.minimum(diff_int1, diff_int0) / (gain_arr * grp_time)
-    else:  # FINEGUIDE, ACQ1, ACQ2, or TRACK
-        new_model.data = slope_int_cube / grp_time
+        gain_model = None
+        readnoise_model = None
+    gain_arr, readnoise_arr = get_ref_arr(model, imshape, gain_model, readnoise_model,
+                                          gain_file=gain_file,
+                                          readnoise_file=readnoise_file)
+
+    data = np.stack([model.data for model in models])
+    grp_time = [model.meta.exposure.group_time for model in models]
+    rate, err = compute_rates(data, exp_type, grp_time, gain_arr, readnoise_arr)
+
+    return [make_cal_model(model, rate[i], err[i]) for i, model in enumerate(models)]
+
+
+def compute_rates(data, exp_type, grp_time, gain_arr, readnoise_arr):
+    """
+    Short Summary
+    -------------
+    Compute the CDS count rates and errors for a stack of exposures.
+
+    Parameters
+    ----------
+    data : ndarray, 5-D
+        Ramp data of each exposure, with shape
+        (n_exposures, n_int, n_groups, n_rows, n_cols)
+
+    exp_type : str
+        Exposure type shared by the exposures
+
+    grp_time : list of float
+        Group time of each exposure
+
+    gain_arr, readnoise_arr : ndarray, 2-D
+        Gain and readnoise for each pixel
+
+    Returns
+    -------
+    rate : ndarray, 4-D, float32
+        Count rates, with one plane per integration, or a single plane for
+        the ID modes
+
+    err : ndarray, 4-D, float32
+        Errors of the count rates
+    """
+    grp_time = np.asarray(grp_time, dtype=np.float64).reshape(-1, 1, 1, 1)
+
+    if exp_type == 'FGS_FINEGUIDE':
+        first_4 = data[:, :, :4].mean(axis=2)
+        last_4 = data[:, :, -4:].mean(axis=2)
+        slope = (last_4 - first_4).astype(np.float32)
+    else:
+        slope = (data[:, :, 1] - data[:, :, 0]).astype(np.float32)
+        if exp_type[:6] == 'FGS_ID':
+            # Use the minimum of the differences in the two integrations
+            slope = np.minimum(slope[:, 1], slope[:, 0])[:, np.newaxis]
+
+    rate = slope / grp_time
+    var_rn = 2 * (readnoise_arr / grp_time)**2
+    var_pn = slope / (gain_arr * grp_time)
 
     # set err to sqrt of sum of variances
     var_pn[var_pn < 0] = 0.  # ensure variance is non-negative
-    new_model.err = (var_rn + var_pn) ** 0.5
+    err = (var_rn + var_pn) ** 0.5
+
+    return rate.astype(np.float32), err.astype(np.float32)
+
+
+def make_cal_model(model, rate, err):
+    """
+    Short Summary
+    -------------
+    Make the output model for a guider exposure.
+
+    Parameters
+    ----------
+    model : `datamodels.GuiderRawModel`
+        input data model
+
+    rate, err : ndarray, 3-D
+        Count rates and their errors
+
+    Returns
+    -------
+    new_model : 'datamodels.GuiderCalModel'
+        output data model
+    """
+    new_model = datamodels.GuiderCalModel()
+    new_model.dq = model.dq
+    new_model.data = rate
+    new_model.err = err
 
     # Add all table extensions to be carried over to output
     if len(model.planned_star_table):
@@ -141,7 +230,34 @@ def guider_cds(model, gain_model=None, readnoise_model=None):
     return new_model
 
 
-def get_ref_arr(model, imshape, gain_model=None, readnoise_model=None):
+def batch_key(model):
+    """
+    Short Summary
+    -------------
+    Key grouping guider exposures that can be processed together.
+
+    Exposures with the same key use the same reference files and can be
+    stacked for `guider_cds_batch`.
+
+    Parameters
+    ----------
+    model : `datamodels.GuiderRawModel`
+        input data model
+
+    Returns
+    -------
+    key : tuple
+        observation date, exposure type, detector, subarray and data shape
+    """
+    subarray = model.meta.subarray
+    return (model.meta.observation.date, model.meta.exposure.type,
+            model.meta.instrument.detector,
+            (subarray.xstart, subarray.ystart, subarray.xsize, subarray.ysize),
+            model.data.shape)
+
+
+def get_ref_arr(model, imshape, gain_model=None, readnoise_model=None,
+                gain_file=None, readnoise_file=None):
     """
     Extract gain and readnoise arrays in appropriate shape for the sci data from
     the reference files
@@ -160,6 +276,10 @@ def get_ref_arr(model, imshape, gain_model=None, readnoise_model=None):
     readnoise_model : `datamodels.ReadnoiseModel` or None
         Readnoise for all pixels
 
+    gain_file, readnoise_file : str or None
+        Paths of the reference files, used to cache the subarrays
+        extracted from them
+
     Returns
     -------
     gain_arr : ndarray, 2-D, float
@@ -182,7 +302,8 @@ def get_ref_arr(model, imshape, gain_model=None, readnoise_model=None):
             gain_arr = gain_model.data
         else:
             log.info('Extracting reference file subarray to match science data')
-            ref_sub_model = reffile_utils.get_subarray_model(model, gain_model)
+            ref_sub_model = reffile_utils.get_subarray_model(model, gain_model,
+                                                             ref_file=gain_file)
             gain_arr = ref_sub_model.data
             ref_sub_model.close()
 
@@ -199,7 +320,8 @@ def get_ref_arr(model, imshape, gain_model=None, readnoise_model=None):
             readnoise_arr = readnoise_model.data
         else:
             log.info('Extracting readnoise reference file subarray to match science data')
-            ref_sub_model = reffile_utils.get_subarray_model(model, readnoise_model)
+            ref_sub_model = reffile_utils.get_subarray_model(model, readnoise_model,
+                                                             ref_file=readnoise_file)
             readnoise_arr = ref_sub_model.data
             ref_sub_model.close()
 
@@ -1,9 +1,11 @@
 #! /usr/bin/env python
+import os
 
 from crds.core.exceptions import CrdsLookupError
 
 from stdatamodels.jwst import datamodels
 
+from ..datamodels import ModelContainer
 from ..stpipe import Step
 from . import guider_cds
 
@@ -18,34 +20,119 @@ class GuiderCdsStep (Step):
 
     """
     This step calculates the countrate for each pixel for FGS modes.
+
+    The input is a guider exposure, or a list or association of guider
+    exposures, which are processed with `process_batch`.
     """
 
     class_alias = "guider_cds"
 
+    spec = """
+        batch_size = integer(default=64)  # Number of exposures processed together
+    """
+
     def process(self, input):
+        if isinstance(input, (str, os.PathLike)) and str(input).lower().endswith('.json'):
+            input = _association_members(input)
+        if isinstance(input, (list, tuple, ModelContainer)):
+            # Save each result under the name of its exposure
+            self.output_use_model = True
+            return ModelContainer(self.process_batch(input))
+
         with datamodels.GuiderRawModel(input) as input_model:
 
-            # Get the gain reference file
-            gain_model = None   # will overwrite if file can be retrieved
-            try:
-                gain_filename = self.get_reference_file(input_model, 'gain')
-                gain_model = datamodels.GainModel(gain_filename)
-                self.log.info('Using GAIN reference file: %s', gain_filename)
-            except CrdsLookupError:
-                self.log.warning('Unable to retrieve GAIN ref file.')
-
-            # Get the readnoise reference file
-            readnoise_model = None   # will overwrite if file can be retrieved
-            try:
-                readnoise_filename = self.get_reference_file(input_model, 'readnoise')
-                readnoise_model = datamodels.ReadnoiseModel(readnoise_filename)
-                self.log.info('Using READNOISE reference file: %s',
-                              readnoise_filename)
-            except CrdsLookupError:
-                self.log.warning('Unable to retrieve READNOISE ref file.')
+            _, gain_model = self._load_reference(
+                input_model, 'gain', datamodels.GainModel)
+            _, readnoise_model = self._load_reference(
+                input_model, 'readnoise', datamodels.ReadnoiseModel)
 
             out_model = guider_cds.guider_cds(input_model, gain_model, readnoise_model)
 
         out_model.meta.cal_step.guider_cds = 'COMPLETE'
 
         return out_model
+
+    def process_batch(self, inputs):
+        """Calculate the count rates for many guider exposures.
+
+        The exposures are grouped by exposure type, detector, subarray and
+        shape, so that the reference files are looked up and their subarrays
+        extracted once per group, and the count rates of up to
+        ``batch_size`` exposures are computed together.  Exposures given as
+        file names are opened one batch at a time, and closed once their
+        count rates are computed.
+
+        Parameters
+        ----------
+        inputs : list of str or `~jwst.datamodels.GuiderRawModel`
+            The guider exposures.
+
+        Returns
+        -------
+        results : list of `~jwst.datamodels.GuiderCalModel`
+            The count rates, in the order of the inputs.
+        """
+        inputs = list(inputs)
+
+        # Group the exposures, opening them one at a time
+        groups = {}
+        for index, input in enumerate(inputs):
+            model = datamodels.GuiderRawModel(input)
+            groups.setdefault(guider_cds.batch_key(model), []).append(index)
+            if not isinstance(input, datamodels.JwstDataModel):
+                model.close()
+        self.log.info('Processing %d guider exposures in %d groups',
+                      len(inputs), len(groups))
+
+        batch_size = max(self.batch_size, 1)
+        results = [None] * len(inputs)
+        for indexes in groups.values():
+            self._reference_files_used = []
+            gain_filename = readnoise_filename = gain_model = readnoise_model = None
+
+            for start in range(0, len(indexes), batch_size):
+                batch = indexes[start:start + batch_size]
+                models = [datamodels.GuiderRawModel(inputs[index]) for index in batch]
+                if start == 0:
+                    gain_filename, gain_model = self._load_reference(
+                        models[0], 'gain', datamodels.GainModel)
+                    readnoise_filename, readnoise_model = self._load_reference(
+                        models[0], 'readnoise', datamodels.ReadnoiseModel)
+
+                out_models = guider_cds.guider_cds_batch(
+                    models, gain_model, readnoise_model,
+                    gain_file=gain_filename, readnoise_file=readnoise_filename)
+                for index, model, out_model in zip(batch, models, out_models):
+                    out_model.meta.cal_step.guider_cds = 'COMPLETE'
+                    self.finalize_result(out_model, self._reference_files_used)
+                    results[index] = out_model
+                    # close the exposures opened here
+                    if not isinstance(inputs[index], datamodels.JwstDataModel):
+                        model.close()
+
+            if gain_model is not None:
+                gain_model.close()
+            if readnoise_model is not None:
+                readnoise_model.close()
+
+        # The results hold the reference files of their own group
+        self._reference_files_used = []
+        return results
+
+    def _load_reference(self, input_model, reftype, model_class):
+        """Open a reference file, or return None if it can not be retrieved."""
+        try:
+            filename = self.get_reference_file(input_model, reftype)
+        except CrdsLookupError:
+            self.log.warning('Unable to retrieve %s ref file.', reftype.upper())
+            return None, None
+        self.log.info('Using %s reference file: %s', reftype.upper(), filename)
+        return filename, model_class(filename)
+
+
+def _association_members(asn_file):
+    """Paths of the members of the first product of an association."""
+    asn_data = ModelContainer.read_asn(asn_file)
+    asn_dir = os.path.dirname(os.path.abspath(asn_file))
+    return [os.path.join(asn_dir, member['expname'])
+            for member in asn_data['products'][0]['members']]
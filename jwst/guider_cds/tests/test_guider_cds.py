@@ -3,7 +3,11 @@ import pytest
 
 from stdatamodels.jwst import datamodels
 
-from jwst.guider_cds.guider_cds import get_dataset_info, guider_cds
+from jwst.associations.asn_from_list import asn_from_list
+from jwst.datamodels import ModelContainer
+from jwst.guider_cds import GuiderCdsStep
+from jwst.guider_cds.guider_cds import (batch_key, get_dataset_info, guider_cds,
+                                        guider_cds_batch)
 
 
 @pytest.fixture
@@ -154,3 +158,84 @@ def test_err_nonzero(make_guider_image):
     result = guider_cds(model)
 
     assert result.err.max() > 0
+
+
+@pytest.mark.parametrize("exptype", ['FGS_FINEGUIDE', 'FGS_TRACK', 'FGS_ID-IMAGE'])
+def test_guider_cds_batch(exptype, make_guider_image):
+    """Batch processing gives the same results as one exposure at a time."""
+
+    models = []
+    for group_time in [465.643643, 100.0, 12.5]:
+        model = make_guider_image.copy()
+        model.meta.exposure.type = exptype
+        model.meta.exposure.group_time = group_time
+        model.data = np.random.rand(4, 10, 10, 10)
+        models.append(model)
+
+    results = guider_cds_batch(models)
+
+    assert len(results) == len(models)
+    for model, result in zip(models, results):
+        expected = guider_cds(model)
+        np.testing.assert_allclose(result.data, expected.data)
+        np.testing.assert_allclose(result.err, expected.err)
+        assert result.meta.exposure.group_time == model.meta.exposure.group_time
+        assert result.meta.bunit_data == 'DN/s'
+
+
+def test_guider_cds_batch_mismatch(make_guider_image):
+    """Exposures of different types can not be batched together."""
+
+    model = make_guider_image
+    other = model.copy()
+    other.meta.exposure.type = 'FGS_TRACK'
+
+    assert batch_key(model) != batch_key(other)
+    with pytest.raises(ValueError):
+        guider_cds_batch([model, other])
+
+
+def test_step_association(make_guider_image, tmp_path, monkeypatch):
+    """The step processes the exposures of an association in batches."""
+
+    refs = {}
+    for reftype, model_class in [('gain', datamodels.GainModel),
+                                 ('readnoise', datamodels.ReadnoiseModel)]:
+        ref = model_class(data=np.full((10, 10), 2., dtype=np.float32))
+        ref.meta.instrument.name = 'FGS'
+        ref.meta.subarray.xstart = ref.meta.subarray.ystart = 1
+        ref.meta.subarray.xsize = ref.meta.subarray.ysize = 10
+        refs[reftype] = str(tmp_path / f'{reftype}.fits')
+        ref.save(refs[reftype])
+    monkeypatch.setattr(GuiderCdsStep, 'get_reference_file',
+                        lambda self, model, reftype: refs[reftype])
+
+    models = []
+    for i, (exptype, group_time) in enumerate([('FGS_FINEGUIDE', 465.643643),
+                                               ('FGS_ID-IMAGE', 12.5),
+                                               ('FGS_FINEGUIDE', 100.0)]):
+        model = make_guider_image.copy()
+        model.meta.exposure.type = exptype
+        model.meta.exposure.group_time = group_time
+        model.data = np.random.rand(4, 10, 10, 10)
+        model.meta.subarray.xstart = model.meta.subarray.ystart = 1
+        model.meta.subarray.xsize = model.meta.subarray.ysize = 10
+        model.meta.filename = f'guider{i}_uncal.fits'
+        model.save(str(tmp_path / model.meta.filename))
+        models.append(model)
+
+    asn = asn_from_list([model.meta.filename for model in models], product_name='guider')
+    asn_file = tmp_path / 'guider_asn.json'
+    asn_file.write_text(asn.dump()[1])
+
+    results = GuiderCdsStep.call(str(asn_file), batch_size=1)
+
+    assert isinstance(results, ModelContainer)
+    assert len(results) == len(models)
+    with (datamodels.GainModel(refs['gain']) as gain_model,
+          datamodels.ReadnoiseModel(refs['readnoise']) as readnoise_model):
+        for model, result in zip(models, results):
+            expected = guider_cds(model, gain_model, readnoise_model)
+            np.testing.assert_allclose(result.data, expected.data)
+            np.testing.assert_allclose(result.err, expected.err)
+            assert result.meta.cal_step.guider_cds == 'COMPLETE'
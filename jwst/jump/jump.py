@@ -4,10 +4,15 @@ from stcal.jump.jump import detect_jumps
 from stdatamodels.jwst.datamodels import dqflags
 
 from ..lib import reffile_utils
+from ..lib.pipe_utils import compute_num_cores
+from ..lib.shared_arrays import SharedArrays, attach_shared_arrays, row_slices, shared_pool
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Shared arrays and detection parameters, in each worker process
+_worker_arrays = {}
+
 
 def run_detect_jumps(output_model, gain_model, readnoise_model,
                      rejection_thresh, three_grp_thresh, four_grp_thresh,
@@ -59,39 +64,42 @@ def run_detect_jumps(output_model, gain_model, readnoise_model,
         log.info('Extracting readnoise subarray to match science data')
         readnoise_2d = reffile_utils.get_subarray_data(output_model,
                                                        readnoise_model)
-    new_gdq, new_pdq, number_crs, number_extended_events, stddev\
-        = detect_jumps(frames_per_group, output_model.data, output_model.groupdq,
-                                    output_model.pixeldq, output_model.err,
-                                    gain_2d, readnoise_2d,
-                                    rejection_thresh, three_grp_thresh,
-                                    four_grp_thresh, max_cores,
-                                    max_jump_to_flag_neighbors,
-                                    min_jump_to_flag_neighbors,
-                                    flag_4_neighbors, dqflags.pixel,
-                                    after_jump_flag_dn1,
-                                    after_jump_flag_n1,
-                                    after_jump_flag_dn2,
-                                    after_jump_flag_n2,
-                                    min_sat_area=min_sat_area, min_jump_area=min_jump_area,
-                                    expand_factor=expand_factor, use_ellipses=use_ellipses,
-                                    min_sat_radius_extend=min_sat_radius_extend,
-                                    sat_required_snowball=sat_required_snowball, sat_expand=sat_expand,
-                                    expand_large_events=expand_large_events, find_showers=find_showers,
-                                    edge_size=edge_size, extend_snr_threshold=extend_snr_threshold,
-                                    extend_min_area=extend_min_area, extend_inner_radius=extend_inner_radius,
-                                    extend_outer_radius=extend_outer_radius,
-                                    extend_ellipse_expand_ratio=extend_ellipse_expand_ratio,
-                                    grps_masked_after_shower=grps_masked_after_shower,
-                                    min_diffs_single_pass=min_diffs_single_pass,
-                                    max_extended_radius=max_extended_radius,
-                                    minimum_groups=minimum_groups,
-                                    minimum_sigclip_groups=minimum_sigclip_groups,
-                                    only_use_ints=only_use_ints,
-                                    mask_persist_grps_next_int = mask_snowball_persist_next_int,
-                                    persist_grps_flagged = snowball_grps_masked_next_int,
-                                    max_shower_amplitude = max_shower_amplitude
-                                    )
+    args = (rejection_thresh, three_grp_thresh, four_grp_thresh, max_cores,
+            max_jump_to_flag_neighbors, min_jump_to_flag_neighbors,
+            flag_4_neighbors, dqflags.pixel,
+            after_jump_flag_dn1, after_jump_flag_n1,
+            after_jump_flag_dn2, after_jump_flag_n2)
+    kwargs = dict(min_sat_area=min_sat_area, min_jump_area=min_jump_area,
+                  expand_factor=expand_factor, use_ellipses=use_ellipses,
+                  min_sat_radius_extend=min_sat_radius_extend,
+                  sat_required_snowball=sat_required_snowball, sat_expand=sat_expand,
+                  expand_large_events=expand_large_events, find_showers=find_showers,
+                  edge_size=edge_size, extend_snr_threshold=extend_snr_threshold,
+                  extend_min_area=extend_min_area, extend_inner_radius=extend_inner_radius,
+                  extend_outer_radius=extend_outer_radius,
+                  extend_ellipse_expand_ratio=extend_ellipse_expand_ratio,
+                  grps_masked_after_shower=grps_masked_after_shower,
+                  min_diffs_single_pass=min_diffs_single_pass,
+                  max_extended_radius=max_extended_radius,
+                  minimum_groups=minimum_groups,
+                  minimum_sigclip_groups=minimum_sigclip_groups,
+                  only_use_ints=only_use_ints,
+                  mask_persist_grps_next_int=mask_snowball_persist_next_int,
+                  persist_grps_flagged=snowball_grps_masked_next_int,
+                  max_shower_amplitude=max_shower_amplitude)
 
+    # Snowball and shower flagging need the full frame, so only the
+    # per-pixel detection can be split across processes here.
+    ncores = compute_num_cores(max_cores, max_items=output_model.data.shape[2])
+    if ncores > 1 and not (expand_large_events or find_showers):
+        new_gdq, new_pdq, number_crs, number_extended_events = _detect_jumps_parallel(
+            frames_per_group, output_model, gain_2d, readnoise_2d,
+            args, kwargs, ncores)
+    else:
+        new_gdq, new_pdq, number_crs, number_extended_events, stddev \
+            = detect_jumps(frames_per_group, output_model.data, output_model.groupdq,
+                           output_model.pixeldq, output_model.err,
+                           gain_2d, readnoise_2d, *args, **kwargs)
 
     # Update the DQ arrays of the output model with the jump detection results
     output_model.groupdq = new_gdq
@@ -113,3 +121,89 @@ def run_detect_jumps(output_model, gain_model, readnoise_model,
                                                               (total_time * total_pixels)
 
     return output_model
+
+
+def _init_worker(specs, frames_per_group, args, kwargs):
+    """Attach a worker process to the shared arrays."""
+    _worker_arrays.update(attach_shared_arrays(specs))
+    _worker_arrays['params'] = (frames_per_group, args, kwargs)
+
+
+def _detect_jumps_in_rows(task):
+    """Detect jumps in a slice of rows, storing the flags in shared memory."""
+    k, (start, stop, read_start, read_stop) = task
+    arrays = _worker_arrays
+    frames_per_group, args, kwargs = arrays['params']
+    own = slice(start - read_start, stop - read_start)
+
+    new_gdq, new_pdq, *_ = detect_jumps(
+        frames_per_group, arrays['data', k], arrays['groupdq', k],
+        arrays['pixeldq', k], arrays['err', k], arrays['gain', k],
+        arrays['readnoise', k], *args, **kwargs)
+
+    arrays['new_gdq'][:, :, start:stop] = new_gdq[:, :, own]
+    arrays['new_pdq'][start:stop] = new_pdq[own]
+    jump_flag = dqflags.group['JUMP_DET']
+    return np.count_nonzero(np.bitwise_and(new_gdq[:, :, own], jump_flag))
+
+
+def _detect_jumps_parallel(frames_per_group, output_model, gain_2d, readnoise_2d,
+                           args, kwargs, ncores):
+    """
+    Run jump detection on slices of rows in a pool of processes.
+
+    Each slice of the ramp and reference arrays is copied once into its
+    own contiguous block of shared memory, which the worker processes use
+    in place.  The updated flags are written into shared output arrays.
+    Each slice includes one extra row on either side, so that neighbor
+    flagging across slice boundaries matches detection on the full frame.
+
+    Parameters
+    ----------
+    frames_per_group : int
+        Number of frames averaged per group.
+    output_model : `~jwst.datamodels.RampModel`
+        The ramp data.
+    gain_2d, readnoise_2d : ndarray
+        Gain and read noise images matching the science data.
+    args : tuple
+        Positional arguments for `detect_jumps`, following the read noise.
+    kwargs : dict
+        Keyword arguments for `detect_jumps`.  Large event flagging must
+        be turned off.
+    ncores : int
+        Number of processes.
+
+    Returns
+    -------
+    new_gdq, new_pdq : ndarray
+        Updated group and pixel DQ arrays.
+    number_crs : int
+        Number of groups flagged as jumps.
+    number_extended_events : int
+        Number of snowballs and showers, always 0.
+    """
+    # Each worker runs detect_jumps on a single core
+    args = args[:3] + ('1',) + args[4:]
+    nrows = output_model.data.shape[2]
+    slices = row_slices(nrows, ncores, halo=1)
+    inputs = {}
+    for k, (_, _, read_start, read_stop) in enumerate(slices):
+        for name, array in [('data', output_model.data),
+                            ('groupdq', output_model.groupdq),
+                            ('pixeldq', output_model.pixeldq),
+                            ('err', output_model.err),
+                            ('gain', gain_2d), ('readnoise', readnoise_2d)]:
+            inputs[name, k] = array[..., read_start:read_stop, :]
+    outputs = {'new_gdq': (output_model.groupdq.shape, output_model.groupdq.dtype),
+               'new_pdq': (output_model.pixeldq.shape, output_model.pixeldq.dtype)}
+
+    with SharedArrays(inputs, outputs) as shared:
+        log.info(f'Detecting jumps in {len(slices)} slices with {ncores} processes')
+        with shared_pool(ncores, initializer=_init_worker,
+                         initargs=(shared.specs, frames_per_group, args, kwargs)) as pool:
+            number_crs = sum(pool.map(_detect_jumps_in_rows, enumerate(slices)))
+        new_gdq = shared['new_gdq'].copy()
+        new_pdq = shared['new_pdq'].copy()
+
+    return new_gdq, new_pdq, number_crs, 0
@@ -5,6 +5,7 @@ import pytest
 from stdatamodels.jwst.datamodels import GainModel, ReadnoiseModel, RampModel, dqflags
 
 from jwst.jump.jump import run_detect_jumps
+from jwst.lib import pipe_utils
 import multiprocessing
 
 import os
@@ -1022,6 +1023,29 @@ def test_cr_neighbor_sat_flagging(setup_inputs):
     assert dq_out[0, 4, 5, 1] == SATURATED
 
 
+def test_shared_memory_slices_match_serial(setup_inputs, monkeypatch):
+    """
+    Jump detection on slices of rows in shared memory gives the same flags
+    as detection on the full frame, including neighbors across slice edges.
+    """
+    # Use several processes, whatever the number of cores of the machine
+    monkeypatch.setattr(pipe_utils.os, 'cpu_count', lambda: 4)
+    model, rnoise, gain = setup_inputs(ngroups=8, nints=2, nrows=40, ncols=30,
+                                       gain=4, readnoise=5.0, deltatime=3.0)
+    rng = np.random.default_rng(42)
+    ramp = np.arange(8, dtype=np.float32) * 10
+    model.data[:] = ramp[None, :, None, None] + rng.normal(0, 2, model.data.shape)
+    for i, j, y, x in zip(rng.integers(0, 2, 50), rng.integers(1, 8, 50),
+                          rng.integers(0, 40, 50), rng.integers(0, 30, 50)):
+        model.data[i, j:, y, x] += 500.0
+
+    serial = run_detect_jumps(model.copy(), gain, rnoise, 4.0, 5.0, 6.0, '1', 200, 4, True)
+    parallel = run_detect_jumps(model.copy(), gain, rnoise, 4.0, 5.0, 6.0, '3', 200, 4, True)
+
+    assert_array_equal(parallel.groupdq, serial.groupdq)
+    assert_array_equal(parallel.pixeldq, serial.pixeldq)
+
+
 @pytest.fixture
 def setup_inputs():
     def _setup(ngroups=10, readnoise=10, nints=1, nrows=102, ncols=103,
@@ -0,0 +1,159 @@
+"""Floating point precision of science arrays in the pipelines.
+
+Science, error and variance arrays are stored as float32, but some steps
+do their intermediate arithmetic in float64, and may return float64 arrays
+to the next step.  With the ``"float32"`` policy, steps that support it
+keep their intermediates in float32, and the science arrays of every step
+result are cast back to float32.  The ``"default"`` policy keeps the
+existing behavior.
+
+A step follows its own ``dtype_policy`` parameter if it has one that is
+not ``"default"``, and otherwise that of its pipeline.
+"""
+
+import logging
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = [
+    "DTYPE_POLICIES",
+    "SCIENCE_ARRAYS",
+    "cast_float32",
+    "compare_precision",
+    "get_dtype_policy",
+    "working_dtype",
+]
+
+DTYPE_POLICIES = ("default", "float32")
+
+# Floating point arrays kept in float32 by the "float32" policy
+SCIENCE_ARRAYS = ("data", "err", "var_poisson", "var_rnoise", "var_flat", "zeroframe")
+
+
+def get_dtype_policy(step):
+    """Get the dtype policy in effect for a step.
+
+    Parameters
+    ----------
+    step : `~jwst.stpipe.Step`
+        The step.
+
+    Returns
+    -------
+    policy : str
+        One of `DTYPE_POLICIES`.
+    """
+    for obj in (step, step.parent):
+        policy = getattr(obj, "dtype_policy", None)
+        if policy not in (None, "default"):
+            return policy
+    return "default"
+
+
+def working_dtype(policy, *dtypes):
+    """Floating point type for intermediate arithmetic on arrays.
+
+    Parameters
+    ----------
+    policy : str
+        One of `DTYPE_POLICIES`.
+
+    *dtypes : numpy dtype
+        Data types of the arrays involved.
+
+    Returns
+    -------
+    dtype : numpy dtype
+        float32 with the "float32" policy, unless an input is already of
+        higher precision; float64 otherwise.
+    """
+    if policy == "float32":
+        return np.result_type(np.float32, *dtypes)
+    return np.result_type(np.float64, *dtypes)
+
+
+def _science_models(model):
+    """The model and any slits or integrations it holds."""
+    yield model
+    for name in ("slits", "spec"):
+        if name in model.instance:
+            yield from getattr(model, name)
+
+
+def cast_float32(model):
+    """Cast float64 science arrays of a model to float32, in place.
+
+    Parameters
+    ----------
+    model : `~jwst.datamodels.JwstDataModel`
+        The model to update.
+
+    Returns
+    -------
+    names : list of str
+        The names of the arrays that were cast.
+    """
+    names = []
+    for sub_model in _science_models(model):
+        for name in SCIENCE_ARRAYS:
+            array = sub_model.instance.get(name)
+            if isinstance(array, np.ndarray) and array.dtype == np.float64:
+                setattr(sub_model, name, array.astype(np.float32))
+                names.append(name)
+    if names:
+        log.debug(f"Cast {', '.join(names)} to float32")
+    return names
+
+
+def compare_precision(reference, result, names=SCIENCE_ARRAYS):
+    """Quantify the differences between the science arrays of two models.
+
+    Intended to compare the results of the same processing with the
+    "default" and "float32" policies.
+
+    Parameters
+    ----------
+    reference : `~jwst.datamodels.JwstDataModel`
+        The model processed with the reference precision.
+
+    result : `~jwst.datamodels.JwstDataModel`
+        The model to compare.
+
+    names : tuple of str, optional
+        The arrays to compare.  Arrays missing or empty in either model
+        are skipped.
+
+    Returns
+    -------
+    stats : dict
+        For each array, a dict with the maximum absolute difference
+        ``max_abs``, the maximum difference relative to the reference
+        value ``max_rel``, the RMS of the differences ``rms``, and the
+        number of pixels finite in only one of the models ``nan_mismatch``.
+    """
+    stats = {}
+    for name in names:
+        expected = reference.instance.get(name)
+        actual = result.instance.get(name)
+        if not isinstance(expected, np.ndarray) or not isinstance(actual, np.ndarray):
+            continue
+        if expected.size == 0 or expected.shape != actual.shape:
+            continue
+
+        expected = expected.astype(np.float64)
+        actual = actual.astype(np.float64)
+        finite = np.isfinite(expected) & np.isfinite(actual)
+        diff = np.abs(actual[finite] - expected[finite])
+        scale = np.abs(expected[finite])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rel = np.where(scale > 0, diff / scale, 0.)
+        stats[name] = {
+            "max_abs": float(diff.max()) if diff.size else 0.,
+            "max_rel": float(rel.max()) if rel.size else 0.,
+            "rms": float(np.sqrt(np.mean(diff**2))) if diff.size else 0.,
+            "nan_mismatch": int(np.count_nonzero(np.isfinite(expected) != np.isfinite(actual))),
+        }
+    return stats
@@ -0,0 +1,307 @@
+"""Apply consecutive detector1 corrections in a single pass over the ramp.
+
+The saturation, superbias, linearity and dark_current steps each walk the
+full ramp and work on their own copy of the model.  When several of them
+run back to back, this module applies them instead on a single copy of
+the ramp, one integration at a time, so that each integration is read and
+written once while it is in cache rather than once per step.
+
+The per-integration corrections call the same lower-level routines as the
+steps, with the reference data prepared once for the whole exposure.
+"""
+
+import abc
+import logging
+
+import numpy as np
+from stcal.dark_current import dark_class, dark_sub
+from stcal.linearity.linearity import linearity_correction
+from stcal.saturation.saturation import flag_saturated_pixels
+from stdatamodels.jwst import datamodels
+from stdatamodels.jwst.datamodels import dqflags
+
+from . import pipe_utils
+from ..linearity.linearity import get_linearity_coeffs
+from ..saturation.saturation import ATOD_LIMIT, get_read_pattern, get_saturation_thresholds
+from ..superbias.bias_sub import get_bias_model
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = [
+    "FUSABLE_STEPS",
+    "apply_fused_corrections",
+    "can_fuse",
+]
+
+# Steps that may be applied in a fused pass, by pipeline step name
+FUSABLE_STEPS = ("saturation", "superbias", "linearity", "dark_current")
+
+
+class _Correction(abc.ABC):
+    """A correction applied one integration at a time.
+
+    Parameters
+    ----------
+    step : `~jwst.stpipe.Step`
+        The pipeline step providing the parameters and reference files.
+    """
+
+    reftype = None
+    cal_step = None
+
+    def __init__(self, step):
+        self.step = step
+
+    def prepare(self, model):
+        """Load the reference data for the exposure.
+
+        Returns
+        -------
+        ready : bool
+            False if the correction is skipped.
+        """
+        self.ref_name = self.step.get_reference_file(model, self.reftype)
+        self.step.log.info('Using %s reference file %s', self.reftype.upper(), self.ref_name)
+        if self.ref_name == 'N/A':
+            self.step.log.warning('No %s reference file found', self.reftype.upper())
+            self.step.log.warning('%s step will be skipped', self.step.name)
+            setattr(model.meta.cal_step, self.cal_step, 'SKIPPED')
+            return False
+        return True
+
+    @abc.abstractmethod
+    def apply(self, model, integ):
+        """Apply the correction to one integration, in place."""
+
+    def finish(self, model):
+        """Record the correction as complete."""
+        setattr(model.meta.cal_step, self.cal_step, 'COMPLETE')
+
+
+class _Saturation(_Correction):
+    reftype = 'saturation'
+    cal_step = 'saturation'
+
+    def prepare(self, model):
+        if not super().prepare(model):
+            return False
+        ref_model = datamodels.SaturationModel(self.ref_name)
+        sat_thresh, sat_dq = get_saturation_thresholds(model, ref_model,
+                                                       ref_file=self.ref_name)
+        self.sat_thresh = sat_thresh.copy()
+        self.sat_dq = sat_dq.copy()
+        del ref_model
+        self.read_pattern = get_read_pattern(model, self.step.use_readpatt)
+        return True
+
+    def apply(self, model, integ):
+        ints = slice(integ, integ + 1)
+        zframe = model.zeroframe[ints] if model.meta.exposure.zero_frame else None
+        gdq, pdq, zframe = flag_saturated_pixels(
+            model.data[ints], model.groupdq[ints], model.pixeldq,
+            self.sat_thresh, self.sat_dq, ATOD_LIMIT, dqflags.pixel,
+            n_pix_grow_sat=self.step.n_pix_grow_sat,
+            read_pattern=self.read_pattern, zframe=zframe)
+        model.groupdq[ints] = gdq
+        model.pixeldq = pdq
+        if zframe is not None:
+            model.zeroframe[ints] = zframe
+
+
+class _Superbias(_Correction):
+    reftype = 'superbias'
+    cal_step = 'superbias'
+
+    def prepare(self, model):
+        if not super().prepare(model):
+            return False
+        bias_model = get_bias_model(model, datamodels.SuperBiasModel(self.ref_name),
+                                    ref_file=self.ref_name)
+        self.bias = bias_model.data.copy()
+        self.bias_dq = bias_model.dq.copy()
+        del bias_model
+        return True
+
+    def apply(self, model, integ):
+        # combine the science and superbias DQ arrays
+        if integ == 0:
+            model.pixeldq = np.bitwise_or(model.pixeldq, self.bias_dq)
+
+        model.data[integ] -= self.bias
+
+        # Zero values in the ZEROFRAME indicate bad data, so should be kept zero
+        if model.meta.exposure.zero_frame:
+            zframe = model.zeroframe[integ]
+            wh_zero = zframe == 0.
+            zframe -= self.bias
+            zframe[wh_zero] = 0.
+
+
+class _Linearity(_Correction):
+    reftype = 'linearity'
+    cal_step = 'linearity'
+
+    def prepare(self, model):
+        if not super().prepare(model):
+            return False
+        lin_model = datamodels.LinearityModel(self.ref_name)
+        lin_coeffs, lin_dq = get_linearity_coeffs(model, lin_model, ref_file=self.ref_name)
+        self.lin_coeffs = lin_coeffs.copy()
+        self.lin_dq = lin_dq.copy()
+        del lin_model
+        return True
+
+    def apply(self, model, integ):
+        ints = slice(integ, integ + 1)
+        zframe = model.zeroframe[ints] if model.meta.exposure.zero_frame else None
+        data, pdq, zframe = linearity_correction(
+            model.data[ints], model.groupdq[ints], model.pixeldq,
+            self.lin_coeffs, self.lin_dq, dqflags.pixel, zframe=zframe)
+        model.data[ints] = data
+        model.pixeldq = pdq
+        if zframe is not None:
+            model.zeroframe[ints] = zframe
+
+
+class _DarkCurrent(_Correction):
+    reftype = 'dark'
+    cal_step = 'dark_sub'
+
+    def prepare(self, model):
+        if not super().prepare(model):
+            return False
+
+        # Use the dark frames averaged for an earlier exposure, if cached,
+        # rather than opening the full dark reference file
+        self.step.dark_name = self.ref_name
+        dark_cache, cache_key = self.step.get_dark_cache(model)
+        dark_model = None
+        if cache_key is not None:
+            dark_model = dark_cache.get(cache_key, model.data.shape[1])
+            if dark_model is not None:
+                cache_key = None
+        if dark_model is None:
+            dark_model = datamodels.DarkModel(self.ref_name)
+        self.step.set_average_dark_current(model, dark_model)
+
+        # Average the dark frames to match the science groups once for the
+        # exposure:  the science data passed to stcal hold no integration,
+        # so that only the dark is checked and averaged
+        science = dark_class.ScienceData()
+        science.data = model.data[:0]
+        science.groupdq = model.groupdq[:0]
+        science.err = model.err[:0]
+        science.pixeldq = model.pixeldq
+        science.exp_nframes = model.meta.exposure.nframes
+        science.exp_groupgap = model.meta.exposure.groupgap
+        science.exp_intstart = model.meta.exposure.integration_start
+        dark_data = dark_class.DarkData(dark_model=dark_model)
+        out_data, averaged_dark = dark_sub.do_correction_data(science, dark_data)
+        self.status = out_data.cal_step
+        if self.status == 'SKIPPED':
+            return True
+
+        if averaged_dark is None:
+            averaged_dark = dark_data
+        elif cache_key is not None:
+            dark_cache.put(cache_key, averaged_dark, model.data.shape[1], dark_model)
+        self.dark = averaged_dark.data[:model.data.shape[1]]
+        self.dark_dq = averaged_dark.groupdq
+        del dark_model
+        return True
+
+    def apply(self, model, integ):
+        if self.status == 'SKIPPED':
+            return
+
+        # Propagate the dark DQ to the science DQ, and subtract the dark
+        # from each group of the integration
+        if integ == 0:
+            model.pixeldq = np.bitwise_or(model.pixeldq, self.dark_dq)
+        model.data[integ] -= self.dark
+
+    def finish(self, model):
+        self.dark = None
+        self.dark_dq = None
+        model.meta.cal_step.dark_sub = self.status
+
+_CORRECTIONS = {
+    "saturation": _Saturation,
+    "superbias": _Superbias,
+    "linearity": _Linearity,
+    "dark_current": _DarkCurrent,
+}
+
+
+def can_fuse(step, model):
+    """Check whether a step can be applied in a fused pass.
+
+    Steps that are skipped, that save their results or other intermediate
+    products, or that have hooks, are run on their own.
+
+    Parameters
+    ----------
+    step : `~jwst.stpipe.Step`
+        The pipeline step.
+
+    model : `~jwst.datamodels.RampModel`
+        The ramp data.
+
+    Returns
+    -------
+    fusable : bool
+        True if the step can be fused with its neighbors.
+    """
+    if step.name not in FUSABLE_STEPS:
+        return False
+    if step.skip or step.save_results or step.pre_hooks or step.post_hooks:
+        return False
+    if step.name == 'saturation' and pipe_utils.is_irs2(model):
+        return False
+    if step.name == 'dark_current':
+        # MIRI darks have planes for each integration
+        if model.meta.instrument.name == 'MIRI' or step.dark_output is not None:
+            return False
+    return True
+
+
+def apply_fused_corrections(model, steps):
+    """Apply several corrections in one pass over the integrations.
+
+    Parameters
+    ----------
+    model : `~jwst.datamodels.RampModel`
+        The input ramp data.  It is not modified.
+
+    steps : list of `~jwst.stpipe.Step`
+        The steps to apply, in order.  Each must pass `can_fuse`.
+
+    Returns
+    -------
+    result : `~jwst.datamodels.RampModel`
+        The corrected ramp data.
+    """
+    names = ", ".join(step.name for step in steps)
+    log.info(f'Applying fused corrections: {names}')
+
+    # Work on a single copy for all corrections
+    result = model.copy()
+    corrections = []
+    for step in steps:
+        step._reference_files_used = []
+        correction = _CORRECTIONS[step.name](step)
+        if correction.prepare(result):
+            corrections.append(correction)
+
+    nints = result.data.shape[0]
+    for integ in range(nints):
+        for correction in corrections:
+            correction.apply(result, integ)
+
+    for correction in corrections:
+        correction.finish(result)
+    for step in steps:
+        step.finalize_result(result, step._reference_files_used)
+
+    return result
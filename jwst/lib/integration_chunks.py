@@ -0,0 +1,346 @@
+"""Utilities for processing ramp data in chunks of integrations.
+
+Large multi-integration exposures can be calibrated in bounded memory by
+splitting the ramp into chunks of integrations, processing each chunk the
+same way a segmented exposure is processed, and stitching the per-integration
+ramp fitting results back together afterwards.
+"""
+
+import logging
+import os
+import warnings
+
+import numpy as np
+from stcal.ramp_fitting.utils import LARGE_VARIANCE_THRESHOLD
+from stdatamodels.jwst import datamodels
+from stdatamodels.jwst.datamodels import dqflags
+
+from .suffix import remove_suffix
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = [
+    "IntegrationStitcher",
+    "chunk_filename",
+    "combine_integrations",
+    "extract_integrations",
+    "insert_integrations",
+    "integrations_per_chunk",
+]
+
+# Approximate number of full-size working copies of a chunk of ramp data
+# held at once by the detector1 steps (input, step copy and temporaries).
+CHUNK_MEMORY_OVERHEAD = 4
+
+DO_NOT_USE = dqflags.pixel["DO_NOT_USE"]
+SATURATED = dqflags.pixel["SATURATED"]
+
+
+def integrations_per_chunk(model, memory_limit):
+    """Compute the number of integrations to process at once.
+
+    Parameters
+    ----------
+    model : `~jwst.datamodels.RampModel`
+        The ramp data to be processed.
+
+    memory_limit : float or None
+        Memory budget, in GB, for the ramp data of one chunk, including
+        working copies made by the processing steps. If None or not
+        positive, all integrations are processed at once.
+
+    Returns
+    -------
+    nints : int
+        Number of integrations per chunk, at least 1 and at most the
+        number of integrations in the exposure.
+    """
+    nints = model.data.shape[0]
+    if memory_limit is None or memory_limit <= 0:
+        return nints
+
+    int_size = np.prod(model.data.shape[1:])
+    bytes_per_int = int_size * (
+        model.data.itemsize + model.groupdq.itemsize + model.err.itemsize
+    ) * CHUNK_MEMORY_OVERHEAD
+    chunk_nints = int(memory_limit * 1024 ** 3 // bytes_per_int)
+
+    if chunk_nints < 1:
+        log.warning("Memory limit of %g GB is smaller than a single integration; "
+                    "processing one integration at a time", memory_limit)
+    return int(np.clip(chunk_nints, 1, nints))
+
+
+def chunk_filename(filename, chunk_index):
+    """Make a unique file name for a chunk of an exposure.
+
+    The chunk label is inserted ahead of the product suffix, so that
+    intermediate products saved for a chunk do not overwrite each other.
+
+    Parameters
+    ----------
+    filename : str or None
+        File name of the full exposure.
+
+    chunk_index : int
+        Zero-indexed chunk number.
+
+    Returns
+    -------
+    filename : str or None
+        The chunk file name, or None if ``filename`` is None.
+    """
+    if filename is None:
+        return None
+    basename, ext = os.path.splitext(filename)
+    root, separator = remove_suffix(basename)
+    suffix = basename[len(root) + len(separator):]
+    chunk_root = f"{root}_chunk{chunk_index + 1:03d}"
+    if suffix:
+        return f"{chunk_root}{separator}{suffix}{ext}"
+    return f"{chunk_root}{ext}"
+
+
+def extract_integrations(model, start, stop):
+    """Copy a range of integrations out of a ramp model.
+
+    The new model carries the metadata of the input, with
+    ``meta.exposure.integration_start`` and ``integration_end`` updated
+    so that steps treat it like a segment of the full exposure.
+
+    Parameters
+    ----------
+    model : `~jwst.datamodels.RampModel`
+        The full ramp model.
+
+    start, stop : int
+        Zero-indexed integration range to extract, following Python
+        slice conventions.
+
+    Returns
+    -------
+    chunk : `~jwst.datamodels.RampModel`
+        New ramp model containing only the requested integrations.
+    """
+    chunk = datamodels.RampModel(
+        data=model.data[start:stop].copy(),
+        groupdq=model.groupdq[start:stop].copy(),
+        err=model.err[start:stop].copy(),
+        pixeldq=model.pixeldq.copy(),
+    )
+    chunk.update(model)
+
+    for attr in ("zeroframe", "refout"):
+        if model.hasattr(attr):
+            setattr(chunk, attr, getattr(model, attr)[start:stop].copy())
+    if model.hasattr("average_dark_current"):
+        chunk.average_dark_current = model.average_dark_current.copy()
+    for table in ("group", "int_times"):
+        if model.hasattr(table):
+            setattr(chunk, table, getattr(model, table))
+
+    int_start = model.meta.exposure.integration_start
+    if int_start is None:
+        int_start = 1
+    chunk.meta.exposure.integration_start = int_start + start
+    chunk.meta.exposure.integration_end = int_start + stop - 1
+
+    return chunk
+
+
+def insert_integrations(model, chunk, start):
+    """Copy a calibrated chunk of integrations back into a ramp model.
+
+    The ramp arrays of the chunk replace the matching integrations of the
+    model, the pixel DQ flags of the chunk are added to those of the model,
+    and the metadata of the chunk, such as the step completion status, are
+    copied to the model.
+
+    Parameters
+    ----------
+    model : `~jwst.datamodels.RampModel`
+        The full ramp model, updated in place.
+
+    chunk : `~jwst.datamodels.RampModel`
+        Ramp model of the integrations from ``start``, as made by
+        `extract_integrations` and then calibrated.
+
+    start : int
+        Zero-indexed first integration of the chunk.
+    """
+    stop = start + chunk.data.shape[0]
+    for attr in ("data", "groupdq", "err", "zeroframe", "refout"):
+        if not (model.hasattr(attr) and chunk.hasattr(attr)):
+            continue
+        values = getattr(chunk, attr)
+        full = getattr(model, attr)
+        if full.dtype != values.dtype:
+            full = full.astype(np.result_type(full, values))
+            setattr(model, attr, full)
+        full[start:stop] = values
+    model.pixeldq |= chunk.pixeldq
+    if chunk.hasattr("average_dark_current"):
+        model.average_dark_current = chunk.average_dark_current
+
+    filename = model.meta.filename
+    int_start = model.meta.exposure.integration_start
+    int_end = model.meta.exposure.integration_end
+    model.update(chunk)
+    model.meta.filename = filename
+    model.meta.exposure.integration_start = int_start
+    model.meta.exposure.integration_end = int_end
+
+
+def combine_integrations(data, dq, var_poisson, var_rnoise, err):
+    """Combine per-integration ramp fitting results into exposure results.
+
+    This follows the OLS ramp fitting combination: the exposure slope is
+    the inverse-variance weighted mean of the integration slopes, and the
+    Poisson and read noise variances are combined as inverse sums over the
+    usable integrations.
+
+    Parameters
+    ----------
+    data, var_poisson, var_rnoise, err : ndarray
+        Per-integration slope, variances and error, 3-D float.
+
+    dq : ndarray
+        Per-integration DQ, 3-D int.
+
+    Returns
+    -------
+    image_info : tuple
+        The exposure level (data, dq, var_poisson, var_rnoise, err) arrays.
+    """
+    invalid_flags = DO_NOT_USE | SATURATED
+    usable = (np.bitwise_and(dq, invalid_flags) == 0)
+
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", ".*divide by zero.*", RuntimeWarning)
+        warnings.filterwarnings("ignore", ".*invalid value.*", RuntimeWarning)
+
+        weight = np.where(usable & (err > 0), 1. / err.astype(np.float64) ** 2, 0.)
+        num = np.where(weight > 0, data * weight, 0.).sum(axis=0)
+        rate = num / weight.sum(axis=0)
+        rate[~np.isfinite(rate)] = 0.
+
+        def _inverse_sum(var):
+            inv = np.where(usable & (var > 0), 1. / var.astype(np.float64), 0.)
+            combined = 1. / inv.sum(axis=0)
+            combined[combined > LARGE_VARIANCE_THRESHOLD] = 0.
+            combined[~np.isfinite(combined)] = 0.
+            return combined
+
+        var_p = _inverse_sum(var_poisson)
+        var_r = _inverse_sum(var_rnoise)
+        var_p[np.where(usable, var_poisson, 0.).sum(axis=0) == 0] = 0.
+        total_err = np.sqrt(var_p + var_r)
+
+    # Compress the integration DQ: DO_NOT_USE and SATURATED are only set
+    # when they apply to every integration.
+    final_dq = np.bitwise_or.reduce(dq, axis=0)
+    final_dq = np.bitwise_and(final_dq, np.uint32(~invalid_flags & 0xFFFFFFFF))
+    all_invalid = np.all(np.bitwise_and(dq, invalid_flags) > 0, axis=0)
+    final_dq[all_invalid] |= DO_NOT_USE
+    all_saturated = np.all(np.bitwise_and(dq, SATURATED) > 0, axis=0)
+    final_dq[all_saturated] |= DO_NOT_USE | SATURATED
+
+    rate[np.bitwise_and(final_dq, invalid_flags) > 0] = np.nan
+
+    return (rate.astype(np.float32), final_dq.astype(np.uint32),
+            var_p.astype(np.float32), var_r.astype(np.float32),
+            total_err.astype(np.float32))
+
+
+class IntegrationStitcher:
+    """Assemble ramp fitting products from chunks of integrations.
+
+    Parameters
+    ----------
+    input_model : `~jwst.datamodels.RampModel`
+        The full exposure ramp model the chunks were extracted from.
+    """
+
+    def __init__(self, input_model):
+        self.input_model = input_model
+        nints, _, nrows, ncols = input_model.data.shape
+        shape = (nints, nrows, ncols)
+        self.data = np.full(shape, np.nan, dtype=np.float32)
+        # Integrations of chunks that are not added stay unusable
+        self.dq = np.full(shape, DO_NOT_USE, dtype=np.uint32)
+        self.var_poisson = np.zeros(shape, dtype=np.float32)
+        self.var_rnoise = np.zeros(shape, dtype=np.float32)
+        self.err = np.zeros(shape, dtype=np.float32)
+        self.rate_template = None
+        self.ints_template = None
+
+    def add(self, rate_model, ints_model, start):
+        """Store the results for one chunk.
+
+        Parameters
+        ----------
+        rate_model : `~jwst.datamodels.ImageModel`
+            Exposure level ramp fitting result for the chunk.
+
+        ints_model : `~jwst.datamodels.CubeModel`
+            Integration level ramp fitting result for the chunk.
+
+        start : int
+            Zero-indexed first integration of the chunk.
+        """
+        stop = start + ints_model.data.shape[0]
+        self.data[start:stop] = ints_model.data
+        self.dq[start:stop] = ints_model.dq
+        self.var_poisson[start:stop] = ints_model.var_poisson
+        self.var_rnoise[start:stop] = ints_model.var_rnoise
+        self.err[start:stop] = ints_model.err
+
+        # Keep the metadata of the first chunk for the stitched products
+        if self.rate_template is None:
+            self.rate_template = rate_model
+            self.ints_template = ints_model
+        else:
+            rate_model.close()
+            ints_model.close()
+
+    def _restore_meta(self, model):
+        model.meta.filename = self.input_model.meta.filename
+        model.meta.exposure.integration_start = self.input_model.meta.exposure.integration_start
+        model.meta.exposure.integration_end = self.input_model.meta.exposure.integration_end
+
+    def finish(self):
+        """Create the stitched exposure and integration products.
+
+        Returns
+        -------
+        rate_model : `~jwst.datamodels.ImageModel` or `~jwst.datamodels.IFUImageModel`
+            The exposure level product.
+
+        ints_model : `~jwst.datamodels.CubeModel`
+            The integration level product.
+        """
+        if self.rate_template is None:
+            raise ValueError("No chunks have been added")
+
+        ints_model = self.ints_template
+        ints_model.data = self.data
+        ints_model.dq = self.dq
+        ints_model.var_poisson = self.var_poisson
+        ints_model.var_rnoise = self.var_rnoise
+        ints_model.err = self.err
+        if self.input_model.hasattr("int_times"):
+            ints_model.int_times = self.input_model.int_times
+        self._restore_meta(ints_model)
+
+        data, dq, var_poisson, var_rnoise, err = combine_integrations(
+            self.data, self.dq, self.var_poisson, self.var_rnoise, self.err)
+        rate_model = self.rate_template
+        rate_model.data = data
+        rate_model.dq = dq
+        rate_model.var_poisson = var_poisson
+        rate_model.var_rnoise = var_rnoise
+        rate_model.err = err
+        self._restore_meta(rate_model)
+
+        return rate_model, ints_model
@@ -1,6 +1,8 @@
 """Pipeline utilities objects"""
 
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from stdatamodels.properties import ObjectNode
@@ -151,3 +153,80 @@ def match_nans_and_flags(input_model):
     # Update the DQ extension
     if input_model.dq.shape == data_shape:
         input_model.dq[is_invalid] |= dqflags.pixel['DO_NOT_USE']
+
+
+def compute_num_cores(max_cores, max_items=None):
+    """Compute the number of cores to use for parallel processing.
+
+    Parameters
+    ----------
+    max_cores : str
+        Requested number of cores, as given to a step's ``maximum_cores``
+        parameter: an integer, or one of 'none', 'quarter', 'half' or 'all'.
+
+    max_items : int, optional
+        Number of items to be processed. No more cores than items are used.
+
+    Returns
+    -------
+    ncores : int
+        Number of cores to use, at least 1.
+    """
+    available = os.cpu_count() or 1
+    max_cores = str(max_cores).strip().lower()
+    if max_cores.isnumeric():
+        ncores = int(max_cores)
+    elif max_cores == 'quarter':
+        ncores = available // 4
+    elif max_cores == 'half':
+        ncores = available // 2
+    elif max_cores == 'all':
+        ncores = available
+    else:
+        if max_cores not in ('none', 'one'):
+            log.warning(f"Unrecognized value for maximum_cores: '{max_cores}'; using 1")
+        ncores = 1
+
+    ncores = min(ncores, available)
+    if max_items is not None:
+        ncores = min(ncores, max_items)
+    return max(ncores, 1)
+
+
+def map_slits(func, slits, max_cores='1'):
+    """Apply a function to each slit, in parallel threads if requested.
+
+    The slits of multi-slit exposures are calibrated independently, so
+    their processing can be spread over threads: most of the time goes to
+    numpy operations, including the WCS evaluation, which release the GIL.
+    The function must not modify anything shared between slits, such as
+    the exposure-level metadata: it should update its own slit only, and
+    return what needs combining, which is done after all slits are done.
+
+    Parameters
+    ----------
+    func : callable
+        Function of one slit.
+
+    slits : iterable
+        The slits, or any per-slit items.
+
+    max_cores : str
+        Number of threads, as given to a step's ``maximum_cores``
+        parameter: an integer, or one of 'none', 'quarter', 'half' or 'all'.
+
+    Returns
+    -------
+    results : list
+        The values returned by ``func``, in the order of ``slits``. If
+        ``func`` raises an exception for any slit, the first one, in the
+        order of the slits, is raised.
+    """
+    slits = list(slits)
+    nthreads = compute_num_cores(max_cores, len(slits))
+    if nthreads == 1:
+        return [func(slit) for slit in slits]
+
+    log.debug(f'Processing {len(slits)} slits using {nthreads} threads')
+    with ThreadPoolExecutor(max_workers=nthreads) as executor:
+        return list(executor.map(func, slits))
@@ -1,3 +1,7 @@
+import os
+import threading
+from collections import OrderedDict
+
 import numpy as np
 
 from stdatamodels.jwst import datamodels
@@ -7,6 +11,22 @@ import logging
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Subarray models extracted from reference files, kept for reuse across
+# exposures with the same subarray, in least recently used order.  Entries are
+# dropped once their total size exceeds SUBARRAY_CACHE_BYTES.
+SUBARRAY_CACHE_BYTES = 1024**3
+_subarray_cache = OrderedDict()
+_subarray_cache_lock = threading.Lock()
+subarray_cache_stats = {'hits': 0, 'misses': 0}
+
+# Reference models opened from files, kept for reuse across steps and
+# exposures, in least recently used order.  Models are dropped once their
+# total size exceeds REFERENCE_CACHE_BYTES; 0 disables the cache.
+REFERENCE_CACHE_BYTES = 2 * 1024**3
+_reference_cache = OrderedDict()
+_reference_cache_lock = threading.Lock()
+reference_cache_stats = {'hits': 0, 'misses': 0}
+
 
 def is_subarray(input_model):
     """
@@ -292,7 +312,7 @@ def get_subarray_data(sci_model, ref_model):
     return ref_model.data[ystart:ystop, xstart:xstop]
 
 
-def get_subarray_model(sci_model, ref_model):
+def get_subarray_model(sci_model, ref_model, ref_file=None):
     """
     Create a subarray version of a reference file model that matches
     the subarray characteristics of a science data model. A new
@@ -307,6 +327,10 @@ def get_subarray_model(sci_model, ref_model):
     ref_model: JWST data model
         reference file data model
 
+    ref_file: str, optional
+        path of the reference file. If given, the subarray model is
+        cached for later calls with the same file and subarray.
+
     Returns
     -------
     sub_model: JWST data model
@@ -344,6 +368,18 @@ def get_subarray_model(sci_model, ref_model):
         log.error('Slice indexes: xstart=%d, xstop=%d, ystart=%d, ystop=%d', xstart, xstop, ystart, ystop)
         raise ValueError('Bad reference file slice indexes')
 
+    key = _file_cache_key(ref_file, type(ref_model).__name__,
+                              ystart, ystop, xstart, xstop)
+    if key is not None:
+        cached = cached_subarray(
+            key, lambda: _extract_subarray_model(ref_model, ystart, ystop, xstart, xstop))
+        return None if cached is None else cached.copy()
+
+    return _extract_subarray_model(ref_model, ystart, ystop, xstart, xstop)
+
+
+def _extract_subarray_model(ref_model, ystart, ystop, xstart, xstop):
+    """Extract a subarray model, given the slice indexes."""
     # Extract subarrays from each data attribute in the particular
     # type of reference file model and return a new copy of the
     # data model
@@ -388,6 +424,177 @@ def get_subarray_model(sci_model, ref_model):
     return sub_model
 
 
+def _file_cache_key(ref_file, kind, *slice_indexes):
+    """
+    Make the cache key of a value derived from a reference file.
+
+    The modification time and size of the file are part of the key, so
+    that a file replaced on disk is not matched. Reference models that
+    do not come from a file are not cached.
+    """
+    if not isinstance(ref_file, (str, os.PathLike)):
+        return None
+    try:
+        stat = os.stat(ref_file)
+    except OSError:
+        return None
+    return (os.path.abspath(ref_file), stat.st_mtime_ns, stat.st_size,
+            kind, tuple(int(index) for index in slice_indexes))
+
+
+def _cache_nbytes(value):
+    """Size of the arrays in a cached model, in bytes."""
+    if value is None:
+        return 0
+    return sum(array.nbytes for array in _model_arrays(value.instance))
+
+
+def _model_arrays(node):
+    """Iterate over the arrays in a model tree, including nested models and tables."""
+    if isinstance(node, np.ndarray):
+        yield node
+    elif isinstance(node, dict):
+        for value in node.values():
+            yield from _model_arrays(value)
+    elif isinstance(node, (list, tuple)):
+        for value in node:
+            yield from _model_arrays(value)
+
+
+def cached_subarray(key, build):
+    """
+    Get an extracted subarray from the cache, building it if necessary.
+
+    Parameters
+    ----------
+    key: hashable
+        cache key, identifying the reference file and the subarray
+
+    build: callable
+        function returning the model to cache. It must not share memory
+        with the full-frame reference model.
+
+    Returns
+    -------
+    value: JWST data model
+        the cached model, which should be copied before it is modified.
+    """
+    with _subarray_cache_lock:
+        if key in _subarray_cache:
+            _subarray_cache.move_to_end(key)
+            subarray_cache_stats['hits'] += 1
+            return _subarray_cache[key][0]
+        subarray_cache_stats['misses'] += 1
+
+    value = build()
+    if value is not None:
+        # Drop the references to the full-frame arrays
+        value = value.copy()
+    nbytes = _cache_nbytes(value)
+
+    with _subarray_cache_lock:
+        _subarray_cache[key] = (value, nbytes)
+        total = sum(entry[1] for entry in _subarray_cache.values())
+        while total > SUBARRAY_CACHE_BYTES and len(_subarray_cache) > 1:
+            _, (_, dropped) = _subarray_cache.popitem(last=False)
+            total -= dropped
+    return value
+
+
+def clear_subarray_cache():
+    """Remove all cached subarrays and reset the cache statistics."""
+    with _subarray_cache_lock:
+        _subarray_cache.clear()
+        subarray_cache_stats['hits'] = 0
+        subarray_cache_stats['misses'] = 0
+
+
+def open_reference_model(ref_file, model_class=None):
+    """
+    Open a reference file as a data model, reusing models already opened.
+
+    Steps processing many exposures with the same reference files, in a
+    pipeline or an association, then read and parse each file once.
+
+    Parameters
+    ----------
+    ref_file: str, path or JWST data model
+        the reference file. Models, such as user supplied overrides, are
+        returned unchanged.
+
+    model_class: JwstDataModel subclass, optional
+        the model to open the file as; by default as given by
+        `stdatamodels.jwst.datamodels.open`.
+
+    Returns
+    -------
+    ref_model: JWST data model
+        the reference model. As it may be shared, its arrays are read-only,
+        and it must not be modified; closing it has no effect on its data.
+    """
+    if not isinstance(ref_file, (str, os.PathLike)):
+        return ref_file
+
+    def open_model():
+        if model_class is None:
+            return datamodels.open(ref_file)
+        return model_class(ref_file)
+
+    key = _file_cache_key(ref_file, 'model' if model_class is None else model_class.__name__)
+    if key is None or REFERENCE_CACHE_BYTES <= 0:
+        return open_model()
+
+    with _reference_cache_lock:
+        if key in _reference_cache:
+            _reference_cache.move_to_end(key)
+            reference_cache_stats['hits'] += 1
+            return _reference_cache[key][0]
+        reference_cache_stats['misses'] += 1
+
+    ref_model = open_model()
+    nbytes = _load_read_only(ref_model.instance)
+    if nbytes > REFERENCE_CACHE_BYTES:
+        return ref_model
+
+    with _reference_cache_lock:
+        _reference_cache[key] = (ref_model, nbytes)
+        total = sum(entry[1] for entry in _reference_cache.values())
+        while total > REFERENCE_CACHE_BYTES:
+            _, (_, dropped) = _reference_cache.popitem(last=False)
+            total -= dropped
+    return ref_model
+
+
+def _load_read_only(node):
+    """
+    Load the arrays of a model tree into memory and make them read-only.
+
+    Arrays from ASDF files are only read when first accessed; they are
+    read here, so that the model remains usable after it is closed.
+
+    Returns the size of the arrays, in bytes.
+    """
+    items = node.items() if isinstance(node, dict) else enumerate(node)
+    nbytes = 0
+    for key, value in items:
+        if isinstance(value, (dict, list)):
+            nbytes += _load_read_only(value)
+        elif hasattr(value, '__array__') and not isinstance(value, str):
+            if not isinstance(value, np.ndarray):
+                value = node[key] = np.array(value)
+            value.flags.writeable = False
+            nbytes += value.nbytes
+    return nbytes
+
+
+def clear_reference_cache():
+    """Remove all cached reference models and reset the cache statistics."""
+    with _reference_cache_lock:
+        _reference_cache.clear()
+        reference_cache_stats['hits'] = 0
+        reference_cache_stats['misses'] = 0
+
+
 class MatchRowError(Exception):
     """
     Raised when more than one row is matched in a FITS table or list of dict.
@@ -0,0 +1,190 @@
+"""Share numpy arrays with worker processes without pickling them.
+
+Arrays are copied once into blocks of shared memory owned by the parent
+process.  Worker processes receive only a small description of each block
+(name, shape and dtype) and attach to it, so that the data are read and
+written in place instead of being serialized for every task.
+"""
+
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = [
+    "SharedArrays",
+    "attach_shared_arrays",
+    "row_slices",
+    "shared_pool",
+]
+
+# Shared memory blocks attached in this (worker) process, by block name
+_attached_blocks = {}
+
+
+class SharedArrays:
+    """Arrays stored in shared memory, for use by a pool of processes.
+
+    Use as a context manager: the shared memory is released on exit, so
+    any arrays that must outlive the pool have to be copied out first.
+
+    Parameters
+    ----------
+    arrays : dict, optional
+        Input arrays, by name.  Each is copied into shared memory.  A value
+        of None is passed through to the workers as None.
+
+    empty : dict, optional
+        Arrays to allocate without initialization, as name: (shape, dtype).
+        These are typically outputs, filled in by the workers.
+    """
+
+    def __init__(self, arrays=None, empty=None):
+        self._blocks = []
+        self.arrays = {}
+        self.specs = {}
+        try:
+            for name, array in (arrays or {}).items():
+                if array is None:
+                    self.arrays[name] = None
+                    self.specs[name] = None
+                    continue
+                array = np.asarray(array)
+                shared = self._allocate(name, array.shape, array.dtype)
+                shared[...] = array
+            for name, (shape, dtype) in (empty or {}).items():
+                self._allocate(name, shape, dtype)
+        except Exception:
+            self.close()
+            raise
+
+    def _allocate(self, name, shape, dtype):
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        self._blocks.append(shm)
+        shared = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        self.arrays[name] = shared
+        self.specs[name] = (shm.name, tuple(shape), dtype.str)
+        return shared
+
+    @property
+    def nbytes(self):
+        """Total size of the shared arrays, in bytes."""
+        return sum(array.nbytes for array in self.arrays.values()
+                   if array is not None)
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Release the shared memory.  Arrays obtained from it become invalid."""
+        self.arrays = {}
+        while self._blocks:
+            shm = self._blocks.pop()
+            try:
+                shm.close()
+            except BufferError:
+                # Views of the array are still in use; the memory is
+                # released when the last of them is deleted.
+                pass
+            shm.unlink()
+
+
+def attach_shared_arrays(specs):
+    """Attach to arrays shared by the parent process.
+
+    Intended to be called in a worker process, typically from a pool
+    initializer.  The shared memory stays attached for the lifetime of the
+    worker.
+
+    Parameters
+    ----------
+    specs : dict
+        The ``specs`` attribute of a `SharedArrays` instance.
+
+    Returns
+    -------
+    arrays : dict
+        Arrays by name, backed by the shared memory.
+    """
+    arrays = {}
+    for name, spec in specs.items():
+        if spec is None:
+            arrays[name] = None
+            continue
+        block_name, shape, dtype = spec
+        shm = _attached_blocks.get(block_name)
+        if shm is None:
+            # Workers started by `shared_pool` use the resource tracker of
+            # the parent process, which unlinks the memory when done.
+            shm = shared_memory.SharedMemory(name=block_name)
+            _attached_blocks[block_name] = shm
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return arrays
+
+
+def shared_pool(ncores, initializer=None, initargs=()):
+    """Create a process pool for workers attaching to shared arrays.
+
+    Workers are started from a fork server, so that they do not inherit
+    the memory of the parent process.
+
+    Parameters
+    ----------
+    ncores : int
+        Number of processes.
+
+    initializer : callable, optional
+        Called in each worker process with ``initargs``.
+
+    initargs : tuple, optional
+        Arguments for ``initializer``.
+
+    Returns
+    -------
+    pool : `multiprocessing.pool.Pool`
+        The process pool.
+    """
+    ctx = multiprocessing.get_context("forkserver")
+    return ctx.Pool(processes=ncores, initializer=initializer, initargs=initargs)
+
+
+def row_slices(nrows, nslices, halo=0):
+    """Split image rows into contiguous slices.
+
+    Parameters
+    ----------
+    nrows : int
+        Number of rows.
+
+    nslices : int
+        Number of slices.  No more than ``nrows`` slices are made.
+
+    halo : int, optional
+        Number of extra rows on each side of a slice that are read but not
+        owned by it.
+
+    Returns
+    -------
+    slices : list of tuple of int
+        For each slice, the (start, stop) of the rows it owns, followed by
+        the (start, stop) of the rows it reads, including the halo.
+    """
+    nslices = max(1, min(nslices, nrows))
+    edges = np.linspace(0, nrows, nslices + 1).round().astype(int)
+    slices = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        slices.append((int(start), int(stop),
+                       int(max(start - halo, 0)), int(min(stop + halo, nrows))))
+    return slices
@@ -0,0 +1,74 @@
+"""Test the float32 dtype policy"""
+import numpy as np
+import pytest
+from stdatamodels.jwst.datamodels import ImageModel, MultiSlitModel, SlitModel
+
+from jwst.lib.dtype_policy import (cast_float32, compare_precision, get_dtype_policy,
+                                   working_dtype)
+from jwst.stpipe import Pipeline, Step
+
+
+class PolicyStep(Step):
+    spec = """
+        dtype_policy = option("default", "float32", default="default")
+    """
+
+
+class PolicyPipeline(Pipeline):
+    spec = """
+        dtype_policy = option("default", "float32", default="default")
+    """
+    step_defs = {'policy_step': PolicyStep}
+
+
+@pytest.mark.parametrize(
+    'policy, dtypes, expected',
+    [
+        ('default', (np.float32,), np.float64),
+        ('float32', (np.float32,), np.float32),
+        ('float32', (np.float32, np.int16), np.float32),
+        ('float32', (np.float64,), np.float64),
+    ]
+)
+def test_working_dtype(policy, dtypes, expected):
+    assert working_dtype(policy, *dtypes) == expected
+
+
+def test_get_dtype_policy():
+    pipeline = PolicyPipeline()
+    assert get_dtype_policy(pipeline.policy_step) == 'default'
+
+    pipeline.dtype_policy = 'float32'
+    assert get_dtype_policy(pipeline.policy_step) == 'float32'
+
+    step = PolicyStep(dtype_policy='float32')
+    assert get_dtype_policy(step) == 'float32'
+
+
+def test_cast_float32():
+    model = ImageModel((5, 5))
+    model.data = np.full((5, 5), 1 / 3, dtype=np.float64)
+    model.var_flat = np.ones((5, 5), dtype=np.float64)
+    cast_float32(model)
+
+    for name in ('data', 'err', 'var_flat'):
+        assert getattr(model, name).dtype == np.float32
+    np.testing.assert_allclose(model.data, 1 / 3, rtol=1e-7)
+
+    model = MultiSlitModel()
+    model.slits.append(SlitModel(np.ones((3, 4), dtype=np.float64)))
+    cast_float32(model)
+    assert model.slits[0].data.dtype == np.float32
+
+
+def test_compare_precision():
+    reference = ImageModel(np.full((4, 4), 100., dtype=np.float32))
+    result = reference.copy()
+    result.data[0, 0] = 100.5
+    result.data[1, 1] = np.nan
+
+    stats = compare_precision(reference, result)
+
+    assert stats['data']['max_abs'] == pytest.approx(0.5)
+    assert stats['data']['max_rel'] == pytest.approx(0.005)
+    assert stats['data']['nan_mismatch'] == 1
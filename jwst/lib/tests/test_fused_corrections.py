@@ -0,0 +1,115 @@
+"""Test fused detector1 corrections"""
+import numpy as np
+import pytest
+from stdatamodels.jwst.datamodels import (DarkModel, LinearityModel, RampModel,
+                                          SaturationModel, SuperBiasModel)
+
+from jwst.dark_current import DarkCurrentStep
+from jwst.lib.fused_corrections import apply_fused_corrections, can_fuse
+from jwst.linearity import LinearityStep
+from jwst.saturation import SaturationStep
+from jwst.superbias import SuperBiasStep
+
+NINTS, NGROUPS, NROWS, NCOLS = 3, 5, 12, 10
+
+
+def _set_meta(model):
+    model.meta.instrument.name = 'NIRCAM'
+    model.meta.instrument.detector = 'NRCA1'
+    model.meta.subarray.xstart = 1
+    model.meta.subarray.ystart = 1
+    model.meta.subarray.xsize = NCOLS
+    model.meta.subarray.ysize = NROWS
+    return model
+
+
+@pytest.fixture
+def ramp():
+    rng = np.random.default_rng(3)
+    model = _set_meta(RampModel((NINTS, NGROUPS, NROWS, NCOLS)))
+    model.meta.observation.date = '2024-01-01'
+    model.meta.observation.time = '00:00:00'
+    model.meta.exposure.type = 'NRC_IMAGE'
+    model.meta.exposure.ngroups = NGROUPS
+    model.meta.exposure.nframes = 1
+    model.meta.exposure.groupgap = 0
+    model.meta.exposure.frame_time = 10.7
+    model.meta.exposure.group_time = 10.7
+    signal = rng.uniform(100, 5000, (NINTS, 1, NROWS, NCOLS))
+    model.data[:] = 12000 + signal * np.arange(1, NGROUPS + 1)[:, None, None]
+
+    # A few saturated pixels
+    model.data[1, 3:, 4, 4] = 60000.
+    model.data[2, 2:, 7, 1] = 60000.
+    return model
+
+
+@pytest.fixture
+def steps():
+    rng = np.random.default_rng(4)
+
+    saturation = _set_meta(SaturationModel((NROWS, NCOLS)))
+    saturation.data[:] = 50000.
+    saturation.dq[0, 0] = 2
+
+    superbias = _set_meta(SuperBiasModel((NROWS, NCOLS)))
+    superbias.data[:] = rng.normal(12000, 50, (NROWS, NCOLS))
+    superbias.data[2, 3] = np.nan
+    superbias.dq[5, 5] = 1
+
+    linearity = _set_meta(LinearityModel((3, NROWS, NCOLS)))
+    linearity.coeffs[0] = 0.
+    linearity.coeffs[1] = 1.
+    linearity.coeffs[2] = 1e-6
+    linearity.dq = np.zeros((NROWS, NCOLS), dtype=np.uint32)
+
+    dark = _set_meta(DarkModel((10, NROWS, NCOLS)))
+    dark.data[:] = rng.uniform(0, 5, (10, NROWS, NCOLS)).cumsum(axis=0)
+    dark.meta.exposure.ngroups = 10
+    dark.meta.exposure.nframes = 1
+    dark.meta.exposure.groupgap = 0
+
+    return [
+        SaturationStep(name='saturation', override_saturation=saturation),
+        SuperBiasStep(name='superbias', override_superbias=superbias),
+        LinearityStep(name='linearity', override_linearity=linearity),
+        DarkCurrentStep(name='dark_current', override_dark=dark),
+    ]
+
+
+def test_fused_matches_steps(ramp, steps):
+    expected = ramp.copy()
+    for step in steps:
+        expected = step.run(expected)
+
+    assert all(can_fuse(step, ramp) for step in steps)
+    result = apply_fused_corrections(ramp, steps)
+
+    np.testing.assert_allclose(result.data, expected.data, rtol=1e-6)
+    np.testing.assert_array_equal(result.groupdq, expected.groupdq)
+    np.testing.assert_array_equal(result.pixeldq, expected.pixeldq)
+    np.testing.assert_allclose(result.err, expected.err)
+    for cal_step in ['saturation', 'superbias', 'linearity', 'dark_sub']:
+        assert getattr(result.meta.cal_step, cal_step) == 'COMPLETE'
+
+    # The input is not modified
+    assert result is not ramp
+    assert ramp.meta.cal_step.saturation is None
+
+
+def test_can_fuse(ramp, steps):
+    saturation, superbias, linearity, dark = steps
+
+    linearity.save_results = True
+    assert not can_fuse(linearity, ramp)
+
+    superbias.skip = True
+    assert not can_fuse(superbias, ramp)
+
+    dark.dark_output = 'dark.fits'
+    assert not can_fuse(dark, ramp)
+
+    ramp.meta.instrument.name = 'MIRI'
+    dark.dark_output = None
+    assert not can_fuse(dark, ramp)
+    assert can_fuse(saturation, ramp)
@@ -0,0 +1,158 @@
+"""Test processing ramps in chunks of integrations"""
+import numpy as np
+import pytest
+from stcal.ramp_fitting.ramp_fit import ramp_fit
+from stdatamodels.jwst.datamodels import CubeModel, ImageModel, RampModel, dqflags
+
+from jwst.lib import integration_chunks
+from jwst.ramp_fitting.ramp_fit_step import create_image_model, create_integration_model
+
+
+def make_ramp(nints=5, ngroups=6, nrows=8, ncols=9):
+    rng = np.random.default_rng(42)
+    rate = rng.uniform(1, 50, size=(nrows, ncols)).astype(np.float32)
+    times = np.arange(1, ngroups + 1, dtype=np.float32)
+    data = rate * times[:, None, None]
+    data = np.broadcast_to(data, (nints, ngroups, nrows, ncols)).copy()
+    data += rng.normal(0, 3, size=data.shape).astype(np.float32)
+
+    model = RampModel(data=data, int_times=np.zeros((nints,)))
+    model.meta.instrument.name = 'NIRCAM'
+    model.meta.instrument.detector = 'NRCA1'
+    model.meta.observation.date = '2015-10-13'
+    model.meta.exposure.type = 'NRC_IMAGE'
+    model.meta.exposure.frame_time = 1.0
+    model.meta.exposure.group_time = 1.0
+    model.meta.exposure.ngroups = ngroups
+    model.meta.exposure.nints = nints
+    model.meta.exposure.nframes = 1
+    model.meta.exposure.groupgap = 0
+    model.meta.exposure.drop_frames1 = 0
+    model.meta.subarray.name = 'FULL'
+    model.meta.subarray.xstart = 1
+    model.meta.subarray.ystart = 1
+    model.meta.subarray.xsize = ncols
+    model.meta.subarray.ysize = nrows
+    model.meta.filename = 'test_uncal.fits'
+
+    # A cosmic ray, a saturated integration and a fully saturated pixel
+    model.groupdq[1, 3, 2, 2] = dqflags.group['JUMP_DET']
+    model.data[1, 3:, 2, 2] += 500.
+    model.groupdq[2, :, 4, 4] = dqflags.group['SATURATED']
+    model.groupdq[:, :, 5, 5] = dqflags.group['SATURATED']
+    return model
+
+
+def fit(model):
+    shape = model.data.shape[2:]
+    readnoise = np.full(shape, 5., dtype=np.float32)
+    gain = np.full(shape, 2., dtype=np.float32)
+    image_info, integ_info, _, _ = ramp_fit(
+        model, 512, False, readnoise, gain, 'OLS', 'optimal', 'none', dqflags.pixel)
+    return (create_image_model(model, image_info),
+            create_integration_model(model, integ_info, model.int_times))
+
+
+def test_integrations_per_chunk():
+    model = RampModel((10, 4, 32, 32))
+    bytes_per_int = 4 * 32 * 32 * (4 + 1 + 4) * integration_chunks.CHUNK_MEMORY_OVERHEAD
+
+    assert integration_chunks.integrations_per_chunk(model, None) == 10
+    assert integration_chunks.integrations_per_chunk(model, 0) == 10
+    assert integration_chunks.integrations_per_chunk(model, 3 * bytes_per_int / 1024 ** 3) == 3
+    assert integration_chunks.integrations_per_chunk(model, 1e-9) == 1
+    assert integration_chunks.integrations_per_chunk(model, 100.) == 10
+
+
+@pytest.mark.parametrize('filename, expected', [
+    ('jw00001001001_01101_00001_nrca1_uncal.fits', 'jw00001001001_01101_00001_nrca1_chunk002_uncal.fits'),
+    ('test.fits', 'test_chunk002.fits'),
+    (None, None),
+])
+def test_chunk_filename(filename, expected):
+    assert integration_chunks.chunk_filename(filename, 1) == expected
+
+
+def test_extract_integrations():
+    model = make_ramp()
+    model.meta.exposure.integration_start = 3
+    chunk = integration_chunks.extract_integrations(model, 1, 4)
+
+    np.testing.assert_array_equal(chunk.data, model.data[1:4])
+    np.testing.assert_array_equal(chunk.groupdq, model.groupdq[1:4])
+    assert chunk.meta.exposure.integration_start == 4
+    assert chunk.meta.exposure.integration_end == 6
+    assert chunk.meta.exposure.nints == model.meta.exposure.nints
+    assert chunk.meta.instrument.detector == 'NRCA1'
+
+    # The chunk is a copy
+    chunk.data[0] = -1
+    assert np.all(model.data[1] != -1)
+
+
+def test_insert_integrations():
+    model = make_ramp()
+    model.meta.filename = 'test_uncal.fits'
+    chunk = integration_chunks.extract_integrations(model, 1, 3)
+    chunk.meta.filename = 'test_chunk002_uncal.fits'
+    chunk.data += 1
+    chunk.groupdq[:, 0] |= dqflags.group['DO_NOT_USE']
+    chunk.pixeldq[0, 0] = dqflags.pixel['DEAD']
+    chunk.meta.cal_step.superbias = 'COMPLETE'
+    expected = model.data.copy()
+    expected[1:3] += 1
+
+    integration_chunks.insert_integrations(model, chunk, 1)
+
+    np.testing.assert_array_equal(model.data, expected)
+    assert np.all(model.groupdq[1:3, 0] & dqflags.group['DO_NOT_USE'])
+    assert not np.any(model.groupdq[[0, 3, 4], 0] & dqflags.group['DO_NOT_USE'])
+    assert model.pixeldq[0, 0] == dqflags.pixel['DEAD']
+    assert model.meta.cal_step.superbias == 'COMPLETE'
+    assert model.meta.filename == 'test_uncal.fits'
+    assert model.meta.exposure.integration_start is None
+
+
+def test_combine_integrations():
+    rate, ints = fit(make_ramp())
+    data, dq, var_poisson, var_rnoise, err = integration_chunks.combine_integrations(
+        ints.data, ints.dq, ints.var_poisson, ints.var_rnoise, ints.err)
+
+    np.testing.assert_array_equal(dq, rate.dq)
+    np.testing.assert_allclose(data, rate.data, rtol=1e-6, equal_nan=True)
+    np.testing.assert_allclose(var_poisson, rate.var_poisson, rtol=1e-6)
+    np.testing.assert_allclose(var_rnoise, rate.var_rnoise, rtol=1e-6)
+    np.testing.assert_allclose(err, rate.err, rtol=1e-6)
+    assert np.isnan(data[5, 5])
+    assert dq[5, 5] & dqflags.pixel['SATURATED']
+
+
+@pytest.mark.parametrize('chunk_nints', [1, 2, 5])
+def test_stitched_results_match_full_fit(chunk_nints):
+    model = make_ramp()
+    full_rate, full_ints = fit(model.copy())
+
+    nints = model.data.shape[0]
+    stitcher = integration_chunks.IntegrationStitcher(model)
+    for start in range(0, nints, chunk_nints):
+        chunk = integration_chunks.extract_integrations(model, start, start + chunk_nints)
+        rate, ints = fit(chunk)
+        stitcher.add(rate, ints, start)
+    rate, ints = stitcher.finish()
+
+    assert isinstance(rate, ImageModel)
+    assert isinstance(ints, CubeModel)
+    assert rate.meta.exposure.integration_start is None
+    assert rate.meta.filename == model.meta.filename
+
+    np.testing.assert_array_equal(rate.dq, full_rate.dq)
+    np.testing.assert_array_equal(ints.dq, full_ints.dq)
+    np.testing.assert_allclose(ints.data, full_ints.data, rtol=1e-5, equal_nan=True)
+    np.testing.assert_allclose(rate.var_rnoise, full_rate.var_rnoise, rtol=1e-5)
+
+    # The Poisson variance, and so the integration weights, depend on the
+    # median rate over the integrations that were fit together
+    good = np.isfinite(full_rate.data)
+    np.testing.assert_array_equal(np.isfinite(rate.data), good)
+    assert np.all(np.abs(rate.data - full_rate.data)[good] < 0.25 * full_rate.err[good])
+    np.testing.assert_allclose(rate.err, full_rate.err, rtol=0.2)
@@ -1,4 +1,7 @@
 """Test utilities"""
+import threading
+import time
+
 import pytest
 
 import numpy as np
@@ -216,3 +219,42 @@ def test_match_nans_and_flags_shape_mismatch():
 
     model.close()
     model_copy.close()
+
+
+@pytest.mark.parametrize('max_cores, max_items, expected', [
+    ('none', None, 1),
+    ('1', None, 1),
+    ('3', None, 3),
+    ('3', 2, 2),
+    ('all', None, 8),
+    ('half', None, 4),
+    ('quarter', None, 2),
+    ('quarter', 1, 1),
+    ('64', None, 8),
+    ('bad', None, 1),
+])
+def test_compute_num_cores(monkeypatch, max_cores, max_items, expected):
+    monkeypatch.setattr(pipe_utils.os, 'cpu_count', lambda: 8)
+    assert pipe_utils.compute_num_cores(max_cores, max_items) == expected
+
+
+@pytest.mark.parametrize('max_cores', ['1', '4'])
+def test_map_slits(monkeypatch, max_cores):
+    monkeypatch.setattr(pipe_utils.os, 'cpu_count', lambda: 8)
+    threads = set()
+
+    def square(value):
+        threads.add(threading.get_ident())
+        time.sleep(0.01 * (10 - value))
+        return value ** 2
+
+    assert pipe_utils.map_slits(square, range(10), max_cores) == [i ** 2 for i in range(10)]
+    assert (len(threads) > 1) == (max_cores != '1')
+
+    def fail(value):
+        if value in (3, 6):
+            raise ValueError(f'slit {value}')
+        return value
+
+    with pytest.raises(ValueError, match='slit 3'):
+        pipe_utils.map_slits(fail, range(10), max_cores)
@@ -1,4 +1,11 @@
-from jwst.lib.reffile_utils import find_row
+import numpy as np
+import pytest
+from stdatamodels.jwst.datamodels import GainModel, RampModel, SaturationModel
+
+from jwst.lib import reffile_utils
+from jwst.lib.reffile_utils import (clear_reference_cache, clear_subarray_cache, find_row,
+                                    get_subarray_data, get_subarray_model, open_reference_model,
+                                    reference_cache_stats, subarray_cache_stats)
 
 
 def test_find_row():
@@ -14,3 +21,177 @@ def test_find_row():
 
     result = find_row(filters, missing_key)
     assert result is None
+
+
+def _set_subarray(model, xstart, ystart, xsize, ysize):
+    model.meta.instrument.name = 'NIRCAM'
+    model.meta.subarray.xstart = xstart
+    model.meta.subarray.ystart = ystart
+    model.meta.subarray.xsize = xsize
+    model.meta.subarray.ysize = ysize
+    return model
+
+
+@pytest.fixture
+def subarray_cache():
+    clear_subarray_cache()
+    yield
+    clear_subarray_cache()
+
+
+@pytest.fixture
+def sci_model():
+    return _set_subarray(RampModel((1, 2, 10, 20)), 11, 21, 20, 10)
+
+
+def _set_reference_meta(model, reftype):
+    model.meta.reftype = reftype
+    model.meta.description = 'test reference file'
+    model.meta.author = 'test'
+    model.meta.pedigree = 'DUMMY'
+    model.meta.useafter = '2000-01-01T00:00:00'
+    return model
+
+
+@pytest.fixture
+def ref_files(tmp_path):
+    shape = (64, 64)
+    data = np.arange(np.prod(shape), dtype=np.float32).reshape(shape)
+
+    gain = _set_reference_meta(_set_subarray(GainModel(data=data), 1, 1, 64, 64), 'GAIN')
+    gain_file = str(tmp_path / 'gain.fits')
+    gain.save(gain_file)
+
+    saturation = _set_reference_meta(_set_subarray(SaturationModel(data=data), 1, 1, 64, 64),
+                                     'SATURATION')
+    saturation.dq = np.ones(shape, dtype=np.uint32)
+    saturation_file = str(tmp_path / 'saturation.fits')
+    saturation.save(saturation_file)
+
+    return gain_file, saturation_file
+
+
+def test_subarray_data(sci_model, ref_files):
+    gain_file, _ = ref_files
+    expected = np.arange(64 * 64, dtype=np.float32).reshape(64, 64)[20:30, 10:30]
+
+    with GainModel(gain_file) as gain_model:
+        sub_data = get_subarray_data(sci_model, gain_model)
+        np.testing.assert_array_equal(sub_data, expected)
+        assert np.shares_memory(sub_data, gain_model.data)
+
+
+def test_subarray_model_cache(subarray_cache, sci_model, ref_files):
+    _, saturation_file = ref_files
+
+    with SaturationModel(saturation_file) as ref_model:
+        first = get_subarray_model(sci_model, ref_model, ref_file=saturation_file)
+    first.data[:] = -1
+
+    with SaturationModel(saturation_file) as ref_model:
+        second = get_subarray_model(sci_model, ref_model, ref_file=saturation_file)
+        expected = get_subarray_model(sci_model, ref_model)
+
+    assert subarray_cache_stats == {'hits': 1, 'misses': 1}
+    assert isinstance(second, SaturationModel)
+    np.testing.assert_array_equal(second.data, expected.data)
+    np.testing.assert_array_equal(second.dq, expected.dq)
+
+    # A different subarray is a different entry
+    sci_model.meta.subarray.xstart = 1
+    with SaturationModel(saturation_file) as ref_model:
+        get_subarray_model(sci_model, ref_model, ref_file=saturation_file)
+    assert subarray_cache_stats == {'hits': 1, 'misses': 2}
+
+
+def test_subarray_cache_eviction(subarray_cache, monkeypatch, sci_model, ref_files):
+    gain_file, saturation_file = ref_files
+    # Room for a single 10 x 20 subarray model
+    monkeypatch.setattr(reffile_utils, 'SUBARRAY_CACHE_BYTES', 2000)
+
+    with GainModel(gain_file) as gain_model:
+        get_subarray_model(sci_model, gain_model, ref_file=gain_file)
+    with SaturationModel(saturation_file) as ref_model:
+        get_subarray_model(sci_model, ref_model, ref_file=saturation_file)
+    with GainModel(gain_file) as gain_model:
+        get_subarray_model(sci_model, gain_model, ref_file=gain_file)
+
+    assert subarray_cache_stats == {'hits': 0, 'misses': 3}
+    assert len(reffile_utils._subarray_cache) == 1
+
+
+def test_subarray_cache_requires_file(subarray_cache, sci_model):
+    gain_model = _set_reference_meta(
+        _set_subarray(GainModel(data=np.ones((64, 64), dtype=np.float32)), 1, 1, 64, 64), 'GAIN')
+
+    get_subarray_model(sci_model, gain_model, ref_file=gain_model)
+    get_subarray_model(sci_model, gain_model)
+    assert subarray_cache_stats == {'hits': 0, 'misses': 0}
+
+
+@pytest.fixture
+def reference_cache():
+    clear_reference_cache()
+    yield
+    clear_reference_cache()
+
+
+def test_open_reference_model(reference_cache, ref_files):
+    gain_file, saturation_file = ref_files
+
+    gain_model = open_reference_model(gain_file, GainModel)
+    assert isinstance(gain_model, GainModel)
+    assert not gain_model.data.flags.writeable
+    with pytest.raises(ValueError):
+        gain_model.data[0, 0] = 0.
+    gain_model.close()
+
+    assert open_reference_model(gain_file, GainModel) is gain_model
+    assert gain_model.data[1, 0] == 64.
+    assert reference_cache_stats == {'hits': 1, 'misses': 1}
+
+    # copies can be modified
+    gain_copy = gain_model.copy()
+    gain_copy.data[0, 0] = 1.
+    assert gain_model.data[0, 0] == 0.
+
+    # opened as another model class, or by datamodels.open
+    saturation_model = open_reference_model(saturation_file)
+    assert isinstance(saturation_model, SaturationModel)
+    assert open_reference_model(saturation_file) is saturation_model
+    assert open_reference_model(gain_file) is not gain_model
+    assert reference_cache_stats == {'hits': 2, 'misses': 3}
+
+
+def test_reference_cache_eviction(reference_cache, monkeypatch, ref_files):
+    gain_file, saturation_file = ref_files
+    # Room for the gain model, but not together with the saturation model
+    monkeypatch.setattr(reffile_utils, 'REFERENCE_CACHE_BYTES', 64 * 64 * 4 * 2)
+
+    open_reference_model(gain_file, GainModel)
+    open_reference_model(saturation_file, SaturationModel)
+    open_reference_model(saturation_file, SaturationModel)
+    open_reference_model(gain_file, GainModel)
+
+    assert reference_cache_stats == {'hits': 1, 'misses': 3}
+    assert len(reffile_utils._reference_cache) == 1
+
+
+def test_reference_cache_file_changed(reference_cache, ref_files):
+    gain_file, _ = ref_files
+    gain_model = open_reference_model(gain_file, GainModel)
+
+    new_gain = gain_model.copy()
+    new_gain.data = np.zeros((32, 32), dtype=np.float32)
+    new_gain.save(gain_file)
+
+    assert open_reference_model(gain_file, GainModel).data.shape == (32, 32)
+    assert reference_cache_stats == {'hits': 0, 'misses': 2}
+
+
+def test_reference_cache_models_not_cached(reference_cache):
+    gain_model = GainModel(data=np.ones((4, 4), dtype=np.float32))
+
+    assert open_reference_model(gain_model) is gain_model
+    assert gain_model.data.flags.writeable
+    assert reference_cache_stats == {'hits': 0, 'misses': 0}
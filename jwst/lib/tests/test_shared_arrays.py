@@ -0,0 +1,57 @@
+"""Test sharing arrays with worker processes"""
+import numpy as np
+import pytest
+
+from jwst.lib.shared_arrays import (SharedArrays, attach_shared_arrays,
+                                    row_slices, shared_pool)
+
+_worker_arrays = {}
+
+
+def _init_worker(specs):
+    _worker_arrays.update(attach_shared_arrays(specs))
+
+
+def _double_rows(task):
+    k, (start, stop, _, _) = task
+    _worker_arrays['output'][start:stop] = 2 * _worker_arrays['input', k]
+    return stop - start
+
+
+@pytest.mark.parametrize(
+    'nrows, nslices, halo, expected',
+    [
+        (10, 1, 0, [(0, 10, 0, 10)]),
+        (10, 2, 0, [(0, 5, 0, 5), (5, 10, 5, 10)]),
+        (10, 3, 1, [(0, 3, 0, 4), (3, 7, 2, 8), (7, 10, 6, 10)]),
+        (2, 4, 1, [(0, 1, 0, 2), (1, 2, 0, 2)]),
+    ]
+)
+def test_row_slices(nrows, nslices, halo, expected):
+    assert row_slices(nrows, nslices, halo=halo) == expected
+
+
+def test_shared_arrays():
+    data = np.arange(24, dtype=np.float32).reshape(2, 3, 4)
+    with SharedArrays({'data': data, 'none': None},
+                      {'output': ((3, 4), np.uint8)}) as shared:
+        np.testing.assert_array_equal(shared['data'], data)
+        assert shared['none'] is None
+        assert shared['output'].shape == (3, 4)
+        assert shared['output'].dtype == np.uint8
+        assert shared.nbytes == data.nbytes + 12
+        assert shared.specs['none'] is None
+        assert shared.specs['output'][1:] == ((3, 4), np.dtype(np.uint8).str)
+
+
+def test_shared_pool():
+    data = np.arange(60, dtype=np.float64).reshape(10, 6)
+    slices = row_slices(data.shape[0], 3)
+    inputs = {('input', k): data[start:stop] for k, (start, stop, _, _) in enumerate(slices)}
+    with SharedArrays(inputs, {'output': (data.shape, data.dtype)}) as shared:
+        with shared_pool(2, initializer=_init_worker, initargs=(shared.specs,)) as pool:
+            nrows = pool.map(_double_rows, enumerate(slices))
+        result = shared['output'].copy()
+
+    assert sum(nrows) == data.shape[0]
+    np.testing.assert_array_equal(result, 2 * data)
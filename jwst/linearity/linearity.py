@@ -10,7 +10,7 @@ log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 
-def do_correction(output_model, lin_model):
+def do_correction(output_model, lin_model, ref_file=None):
 
     # Create the output model as a copy of the input
     zframe = None
@@ -25,14 +25,7 @@ def do_correction(output_model, lin_model):
         gdq = (output_model.data * 0).astype(np.uint32)
 
     # Obtain linearity coefficients and dq array from reference file
-    if reffile_utils.ref_matches_sci(output_model, lin_model):
-        lin_coeffs = lin_model.coeffs
-        lin_dq = lin_model.dq
-    else:
-        sub_lin_model = reffile_utils.get_subarray_model(output_model, lin_model)
-        lin_coeffs = sub_lin_model.coeffs.copy()
-        lin_dq = sub_lin_model.dq.copy()
-        sub_lin_model.close()
+    lin_coeffs, lin_dq = get_linearity_coeffs(output_model, lin_model, ref_file=ref_file)
 
     # Call linearity correction function in stcal
     new_data, new_pdq, new_zframe = linearity_correction(
@@ -45,3 +38,39 @@ def do_correction(output_model, lin_model):
         output_model.zeroframe = new_zframe
 
     return output_model
+
+
+def get_linearity_coeffs(output_model, lin_model, ref_file=None):
+    """Get the linearity coefficients and DQ matching the science data.
+
+    Parameters
+    ----------
+    output_model : `~jwst.datamodels.RampModel`
+        The input science data
+
+    lin_model : `~jwst.datamodels.LinearityModel`
+        Linearity reference file data model
+
+    ref_file : str, optional
+        Path of the linearity reference file, used to cache the subarray
+        extracted from it
+
+    Returns
+    -------
+    lin_coeffs : ndarray
+        Linearity polynomial coefficients, 3-D
+
+    lin_dq : ndarray
+        Linearity reference DQ image
+    """
+    if reffile_utils.ref_matches_sci(output_model, lin_model):
+        lin_coeffs = lin_model.coeffs
+        lin_dq = lin_model.dq
+    else:
+        sub_lin_model = reffile_utils.get_subarray_model(output_model, lin_model,
+                                                         ref_file=ref_file)
+        lin_coeffs = sub_lin_model.coeffs.copy()
+        lin_dq = sub_lin_model.dq.copy()
+        sub_lin_model.close()
+
+    return lin_coeffs, lin_dq
@@ -42,7 +42,7 @@ class LinearityStep(Step):
             result = input_model.copy()
 
             # Do the linearity correction
-            result = linearity.do_correction(result, lin_model)
+            result = linearity.do_correction(result, lin_model, ref_file=self.lin_name)
             result.meta.cal_step.linearity = 'COMPLETE'
 
             # Cleanup
@@ -1,6 +1,5 @@
 from stdatamodels.jwst import datamodels
 
-from jwst.clean_flicker_noise import clean_flicker_noise
 from ..stpipe import Step
 
 __all__ = ["NSCleanStep"]
@@ -98,6 +97,9 @@ class NSCleanStep(Step):
                    "and will be removed in future builds.")
         self.log.warning(message)
 
+        # Only imported when run, as in clean_flicker_noise
+        from jwst.clean_flicker_noise import clean_flicker_noise
+
         # Open the input data model
         with datamodels.open(input) as input_model:
 
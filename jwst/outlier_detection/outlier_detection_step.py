@@ -8,7 +8,6 @@ from jwst.stpipe import Step
 from jwst.stpipe.utilities import record_step_status
 from jwst.lib.pipe_utils import is_tso
 
-from . import coron, ifu, imaging, tso, spec
 
 # Categorize all supported modes
 IMAGE_MODES = ['NRC_IMAGE', 'MIR_IMAGE', 'NRS_IMAGE', 'NIS_IMAGE', 'FGS_IMAGE']
@@ -78,6 +77,7 @@ class OutlierDetectionStep(Step):
         scale1, scale2 = [float(v) for v in self.scale.split()]
 
         if mode == 'tso':
+            from . import tso
             result_models = tso.detect_outliers(
                 input_data,
                 self.save_intermediate_results,
@@ -88,6 +88,7 @@ class OutlierDetectionStep(Step):
                 self.make_output_path,
             )
         elif mode == 'coron':
+            from . import coron
             result_models = coron.detect_outliers(
                 input_data,
                 self.save_intermediate_results,
@@ -97,6 +98,7 @@ class OutlierDetectionStep(Step):
                 self.make_output_path,
             )
         elif mode == 'imaging':
+            from . import imaging
             result_models = imaging.detect_outliers(
                 input_data,
                 self.save_intermediate_results,
@@ -116,6 +118,7 @@ class OutlierDetectionStep(Step):
                 self.make_output_path,
             )
         elif mode == 'spec':
+            from . import spec
             result_models = spec.detect_outliers(
                 input_data,
                 self.save_intermediate_results,
@@ -135,6 +138,7 @@ class OutlierDetectionStep(Step):
                 self.make_output_path,
             )
         elif mode == 'ifu':
+            from . import ifu
             result_models = ifu.detect_outliers(
                 input_data,
                 self.save_intermediate_results,
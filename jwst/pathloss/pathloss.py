@@ -10,7 +10,7 @@ import stdatamodels.jwst.datamodels as datamodels
 
 from jwst.assign_wcs import nirspec, util
 from jwst.lib.wcs_utils import get_wavelengths
-from jwst.lib.pipe_utils import match_nans_and_flags
+from jwst.lib.pipe_utils import map_slits, match_nans_and_flags
 
 
 log = logging.getLogger(__name__)
@@ -319,7 +319,7 @@ def calculate_two_shutter_uniform_pathloss(pathloss_model):
 
 
 def do_correction(input_model, pathloss_model=None, inverse=False, source_type=None,
-                  correction_pars=None, user_slit_loc=None):
+                  correction_pars=None, user_slit_loc=None, max_cores='1'):
     """Execute all tasks for Path Loss Correction
 
     Parameters
@@ -343,6 +343,10 @@ def do_correction(input_model, pathloss_model=None, inverse=False, source_type=N
         User-provided slit location in units of arcsec, where (0,0)
         is the center and the edges are +/-0.255 arcsec.
 
+    max_cores : str
+        Number of NIRSpec MOS or fixed slits to correct in parallel threads:
+        an integer, or one of 'none', 'quarter', 'half' or 'all'.
+
     Returns
     -------
     output_model, corrections : jwst.datamodel.JwstDataModel, jwst.datamodel.datamodel
@@ -360,10 +364,10 @@ def do_correction(input_model, pathloss_model=None, inverse=False, source_type=N
 
     if exp_type == 'NRS_MSASPEC':
         corrections = do_correction_mos(output_model, pathloss_model,
-                                        inverse, source_type, correction_pars)
+                                        inverse, source_type, correction_pars, max_cores)
     elif exp_type in ['NRS_FIXEDSLIT', 'NRS_BRIGHTOBJ']:
         corrections = do_correction_fixedslit(output_model, pathloss_model,
-                                              inverse, source_type, correction_pars)
+                                              inverse, source_type, correction_pars, max_cores)
     elif exp_type == 'NRS_IFU':
         corrections = do_correction_ifu(output_model, pathloss_model,
                                         inverse, source_type, correction_pars)
@@ -490,7 +494,8 @@ def is_pointsource(srctype):
         return False
 
 
-def do_correction_mos(data, pathloss, inverse=False, source_type=None, correction_pars=None):
+def do_correction_mos(data, pathloss, inverse=False, source_type=None, correction_pars=None,
+                      max_cores='1'):
     """Path loss correction for NIRSpec MOS
 
     Data are modified in-place.
@@ -512,6 +517,10 @@ def do_correction_mos(data, pathloss, inverse=False, source_type=None, correctio
     correction_pars : jwst.datamodels.MultiSlitModel or None
         The precomputed pathloss to apply instead of recalculation.
 
+    max_cores : str
+        Number of slits to correct in parallel threads: an integer, or one
+        of 'none', 'quarter', 'half' or 'all'.
+
     Returns
     -------
     corrections : jwst.datamodel.MultiSlitModel
@@ -519,21 +528,20 @@ def do_correction_mos(data, pathloss, inverse=False, source_type=None, correctio
     """
     exp_type = data.meta.exposure.type
 
-    # Loop over all MOS slitlets
-    corrections = datamodels.MultiSlitModel()
-    for slit_number, slit in enumerate(data.slits):
+    # Process all MOS slitlets, possibly in parallel threads
+    def correct_slit(slit_number_slit):
+        slit_number, slit = slit_number_slit
         log.info(f'Working on slit {slit_number}')
 
         if correction_pars:
             correction = correction_pars.slits[slit_number]
         else:
             correction = _corrections_for_mos(slit, pathloss, exp_type, source_type)
-        corrections.slits.append(correction)
 
         # Apply the correction
         if not correction:
             log.warning(f'No correction provided for slit {slit_number}. Skipping')
-            continue
+            return correction
 
         if not inverse:
             slit.data /= correction.data
@@ -549,6 +557,11 @@ def do_correction_mos(data, pathloss, inverse=False, source_type=None, correctio
 
         # Make sure all NaNs and flags match up in the output slit model
         match_nans_and_flags(slit)
+        return correction
+
+    corrections = datamodels.MultiSlitModel()
+    for correction in map_slits(correct_slit, enumerate(data.slits), max_cores):
+        corrections.slits.append(correction)
 
     # Set step status to complete
     data.meta.cal_step.pathloss = 'COMPLETE'
@@ -556,7 +569,8 @@ def do_correction_mos(data, pathloss, inverse=False, source_type=None, correctio
     return corrections
 
 
-def do_correction_fixedslit(data, pathloss, inverse=False, source_type=None, correction_pars=None):
+def do_correction_fixedslit(data, pathloss, inverse=False, source_type=None, correction_pars=None,
+                            max_cores='1'):
     """Path loss correction for NIRSpec fixed-slit modes
 
     Data are modified in-place.
@@ -578,6 +592,10 @@ def do_correction_fixedslit(data, pathloss, inverse=False, source_type=None, cor
     correction_pars : jwst.datamodels.MultiSlitModel or None
         The precomputed pathloss to apply instead of recalculation.
 
+    max_cores : str
+        Number of slits to correct in parallel threads: an integer, or one
+        of 'none', 'quarter', 'half' or 'all'.
+
     Returns
     -------
     corrections : jwst.datamodel.MultiSlitModel
@@ -585,21 +603,20 @@ def do_correction_fixedslit(data, pathloss, inverse=False, source_type=None, cor
     """
     exp_type = data.meta.exposure.type
 
-    # Loop over all slits contained in the input
-    corrections = datamodels.MultiSlitModel()
-    for slit_number, slit in enumerate(data.slits):
+    # Process all slits contained in the input, possibly in parallel threads
+    def correct_slit(slit_number_slit):
+        slit_number, slit = slit_number_slit
         log.info(f'Working on slit {slit.name}')
 
         if correction_pars:
             correction = correction_pars.slits[slit_number]
         else:
             correction = _corrections_for_fixedslit(slit, pathloss, exp_type, source_type)
-        corrections.slits.append(correction)
 
         # Apply the correction
         if not correction:
             log.warning(f'No correction provided for slit {slit_number}. Skipping')
-            continue
+            return correction
 
         if not inverse:
             slit.data /= correction.data
@@ -615,6 +632,11 @@ def do_correction_fixedslit(data, pathloss, inverse=False, source_type=None, cor
 
         # Make sure all NaNs and flags match up in the output slit model
         match_nans_and_flags(slit)
+        return correction
+
+    corrections = datamodels.MultiSlitModel()
+    for correction in map_slits(correct_slit, enumerate(data.slits), max_cores):
+        corrections.slits.append(correction)
 
     # Set step status to complete
     data.meta.cal_step.pathloss = 'COMPLETE'
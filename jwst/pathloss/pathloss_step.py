@@ -1,5 +1,6 @@
 from stdatamodels.jwst import datamodels
 
+from ..lib.reffile_utils import open_reference_model
 from ..stpipe import Step
 from . import pathloss
 
@@ -20,6 +21,7 @@ class PathLossStep(Step):
         inverse = boolean(default=False)    # Invert the operation
         source_type = string(default=None)  # Process as specified source type
         user_slit_loc = float(default=None)   # User-provided correction to MIRI LRS source location
+        maximum_cores = string(default='1')  # Number of NIRSpec slits to correct in parallel threads. Can be an integer, 'half', 'quarter', or 'all'
     """
 
     reference_file_types = ['pathloss']
@@ -49,15 +51,18 @@ class PathLossStep(Step):
 
                 # Open the pathloss ref file data model
                 if input_model.meta.exposure.type.upper() in ["MIR_LRS-FIXEDSLIT"]:
-                    pathloss_model = datamodels.MirLrsPathlossModel(self.pathloss_name)
+                    pathloss_model = open_reference_model(self.pathloss_name,
+                                                          datamodels.MirLrsPathlossModel)
                 else:
-                    pathloss_model = datamodels.PathlossModel(self.pathloss_name)
+                    pathloss_model = open_reference_model(self.pathloss_name,
+                                                          datamodels.PathlossModel)
 
             # Do the pathloss correction
             result, self.correction_pars = pathloss.do_correction(
                 input_model, pathloss_model,
                 inverse=self.inverse, source_type=self.source_type,
-                correction_pars=correction_pars, user_slit_loc=self.user_slit_loc
+                correction_pars=correction_pars, user_slit_loc=self.user_slit_loc,
+                max_cores=self.maximum_cores
             )
 
             if pathloss_model:
@@ -255,6 +255,32 @@ def test_do_correction_msa_slit_size_eq_0():
     assert result.meta.cal_step.pathloss == 'COMPLETE'
 
 
+def test_do_correction_msa_threads():
+    """Slits corrected in parallel threads match the serial result."""
+    rng = np.random.default_rng(7)
+    datmod = MultiSlitModel()
+    datmod.meta.exposure.type = 'NRS_MSASPEC'
+    corrections = MultiSlitModel()
+    for i in range(5):
+        shape = (5 + i, 30)
+        datmod.slits.append({'data': rng.uniform(1, 2, shape), 'err': np.ones(shape),
+                             'var_poisson': np.ones(shape), 'var_rnoise': np.ones(shape),
+                             'var_flat': np.ones(shape)})
+        correction = rng.uniform(0.5, 1, shape)
+        correction[0, 0] = np.nan
+        corrections.slits.append({'data': correction, 'pathloss_point': correction,
+                                  'pathloss_uniform': correction / 2})
+
+    serial, serial_corrections = do_correction(datmod, correction_pars=corrections)
+    threaded, threaded_corrections = do_correction(datmod, correction_pars=corrections,
+                                                   max_cores='3')
+
+    assert len(threaded_corrections.slits) == 5
+    for slit, expected in zip(threaded.slits, serial.slits):
+        for ext in ['data', 'err', 'var_poisson', 'var_rnoise', 'var_flat', 'pathloss_uniform']:
+            np.testing.assert_array_equal(getattr(slit, ext), getattr(expected, ext))
+
+
 def test_do_correction_fixed_slit_exception():
     """If no matching aperture name found, exit."""
 
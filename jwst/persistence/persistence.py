@@ -1,7 +1,6 @@
 #
 #  Module for correcting for persistence
 
-import math
 import numpy as np
 import logging
 
@@ -16,6 +15,9 @@ SCALEFACTOR = 2.
 from traps, compared with photon-generated charges.
 """
 
+GROUP_CHUNK_SIZE = 16
+"""Maximum number of groups for which persistence is computed at once."""
+
 
 def no_NaN(input_model, fill_value,
            zap_nan=False, zap_zero=False):
@@ -113,6 +115,10 @@ class DataSet():
 
     nresets : int
         The number of resets (frames) at the beginning of each integration.
+
+    group_chunk : int
+        The maximum number of groups for which persistence is computed
+        and subtracted at once.
     """
 
     def __init__(self, output_obj, input_traps_filled,
@@ -174,6 +180,8 @@ class DataSet():
         self.groupgap = 0
         self.nresets = 0
 
+        self.group_chunk = GROUP_CHUNK_SIZE
+
     def do_all(self):
         """Execute all tasks for persistence correction
 
@@ -211,8 +219,6 @@ class DataSet():
         if nfamilies <= 0:
             log.error("The trappars reference table is empty!")
 
-        # Note that this might be a subarray.
-        persistence = np.zeros((shape[-2], shape[-1]), dtype=np.float64)
         (nints, ngroups, ny, nx) = shape
         t_group = self.output_obj.meta.exposure.group_time
 
@@ -244,6 +250,9 @@ class DataSet():
         self.trap_density = no_NaN(self.trap_density, 0., zap_nan=True)
         self.persistencesat = no_NaN(self.persistencesat, 1.e7, zap_nan=True)
 
+        # Reciprocal e-folding times for trap decay, one for each family.
+        decay_rate = np.abs(par[3]).astype(np.float64)
+
         if have_traps_filled:   # was there an actual traps_filled file?
             # Decrease traps_filled by the number of traps that decayed
             # in the time (to_start) from the end of the traps_filled file
@@ -259,29 +268,22 @@ class DataSet():
                         - self.traps_filled.meta.exposure.end_time) * 86400.
             log.debug("Decay time for previous traps-filled file = %g s",
                       to_start)
-            for k in range(nfamilies):
-                decay_param_k = self.get_decay_param(par, k)
-                decay = self.compute_decay(self.traps_filled.data[k],
-                                           decay_param_k, to_start)
-                self.traps_filled.data[k, :, :] -= decay
-                del decay
+            self.apply_decay(self.traps_filled.data, decay_rate, to_start)
 
         """
         These will be full-frame:
             self.traps_filled           (nfamilies, det_ny, det_nx)
             self.trap_density (before extracting subarray)
             self.persistencesat (before extracting subarray)
-            decayed                     (nfamilies, det_ny, det_nx)
-            decayed_in_group            (det_ny, det_nx)
 
         These will be subarrays if the input object is a subarray:
             self.output_obj             (nints, ngroups, ny, nx)
             self.trap_density (after extracting subarray)
             self.persistencesat (after extracting subarray)
-            persistence
+            trapped                     (nfamilies, ny * nx)
+            persistence                 (nchunk, ny * nx)
             self.output_pers
-            filled
-            cr_filled
+            filled                      (nfamilies, ny, nx)
         """
 
         # If the science image is a subarray, extract matching sections of
@@ -321,70 +323,69 @@ class DataSet():
         else:
             self.output_pers = None
 
-        # Buffer for accumulating the number of decayed traps from the
-        # start of an integration to the current group (in the loop below).
-        decayed = np.zeros((nfamilies, det_ny, det_nx), dtype=np.float64)
+        # Work buffers, reused for all integrations.  Persistence is
+        # computed for blocks of up to `group_chunk` groups at a time.
+        # trapped holds the traps_filled values for the science region
+        # at the start of the current integration.
+        nchunk = max(1, min(self.group_chunk, ngroups))
+        trapped = np.zeros((nfamilies, ny * nx), dtype=np.float32)
+        persistence = np.zeros((nchunk, ny * nx), dtype=np.float32)
+        filled = np.zeros((nfamilies, ny, nx), dtype=np.float32)
+
+        # Fraction of the filled traps (at the start of the integration)
+        # that have decayed by the end of each group, for each family.
+        group_end = np.arange(1, ngroups + 1, dtype=np.float64) * t_group
+        decayed_fraction = -np.expm1(-np.outer(group_end, decay_rate))
+        decayed_fraction = decayed_fraction.astype(np.float32)
 
         # self.traps_filled will be updated with each integration, to
         # account for charge capture and decay of traps.
-        filled = -1                             # just to ensure that it exists
         for integ in range(nints):
             self.get_group_info(integ)          # self.tgroup, etc.
-            decayed[:, :, :] = 0.               # initialize
             # slope has to be computed early in the loop over integrations,
             # before the data are modified by subtracting persistence.
             # The slope is needed for computing charge captures.
             (grp_slope, slope) = self.compute_slope(integ)
-            for group in range(ngroups):
-                persistence[:, :] = 0.          # initialize
-                for k in range(nfamilies):
-                    decay_param_k = self.get_decay_param(par, k)
-                    # Compute and subtract the decays during the reset.
-                    # Decays during the reset at the beginning of the
-                    # first integration have already been accounted for.
-                    if integ > 0 and group == 0 and self.nresets > 0:
-                        reset_time = self.tframe * self.nresets
-                        decay_during_reset = \
-                            self.compute_decay(self.traps_filled.data[k],
-                                               decay_param_k, reset_time)
-                        self.traps_filled.data[k, :, :] -= decay_during_reset
-                    # Decays during current group, for current trap family.
-                    decayed_in_group = \
-                        self.compute_decay(self.traps_filled.data[k],
-                                           decay_param_k, t_group)
-                    # Cumulative decay to the end of the current group.
-                    decayed[k, :, :] += decayed_in_group
-                    self.traps_filled.data[k, :, :] -= decayed_in_group
-                    if is_subarray:
-                        persistence += decayed[k, save_slice[0], save_slice[1]]
-                    else:
-                        persistence += decayed[k, :, :]
-                    del decayed_in_group
+
+            # Compute and subtract the decays during the reset.
+            # Decays during the reset at the beginning of the
+            # first integration have already been accounted for.
+            if integ > 0 and self.nresets > 0:
+                reset_time = self.tframe * self.nresets
+                self.apply_decay(self.traps_filled.data, decay_rate, reset_time)
+
+            trapped[:] = self.traps_filled.data[:, save_slice[0],
+                                                save_slice[1]].reshape((nfamilies, -1))
+
+            for start in range(0, ngroups, nchunk):
+                stop = min(start + nchunk, ngroups)
+                pers = persistence[:stop - start]
+                # Cumulative decays to the end of each group, summed over
+                # trap families.
+                np.dot(decayed_fraction[start:stop], trapped, out=pers)
+                pers_cube = pers.reshape((stop - start, ny, nx))
 
                 # Persistence was computed in DN.
-                self.output_obj.data[integ, group, :, :] -= persistence
+                self.output_obj.data[integ, start:stop, :, :] -= pers_cube
                 if self.save_persistence:
-                    self.output_pers.data[integ, group, :, :] = \
-                        persistence.copy()
-                if persistence.max() >= self.flag_pers_cutoff:
-                    mask = (persistence >= self.flag_pers_cutoff)
+                    self.output_pers.data[integ, start:stop, :, :] = pers_cube
+                if pers.max() >= self.flag_pers_cutoff:
+                    mask = (pers_cube >= self.flag_pers_cutoff).any(axis=0)
                     self.output_obj.pixeldq[mask] |= dqflags.pixel['PERSISTENCE']
 
+            # The traps decay over the whole detector during the integration.
+            self.apply_decay(self.traps_filled.data, decay_rate,
+                             ngroups * t_group)
+
             # Update traps_filled with the number of traps that captured
-            # a charge during the current integration.
-            for k in range(nfamilies):
-                capture_param_k = self.get_capture_param(par, k)
-                # This may be a subarray.
-                filled = self.predict_capture(capture_param_k,
-                                              self.trap_density.data,
-                                              integ, grp_slope, slope)
-                if is_subarray:
-                    self.traps_filled.data[k, save_slice[0],
-                                           save_slice[1]] += filled
-                else:
-                    self.traps_filled.data[k, :, :] += filled
-
-        del filled
+            # a charge during the current integration.  This may be a
+            # subarray.
+            self.predict_capture(par[0:3], self.trap_density.data,
+                                 integ, grp_slope, slope, out=filled)
+            self.traps_filled.data[:, save_slice[0], save_slice[1]] += filled
+            del grp_slope, slope
+
+        del trapped, persistence, filled
 
         # Update the start and end times (and other stuff) in the
         # traps_filled image to the times for the current exposure.
@@ -568,17 +569,11 @@ class DataSet():
             saturation limit per second.
         """
 
-        (_, ngroups, ny, nx) = self.output_obj.shape
+        ngroups = self.output_obj.shape[1]
         if ngroups == 1:
             # This won't be accurate, because there's only one group.
             grp_slope = self.output_obj.data[integ, 0, :, :]
-            if hasattr(self.persistencesat, "dq"):
-                mask = (np.bitwise_and(self.persistencesat.dq,
-                                       dqflags.pixel["DO_NOT_USE"]) > 0)
-                if mask.sum() == 0:
-                    mask = None
-            else:
-                mask = None
+            mask = self.get_persat_mask()
             if mask is None:
                 slope = grp_slope / (self.persistencesat.data * self.tgroup)
             else:
@@ -596,9 +591,8 @@ class DataSet():
         # This assumes that the jump step has already been run, so that
         # CR jumps will have been flagged in the groupdq extension.
         # n_cr is a 2-D array of the number of cosmic-ray hits per pixel.
-        cr = (np.bitwise_and(gdq, gdqflags["JUMP_DET"]) > 0).astype(np.int32)
-        n_cr = cr.sum(axis=0)
-        del cr
+        n_cr = np.count_nonzero(np.bitwise_and(gdq, gdqflags["JUMP_DET"]),
+                                axis=0)
 
         # In the absence of saturation and jumps, these differences would
         # be approximately constant for a given pixel.
@@ -612,22 +606,19 @@ class DataSet():
         # n_sat is a 2-D array of the number of saturated groups per pixel.
         s_mask = (np.bitwise_and(gdq[1:, :, :], gdqflags["SATURATED"]) > 0)
         diff[s_mask] = huge_diff
-        sat = s_mask.astype(np.int32)
-        n_sat = sat.sum(axis=0)
-        del s_mask, sat
+        n_sat = np.count_nonzero(s_mask, axis=0)
+        del s_mask
 
-        sdiff = np.sort(diff, axis=0)
+        diff.sort(axis=0)               # in-place
+        sdiff = diff
         # Upper limit of good data (slice notation, i.e. exclusive).
         upper = diff.shape[0] - (n_cr + n_sat)
         really_bad = np.where(upper < 0)
         upper[really_bad] = 0           # for the comparison with indx below
         del really_bad
-        temp = np.arange(ngroups - 1, dtype=np.int32)
-        temp2 = np.repeat(temp, nx * ny)
-        indx = temp2.reshape((ngroups - 1, ny, nx))
-        mask = np.where(indx >= upper)
-        sdiff[mask] = 0.                # zero values won't affect the sum
-        del temp, temp2, indx, mask
+        indx = np.arange(ngroups - 1, dtype=np.int32).reshape((ngroups - 1, 1, 1))
+        sdiff[indx >= upper] = 0.       # zero values won't affect the sum
+        del indx
         bad = np.where(upper <= 0)
         upper[bad] = 1                  # so we can divide by upper
 
@@ -638,13 +629,7 @@ class DataSet():
 
         # slope will have units (DN / persistence_saturation_limit) / second,
         # where persistence_saturation_limit is in units of DN.
-        if hasattr(self.persistencesat, "dq"):
-            mask = (np.bitwise_and(self.persistencesat.dq,
-                                   dqflags.pixel["DO_NOT_USE"]) > 0)
-            if mask.sum() == 0:
-                mask = None
-        else:
-            mask = None
+        mask = self.get_persat_mask()
         if mask is None:
             slope = grp_slope / (self.persistencesat.data * self.tgroup)
         else:
@@ -655,52 +640,6 @@ class DataSet():
 
         return grp_slope, slope
 
-    def get_capture_param(self, par, k):
-        """Extract capture parameters for the current trap family.
-
-        Parameters
-        ----------
-        par : tuple of ndarray
-            These were read from the trap parameters reference table.
-            Each element of the tuple is a column from the table.  Each
-            row of the table is for a different trap family.
-
-        k : int
-            Index of the current trap family
-
-        Returns
-        -------
-        tuple of three floats
-            These are the capture parameters for the current trap family.
-        """
-
-        (par0, par1, par2) = par[0:3]
-
-        return par0[k], par1[k], par2[k]
-
-    def get_decay_param(self, par, k):
-        """Extract decay parameter(s) for the current trap family.
-
-        Parameters
-        ----------
-        par : tuple of ndarray
-            These were read from the trap parameters reference table.
-            Each element of the tuple is a column from the table.  Each
-            row of the table is for a different trap family.
-
-        k : int
-            Index of the current trap family
-
-        Returns
-        -------
-        float
-            This is the decay parameter for the current trap family.
-        """
-
-        par3 = par[3]
-
-        return par3[k]
-
     def get_group_info(self, integ):
         """Get some metadata.
 
@@ -745,19 +684,38 @@ class DataSet():
             else:
                 self.nresets = 1
 
-    def predict_capture(self, capture_param_k, trap_density, integ,
-                        grp_slope, slope):
+
+    def get_persat_mask(self):
+        """Find pixels flagged as bad in the persistence saturation limit.
+
+        Returns
+        -------
+        ndarray, 2-D, bool, or None
+            True where the DQ array of the PERSAT reference file is flagged
+            DO_NOT_USE, or None if there are no such pixels.
+        """
+
+        if not hasattr(self.persistencesat, "dq"):
+            return None
+        mask = (np.bitwise_and(self.persistencesat.dq,
+                               dqflags.pixel["DO_NOT_USE"]) > 0)
+        if not mask.any():
+            return None
+        return mask
+
+    def predict_capture(self, capture_param, trap_density, integ,
+                        grp_slope, slope, out=None):
         """Compute the number of traps that will be filled in time dt.
 
-        This is based on Michael Regan's trapcapturemodel.pro.
+        This is based on Michael Regan's trapcapturemodel.pro.  All trap
+        families are computed at once.
 
         Parameters
         ----------
-        capture_param_k : tuple of three floats
-            Three values read from a reference table.  These will be from
-            three separate columns but just one row; the row corresponds
-            to the current trap family.  (The _k in the variable name
-            indicates that the values are for one trap family.)
+        capture_param : tuple of three ndarrays
+            Columns "capture0", "capture1" and "capture2" read from the
+            trap parameters reference table.  Each row of the table is for
+            a different trap family.
 
         trap_density : ndarray, 2-D
             Image of the total number of traps per pixel.
@@ -777,10 +735,15 @@ class DataSet():
             fraction of the persistence saturation limit per second.
             This is the same as `grp_slope` except for units.
 
+        out : ndarray, 3-D, or None
+            If not None, the result will be written into this array,
+            which must have one plane for each trap family.
+
         Returns
         -------
-        ndarray, 2-D
-            The computed traps_filled at the end of the integration.
+        ndarray, 3-D
+            The computed traps_filled at the end of the integration, one
+            plane for each trap family.
         """
 
         data = self.output_obj.data[integ, :, :, :]
@@ -797,59 +760,49 @@ class DataSet():
 
         # Find pixels exceeding the persistence saturation limit (full well).
         pflag = (data > self.persistencesat.data)
-        if hasattr(self.persistencesat, "dq"):
-            mask = (np.bitwise_and(self.persistencesat.dq,
-                                   dqflags.pixel["DO_NOT_USE"]) > 0)
-            mshape = mask.shape
-            mask = mask.reshape((1,) + mshape)
-            m3 = np.repeat(mask, ngroups, 0)
-            pflag[m3] = False
-            del mask, m3
-
-        # All of these are 2-D arrays.
-        sat_count = pflag.sum(axis=0, dtype=np.intp)
+        mask = self.get_persat_mask()
+        if mask is not None:
+            pflag &= ~mask
+            del mask
+
+        # All of these are 2-D arrays, the same for all trap families.
+        sat_count = np.count_nonzero(pflag, axis=0)
         del pflag
         sattime = sat_count.astype(np.float64) * t_group
         dt = totaltime - sattime
 
         # Traps that were filled due to the linear portion of the ramp.
-        ramp_traps_filled = self.predict_ramp_capture(
-            capture_param_k,
-            trap_density, slope, dt)
+        filled = self.predict_ramp_capture(capture_param, trap_density,
+                                           slope, dt, out=out)
+        del dt
 
-        filled = ramp_traps_filled.copy()
         mask = (sat_count > 0)
-        any_saturated = np.any(mask)
-        if any_saturated:
+        if np.any(mask):
             # Traps that were filled due to the saturated portion of the ramp.
-            filled[mask] = self.predict_saturation_capture(
-                capture_param_k,
+            filled[:, mask] = self.predict_saturation_capture(
+                capture_param,
                 trap_density[mask],
-                ramp_traps_filled[mask],
+                filled[:, mask],
                 sattime[mask], sat_count[mask], ngroups)
-        del sat_count, sattime, ramp_traps_filled, mask
+        del sat_count, sattime, mask
 
         # Traps that were filled due to cosmic-ray jumps.
-        cr_filled = self.delta_fcn_capture(
-            capture_param_k,
-            trap_density, integ,
-            grp_slope, ngroups, t_group)
-        filled += cr_filled
+        self.delta_fcn_capture(capture_param, trap_density, integ,
+                               grp_slope, ngroups, t_group, out=filled)
 
         return filled
 
-    def predict_ramp_capture(self, capture_param_k, trap_density, slope, dt):
+    def predict_ramp_capture(self, capture_param, trap_density, slope, dt,
+                             out=None):
         """Compute the number of traps that will be filled in time dt.
 
         This is based on Michael Regan's predictrampcapture3.pro.
 
         Parameters
         ----------
-        capture_param_k : tuple
-            Three values read from a reference table.  These will be from
-            three separate columns but just one row; the row corresponds
-            to the current trap family.  (The _k in the variable name
-            indicates that the values are for one trap family.)
+        capture_param : tuple of three ndarrays
+            Capture parameters from the trap parameters reference table,
+            one value per trap family in each array.
 
         trap_density : ndarray, 2-D
             Image of the total number of traps per pixel.
@@ -861,33 +814,55 @@ class DataSet():
             The unit is fraction of the persistence saturation limit
             per second.
 
-        dt : float
+        dt : ndarray, 2-D
             The time interval (unit = second) over which the charge capture
             is to be computed.  This does not include saturated groups.
 
+        out : ndarray, 3-D, or None
+            If not None, the result will be written into this array.
+
         Returns
         -------
-        ndarray, 2-D
-            The computed traps_filled at the end of the integration.
+        ndarray, 3-D
+            The computed traps_filled at the end of the integration, one
+            plane for each trap family.
         """
 
-        (par0, par1, par2) = capture_param_k
-        if par1 == 0:
+        (par0, par1, par2) = [np.asarray(p, dtype=np.float64)
+                              for p in capture_param]
+        nfamilies = len(par0)
+        tau = np.full(nfamilies, 1.e10)     # arbitrary "big" number
+        for k in np.flatnonzero(par1 == 0):
             log.error("Capture parameter is zero; parameters are %g, %g, %g",
-                      par0, par1, par2)
-            tau = 1.e10                 # arbitrary "big" number
-        else:
-            tau = 1. / abs(par1)
-
-        traps_filled = (trap_density * slope**2
-                        * (dt**2 * (par0 + par2) / 2.
-                           + par0 * (dt * tau + tau**2) * np.exp(-dt / tau)
-                           - par0 * tau**2))
-
-        traps_filled *= SCALEFACTOR
-        return traps_filled
-
-    def predict_saturation_capture(self, capture_param_k, trap_density,
+                      par0[k], par1[k], par2[k])
+        nonzero = (par1 != 0)
+        tau[nonzero] = 1. / np.abs(par1[nonzero])
+
+        if out is None:
+            out = np.zeros((nfamilies,) + dt.shape, dtype=np.float32)
+
+        # These don't depend on the trap family.
+        weight = trap_density * slope**2 * SCALEFACTOR
+        dt2 = dt**2
+        temp = np.empty(dt.shape, dtype=np.float64)
+        temp2 = np.empty(dt.shape, dtype=np.float64)
+
+        for k in range(nfamilies):
+            # par0 * (dt * tau + tau**2) * exp(-dt / tau)
+            np.divide(dt, -tau[k], out=temp)
+            np.exp(temp, out=temp)
+            np.add(dt, tau[k], out=temp2)
+            temp *= temp2
+            temp *= par0[k] * tau[k]
+            # + dt**2 * (par0 + par2) / 2 - par0 * tau**2
+            np.multiply(dt2, (par0[k] + par2[k]) / 2., out=temp2)
+            temp += temp2
+            temp -= par0[k] * tau[k]**2
+            np.multiply(temp, weight, out=out[k])
+
+        return out
+
+    def predict_saturation_capture(self, capture_param, trap_density,
                                    incoming_filled_traps,
                                    sattime, sat_count, ngroups):
         """Compute number of traps filled due to saturated pixels.
@@ -901,18 +876,18 @@ class DataSet():
         `incoming_filled_traps` can be so small that `exp_filled_traps`
         would be negative.
 
-        `trap_density`, `incoming_filled_traps`, `sattime`, and `sat_count`
-        were all 2-D arrays in the calling function `predict_capture`, but
-        these arrays have been masked to select only ramps with at least
-        one saturated group, so in this function these arrays are 1-D.
+        `trap_density`, `sattime`, and `sat_count` were all 2-D arrays in
+        the calling function `predict_capture`, but these arrays have been
+        masked to select only ramps with at least one saturated group, so
+        in this function these arrays are 1-D.  `incoming_filled_traps`
+        has been masked the same way, so it is 2-D, with one row for each
+        trap family.
 
         Parameters
         ----------
-        capture_param_k : tuple
-            Three values read from a reference table.  These will be from
-            three separate columns but just one row; the row corresponds
-            to the current trap family.  (The _k in the variable name
-            indicates that the values are for one trap family.)
+        capture_param : tuple of three ndarrays
+            Capture parameters from the trap parameters reference table,
+            one value per trap family in each array.
 
         trap_density : ndarray
             Image of the total number of traps per pixel.
@@ -934,16 +909,18 @@ class DataSet():
         Returns
         -------
         ndarray, 2-D
-            The computed traps_filled at the end of the integration.
+            The computed traps_filled at the end of the integration, one
+            row for each trap family.
         """
 
-        (par0, par1, par2) = capture_param_k
+        (par0, par1, par2) = [np.asarray(p, dtype=np.float64)[:, np.newaxis]
+                              for p in capture_param]
         par1 = abs(par1)        # the minus sign will be specified explicitly
 
         # For each pixel that had no ramp before saturation, fill all the
         # instantaneous traps; otherwise, they were filled during the ramp.
         flag = (sat_count == ngroups)
-        incoming_filled_traps[flag] = trap_density[flag] * par2
+        incoming_filled_traps[:, flag] = trap_density[flag] * par2
 
         # Find out how many exponential traps have already been filled.
         exp_filled_traps = incoming_filled_traps - trap_density * par2
@@ -960,8 +937,8 @@ class DataSet():
 
         return total_filled_traps
 
-    def delta_fcn_capture(self, capture_param_k, trap_density, integ,
-                          grp_slope, ngroups, t_group):
+    def delta_fcn_capture(self, capture_param, trap_density, integ,
+                          grp_slope, ngroups, t_group, out=None):
         """Compute number of traps filled due to cosmic-ray jumps.
 
         Extended Summary
@@ -977,11 +954,9 @@ class DataSet():
 
         Parameters
         ----------
-        capture_param_k : tuple
-            Three values read from a reference table.  These will be from
-            three separate columns but just one row; the row corresponds
-            to the current trap family.  (The _k in the variable name
-            indicates that the values are for one trap family.)
+        capture_param : tuple of three ndarrays
+            Capture parameters from the trap parameters reference table,
+            one value per trap family in each array.
 
         trap_density : ndarray, 2-D
             Image of the total number of traps per pixel.
@@ -1002,75 +977,73 @@ class DataSet():
             The time (seconds) from the start of one group to the start
             of the next group.
 
+        out : ndarray, 3-D, or None
+            If not None, the traps filled by cosmic rays will be added
+            to this array in-place.
+
         Returns
         -------
-        ndarray, 2-D
-            The computed cr_filled at the end of the integration.
+        ndarray, 3-D
+            The computed cr_filled at the end of the integration, one
+            plane for each trap family, or `out` with cr_filled added.
         """
 
-        (par0, par1, par2) = capture_param_k
-        # cr_filled will be incremented group-by-group, depending on
-        # where cosmic rays were found in each group.
-        cr_filled = np.zeros_like(trap_density)
+        (par0, par1, par2) = [np.asarray(p, dtype=np.float64)[:, np.newaxis]
+                              for p in capture_param]
+        if out is None:
+            out = np.zeros((len(par0),) + trap_density.shape,
+                           dtype=np.float32)
         data = self.output_obj.data[integ, :, :, :]
         gdq = self.output_obj.groupdq[integ, :, :, :]
         gdqflags = dqflags.group
 
         # If there's a CR hit in the first group, we can't determine its
-        # amplitude, so skip the first group.  Loop over all subsequent
-        # groups, checking (via the groupdq extension) for cosmic-ray hits.
-        for group in range(1, ngroups):
-            cr_flag = np.where(np.bitwise_and(gdq[group, :, :],
-                                              gdqflags['JUMP_DET']) > 0)
-            if len(cr_flag[0]) > 0:
-                delta_t = (float(ngroups - group) - 0.5) * t_group
-                # z and z_prev are index arrays.
-                z = np.empty(len(cr_flag[0]), dtype=np.intp)
-                z[:] = group
-                z_prev = z - 1
-                # jump is a 1-D array, just for the CRs in the current group.
-                jump = ((data[z, cr_flag[0], cr_flag[1]]
-                         - data[z_prev, cr_flag[0], cr_flag[1]])
-                        - grp_slope[cr_flag])
-                jump = np.where(jump < 0., 0., jump)
-                cr_filled[cr_flag] += trap_density[cr_flag] * jump \
-                    * (par0 * (1. - math.exp(par1 * delta_t))
-                       + par2)
-
+        # amplitude, so skip the first group.  Find the cosmic-ray hits
+        # (via the groupdq extension) in all subsequent groups at once.
+        (z, cr_y, cr_x) = np.nonzero(np.bitwise_and(gdq[1:, :, :],
+                                                    gdqflags['JUMP_DET']))
+        if len(z) == 0:
+            return out
+        z += 1
+        delta_t = (float(ngroups) - z - 0.5) * t_group
+        # jump is a 1-D array, one element for each CR hit.
+        jump = ((data[z, cr_y, cr_x] - data[z - 1, cr_y, cr_x])
+                - grp_slope[cr_y, cr_x])
+        jump = np.where(jump < 0., 0., jump)
+        cr_filled = (trap_density[cr_y, cr_x] * jump
+                     * (par0 * (1. - np.exp(par1 * delta_t)) + par2))
         cr_filled *= SCALEFACTOR
-        return cr_filled
 
-    def compute_decay(self, traps_filled, decay_param, delta_t):
-        """Compute the number of trap decays.
+        # A pixel can have hits in more than one group.
+        index = np.ravel_multi_index((cr_y, cr_x), trap_density.shape)
+        for k in range(out.shape[0]):
+            np.add.at(out[k].reshape(-1), index, cr_filled[k])
 
-        This is based on Michael Regan's trapdecay.pro.
+        return out
+
+    def apply_decay(self, traps_filled, decay_rate, delta_t):
+        """Decrease the number of filled traps by the number of decays.
+
+        This is based on Michael Regan's trapdecay.pro.  The number of
+        decays in time `delta_t` is traps_filled * (1 - exp(-delta_t / tau)).
 
         Parameters
         ----------
-        traps_filled : ndarray, 2-D
-            This is an image of the number of filled traps in each pixel
-            for the current trap family.
+        traps_filled : ndarray, 3-D
+            The number of filled traps in each pixel, one plane for each
+            trap family.  This will be modified in-place.
 
-        decay_param : float
-            The decay parameter.  This is negative, but otherwise it's
-            the reciprocal of the e-folding time for trap decay for the
-            current trap family.
+        decay_rate : ndarray, 1-D
+            The absolute values of the decay parameters, i.e. the
+            reciprocals of the e-folding times for trap decay, one for each
+            trap family.
 
         delta_t : float
             The time interval (unit = second) over which the trap decay
             is to be computed.
-
-        Returns
-        -------
-        decayed : ndarray, 2-D
-            Image of the computed number of trap decays for each pixel,
-            for the current trap family.
         """
 
-        if decay_param == 0.:
-            decayed = traps_filled * 0.
-        else:
-            tau = 1. / abs(decay_param)
-            decayed = traps_filled * (1. - math.exp(-delta_t / tau))
-
-        return decayed
+        remaining = np.exp(-delta_t * decay_rate)
+        for k in range(traps_filled.shape[0]):
+            if remaining[k] != 1.:
+                traps_filled[k] *= remaining[k]
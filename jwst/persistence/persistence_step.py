@@ -1,8 +1,12 @@
 #! /usr/bin/env python
+import os
+
+import numpy as np
 from stdatamodels.jwst import datamodels
 
 from ..stpipe import Step
 from . import persistence
+from .trap_store import TrapStateStore
 
 __all__ = ["PersistenceStep"]
 
@@ -16,6 +20,8 @@ class PersistenceStep(Step):
 
     spec = """
         input_trapsfilled = string(default="") # Name of the most recent trapsfilled file for the current detector
+        trap_state_dir = string(default=None) # Directory of trap states to look up and update when input_trapsfilled is not given
+        trap_state_size = integer(default=10) # Maximum number of trap states kept per detector in trap_state_dir
         flag_pers_cutoff = float(default=40.) # Pixels with persistence correction >= this value in DN will be flagged in the DQ
         save_persistence = boolean(default=False) # Save subtracted persistence to an output file with suffix '_output_pers'
         save_trapsfilled = boolean(default=True) # Save updated trapsfilled file with suffix '_trapsfilled'
@@ -24,6 +30,9 @@ class PersistenceStep(Step):
 
     reference_file_types = ["trapdensity", "trappars", "persat"]
 
+    # The trap state store is updated with each exposure
+    side_product_pars = ("trap_state_dir",)
+
     def process(self, step_input):
 
         if self.input_trapsfilled is not None:
@@ -65,8 +74,14 @@ class PersistenceStep(Step):
             # Work on a copy
             result = input_model.copy()
 
+            trap_store = None
             if self.input_trapsfilled is None:
                 traps_filled_model = None
+                if self.trap_state_dir is not None:
+                    trap_store = self._get_trap_store()
+                    traps_filled_model = trap_store.get(
+                        input_model.meta.instrument.detector,
+                        input_model.meta.exposure.start_time)
             else:
                 traps_filled_model = datamodels.TrapsFilledModel(
                     self.input_trapsfilled)
@@ -88,7 +103,19 @@ class PersistenceStep(Step):
 
             if traps_filled_model is not None:      # input traps_filled
                 del traps_filled_model
-            if traps_filled is not None:            # output traps_filled
+            if traps_filled is not None and trap_store is not None:
+                # The trap state is kept in the store instead of a
+                # trapsfilled file
+                end_time = _last_integration_end_time(result)
+                if end_time is None:
+                    self.log.warning('End time of integration %s unknown; '
+                                     'the trap state will not be stored',
+                                     result.meta.exposure.integration_end)
+                else:
+                    traps_filled.meta.exposure.end_time = end_time
+                    trap_store.put(traps_filled)
+                del traps_filled
+            elif traps_filled is not None:          # output traps_filled
                 # Save the traps_filled image with suffix 'trapsfilled'.
                 self.save_model(
                     traps_filled, suffix='trapsfilled', force=self.save_trapsfilled
@@ -105,3 +132,46 @@ class PersistenceStep(Step):
             del persat_model
 
         return result
+
+    def _get_trap_store(self):
+        """Get the store of trap states in trap_state_dir.
+
+        The store is kept by the step, so that the trap state it holds in
+        memory is reused for the next exposure processed by this step.
+        """
+        store = getattr(self, '_trap_store', None)
+        store_dir = os.path.abspath(os.path.expanduser(os.path.expandvars(self.trap_state_dir)))
+        if store is None or store.store_dir != store_dir:
+            store = TrapStateStore(store_dir, max_entries=self.trap_state_size)
+            self._trap_store = store
+        store.max_entries = self.trap_state_size
+        return store
+
+
+def _last_integration_end_time(model):
+    """End time (MJD) of the last integration in a ramp model.
+
+    This is the exposure end time, unless the model holds only a segment
+    or chunk of the integrations of the exposure, which ends earlier.
+
+    Parameters
+    ----------
+    model : `~jwst.datamodels.RampModel`
+        The ramp data.
+
+    Returns
+    -------
+    end_time : float or None
+        The end time, or None if it is not known.
+    """
+    exposure = model.meta.exposure
+    int_end = exposure.integration_end
+    if int_end is None or exposure.nints is None or int_end >= exposure.nints:
+        return exposure.end_time
+
+    if model.hasattr('int_times') and model.int_times is not None and len(model.int_times) > 0:
+        int_times = model.int_times
+        rows = np.nonzero(int_times['integration_number'] == int_end)[0]
+        if len(rows) > 0:
+            return float(int_times['int_end_MJD_UTC'][rows[0]])
+    return None
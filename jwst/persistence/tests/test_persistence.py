@@ -0,0 +1,154 @@
+"""Test the trap capture and decay model of the persistence step"""
+import numpy as np
+import pytest
+from stdatamodels.jwst import datamodels
+from stdatamodels.jwst.datamodels import dqflags
+
+from jwst.persistence import persistence
+
+DET_SHAPE = (40, 50)
+TGROUP = 10.
+
+
+def make_models(nints=2, ngroups=7, shape=DET_SHAPE, corner=(0, 0), rate=0.):
+    ny, nx = shape
+    model = datamodels.RampModel((nints, ngroups, ny, nx))
+    model.data[:] = rate * np.arange(1, ngroups + 1, dtype=np.float32)[:, None, None]
+    model.meta.instrument.detector = 'NRCA1'
+    model.meta.exposure.frame_time = TGROUP
+    model.meta.exposure.group_time = TGROUP
+    model.meta.exposure.ngroups = ngroups
+    model.meta.exposure.nframes = 1
+    model.meta.exposure.groupgap = 0
+    model.meta.exposure.nresets_at_start = 1
+    model.meta.exposure.nresets_between_ints = 1
+    model.meta.exposure.start_time = 60000.001
+    model.meta.subarray.ystart = corner[0] + 1
+    model.meta.subarray.xstart = corner[1] + 1
+    model.meta.subarray.ysize = ny
+    model.meta.subarray.xsize = nx
+
+    rng = np.random.default_rng(3)
+    trap_density = datamodels.TrapDensityModel(
+        data=rng.uniform(0.5, 1.5, DET_SHAPE).astype(np.float32))
+    persat = datamodels.PersistenceSatModel(
+        data=np.full(DET_SHAPE, 3.e4, dtype=np.float32))
+    for ref in (trap_density, persat):
+        ref.meta.subarray.xstart = 1
+        ref.meta.subarray.ystart = 1
+
+    trappars = datamodels.TrapParsModel()
+    table = np.zeros(3, dtype=[('capture0', 'f4'), ('capture1', 'f4'),
+                               ('capture2', 'f4'), ('decay_param', 'f4')])
+    table['capture0'] = [150., 100., 300.]
+    table['capture1'] = [-0.0045, -0.0007, -0.1]
+    table['capture2'] = [0.001, 0.002, 0.]
+    table['decay_param'] = [-0.0005, -0.002, 0.]
+    trappars.trappars_table = table
+
+    traps_filled = datamodels.TrapsFilledModel(
+        data=rng.uniform(0., 2000., (3,) + DET_SHAPE).astype(np.float32))
+    traps_filled.meta.exposure.end_time = 60000.
+    traps_filled.meta.subarray.xstart = 1
+    traps_filled.meta.subarray.ystart = 1
+
+    return model, traps_filled, trap_density, trappars, persat
+
+
+def run_persistence(models, group_chunk=persistence.GROUP_CHUNK_SIZE):
+    model, traps_filled, trap_density, trappars, persat = models
+    dataset = persistence.DataSet(model, traps_filled, 40., True,
+                                  trap_density, trappars, persat)
+    dataset.group_chunk = group_chunk
+    return dataset.do_all()
+
+
+@pytest.mark.parametrize('shape, corner', [(DET_SHAPE, (0, 0)), ((16, 20), (5, 7))])
+def test_decay_only(shape, corner):
+    """Without any signal, persistence is the sum of the trap decays."""
+    models = make_models(shape=shape, corner=corner)
+    initial = models[1].data.copy()
+    _, traps_filled, output_pers, skipped = run_persistence(models)
+    assert not skipped
+
+    decay_rate = np.abs(models[3].trappars_table['decay_param']).astype(np.float64)
+    to_start = 0.001 * 86400.
+    start = initial * np.exp(-to_start * decay_rate)[:, None, None]
+    ngroups = output_pers.data.shape[1]
+    group_end = np.arange(1, ngroups + 1) * TGROUP
+    decayed = 1. - np.exp(-group_end[:, None] * decay_rate)
+    yslc = slice(corner[0], corner[0] + shape[0])
+    xslc = slice(corner[1], corner[1] + shape[1])
+    expected = np.einsum('gk,kyx->gyx', decayed, start[:, yslc, xslc])
+
+    np.testing.assert_allclose(output_pers.data[0], expected, rtol=1e-5)
+
+    # The traps keep decaying through the reset and the second integration
+    reset = np.exp(-TGROUP * decay_rate)[:, None, None]
+    start *= np.exp(-ngroups * TGROUP * decay_rate)[:, None, None] * reset
+    expected = np.einsum('gk,kyx->gyx', decayed, start[:, yslc, xslc])
+    np.testing.assert_allclose(output_pers.data[1], expected, rtol=1e-5)
+
+    start *= np.exp(-ngroups * TGROUP * decay_rate)[:, None, None]
+    np.testing.assert_allclose(traps_filled.data, start, rtol=1e-5)
+
+
+@pytest.mark.parametrize('group_chunk', [1, 3])
+def test_group_chunks(group_chunk):
+    """The result does not depend on the number of groups done at once."""
+    results = []
+    for chunk in (group_chunk, persistence.GROUP_CHUNK_SIZE):
+        models = make_models(rate=500.)
+        models[0].groupdq[1, 3, 5, 6] = dqflags.group['JUMP_DET']
+        models[0].data[1, 3:, 5, 6] += 2000.
+        results.append(run_persistence(models, group_chunk=chunk))
+    (result, expected) = results
+
+    for res, exp in zip(result[:3], expected[:3]):
+        np.testing.assert_allclose(res.data, exp.data, rtol=1e-6)
+    np.testing.assert_array_equal(result[0].pixeldq, expected[0].pixeldq)
+    assert np.any(result[0].pixeldq & dqflags.pixel['PERSISTENCE'])
+
+
+def test_predict_capture():
+    """Captures for all trap families match the per-family model."""
+    model, traps_filled, trap_density, trappars, persat = make_models(rate=500.)
+    model.data[0, 4:, 2, 3] = 4.e4
+    jump = dqflags.group['JUMP_DET']
+    model.groupdq[0, 2, 8, 9] = jump
+    model.groupdq[0, 5, 8, 9] = jump
+    model.data[0, 2:, 8, 9] += 1000.
+    model.data[0, 5:, 8, 9] += 300.
+
+    dataset = persistence.DataSet(model, traps_filled, 40., False,
+                                  trap_density, trappars, persat)
+    dataset.get_group_info(0)
+    par = dataset.get_parameters()
+    grp_slope, slope = dataset.compute_slope(0)
+    filled = dataset.predict_capture(par[0:3], trap_density.data, 0,
+                                     grp_slope, slope)
+    assert filled.shape == (3,) + DET_SHAPE
+
+    ngroups = model.data.shape[1]
+    dt = np.full(DET_SHAPE, ngroups * TGROUP + TGROUP)
+    # Three groups of pixel (2, 3) are above the persistence saturation limit
+    sattime = 3 * TGROUP
+    dt[2, 3] -= sattime
+    for k in range(3):
+        par0, par1, par2 = (float(p[k]) for p in par[0:3])
+        tau = 1. / abs(par1)
+        expected = (2. * trap_density.data * slope**2
+                    * (dt**2 * (par0 + par2) / 2.
+                       + par0 * (dt * tau + tau**2) * np.exp(-dt / tau)
+                       - par0 * tau**2))
+
+        density = trap_density.data[2, 3]
+        empty = density * par0 - (expected[2, 3] - density * par2)
+        expected[2, 3] += empty * (1. - np.exp(-abs(par1) * sattime))
+
+        for size, group in ((1000., 2), (300., 5)):
+            delta_t = (ngroups - group - 0.5) * TGROUP
+            expected[8, 9] += (2. * trap_density.data[8, 9] * (500. + size - grp_slope[8, 9])
+                               * (par0 * (1. - np.exp(par1 * delta_t)) + par2))
+
+        np.testing.assert_allclose(filled[k], expected, rtol=1e-5)
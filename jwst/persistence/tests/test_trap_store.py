@@ -0,0 +1,87 @@
+"""Test the local store of trap states"""
+import numpy as np
+from stdatamodels.jwst import datamodels
+
+from jwst.persistence import PersistenceStep
+from jwst.persistence.tests.test_persistence import make_models
+from jwst.persistence.trap_store import TrapStateStore
+
+
+def make_state(end_time, value, detector='NRCA1'):
+    traps_filled = datamodels.TrapsFilledModel(
+        data=np.full((3, 8, 10), value, dtype=np.float32))
+    traps_filled.meta.instrument.detector = detector
+    traps_filled.meta.exposure.end_time = end_time
+    return traps_filled
+
+
+def test_trap_store(tmp_path):
+    store = TrapStateStore(str(tmp_path), max_entries=2)
+    assert store.get('NRCA1', 60000.) is None
+
+    store.put(make_state(60000.1, 1.))
+    store.put(make_state(60000.2, 2.))
+    store.put(make_state(60000.15, 5., detector='NRCB1'))
+
+    # The most recent state that ended before the exposure started
+    state = store.get('NRCA1', 60000.3)
+    assert state.meta.exposure.end_time == 60000.2
+    assert state.meta.subarray.xsize == 10
+    assert np.all(state.data == 2.)
+    assert np.all(store.get('NRCA1', 60000.15).data == 1.)
+    assert np.all(store.get('NRCB1', 60000.3).data == 5.)
+    assert store.get('NRCA1', 60000.05) is None
+
+    # The returned state can be modified without changing the store
+    state.data[:] = 0.
+    assert np.all(store.get('NRCA1', 60000.3).data == 2.)
+
+    # Old states are removed
+    store.put(make_state(60000.3, 3.))
+    assert [entry[0] for entry in store.entries('NRCA1')] == [60000.2, 60000.3]
+    assert len(store.entries('NRCB1')) == 1
+
+    # A new store does not share the state in memory, and reads it from disk
+    other = TrapStateStore(str(tmp_path))
+    assert other._recent == {}
+    state = other.get('NRCA1', 60001.)
+    assert np.all(state.data == 3.)
+
+    store.clear()
+    assert store.entries('NRCA1') == []
+
+
+def test_step_trap_state_dir(tmp_path):
+    model, _, trap_density, trappars, persat = make_models(nints=3, rate=100.)
+    overrides = {}
+    for name, ref in [('trapdensity', trap_density), ('trappars', trappars),
+                      ('persat', persat)]:
+        overrides[f'override_{name}'] = str(tmp_path / f'{name}.fits')
+        ref.save(overrides[f'override_{name}'])
+    model.meta.filename = 'test_uncal.fits'
+    model.meta.exposure.nints = 3
+    model.meta.exposure.end_time = 60000.01
+
+    # A segment holding the first two of the three integrations
+    model.meta.exposure.integration_start = 1
+    model.meta.exposure.integration_end = 2
+    model.int_times = np.array(
+        [(i + 1, 0., 0., 60000. + 0.002 * (i + 1), 0., 0., 0.) for i in range(3)],
+        dtype=model.int_times.dtype)
+
+    step = PersistenceStep(trap_state_dir=str(tmp_path / 'states'),
+                           output_dir=str(tmp_path), **overrides)
+    step.run(model)
+
+    # The state is stored at the end of the segment, instead of a trapsfilled file
+    assert not list(tmp_path.glob('*trapsfilled*'))
+    store = step._trap_store
+    assert [entry[0] for entry in store.entries('NRCA1')] == [60000.004]
+
+    # The same step keeps the state in memory for the next exposure
+    model.meta.exposure.integration_end = 3
+    model.meta.exposure.start_time = 60000.02
+    model.meta.exposure.end_time = 60000.03
+    step.run(model)
+    assert step._trap_store is store
+    assert [entry[0] for entry in store.entries('NRCA1')] == [60000.004, 60000.03]
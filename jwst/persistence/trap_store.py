@@ -0,0 +1,180 @@
+#
+#  Local store of trap states for the persistence step
+
+import logging
+import os
+import re
+
+import asdf
+import numpy as np
+from stdatamodels.jwst import datamodels
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ["TrapStateStore"]
+
+
+class TrapStateStore:
+    """
+    Directory of trap states, indexed by detector and exposure end time.
+
+    Each state is the traps-filled image at the end of one exposure,
+    stored in its own ASDF file whose name gives the detector and the
+    exposure end time (MJD).  The most recent state stored by this store
+    for each detector is also kept in memory, so that processing the
+    exposures of a detector one after another with the same store does
+    not read back the state that was just written.  Only the
+    ``max_entries`` most recent states are kept for each detector.
+
+    Parameters
+    ----------
+    store_dir : str
+        Directory holding the trap states; created if needed.
+
+    max_entries : int
+        Maximum number of states to keep for each detector.
+    """
+
+    suffix = '_trapstate.asdf'
+
+    def __init__(self, store_dir, max_entries=10):
+        self.store_dir = os.path.abspath(
+            os.path.expanduser(os.path.expandvars(store_dir)))
+        self.max_entries = max_entries
+        os.makedirs(self.store_dir, exist_ok=True)
+
+        # Most recent state stored for each detector:  (path, data) tuples
+        self._recent = {}
+
+    @staticmethod
+    def _detector_key(detector):
+        return re.sub(r'[^A-Za-z0-9]', '-', str(detector).upper())
+
+    def _path(self, detector, end_time):
+        name = f'{self._detector_key(detector)}_{float(end_time):.9f}{self.suffix}'
+        return os.path.join(self.store_dir, name)
+
+    def entries(self, detector):
+        """List the stored states for a detector.
+
+        Parameters
+        ----------
+        detector : str
+            Detector name.
+
+        Returns
+        -------
+        entries : list of (float, str) tuples
+            Exposure end time (MJD) and file name of each state, oldest
+            first.
+        """
+        prefix = self._detector_key(detector) + '_'
+        entries = []
+        for name in os.listdir(self.store_dir):
+            if not (name.startswith(prefix) and name.endswith(self.suffix)):
+                continue
+            try:
+                end_time = float(name[len(prefix):-len(self.suffix)])
+            except ValueError:
+                continue
+            entries.append((end_time, os.path.join(self.store_dir, name)))
+        return sorted(entries)
+
+    def get(self, detector, start_time):
+        """Retrieve the most recent trap state before an exposure.
+
+        Parameters
+        ----------
+        detector : str
+            Detector name.
+
+        start_time : float
+            Start time (MJD) of the exposure to be corrected.  Only
+            states with an end time no later than this are considered.
+
+        Returns
+        -------
+        traps_filled : `~jwst.datamodels.TrapsFilledModel` or None
+            The trap state at the end of the most recent earlier exposure,
+            or None if there is none.  Decays since then have not been
+            applied.
+        """
+        earlier = [entry for entry in self.entries(detector)
+                   if entry[0] <= start_time]
+        if not earlier:
+            log.info('No stored trap state for %s before MJD %.6f',
+                     detector, start_time)
+            return None
+        end_time, path = earlier[-1]
+
+        recent = self._recent.get(self._detector_key(detector))
+        if recent is not None and recent[0] == path:
+            data = recent[1].copy()
+            log.info('Using trap state %s (in memory)', path)
+        else:
+            try:
+                with asdf.open(path, lazy_load=False, memmap=False) as af:
+                    data = np.array(af['data'])
+            except Exception as err:
+                log.warning('Could not read trap state %s: %s', path, err)
+                return None
+            log.info('Using trap state %s', path)
+
+        traps_filled = datamodels.TrapsFilledModel(data=data)
+        traps_filled.meta.exposure.end_time = end_time
+        traps_filled.meta.instrument.detector = detector
+        traps_filled.meta.subarray.xstart = 1
+        traps_filled.meta.subarray.ystart = 1
+        traps_filled.meta.subarray.xsize = data.shape[-1]
+        traps_filled.meta.subarray.ysize = data.shape[-2]
+        return traps_filled
+
+    def put(self, traps_filled):
+        """Store the trap state at the end of an exposure.
+
+        Parameters
+        ----------
+        traps_filled : `~jwst.datamodels.TrapsFilledModel`
+            The trap state; ``meta.instrument.detector`` and
+            ``meta.exposure.end_time`` are used as the index.
+        """
+        detector = traps_filled.meta.instrument.detector
+        end_time = traps_filled.meta.exposure.end_time
+        if detector is None or end_time is None:
+            log.warning('Detector or exposure end time unknown; '
+                        'the trap state will not be stored')
+            return
+
+        path = self._path(detector, end_time)
+        data = np.array(traps_filled.data, dtype=np.float32)
+        tree = {'data': data,
+                'detector': detector,
+                'end_time': float(end_time),
+                'filename': traps_filled.meta.filename}
+
+        # write to a temporary file first so that concurrent readers
+        # never see a partial file
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        asdf.AsdfFile(tree).write_to(tmp_path)
+        os.replace(tmp_path, path)
+        self._recent[self._detector_key(detector)] = (path, data)
+        log.info('Trap state stored as %s', path)
+        self.evict(detector)
+
+    def evict(self, detector):
+        """Remove the oldest states beyond ``max_entries`` for a detector."""
+        entries = self.entries(detector)
+        for _, path in entries[:max(len(entries) - self.max_entries, 0)]:
+            try:
+                os.remove(path)
+                log.debug('Removed trap state %s', path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """Remove all stored trap states."""
+        for name in os.listdir(self.store_dir):
+            if name.endswith(self.suffix):
+                os.remove(os.path.join(self.store_dir, name))
+        self._recent.clear()
@@ -7,9 +7,10 @@ from astropy import units as u
 from stdatamodels.jwst import datamodels
 from stdatamodels.jwst.datamodels import dqflags
 
-from .. lib.pipe_utils import match_nans_and_flags
+from .. lib.pipe_utils import map_slits, match_nans_and_flags
 from .. lib.wcs_utils import get_wavelengths
 from .. lib.dispaxis import get_dispersion_direction
+from .. lib.reffile_utils import open_reference_model
 from . import miri_mrs
 from . import miri_imager
 
@@ -90,7 +91,7 @@ class DataSet():
     """
 
     def __init__(self, model, inverse=False, source_type=None, mrs_time_correction=False,
-                 correction_pars=None):
+                 correction_pars=None, max_cores='1'):
         """
         Short Summary
         -------------
@@ -113,6 +114,11 @@ class DataSet():
 
         correction_pars : dict
             Correction meta-data from a previous run.
+
+        max_cores : str or int
+            Number of threads applying the correction to the slits of a
+            NIRSpec MSA or fixed-slit exposure, as an integer or one of
+            'quarter', 'half' or 'all'.
         """
         # Setup attributes necessary for calculation.
         if correction_pars:
@@ -151,6 +157,7 @@ class DataSet():
         self.inverse = inverse
         self.source_type = None
         self.mrs_time_correction = mrs_time_correction
+        self.max_cores = max_cores
 
         # For MultiSlitModels, only set a generic source_type value for the
         # entire datamodel if the user has set the source_type parameter.
@@ -245,16 +252,23 @@ class DataSet():
 
             # We have to find and apply a separate set of flux cal
             # data for each of the fixed slits in the input
-            for slit in self.input.slits:
-
+            def calibrate_slit(slit_pars):
+                slitnum, slit = slit_pars
                 log.info('Working on slit %s' % slit.name)
-                self.slitnum += 1
 
                 fields_to_match = {'filter': self.filter, 'grating': self.grating, 'slit': slit.name}
                 row = find_row(ftab.phot_table, fields_to_match)
                 if row is None:
-                    continue
-                self.photom_io(ftab.phot_table[row])
+                    return False
+                self.photom_io(ftab.phot_table[row], slitnum=slitnum)
+                return True
+
+            calibrated = map_slits(calibrate_slit,
+                                   enumerate(self.input.slits, start=self.slitnum + 1),
+                                   self.max_cores)
+            self.slitnum += len(self.input.slits)
+            if any(calibrated):
+                self.set_multislit_units()
 
         # Bright object fixed-slit exposures use a SlitModel
         elif self.exptype == 'NRS_BRIGHTOBJ':
@@ -279,12 +293,17 @@ class DataSet():
             if (isinstance(self.input, datamodels.MultiSlitModel) and
                     self.exptype == 'NRS_MSASPEC'):
 
-                # Loop over the MSA slits, applying the same photom
-                # ref data to all slits
-                for slit in self.input.slits:
+                # Apply the same photom ref data to all slits
+                def calibrate_slit(slit_pars):
+                    slitnum, slit = slit_pars
                     log.info('Working on slit %s' % slit.name)
-                    self.slitnum += 1
-                    self.photom_io(ftab.phot_table[row])
+                    self.photom_io(ftab.phot_table[row], slitnum=slitnum)
+
+                map_slits(calibrate_slit, enumerate(self.input.slits, start=self.slitnum + 1),
+                          self.max_cores)
+                self.slitnum += len(self.input.slits)
+                if len(self.input.slits) > 0:
+                    self.set_multislit_units()
 
             # IFU data
             else:
@@ -328,10 +347,10 @@ class DataSet():
                 # Convert wavelengths from meters to microns, if necessary
                 microns_100 = 1.e-4    # 100 microns, in meters
                 if waves.max() > 0. and waves.max() < microns_100:
-                    waves *= 1.e+6
+                    waves = waves * 1.e+6
 
                 # Load the pixel area table for the IFU slices
-                area_model = datamodels.open(area_fname)
+                area_model = open_reference_model(area_fname)
                 area_data = area_model.area_table
 
                 # Compute 2D wavelength and pixel area arrays for the whole image
@@ -407,6 +426,7 @@ class DataSet():
 
             # We have to find and apply a separate set of flux cal
             # data for each of the slits/orders in the input
+            calibrated = False
             for slit in self.input.slits:
 
                 # Increment slit number
@@ -421,6 +441,9 @@ class DataSet():
                 if row is None:
                     continue
                 self.photom_io(ftab.phot_table[row])
+                calibrated = True
+            if calibrated:
+                self.set_multislit_units()
 
         elif isinstance(self.input, datamodels.CubeModel):
             raise DataModelTypeError(f"Unexpected input data model type for NIRISS: {self.input.__class__.__name__}")
@@ -514,7 +537,8 @@ class DataSet():
 
             # Make sure all NaN's have DO_NOT_USE flag set
             where_nan = np.isnan(ftab.data)
-            ftab.dq[where_nan] = np.bitwise_or(ftab.dq[where_nan],
+            ftab_dq = ftab.dq.copy()
+            ftab_dq[where_nan] = np.bitwise_or(ftab_dq[where_nan],
                                                dqflags.pixel['DO_NOT_USE'])
 
             # Compute the combined 2D sensitivity factors
@@ -533,7 +557,7 @@ class DataSet():
                 self.input.var_flat *= sens2d**2
 
             # Update the science dq
-            self.input.dq = np.bitwise_or(self.input.dq, ftab.dq)
+            self.input.dq = np.bitwise_or(self.input.dq, ftab_dq)
 
             # Check if reference file contains time dependent correction
 
@@ -598,6 +622,7 @@ class DataSet():
         # Handle WFSS data separately from regular imaging
         if isinstance(self.input, datamodels.MultiSlitModel) and self.exptype == 'NRC_WFSS':
             # Loop over the WFSS slits, applying the correct photom ref data
+            calibrated = False
             for slit in self.input.slits:
                 log.info('Working on slit %s' % slit.name)
                 self.slitnum += 1
@@ -609,6 +634,9 @@ class DataSet():
                 if row is None:
                     continue
                 self.photom_io(ftab.phot_table[row])
+                calibrated = True
+            if calibrated:
+                self.set_multislit_units()
         elif self.exptype == 'NRC_TSGRISM':
             fields_to_match = {'filter': self.filter, 'pupil': self.pupil, 'order': self.order}
             row = find_row(ftab.phot_table, fields_to_match)
@@ -728,7 +756,20 @@ class DataSet():
 
         return wave2d, area2d, dqmap
 
-    def photom_io(self, tabdata, order=None):
+    def set_multislit_units(self):
+        """
+        Set the units of a multi-slit exposure, once its slits are calibrated.
+        """
+        if not self.inverse:
+            # Setting top model to None so they will not be written to FITs File.
+            # Information on the units should only come from the individual slits.
+            self.input.meta.bunit_data = None
+            self.input.meta.bunit_err = None
+        else:
+            self.input.meta.bunit_data = 'DN/s'
+            self.input.meta.bunit_err = 'DN/s'
+
+    def photom_io(self, tabdata, order=None, slitnum=None):
         """
         Short Summary
         -------------
@@ -743,10 +784,17 @@ class DataSet():
         order : int
             Spectral order number
 
+        slitnum : int, optional
+            Index of the slit of a MultiSlitModel to calibrate; by default,
+            the current slit, ``self.slitnum``.
+
         Returns
         -------
 
         """
+        if slitnum is None:
+            slitnum = self.slitnum
+
         # First get the scalar conversion factor.
         # For most modes, the scalar conversion factor in the photom reference
         # file is in units of (MJy / sr) / (DN / s), and the output from
@@ -764,7 +812,7 @@ class DataSet():
         except KeyError:
             conversion = tabdata['photmj']              # unit is MJy
             if isinstance(self.input, datamodels.MultiSlitModel):
-                slit = self.input.slits[self.slitnum]
+                slit = self.input.slits[slitnum]
                 if self.exptype in ['NRS_MSASPEC', 'NRS_FIXEDSLIT']:
                     srctype = self.source_type if self.source_type else slit.source_type
                 else:
@@ -799,9 +847,9 @@ class DataSet():
         # Store the conversion factor in the meta data
         log.info(f'PHOTMJSR value: {conversion:.6g}')
         if isinstance(self.input, datamodels.MultiSlitModel):
-            self.input.slits[self.slitnum].meta.photometry.conversion_megajanskys = \
+            self.input.slits[slitnum].meta.photometry.conversion_megajanskys = \
                 conversion
-            self.input.slits[self.slitnum].meta.photometry.conversion_microjanskys = \
+            self.input.slits[slitnum].meta.photometry.conversion_microjanskys = \
                 conversion * MJSR_TO_UJA2
         elif isinstance(self.input, datamodels.MultiSpecModel):
             # No place in MultiSpecModel schema to store photometry info
@@ -850,11 +898,11 @@ class DataSet():
             # Convert wavelengths from meters to microns, if necessary
             microns_100 = 1.e-4         # 100 microns, in meters
             if waves.max() > 0. and waves.max() < microns_100:
-                waves *= 1.e+6
+                waves = waves * 1.e+6
 
             # Compute a 2-D grid of conversion factors, as a function of wavelength
             if isinstance(self.input, datamodels.MultiSlitModel):
-                slit = self.input.slits[self.slitnum]
+                slit = self.input.slits[slitnum]
                 # The NIRSpec fixed-slit primary slit needs special handling if
                 # it contains a point source
                 if (self.exptype.upper() == 'NRS_FIXEDSLIT'
@@ -912,7 +960,7 @@ class DataSet():
 
         # Apply the conversion to the data and all uncertainty arrays
         if isinstance(self.input, datamodels.MultiSlitModel):
-            slit = self.input.slits[self.slitnum]
+            slit = self.input.slits[slitnum]
             if not self.inverse:
                 slit.data *= conversion
             else:
@@ -927,24 +975,15 @@ class DataSet():
             if no_cal is not None:
                 slit.dq[..., no_cal] = np.bitwise_or(slit.dq[..., no_cal],
                                                      dqflags.pixel['DO_NOT_USE'])
+            # The units of the exposure are set by set_multislit_units,
+            # once all slits are done, as slits may be calibrated in threads
             if not self.inverse:
                 if unit_is_surface_brightness:
                     slit.meta.bunit_data = 'MJy/sr'
                     slit.meta.bunit_err = 'MJy/sr'
-                    # Setting top model to None so they will not be written to FITs File.
-                    # Information on the units should only come from the individual slits.
-                    self.input.meta.bunit_data = None
-                    self.input.meta.bunit_err = None
                 else:
                     slit.meta.bunit_data = 'MJy'
                     slit.meta.bunit_err = 'MJy'
-                    # Setting top model to None so they will not be written to FITs File.
-                    # Information on the units should only come from the individual slits.
-                    self.input.meta.bunit_data = None
-                    self.input.meta.bunit_err = None
-            else:
-                self.input.meta.bunit_data = 'DN/s'
-                self.input.meta.bunit_err = 'DN/s'
 
             # Make sure output model has consistent NaN and DO_NOT_USE values
             match_nans_and_flags(slit)
@@ -1205,7 +1244,7 @@ class DataSet():
         if area_fname is not None and area_fname != "N/A":
             use_pixarea_rfile =  True
             # Load the pixel area reference file
-            pix_area = datamodels.open(area_fname)
+            pix_area = open_reference_model(area_fname)
 
         if self.instrument != 'NIRSPEC':
 
@@ -1214,14 +1253,14 @@ class DataSet():
                 # of the science data model
                 if isinstance(self.input, datamodels.MultiSlitModel):
                     # Note that this only copied to the first slit.
-                    self.input.slits[0].area = pix_area.data
+                    self.input.slits[0].area = pix_area.data.copy()
                 else:
                     ystart = self.input.meta.subarray.ystart - 1
                     xstart = self.input.meta.subarray.xstart - 1
                     yend = ystart + self.input.meta.subarray.ysize
                     xend = xstart + self.input.meta.subarray.xsize
                     self.input.area = pix_area.data[ystart: yend,
-                                                    xstart: xend]
+                                                    xstart: xend].copy()
                 log.info('Pixel area map copied to output.')
 
                 # Load the average pixel area values from the AREA reference file header
@@ -1384,7 +1423,7 @@ class DataSet():
 
         """
 
-        ftab = datamodels.open(photom_fname)
+        ftab = open_reference_model(photom_fname)
 
         # Load the pixel area reference file, if it exists, and attach the
         # reference data to the science model
@@ -20,6 +20,7 @@ class PhotomStep(Step):
         inverse = boolean(default=False)    # Invert the operation
         source_type = string(default=None)  # Process as specified source type.
         mrs_time_correction = boolean(default=True) # Apply the MIRI MRS time dependent correction
+        maximum_cores = string(default='1')  # Number of NIRSpec slits to calibrate in parallel threads. Can be an integer, 'half', 'quarter', or 'all'
     """
 
     reference_file_types = ['photom', 'area']
@@ -67,7 +68,8 @@ class PhotomStep(Step):
         try:
             # Do the correction
             phot = photom.DataSet(input_model, self.inverse, self.source_type,
-                                  self.mrs_time_correction, correction_pars)
+                                  self.mrs_time_correction, correction_pars,
+                                  max_cores=self.maximum_cores)
             result = phot.apply_photom(phot_filename, area_filename)
             result.meta.cal_step.photom = 'COMPLETE'
             self.correction_pars = phot.correction_pars
@@ -9,6 +9,7 @@ from stdatamodels.jwst import datamodels
 from stdatamodels.jwst.datamodels import SpecModel, MultiSpecModel
 
 from jwst.photom import photom
+from jwst.lib import pipe_utils
 from jwst.lib.dispaxis import get_dispersion_direction
 
 MJSR_TO_UJA2 = (u.megajansky / u.steradian).to(u.microjansky / (u.arcsecond**2))
@@ -1244,6 +1245,39 @@ def test_nirspec_msa():
     assert np.all(result)
 
 
+@pytest.mark.parametrize('exptype', ['NRS_FIXEDSLIT', 'NRS_MSASPEC'])
+def test_nirspec_slits_threads(exptype, monkeypatch):
+    """Test that calibrating the slits in parallel threads gives the same results"""
+    monkeypatch.setattr(pipe_utils.os, 'cpu_count', lambda: 4)
+
+    input_model = create_input('NIRSPEC', 'NRS1', exptype,
+                               filter='F170LP', grating='G235M')
+    if exptype == 'NRS_FIXEDSLIT':
+        ftab = create_photom_nrs_fs(min_wl=1.0, max_wl=5.0, min_r=8.0, max_r=9.0)
+    else:
+        ftab = create_photom_nrs_msa(min_wl=1.0, max_wl=5.0, min_r=8.0, max_r=9.0)
+
+    serial = photom.DataSet(input_model)
+    serial.calc_nirspec(ftab, 'garbage')
+    threaded = photom.DataSet(input_model, max_cores='all')
+    threaded.calc_nirspec(ftab, 'garbage')
+
+    assert threaded.slitnum == serial.slitnum == len(input_model.slits) - 1
+    for slit, expected in zip(threaded.input.slits, serial.input.slits):
+        np.testing.assert_array_equal(slit.data, expected.data)
+        np.testing.assert_array_equal(slit.err, expected.err)
+        np.testing.assert_array_equal(slit.dq, expected.dq)
+        assert (slit.meta.photometry.conversion_megajanskys
+                == expected.meta.photometry.conversion_megajanskys)
+        assert slit.meta.bunit_data == expected.meta.bunit_data
+
+    # The units come from the slits only
+    assert threaded.input.meta.bunit_data is None
+    assert threaded.input.meta.bunit_err is None
+
+    ftab.close()
+
+
 """ Skip this test because it would require a realistic wcs.
 def test_nirspec_ifu():
 
@@ -1,13 +1,38 @@
-from .calwebb_ami3 import Ami3Pipeline
-from .calwebb_coron3 import Coron3Pipeline
-from .calwebb_dark import DarkPipeline
-from .calwebb_detector1 import Detector1Pipeline
-from .calwebb_guider import GuiderPipeline
-from .calwebb_image2 import Image2Pipeline
-from .calwebb_image3 import Image3Pipeline
-from .calwebb_spec2 import Spec2Pipeline
-from .calwebb_spec3 import Spec3Pipeline
-from .calwebb_tso3 import Tso3Pipeline
-
-__all__ = ['Ami3Pipeline', 'Coron3Pipeline', 'DarkPipeline', 'Detector1Pipeline', 'GuiderPipeline',
-           'Image2Pipeline', 'Image3Pipeline', 'Spec2Pipeline', 'Spec3Pipeline', 'Tso3Pipeline']
+"""
+Pipeline classes of the package, imported on first access.
+
+Importing this package does not import the pipelines, so that running one
+pipeline only imports the steps it uses.
+"""
+from importlib import import_module
+
+# Pipeline class names and the modules defining them, which are named after
+# the pipeline aliases
+_PIPELINE_MODULES = {
+    'Ami3Pipeline': 'calwebb_ami3',
+    'Coron3Pipeline': 'calwebb_coron3',
+    'DarkPipeline': 'calwebb_dark',
+    'Detector1Pipeline': 'calwebb_detector1',
+    'GuiderPipeline': 'calwebb_guider',
+    'Image2Pipeline': 'calwebb_image2',
+    'Image3Pipeline': 'calwebb_image3',
+    'Spec2Pipeline': 'calwebb_spec2',
+    'Spec3Pipeline': 'calwebb_spec3',
+    'Tso3Pipeline': 'calwebb_tso3',
+}
+
+__all__ = list(_PIPELINE_MODULES)
+
+
+def __getattr__(name):
+    try:
+        module = _PIPELINE_MODULES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    pipeline_class = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = pipeline_class
+    return pipeline_class
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -4,6 +4,7 @@ import logging
 from stdatamodels.jwst import datamodels
 
 from ..stpipe import Pipeline
+from ..lib import fused_corrections, integration_chunks
 
 # step imports
 from ..group_scale import group_scale_step
@@ -32,6 +33,13 @@ __all__ = ['Detector1Pipeline']
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Steps that use all the integrations of an exposure together: emicorr fits
+# the phase of the noise over the whole exposure, and persistence carries the
+# trap state from one integration to the next.  When the exposure is
+# processed in chunks of integrations, they are still run on the full
+# exposure.
+FULL_EXPOSURE_STEPS = ('emicorr', 'persistence')
+
 
 class Detector1Pipeline(Pipeline):
     """
@@ -46,6 +54,9 @@ class Detector1Pipeline(Pipeline):
 
     spec = """
         save_calibrated_ramp = boolean(default=False)
+        integration_chunk_memory = float(default=None)  # Memory limit in GB for processing integrations in chunks
+        fuse_corrections = boolean(default=False)  # Apply consecutive saturation, superbias, linearity and dark_current corrections in one pass
+        dtype_policy = option("default", "float32", default="default")  # Keep science arrays in float32 between steps
     """
 
     # Define aliases to steps
@@ -82,71 +93,34 @@ class Detector1Pipeline(Pipeline):
         self.dark_current.output_dir = self.output_dir
         self.ramp_fit.output_dir = self.output_dir
 
-        instrument = input.meta.instrument.name
-        if instrument == 'MIRI':
-
-            # process MIRI exposures;
-            # the steps are in a different order than NIR
-            log.debug('Processing a MIRI exposure')
-
-            input = self.group_scale.run(input)
-            input = self.dq_init.run(input)
-            input = self.emicorr.run(input)
-            input = self.saturation.run(input)
-            input = self.ipc.run(input)
-            input = self.firstframe.run(input)
-            input = self.lastframe.run(input)
-            input = self.reset.run(input)
-            input = self.linearity.run(input)
-            input = self.rscd.run(input)
-            input = self.dark_current.run(input)
-            input = self.refpix.run(input)
-
-            # skip until MIRI team has figured out an algorithm
-            # input = self.persistence(input)
-
-        else:
-
-            # process Near-IR exposures
-            log.debug('Processing a Near-IR exposure')
-
-            input = self.group_scale.run(input)
-            input = self.dq_init.run(input)
-            input = self.saturation.run(input)
-            input = self.ipc.run(input)
-            input = self.superbias.run(input)
-            input = self.refpix.run(input)
-            input = self.linearity.run(input)
-
-            # skip persistence for NIRSpec
-            if instrument != 'NIRSPEC':
-                input = self.persistence.run(input)
-
-            input = self.dark_current.run(input)
-
-        # apply the charge_migration step
-        input = self.charge_migration.run(input)
-
-        # apply the jump step
-        input = self.jump.run(input)
-
-        # apply the clean_flicker_noise step
-        input = self.clean_flicker_noise.run(input)
-
-        # save the corrected ramp data, if requested
-        if self.save_calibrated_ramp:
-            self.save_model(input, 'ramp')
-
-        # apply the ramp_fit step
-        # This explicit test on self.ramp_fit.skip is a temporary workaround
-        # to fix the problem that the ramp_fit step ordinarily returns two
-        # objects, but when the step is skipped due to `skip = True`,
-        # only the input is returned when the step is invoked.
-        if self.ramp_fit.skip:
-            input = self.ramp_fit.run(input)
-            ints_model = None
+        # process the exposure in chunks of integrations, if requested
+        nints = input.data.shape[0]
+        chunk_nints = integration_chunks.integrations_per_chunk(
+            input, self.integration_chunk_memory)
+        if chunk_nints < nints and self.ramp_fit.skip:
+            log.warning('Integration chunking requires ramp fitting; '
+                        'processing the full exposure at once')
+            chunk_nints = nints
+
+        if chunk_nints < nints:
+            input, ints_model = self.process_chunks(input, chunk_nints)
         else:
-            input, ints_model = self.ramp_fit.run(input)
+            input = self.calibrate_ramp(input)
+
+            # save the corrected ramp data, if requested
+            if self.save_calibrated_ramp:
+                self.save_model(input, 'ramp')
+
+            # apply the ramp_fit step
+            # This explicit test on self.ramp_fit.skip is a temporary workaround
+            # to fix the problem that the ramp_fit step ordinarily returns two
+            # objects, but when the step is skipped due to `skip = True`,
+            # only the input is returned when the step is invoked.
+            if self.ramp_fit.skip:
+                input = self.ramp_fit.run(input)
+                ints_model = None
+            else:
+                input, ints_model = self.ramp_fit.run(input)
 
         # apply the gain_scale step to the exposure-level product
         if input is not None:
@@ -169,6 +143,212 @@ class Detector1Pipeline(Pipeline):
 
         return input
 
+    def calibrate_ramp(self, input):
+        """Apply the ramp-level calibration steps, up to ramp fitting.
+
+        Parameters
+        ----------
+        input : `~jwst.datamodels.RampModel`
+            The raw ramp data.
+
+        Returns
+        -------
+        input : `~jwst.datamodels.RampModel`
+            The calibrated ramp data.
+        """
+        return self.run_steps(input, self.ramp_steps(input))
+
+    def ramp_steps(self, input):
+        """List the ramp-level calibration steps for an exposure.
+
+        Parameters
+        ----------
+        input : `~jwst.datamodels.RampModel`
+            The ramp data.
+
+        Returns
+        -------
+        steps : list of str
+            Names of the steps to run up to ramp fitting, in order.
+        """
+        instrument = input.meta.instrument.name
+        if instrument == 'MIRI':
+
+            # process MIRI exposures;
+            # the steps are in a different order than NIR
+            log.debug('Processing a MIRI exposure')
+
+            steps = ['group_scale', 'dq_init', 'emicorr', 'saturation', 'ipc',
+                     'firstframe', 'lastframe', 'reset', 'linearity', 'rscd',
+                     'dark_current', 'refpix']
+
+            # skip persistence until MIRI team has figured out an algorithm
+
+        else:
+
+            # process Near-IR exposures
+            log.debug('Processing a Near-IR exposure')
+
+            steps = ['group_scale', 'dq_init', 'saturation', 'ipc', 'superbias',
+                     'refpix', 'linearity']
+
+            # skip persistence for NIRSpec
+            if instrument != 'NIRSPEC':
+                steps.append('persistence')
+
+            steps.append('dark_current')
+
+        # apply the charge_migration, jump and clean_flicker_noise steps
+        steps.extend(['charge_migration', 'jump', 'clean_flicker_noise'])
+
+        return steps
+
+    def run_steps(self, input, steps):
+        """Run a sequence of steps.
+
+        If ``fuse_corrections`` is set, consecutive saturation, superbias,
+        linearity and dark_current steps are applied together in a single
+        pass over the integrations.  Skipped steps in between do not
+        interrupt the sequence.
+
+        Parameters
+        ----------
+        input : `~jwst.datamodels.RampModel`
+            The input ramp data.
+
+        steps : list of str
+            Names of the steps to run, in order.
+
+        Returns
+        -------
+        input : `~jwst.datamodels.RampModel`
+            The calibrated ramp data.
+        """
+        fused = []
+        for name in steps:
+            step = getattr(self, name)
+            if self.fuse_corrections and fused_corrections.can_fuse(step, input):
+                fused.append(step)
+            elif step.skip and fused:
+                input = step.run(input)
+            else:
+                input = self._run_fused(input, fused)
+                fused = []
+                input = step.run(input)
+
+        return self._run_fused(input, fused)
+
+    def _run_fused(self, input, steps):
+        """Apply a list of fusable steps to the ramp data."""
+        if len(steps) > 1:
+            return fused_corrections.apply_fused_corrections(input, steps)
+        for step in steps:
+            input = step.run(input)
+        return input
+
+    def process_chunks(self, input, chunk_nints):
+        """Calibrate and ramp fit the exposure in chunks of integrations.
+
+        Each chunk is processed the same way as a segment of a segmented
+        exposure. The steps listed in `FULL_EXPOSURE_STEPS` are run on the
+        full exposure instead, after the steps before them have been applied
+        to every chunk. The per-integration results are then stitched
+        together and combined into the exposure level product.
+
+        Parameters
+        ----------
+        input : `~jwst.datamodels.RampModel`
+            The raw ramp data.
+
+        chunk_nints : int
+            Number of integrations to process at once.
+
+        Returns
+        -------
+        rate_model : `~jwst.datamodels.ImageModel` or None
+            The exposure level ramp fitting product.
+
+        ints_model : `~jwst.datamodels.CubeModel` or None
+            The integration level ramp fitting product.
+        """
+        nints = input.data.shape[0]
+        log.info(f'Processing {nints} integrations in chunks of {chunk_nints}')
+
+        # Apply the steps up to the last full-exposure step, writing the
+        # chunks back into the full ramp before each full-exposure step
+        steps = []
+        for name in self.ramp_steps(input):
+            if name in FULL_EXPOSURE_STEPS and not getattr(self, name).skip:
+                if steps:
+                    input = self.run_steps_in_chunks(input, steps, chunk_nints)
+                    steps = []
+                log.info(f'Running {name} on all integrations')
+                input = self.run_steps(input, [name])
+            else:
+                steps.append(name)
+
+        # Apply the remaining steps and the ramp fit chunk by chunk
+        stitcher = integration_chunks.IntegrationStitcher(input)
+        for ichunk, start in enumerate(range(0, nints, chunk_nints)):
+            stop = min(start + chunk_nints, nints)
+            log.info(f'Processing integrations {start + 1} to {stop} of {nints}')
+
+            chunk = integration_chunks.extract_integrations(input, start, stop)
+            chunk.meta.filename = integration_chunks.chunk_filename(
+                input.meta.filename, ichunk)
+            chunk = self.run_steps(chunk, steps)
+
+            # save the corrected ramp data for this chunk, if requested
+            if self.save_calibrated_ramp:
+                self.save_model(chunk, 'ramp')
+
+            rate_model, chunk_ints_model = self.ramp_fit.run(chunk)
+            chunk.close()
+            if rate_model is None or chunk_ints_model is None:
+                log.warning(f'NoneType returned from ramp_fit for integrations {start + 1} '
+                            f'to {stop}; they are flagged as DO_NOT_USE.')
+                continue
+            stitcher.add(rate_model, chunk_ints_model, start)
+
+        if stitcher.rate_template is None:
+            return None, None
+        return stitcher.finish()
+
+    def run_steps_in_chunks(self, input, steps, chunk_nints):
+        """Run a sequence of steps on chunks of integrations of the ramp.
+
+        The calibrated chunks are copied back into the input ramp.
+
+        Parameters
+        ----------
+        input : `~jwst.datamodels.RampModel`
+            The full ramp data, updated in place.
+
+        steps : list of str
+            Names of the steps to run, in order.
+
+        chunk_nints : int
+            Number of integrations to process at once.
+
+        Returns
+        -------
+        input : `~jwst.datamodels.RampModel`
+            The calibrated ramp data.
+        """
+        nints = input.data.shape[0]
+        for ichunk, start in enumerate(range(0, nints, chunk_nints)):
+            stop = min(start + chunk_nints, nints)
+            log.info(f'Processing integrations {start + 1} to {stop} of {nints}')
+
+            chunk = integration_chunks.extract_integrations(input, start, stop)
+            chunk.meta.filename = integration_chunks.chunk_filename(
+                input.meta.filename, ichunk)
+            chunk = self.run_steps(chunk, steps)
+            integration_chunks.insert_integrations(input, chunk, start)
+            chunk.close()
+
+        return input
+
     def setup_output(self, input):
         if input is None:
             return None
@@ -1,11 +1,14 @@
 #!/usr/bin/env python
 from collections import defaultdict
+from functools import partial
 import os.path as op
 
 from stdatamodels.jwst import datamodels
 
 from ..associations.load_as_asn import LoadAsLevel2Asn
+from ..lib.pipe_utils import compute_num_cores
 from ..stpipe import Pipeline
+from ..stpipe.product_pool import estimate_product_memory, process_products
 
 # calwebb IMAGE2 step imports
 from ..background import background_step
@@ -31,6 +34,9 @@ class Image2Pipeline(Pipeline):
 
     spec = """
         save_bsub = boolean(default=False) # Save background-subtracted science
+        dtype_policy = option("default", "float32", default="default") # Keep science arrays in float32 between steps
+        maximum_cores = string(default='1') # Products processed in parallel processes. Can be an integer, 'half', 'quarter', or 'all'
+        memory_budget = float(default=None) # Memory, in GB, of the products processed at the same time
     """
 
     # Define alias to steps
@@ -55,31 +61,34 @@ class Image2Pipeline(Pipeline):
             self.log.warning("Multiple products in input association. Output file name will be ignored.")
             self.output_file = None
 
+        try:
+            getattr(asn, 'filename')
+        except AttributeError:
+            asn.filename = "singleton"
+
         # Each exposure is a product in the association.
-        # Process each exposure.
-        results = []
-        for product in asn['products']:
-            self.log.info('Processing product {}'.format(product['name']))
-            if (self.save_results) & (self.output_file is None):
-                self.output_file = product['name']
-            try:
-                getattr(asn, 'filename')
-            except AttributeError:
-                asn.filename = "singleton"
-
-            result = self.process_exposure_product(
-                product,
-                asn['asn_pool'],
-                op.basename(asn.filename)
+        # Process each exposure, in parallel processes if requested.
+        outcomes = None
+        ncores = compute_num_cores(self.maximum_cores, len(asn['products']))
+        if ncores > 1:
+            self.log.info(f'Processing {len(asn["products"])} products on {ncores} cores')
+            outcomes = process_products(
+                [partial(self._process_product, product, asn) for product in asn['products']],
+                ncores=ncores,
+                memory_budget=None if self.memory_budget is None else self.memory_budget * 1024**3,
+                estimates=[estimate_product_memory(product) for product in asn['products']],
             )
 
-            # Save result
-            suffix = 'cal'
-            if isinstance(result, datamodels.CubeModel):
-                suffix = 'calints'
-            result.meta.filename = self.make_output_path(basepath=self.output_file, suffix=suffix)
+        results = []
+        for index, product in enumerate(asn['products']):
+            if outcomes is None:
+                result = self._process_product(product, asn)
+            else:
+                result, error, trace = outcomes[index]
+                if error is not None:
+                    self.log.error(trace)
+                    raise error
             results.append(result)
-            self.output_file = None
 
         self.log.info('... ending calwebb_image2')
 
@@ -87,6 +96,26 @@ class Image2Pipeline(Pipeline):
         self.suffix = False
         return results
 
+    def _process_product(self, product, asn):
+        """Process one product and name its output."""
+        self.log.info('Processing product {}'.format(product['name']))
+        if (self.save_results) & (self.output_file is None):
+            self.output_file = product['name']
+
+        result = self.process_exposure_product(
+            product,
+            asn['asn_pool'],
+            op.basename(asn.filename)
+        )
+
+        # Save result
+        suffix = 'cal'
+        if isinstance(result, datamodels.CubeModel):
+            suffix = 'calints'
+        result.meta.filename = self.make_output_path(basepath=self.output_file, suffix=suffix)
+        self.output_file = None
+        return result
+
     # Process each exposure
     def process_exposure_product(
             self,
@@ -1,5 +1,6 @@
 import os
 from collections import defaultdict
+from functools import partial
 import os.path as op
 import traceback
 import numpy as np
@@ -9,7 +10,9 @@ from jwst.stpipe import query_step_status
 
 from ..assign_wcs.util import NoDataOnDetectorError
 from ..lib.exposure_types import is_nrs_ifu_flatlamp, is_nrs_ifu_linelamp, is_nrs_slit_linelamp
+from ..lib.pipe_utils import compute_num_cores
 from ..stpipe import Pipeline
+from ..stpipe.product_pool import estimate_product_memory, process_products
 
 # step imports
 from ..assign_wcs import assign_wcs_step
@@ -62,6 +65,8 @@ class Spec2Pipeline(Pipeline):
         save_bsub = boolean(default=False)        # Save background-subtracted science
         fail_on_exception = boolean(default=True) # Fail if any product fails.
         save_wfss_esec = boolean(default=False)   # Save WFSS e-/sec image
+        maximum_cores = string(default='1')       # Products processed in parallel processes. Can be an integer, 'half', 'quarter', or 'all'
+        memory_budget = float(default=None)       # Memory, in GB, of the products processed at the same time
     """
 
     # Define aliases to steps
@@ -115,18 +120,42 @@ class Spec2Pipeline(Pipeline):
             self.log.warning('Multiple products in input association. Output file name will be ignored.')
             self.output_file = None
 
+        try:
+            getattr(asn, 'filename')
+        except AttributeError:
+            asn.filename = "singleton"
+
+        # Process the products in parallel processes, if requested.
+        outcomes = None
+        ncores = compute_num_cores(self.maximum_cores, len(asn['products']))
+        if ncores > 1:
+            self.log.info(f'Processing {len(asn["products"])} products on {ncores} cores')
+            outcomes = process_products(
+                [partial(self._process_product, product, asn) for product in asn['products']],
+                ncores=ncores,
+                memory_budget=None if self.memory_budget is None else self.memory_budget * 1024**3,
+                estimates=[estimate_product_memory(product) for product in asn['products']],
+            )
+
         # Each exposure is a product in the association.
         # Process each exposure.  Delay reporting failures until the end.
         results = []
         failures = []
-        for product in asn['products']:
+        for index, product in enumerate(asn['products']):
+            if outcomes is not None:
+                result, error, trace = outcomes[index]
+                if isinstance(error, NoDataOnDetectorError):
+                    raise error
+                if error is not None:
+                    self.log.error(trace)
+                    failures.append(trace)
+                elif result is not None:
+                    results.append(result)
+                continue
+
             self.log.info('Processing product {}'.format(product['name']))
             if self.output_file is None:
                 self.output_file = product['name']
-            try:
-                getattr(asn, 'filename')
-            except AttributeError:
-                asn.filename = "singleton"
             try:
                 result = self.process_exposure_product(
                     product,
@@ -156,6 +185,13 @@ class Spec2Pipeline(Pipeline):
         self.suffix = False
         return results
 
+    def _process_product(self, product, asn):
+        """Process one product, in a worker process."""
+        self.log.info('Processing product {}'.format(product['name']))
+        if self.output_file is None:
+            self.output_file = product['name']
+        return self.process_exposure_product(product, asn['asn_pool'], asn.filename)
+
     # Process each exposure
     def process_exposure_product(
             self,
@@ -0,0 +1,145 @@
+"""Test processing an exposure in chunks of integrations in Detector1Pipeline"""
+import numpy as np
+import pytest
+from stdatamodels.jwst import datamodels
+from stdatamodels.jwst.datamodels import dqflags
+
+from jwst.lib import integration_chunks
+from jwst.pipeline import Detector1Pipeline
+
+SHAPE = (32, 32)
+NINTS = 4
+NGROUPS = 6
+
+
+def make_ramp():
+    rng = np.random.default_rng(7)
+    rate = rng.uniform(1., 20., SHAPE).astype(np.float32)
+    # A bright region that fills traps, for persistence in later integrations
+    rate[8:16, 8:16] = 3000.
+    times = np.arange(1, NGROUPS + 1, dtype=np.float32)
+    data = np.broadcast_to(rate * times[:, None, None], (NINTS, NGROUPS) + SHAPE).copy()
+    data += rng.normal(0., 3., data.shape).astype(np.float32)
+
+    model = datamodels.RampModel(data=data, int_times=np.zeros((NINTS,)))
+    model.groupdq = np.zeros(data.shape, dtype=np.uint8)
+    model.pixeldq = np.zeros(SHAPE, dtype=np.uint32)
+    model.err = np.ones(data.shape, dtype=np.float32)
+    model.meta.filename = 'test_uncal.fits'
+    model.meta.instrument.name = 'NIRCAM'
+    model.meta.instrument.detector = 'NRCA1'
+    model.meta.instrument.channel = 'SHORT'
+    model.meta.instrument.module = 'A'
+    model.meta.instrument.filter = 'F200W'
+    model.meta.instrument.pupil = 'CLEAR'
+    model.meta.observation.date = '2024-01-01'
+    model.meta.observation.time = '00:00:00'
+    model.meta.exposure.type = 'NRC_IMAGE'
+    model.meta.exposure.readpatt = 'RAPID'
+    model.meta.exposure.start_time = 60310.0
+    model.meta.exposure.end_time = 60310.01
+    model.meta.exposure.nints = NINTS
+    model.meta.exposure.ngroups = NGROUPS
+    model.meta.exposure.nframes = 1
+    model.meta.exposure.groupgap = 0
+    model.meta.exposure.frame_time = 10.
+    model.meta.exposure.group_time = 10.
+    model.meta.exposure.drop_frames1 = 0
+    model.meta.exposure.nresets_at_start = 1
+    model.meta.exposure.nresets_between_ints = 1
+    model.meta.subarray.name = 'FULL'
+    model.meta.subarray.xstart = 1
+    model.meta.subarray.ystart = 1
+    model.meta.subarray.xsize = SHAPE[1]
+    model.meta.subarray.ysize = SHAPE[0]
+    return model
+
+
+@pytest.fixture(scope='module')
+def reference_files(tmp_path_factory):
+    """Write the gain, read noise and persistence reference files."""
+    path = tmp_path_factory.mktemp('reffiles')
+    rng = np.random.default_rng(3)
+    refs = {
+        'gain': datamodels.GainModel(data=np.full(SHAPE, 2., dtype=np.float32)),
+        'readnoise': datamodels.ReadnoiseModel(data=np.full(SHAPE, 5., dtype=np.float32)),
+        'trapdensity': datamodels.TrapDensityModel(
+            data=rng.uniform(0.5, 1.5, SHAPE).astype(np.float32)),
+        'persat': datamodels.PersistenceSatModel(data=np.full(SHAPE, 3.e4, dtype=np.float32)),
+        'trappars': datamodels.TrapParsModel(),
+    }
+    table = np.zeros(3, dtype=[('capture0', 'f4'), ('capture1', 'f4'),
+                               ('capture2', 'f4'), ('decay_param', 'f4')])
+    table['capture0'] = [150., 100., 300.]
+    table['capture1'] = [-0.0045, -0.0007, -0.1]
+    table['capture2'] = [0.001, 0.002, 0.]
+    table['decay_param'] = [-0.0005, -0.002, 0.]
+    refs['trappars'].trappars_table = table
+
+    filenames = {}
+    for reftype, ref in refs.items():
+        ref.meta.instrument.name = 'NIRCAM'
+        ref.meta.instrument.detector = 'NRCA1'
+        if reftype != 'trappars':
+            ref.meta.subarray.xstart = 1
+            ref.meta.subarray.ystart = 1
+            ref.meta.subarray.xsize = SHAPE[1]
+            ref.meta.subarray.ysize = SHAPE[0]
+        filenames[reftype] = str(path / f'{reftype}.fits')
+        ref.save(filenames[reftype])
+    return filenames
+
+
+def run_detector1(reference_files, output_dir, integration_chunk_memory=None):
+    steps = {name: {'skip': True} for name in Detector1Pipeline.step_defs}
+    for name in ('persistence', 'jump', 'ramp_fit'):
+        steps[name] = {}
+    # Flag the persistence of the last integrations, which follows from the
+    # traps filled in the first ones
+    steps['persistence'].update(override_trapdensity=reference_files['trapdensity'],
+                                override_trappars=reference_files['trappars'],
+                                override_persat=reference_files['persat'],
+                                flag_pers_cutoff=1.)
+    for name in ('jump', 'ramp_fit'):
+        steps[name].update(override_gain=reference_files['gain'],
+                           override_readnoise=reference_files['readnoise'])
+
+    pipeline = Detector1Pipeline(steps=steps, output_dir=str(output_dir),
+                                 integration_chunk_memory=integration_chunk_memory)
+    pipeline.save_results = True
+    rate = pipeline.run(make_ramp())
+    ints = datamodels.CubeModel(str(output_dir / 'test_rateints.fits'))
+    return rate, ints
+
+
+def test_chunks_match_full_exposure(reference_files, tmp_path):
+    (tmp_path / 'full').mkdir()
+    (tmp_path / 'chunks').mkdir()
+    full_rate, full_ints = run_detector1(reference_files, tmp_path / 'full')
+
+    # A memory limit for two integrations at a time
+    model = make_ramp()
+    bytes_per_int = np.prod(model.data.shape[1:]) * integration_chunks.CHUNK_MEMORY_OVERHEAD * (
+        model.data.itemsize + model.groupdq.itemsize + model.err.itemsize)
+    rate, ints = run_detector1(reference_files, tmp_path / 'chunks',
+                               integration_chunk_memory=2.5 * bytes_per_int / 1024 ** 3)
+
+    # Persistence ran on the full exposure, once
+    assert rate.meta.cal_step.persistence == 'COMPLETE'
+    assert [path.name for path in (tmp_path / 'chunks').glob('*trapsfilled*')] == [
+        'test_trapsfilled.fits']
+    with (datamodels.TrapsFilledModel(str(tmp_path / 'chunks' / 'test_trapsfilled.fits')) as traps,
+          datamodels.TrapsFilledModel(str(tmp_path / 'full' / 'test_trapsfilled.fits')) as full_traps):
+        np.testing.assert_array_equal(traps.data, full_traps.data)
+    assert np.any(full_rate.dq & dqflags.pixel['PERSISTENCE'])
+
+    np.testing.assert_array_equal(rate.dq, full_rate.dq)
+    np.testing.assert_array_equal(ints.dq, full_ints.dq)
+    np.testing.assert_allclose(ints.data, full_ints.data, rtol=1e-5, equal_nan=True)
+    np.testing.assert_allclose(rate.var_rnoise, full_rate.var_rnoise, rtol=1e-5)
+
+    # The Poisson variance, and so the integration weights, depend on the
+    # median rate over the integrations that were fit together
+    good = np.isfinite(full_rate.data)
+    np.testing.assert_array_equal(np.isfinite(rate.data), good)
+    assert np.all(np.abs(rate.data - full_rate.data)[good] < 0.5 * full_rate.err[good])
@@ -15,6 +15,8 @@ from stdatamodels.jwst.datamodels import dqflags
 from ..stpipe import Step
 
 from ..lib import reffile_utils
+from ..lib.pipe_utils import compute_num_cores
+from ..lib.shared_arrays import SharedArrays, attach_shared_arrays, row_slices, shared_pool
 
 import logging
 import warnings
@@ -26,6 +28,13 @@ log.setLevel(logging.DEBUG)
 
 __all__ = ["RampFitStep"]
 
+# Shared arrays and fitting parameters, in each worker process
+_worker_arrays = {}
+
+# Arrays in the image_info and integ_info tuples returned by ramp_fit
+_FIT_PRODUCTS = [('data', np.float32), ('dq', np.uint32), ('var_poisson', np.float32),
+                 ('var_rnoise', np.float32), ('err', np.float32)]
+
 
 def get_reference_file_subarrays(model, readnoise_model, gain_model, nframes):
     """
@@ -375,6 +384,110 @@ def calc_segs(rn_sect, gdq_sect, group_time):
     return den_r3, num_r3, segs_beg_3, max_seg
 
 
+def _init_worker(specs, meta, fit_args):
+    """Attach a worker process to the shared arrays."""
+    _worker_arrays.update(attach_shared_arrays(specs))
+    _worker_arrays['params'] = (meta, fit_args)
+
+
+def _fit_rows(task):
+    """Fit the ramps in a slice of rows, storing the results in shared memory."""
+    k, (start, stop, _, _) = task
+    arrays = _worker_arrays
+    meta, (buffsize, algorithm, weighting, suppress_one_group) = arrays['params']
+
+    # A lightweight model wrapping the shared slice, for ramp_fit
+    model = datamodels.RampModel(
+        data=arrays['data', k], groupdq=arrays['groupdq', k],
+        pixeldq=arrays['pixeldq', k], err=arrays['err', k],
+        average_dark_current=arrays['average_dark_current', k])
+    model.meta.instance.update(meta)
+    if arrays['zeroframe', k] is not None:
+        model.zeroframe = arrays['zeroframe', k]
+
+    image_info, integ_info, _, _ = ramp_fit.ramp_fit(
+        model, buffsize, False, arrays['readnoise', k], arrays['gain', k],
+        algorithm, weighting, '1', dqflags.pixel,
+        suppress_one_group=suppress_one_group)
+    if image_info is None or integ_info is None:
+        return False
+
+    for (name, _), image, integ in zip(_FIT_PRODUCTS, image_info, integ_info):
+        arrays['image_' + name][start:stop] = image
+        arrays['integ_' + name][:, start:stop] = integ
+    return True
+
+
+def _ramp_fit_parallel(model, buffsize, readnoise_2d, gain_2d, algorithm,
+                       weighting, suppress_one_group, ncores):
+    """
+    Fit ramps on slices of rows in a pool of processes.
+
+    Each slice of the ramp and reference arrays is copied once into its
+    own contiguous block of shared memory, which the worker processes use
+    in place, and the fit results are written into shared output arrays.
+    Only the slice descriptions and a status flag are passed through the
+    pool.  Optional results are not computed.
+
+    Parameters
+    ----------
+    model : `~jwst.datamodels.RampModel`
+        The ramp data.
+    buffsize : int
+        Buffer size for `ramp_fit`.
+    readnoise_2d, gain_2d : ndarray
+        Read noise and gain images matching the science data.
+    algorithm : str
+        Ramp fitting algorithm, 'OLS' or 'OLS_C'.
+    weighting : str
+        Weighting for the fit.
+    suppress_one_group : bool
+        Suppress saturated ramps with good 0th group.
+    ncores : int
+        Number of processes.
+
+    Returns
+    -------
+    image_info, integ_info : tuple or None
+        The ramp fitting arrays for the rate and rateints products, as
+        returned by `ramp_fit`.  None if any slice could not be fit, in
+        which case the full frame should be fit at once instead.
+    """
+    nints, _, nrows, ncols = model.data.shape
+    slices = row_slices(nrows, ncores)
+    zeroframe = None
+    if model.meta.exposure.zero_frame:
+        zeroframe = model.zeroframe
+
+    inputs = {}
+    for k, (start, stop, _, _) in enumerate(slices):
+        for name, array in [('data', model.data), ('groupdq', model.groupdq),
+                            ('pixeldq', model.pixeldq), ('err', model.err),
+                            ('average_dark_current', model.average_dark_current),
+                            ('zeroframe', zeroframe),
+                            ('readnoise', readnoise_2d), ('gain', gain_2d)]:
+            inputs[name, k] = None if array is None else array[..., start:stop, :]
+    outputs = {}
+    for name, dtype in _FIT_PRODUCTS:
+        outputs['image_' + name] = ((nrows, ncols), dtype)
+        outputs['integ_' + name] = ((nints, nrows, ncols), dtype)
+
+    meta = model.meta.instance
+    fit_args = (buffsize, algorithm, weighting, suppress_one_group)
+    with SharedArrays(inputs, outputs) as shared:
+        log.info(f'Fitting ramps in {len(slices)} slices with {ncores} processes')
+        with shared_pool(ncores, initializer=_init_worker,
+                         initargs=(shared.specs, meta, fit_args)) as pool:
+            success = pool.map(_fit_rows, enumerate(slices))
+        if not all(success):
+            return None, None
+
+        image_info = tuple(shared['image_' + name].copy() for name, _ in _FIT_PRODUCTS)
+        integ_info = tuple(shared['integ_' + name].copy() for name, _ in _FIT_PRODUCTS)
+
+    return image_info, integ_info
+
+
 class RampFitStep(Step):
 
     """
@@ -461,10 +574,23 @@ class RampFitStep(Step):
             # Run ramp_fit(), ignoring all DO_NOT_USE groups, and return the
             # ramp fitting arrays for the ImageModel, the CubeModel, and the
             # RampFitOutputModel.
-            image_info, integ_info, opt_info, gls_opt_model = ramp_fit.ramp_fit(
-                result, buffsize, self.save_opt, readnoise_2d, gain_2d,
-                self.algorithm, self.weighting, max_cores, dqflags.pixel,
-                suppress_one_group=self.suppress_one_group)
+            # Ordinary least squares fits are independent for each pixel,
+            # so they can be run on slices of rows in shared memory.
+            image_info = None
+            ncores = compute_num_cores(max_cores, max_items=result.data.shape[2])
+            if ncores > 1 and self.algorithm in ("OLS", "OLS_C") and not self.save_opt:
+                image_info, integ_info = _ramp_fit_parallel(
+                    result, buffsize, readnoise_2d, gain_2d, self.algorithm,
+                    self.weighting, self.suppress_one_group, ncores)
+                opt_info, gls_opt_model = None, None
+                if image_info is None:
+                    log.info('Ramp fitting failed on a slice; fitting the full frame at once')
+
+            if image_info is None:
+                image_info, integ_info, opt_info, gls_opt_model = ramp_fit.ramp_fit(
+                    result, buffsize, self.save_opt, readnoise_2d, gain_2d,
+                    self.algorithm, self.weighting, max_cores, dqflags.pixel,
+                    suppress_one_group=self.suppress_one_group)
 
             # Create a gdq to modify if there are charge_migrated groups
             if self.algorithm == "OLS":
@@ -3,6 +3,7 @@ import numpy as np
 
 from stdatamodels.jwst.datamodels import dqflags, RampModel, GainModel, ReadnoiseModel
 
+from jwst.lib import pipe_utils
 from jwst.ramp_fitting.ramp_fit_step import RampFitStep
 
 DELIM = "-" * 80
@@ -179,6 +180,45 @@ def test_ramp_fit_step(generate_miri_reffiles, setup_inputs, max_cores):
     assert slopes.meta.cal_step.ramp_fit == "COMPLETE"
 
 
+@pytest.mark.parametrize("algorithm", ["OLS", "OLS_C"])
+def test_ramp_fit_step_shared_memory_slices(generate_miri_reffiles, setup_inputs, algorithm,
+                                            monkeypatch):
+    """
+    Fitting slices of rows in shared memory gives the same results as
+    fitting the full frame at once, including the variances from the
+    average dark current.
+    """
+    # Use several processes, whatever the number of cores of the machine
+    monkeypatch.setattr(pipe_utils.os, 'cpu_count', lambda: 4)
+    override_gain, override_readnoise = generate_miri_reffiles
+    nints, ngroups, nrows, ncols = 2, 6, 9, 4
+    model, gdq, rnModel, pixdq, err, gain = setup_inputs(
+        ngroups=ngroups, readnoise=7, nints=nints, nrows=nrows,
+        ncols=ncols, gain=6, deltatime=3.0)
+
+    rng = np.random.default_rng(12)
+    model.data[:] = np.cumsum(rng.uniform(5, 15, model.data.shape), axis=1)
+    model.groupdq[0, 3, 2, 1] = JUMP
+    model.groupdq[1, 4:, 6, 2] = SAT
+    model.average_dark_current = rng.uniform(0.5, 2, (nrows, ncols)).astype(np.float32)
+
+    # ramp_fit scales the read noise in place, so each call gets its own
+    # reference models
+    def fit(maximum_cores):
+        return RampFitStep.call(
+            model.copy(), override_gain=override_gain.copy(),
+            override_readnoise=override_readnoise.copy(), algorithm=algorithm,
+            maximum_cores=maximum_cores)
+
+    slopes, cube_model = fit('1')
+    slopes_mp, cube_model_mp = fit('3')
+
+    for name in ['data', 'dq', 'var_poisson', 'var_rnoise', 'err']:
+        np.testing.assert_allclose(getattr(slopes_mp, name), getattr(slopes, name), err_msg=name)
+        np.testing.assert_allclose(getattr(cube_model_mp, name), getattr(cube_model, name),
+                                   err_msg=name)
+
+
 def test_subarray_5groups(tmp_path_factory):
     # all pixel values are zero. So slope should be zero
     gainfile = tmp_path_factory.mktemp("data") / "gain.fits"
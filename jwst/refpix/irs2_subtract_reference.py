@@ -1,4 +1,6 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 import numpy as np
 from astropy.stats import sigma_clipped_stats
@@ -11,7 +13,7 @@ log.setLevel(logging.DEBUG)
 
 
 def correct_model(output_model, irs2_model, scipix_n_default=16, refpix_r_default=4,
-                  pad=8, preserve_refpix=False):
+                  pad=8, preserve_refpix=False, nthreads=1):
     """Correct an input NIRSpec IRS2 datamodel using reference pixels.
 
     Parameters
@@ -40,6 +42,9 @@ def correct_model(output_model, irs2_model, scipix_n_default=16, refpix_r_defaul
         This is not used in the science pipeline, but is necessary to
         create new bias files for IRS2 mode.
 
+    nthreads: int
+        Number of integrations to correct concurrently.
+
     Returns
     -------
     output_model: ramp model
@@ -159,7 +164,7 @@ def correct_model(output_model, irs2_model, scipix_n_default=16, refpix_r_defaul
         log.warning("DQ extension not found in reference file")
 
     # Compute and apply the correction to one integration at a time
-    for integ in range(n_int):
+    def correct_integration(integ):
         log.info(f'Working on integration {integ+1} out of {n_int}')
 
         # The input data have a length of 3200 for the last axis (X), while
@@ -174,6 +179,16 @@ def correct_model(output_model, irs2_model, scipix_n_default=16, refpix_r_defaul
         else:
             data[integ, :, :, :] = data0
 
+    nthreads = max(min(nthreads, n_int), 1)
+    if nthreads > 1:
+        log.debug(f'Correcting integrations using {nthreads} threads')
+        with ThreadPoolExecutor(max_workers=nthreads) as executor:
+            # Consume the results so that exceptions are raised here
+            list(executor.map(correct_integration, range(n_int)))
+    else:
+        for integ in range(n_int):
+            correct_integration(integ)
+
     # Convert corrected data back to sky orientation
     if not preserve_refpix:
         temp_data = data[:, :, :, nx - ny:]
@@ -728,21 +743,7 @@ def subtract_reference(data0, alpha, beta, irs2_mask, scipix_n,
     # s[2] = shape[1] = ny, the length of the Y axis
     # s[3] = shape[0] = ngroups, the number of groups (or frames)
 
-    ind_n = np.arange(512, dtype=np.intp)
-    ind_ref = np.arange(512 // scipix_n * refpix_r, dtype=np.intp)
-
-    # hnorm is an array of column indices of normal pixels.
-    # len(hnorm) = 512; len(href) = 128
-    # len(hnorm1) = 512; len(href1) = 128
-    hnorm = ind_n + refpix_r * ((ind_n + scipix_n // 2) // scipix_n)
-
-    # href is an array of column indices of reference pixels.
-    href = ind_ref + scipix_n * (ind_ref // refpix_r) + scipix_n // 2
-
-    hnorm1 = ind_n + (refpix_r + 2) * ((ind_n + scipix_n // 2) // scipix_n)
-    href1 = ind_ref + (scipix_n + 2) * (ind_ref // refpix_r) + scipix_n // 2 + 1
-
-    unpad = np.sort(np.hstack([hnorm1, href1]))
+    hnorm, href, hnorm1, href1, unpad = sector_indices(scipix_n, refpix_r)
 
     # Subtract the average over the ramp for each pixel.
     # b_offset is saved so that it can be added back in at the end.
@@ -842,11 +843,28 @@ def subtract_reference(data0, alpha, beta, irs2_mask, scipix_n,
         temp_hs = temp_hs[:, ::-1]
         hs = temp_hs.flatten()
 
+    # The data are real, so only the non-negative frequencies of their
+    # Fourier transforms are needed.  The real part of the inverse transform
+    # of (data * beta + refout * alpha) only depends on the Hermitian parts
+    # of alpha and beta.
+    shape_d = data0.shape
+    nfft = shape_d[2] * shape_d[3]
+    beta_h = hermitian_part(beta)
+
+    # Set up refout if alpha was provided.  The transform of the reference
+    # output is the same for all sectors.
+    refout0 = None
+    if alpha is not None:
+        # IDL:  refout0 = reform(data0[*,*,*,0], sd[1] * sd[2], sd[3])
+        # IDL:  refout0 = fft(refout0, dim=1, /over)
+        refout0 = data0[0, :, :, :].reshape((shape_d[1], nfft))
+        refout0 = np.fft.rfft(refout0, axis=1)
+        alpha_h = hermitian_part(alpha)
+
     # Construct the reference data: this is done in a big loop over the
     # four "sectors" of data in the image, corresponding to the amp regions.
     # Data from each sector is operated on independently and ultimately
     # the corrections are subtracted from each sector independently.
-    shape_d = data0.shape
     for k in range(1, 5):
         log.debug(f'processing sector {k}')
 
@@ -870,39 +888,25 @@ def subtract_reference(data0, alpha, beta, irs2_mask, scipix_n,
         # s[2] = shape[1] = ny
         # s[3] = shape[0] = ngroups
 
-        # IDL and numpy differ in where they apply the normalization for the
-        # FFT.  This really shouldn't matter.
-        normalization = float(shape_d[2] * shape_d[3])
-
-        # Set up refout if alpha was provided
-        refout0 = None
-        if alpha is not None:
-            # IDL:  refout0 = reform(data0[*,*,*,0], sd[1] * sd[2], sd[3])
-            refout0 = data0[0, :, :, :].reshape((shape_d[1], shape_d[2] * shape_d[3]))
-
-            # IDL:  refout0 = fft(refout0, dim=1, /over)
-            # Divide by the length of the axis to be consistent with IDL.
-            refout0 = np.fft.fft(refout0, axis=1) / normalization
-
         # IDL:  r0 = reform(r0, sd[1] * sd[2], sd[3], 5, /over)
-        r0k = r0k.reshape((shape_d[1], shape_d[2] * shape_d[3]))
-        r0k = r0k.astype(np.complex64)
-        r0k_fft = np.fft.fft(r0k, axis=1) / normalization
+        # The IDL code normalizes the forward transform and undoes the
+        # normalization after the inverse transform; this is left out here.
+        r0k = r0k.reshape((shape_d[1], nfft))
+        r0k_fft = np.fft.rfft(r0k, axis=1)
 
         # Note that where the IDL code uses alpha, we use beta, and vice versa.
         # IDL:  for k=0,3 do oBridge[k]->Execute,
         #           "for i=0, s3-1 do r0[*,i] *= alpha"
-        r0k_fft *= beta[k - 1]
+        r0k_fft *= beta_h[k - 1]
 
         # IDL:  for k=0,3 do oBridge[k]->Execute,
         #           "for i=0, s3-1 do r0[*,i] += beta * refout0[*,i]"
         if alpha is not None:
-            r0k_fft += (alpha[k - 1] * refout0)
-        del refout0
+            r0k_fft += (alpha_h[k - 1] * refout0)
 
         # IDL:  for k=0,3 do oBridge[k]->Execute,
         #           "r0 = fft(r0, 1, dim=1, /overwrite)", /nowait
-        r0k = np.fft.ifft(r0k_fft, axis=1) * normalization
+        r0k = np.fft.irfft(r0k_fft, n=nfft, axis=1)
         del r0k_fft
 
         # sd[1] = shape_d[3]   row (712)
@@ -911,7 +915,6 @@ def subtract_reference(data0, alpha, beta, irs2_mask, scipix_n,
         # sd[4] = shape_d[0]   5
         # IDL:  r0 = reform(r0, sd[1], sd[2], sd[3], 5, /over)
         r0k = r0k.reshape(shape_d[1], shape_d[2], shape_d[3])
-        r0k = r0k.real
         if not preserve_refpix:
             r0k = r0k[:, :, hnorm1]
         else:
@@ -925,6 +928,7 @@ def subtract_reference(data0, alpha, beta, irs2_mask, scipix_n,
         del r0k
 
     # End of loop over 4 sectors
+    del refout0
 
     # Original data0 array has shape (5, ngroups, 2048, 712). Now that
     # correction has been applied, remove the interleaved reference pixels.
@@ -976,38 +980,214 @@ def subtract_reference(data0, alpha, beta, irs2_mask, scipix_n,
     return data0
 
 
+@lru_cache(maxsize=8)
+def sector_indices(scipix_n, refpix_r):
+    """Column indices of normal and reference pixels within one sector.
+
+    The arrays depend only on the readout parameters, so they are computed
+    once and shared (read-only) by all calls.
+
+    Parameters
+    ----------
+    scipix_n: int
+        Number of regular samples before stepping out to collect
+        reference samples.
+
+    refpix_r: int
+        Number of reference samples before stepping back in to collect
+        regular samples.
+
+    Returns
+    -------
+    hnorm, href: ndarray
+        Column indices of normal and reference pixels in the IRS2-format data.
+
+    hnorm1, href1: ndarray
+        Column indices of normal and reference pixels in the time-ordered
+        data, which include the gaps when stepping out to and back in from
+        the reference pixels.
+
+    unpad: ndarray
+        Sorted indices of both normal and reference pixels in the
+        time-ordered data.
+    """
+    ind_n = np.arange(512, dtype=np.intp)
+    ind_ref = np.arange(512 // scipix_n * refpix_r, dtype=np.intp)
+
+    # hnorm is an array of column indices of normal pixels.
+    # len(hnorm) = 512; len(href) = 128
+    # len(hnorm1) = 512; len(href1) = 128
+    hnorm = ind_n + refpix_r * ((ind_n + scipix_n // 2) // scipix_n)
+
+    # href is an array of column indices of reference pixels.
+    href = ind_ref + scipix_n * (ind_ref // refpix_r) + scipix_n // 2
+
+    hnorm1 = ind_n + (refpix_r + 2) * ((ind_n + scipix_n // 2) // scipix_n)
+    href1 = ind_ref + (scipix_n + 2) * (ind_ref // refpix_r) + scipix_n // 2 + 1
+
+    unpad = np.sort(np.hstack([hnorm1, href1]))
+
+    indices = (hnorm, href, hnorm1, href1, unpad)
+    for index in indices:
+        index.flags.writeable = False
+    return indices
+
+
+def hermitian_part(coeffs):
+    """Hermitian part of Fourier coefficients, for non-negative frequencies.
+
+    For real data with transform ``D``, the real part of
+    ``ifft(D * coeffs)`` equals ``irfft(rfft(data) * hermitian_part(coeffs))``.
+
+    Parameters
+    ----------
+    coeffs: ndarray
+        Complex coefficients for all frequencies, along the last axis.
+
+    Returns
+    -------
+    coeffs_h: ndarray
+        ``(coeffs[k] + conj(coeffs[-k])) / 2`` for ``k`` from 0 to
+        ``n // 2``, as complex128.
+    """
+    n = coeffs.shape[-1]
+    coeffs = coeffs.astype(np.complex128)
+    reverse = np.roll(coeffs[..., ::-1], 1, axis=-1)
+    return 0.5 * (coeffs + reverse.conj())[..., :n // 2 + 1]
+
+
+@lru_cache(maxsize=4)
+def make_fft_filter(ny, row, scipix_n, refpix_r, pad):
+    """Make the apodized low-pass filter used for Fourier interpolation.
+
+    Parameters
+    ----------
+    ny: int
+        Number of rows in the time-ordered data.
+
+    row: int
+        Length of one row of time-ordered data, including the new-row
+        overhead.
+
+    scipix_n, refpix_r, pad: int
+        Readout parameters, see `subtract_reference`.
+
+    Returns
+    -------
+    aa: ndarray
+        The filter [1, cos, 0, cos, 1], for the non-negative frequencies
+        of a real transform of length ``ny * row``.  The array is shared
+        by all calls, so it is read-only.
+    """
+    # Parameters for the filter to be used.
+    # length of apodization cosine filter
+    elen = 110000 // (scipix_n + refpix_r + 2)
+
+    # max unfiltered frequency
+    blen = (512 + 512 // scipix_n * (refpix_r + 2) + pad) // \
+           (scipix_n + refpix_r + 2) * ny // 2 - elen // 2
+
+    # Construct the filter [1, cos, 0, cos, 1].
+    temp_a1 = (np.cos(np.arange(elen, dtype=np.float64) *
+                      np.pi / float(elen)) + 1.) / 2.
+
+    # elen = 5000
+    # blen = 30268
+    # row * ny // 2 - 2 * blen - 2 * elen = 658552
+    # len(temp_a2) = 729088
+    temp_a2 = np.concatenate((np.ones(blen, dtype=np.float64),
+                              temp_a1.copy(),
+                              np.zeros(row * ny // 2 - 2 * blen - 2 * elen,
+                                       dtype=np.float64),
+                              temp_a1[::-1].copy(),
+                              np.ones(blen, dtype=np.float64)))
+
+    # The full filter is symmetric, aa[n - k] == aa[k], with the second
+    # half given by the reversed, rolled first half; only the first half
+    # plus the Nyquist frequency are needed.
+    aa = np.append(temp_a2, temp_a2[0])
+    aa.flags.writeable = False
+    return aa
+
+
 def fft_interp_norm(dd0, mask0, row, hnorm, hnorm1, ny, ngroups, aa, n_iter_norm):
+    """Replace pixels outside a mask by Fourier filtering/interpolation.
+
+    All groups are filtered together, with real transforms along the
+    time-ordered data of each group.
+
+    Parameters
+    ----------
+    dd0: ndarray
+        Time-ordered data with shape (ngroups, ny, row), modified in place.
+
+    mask0: ndarray
+        Non-zero for normal pixels to be kept, shape (ny, nx // 4).
+
+    row, ny, ngroups: int
+        Dimensions of the time-ordered data.
 
+    hnorm, hnorm1: ndarray
+        Column indices of normal pixels, see `sector_indices`.
+
+    aa: ndarray
+        Filter to apply, from `make_fft_filter`.  The filter may also be
+        given for all frequencies, in which case only the first half is used.
+
+    n_iter_norm: int
+        Number of filter iterations.
+    """
+    nfft = ny * row
+    aa = aa[:nfft // 2 + 1]
     mm = np.zeros((ny, row), dtype=np.int8)
     mm[:, hnorm1] = mask0[:, hnorm]
-    hm = (mm != 0)                      # 2-D boolean mask
-    for j in range(ngroups):
-        dd = dd0[j, :, :].copy()        # make a copy, not a view
-        p = dd.flatten()
-        for it in range(n_iter_norm):
-            pp = np.fft.fft(p)
-            pp *= aa
-            p[:] = np.fft.ifft(pp).real
-            p[hm.ravel()] = dd[hm]
-        dd0[j, :, :] = p.reshape((ny, row))
+    hm = (mm != 0).ravel()              # 1-D boolean mask
+    p = dd0.reshape((ngroups, nfft))
+    kept = p[:, hm]
+    for it in range(n_iter_norm):
+        pp = np.fft.rfft(p, axis=1)
+        pp *= aa
+        p[:] = np.fft.irfft(pp, n=nfft, axis=1)
+        p[:, hm] = kept
+    dd0[:] = p.reshape((ngroups, ny, row))
 
 
 def ols_line(x, y):
-    """Fit a straight line using ordinary least squares."""
+    """Fit a straight line using ordinary least squares.
 
-    xf = x.ravel()
-    yf = y.ravel()
-    if len(xf) < 1 or len(yf) < 1:
-        return 0., 0.
-
-    groups = float(len(xf))
-    mean_x = xf.mean()
-    mean_y = yf.mean()
-    sum_x2 = (xf**2).sum()
-    sum_xy = (xf * yf).sum()
+    Parameters
+    ----------
+    x, y: ndarray
+        Independent and dependent values.  If `y` is 2-D, a line is fit
+        to each row of `y`; `x` must then broadcast to the shape of `y`.
 
-    slope = (sum_xy - groups * mean_x * mean_y) / \
-            (sum_x2 - groups * mean_x**2)
+    Returns
+    -------
+    intercept, slope: float or ndarray
+        The fit coefficients, one per row if `y` is 2-D.
+    """
+    if y.ndim < 2:
+        x = x.ravel()
+        y = y.ravel()
+        if len(x) < 1 or len(y) < 1:
+            return 0., 0.
+    else:
+        # Row sums of a C-ordered array match the sums of each row on its own
+        y = np.ascontiguousarray(y)
+        x = np.broadcast_to(x, y.shape)
+        if y.shape[-1] < 1:
+            return np.zeros(y.shape[0]), np.zeros(y.shape[0])
+
+    npts = float(y.shape[-1])
+    mean_x = x.mean(axis=-1)
+    mean_y = y.mean(axis=-1)
+    sum_x2 = (x**2).sum(axis=-1)
+    sum_xy = (x * y).sum(axis=-1)
+
+    # The sums are accumulated in the data type of the input; the
+    # coefficients are computed in double precision.
+    slope = (sum_xy - npts * mean_x.astype(np.float64) * mean_y) / \
+            (sum_x2 - npts * (mean_x**2).astype(np.float64))
     intercept = mean_y - slope * mean_x
 
     return intercept, slope
@@ -1022,23 +1202,30 @@ def remove_slopes(data0, ngroups, ny, row):
     time_arr -= time_arr.mean(dtype=np.float64)
     row4plus4 = np.array([0, 1, 2, 3, 2044, 2045, 2046, 2047], dtype=np.intp)
 
+    # Fit the top and bottom rows of all sectors and groups, skipping
+    # zero values.  Frames with the same zero values are fit together.
+    edges = data0[:, :, row4plus4, :].reshape((5 * ngroups, -1))
+    edge_times = time_arr[row4plus4, :].ravel()
+    nonzero = (edges != 0.)
+    intercepts = np.zeros(5 * ngroups, dtype=np.float32)
+    slopes = np.zeros(5 * ngroups, dtype=np.float32)
+    patterns, frame_pattern = np.unique(nonzero, axis=0, return_inverse=True)
+    for i, mask in enumerate(patterns):
+        frames = np.flatnonzero(frame_pattern.ravel() == i)
+        (intercept, slope) = ols_line(edge_times[mask], edges[frames][:, mask])
+        intercepts[frames] = intercept
+        slopes[frames] = slope
+
     # For ab_3, it should be OK to use the same index order as the IDL code.
     ab_3 = np.zeros((2, ngroups, 5), dtype=np.float32)
-    for i in range(5):
-        for k in range(ngroups):
-            # mask is 2-D, since both row4plus4 and : have more than one element.
-            mask = (data0[i, k, row4plus4, :] != 0.)
-            (intercept, slope) = ols_line(time_arr[row4plus4, :][mask],
-                                          data0[i, k, row4plus4, :][mask])
-            ab_3[0, k, i] = intercept
-            ab_3[1, k, i] = slope
+    ab_3[0] = intercepts.reshape((5, ngroups)).T
+    ab_3[1] = slopes.reshape((5, ngroups)).T
 
     for i in range(5):
-        for k in range(ngroups):
-            # weight is 0 where data0 is 0, else 1.
-            weight = (data0[i, k, :, :] != 0.).astype(np.int8)
-            data0[i, k, :, :] -= (ab_3[0, k, i] +
-                                  time_arr * ab_3[1, k, i]) * weight
+        # weight is 0 where data0 is 0, else 1.
+        weight = (data0[i] != 0.).astype(np.int8)
+        data0[i] -= (ab_3[0, :, i, np.newaxis, np.newaxis] +
+                     time_arr * ab_3[1, :, i, np.newaxis, np.newaxis]) * weight
 
 
 def replace_bad_pixels(data0, ngroups, ny, row):
@@ -1050,18 +1237,17 @@ def replace_bad_pixels(data0, ngroups, ny, row):
     w_ind = np.arange(1, 32, dtype=np.float32) / 32.
     w = np.sin(w_ind * np.pi)
     kk = 0
-    for jj in range(ngroups):
-        dat = data0[kk, jj, :, :].reshape(row * ny)
-        mask = (dat != 0.).astype(np.float32)
-        numerator = convolve1d(dat, w, mode='wrap')
-        denominator = convolve1d(mask, w, mode='wrap')
-        div_zero = (denominator == 0.)          # check for divide by zero
-        numerator = np.where(div_zero, 0., numerator)
-        denominator = np.where(div_zero, 1., denominator)
-        dat = numerator / denominator
-        dat = dat.reshape(ny, row)
-        mask = mask.reshape(ny, row)
-        data0[kk, jj, :, :] += dat * (1. - mask)
+    dat = data0[kk].reshape((ngroups, row * ny))
+    mask = (dat != 0.).astype(np.float32)
+    numerator = convolve1d(dat, w, axis=1, mode='wrap')
+    denominator = convolve1d(mask, w, axis=1, mode='wrap')
+    div_zero = (denominator == 0.)          # check for divide by zero
+    numerator = np.where(div_zero, 0., numerator)
+    denominator = np.where(div_zero, 1., denominator)
+    dat = numerator / denominator
+    dat = dat.reshape((ngroups, ny, row))
+    mask = mask.reshape((ngroups, ny, row))
+    data0[kk] += dat * (1. - mask)
 
 
 def fill_bad_regions(data0, ngroups, ny, nx, row, scipix_n, refpix_r, pad, hnorm, hnorm1):
@@ -1071,32 +1257,8 @@ def fill_bad_regions(data0, ngroups, ny, nx, row, scipix_n, refpix_r, pad, hnorm
     # (b) gaps and normal data in the time-ordered reference data
     # This "improves" upon the cosine interpolation performed above.
 
-    # Parameters for the filter to be used.
-    # length of apodization cosine filter
-    elen = 110000 // (scipix_n + refpix_r + 2)
-
-    # max unfiltered frequency
-    blen = (512 + 512 // scipix_n * (refpix_r + 2) + pad) // \
-           (scipix_n + refpix_r + 2) * ny // 2 - elen // 2
-
-    # Construct the filter [1, cos, 0, cos, 1].
-    temp_a1 = (np.cos(np.arange(elen, dtype=np.float64) *
-                      np.pi / float(elen)) + 1.) / 2.
-
-    # elen = 5000
-    # blen = 30268
-    # row * ny // 2 - 2 * blen - 2 * elen = 658552
-    # len(temp_a2) = 729088
-    temp_a2 = np.concatenate((np.ones(blen, dtype=np.float64),
-                              temp_a1.copy(),
-                              np.zeros(row * ny // 2 - 2 * blen - 2 * elen,
-                                       dtype=np.float64),
-                              temp_a1[::-1].copy(),
-                              np.ones(blen, dtype=np.float64)))
-
-    roll_a2 = np.roll(temp_a2, -1)
-    aa = np.concatenate((temp_a2, roll_a2[::-1]))
-    del temp_a1, temp_a2, roll_a2
+    # Filter to be used, for real transforms of the time-ordered data.
+    aa = make_fft_filter(ny, row, scipix_n, refpix_r, pad)
 
     # IDL:  aa = a # replicate(1, s[3]) ; for application to the data
     # In IDL, aa is a 2-D array with one column of `a` for each group.  In
@@ -1109,6 +1271,3 @@ def fill_bad_regions(data0, ngroups, ny, nx, row, scipix_n, refpix_r, pad, hnorm
     fft_interp_norm(dd0, np.ones((ny, nx // 4), dtype=np.int64),
                     row, hnorm, hnorm1,
                     ny, ngroups, aa, n_iter_norm)
-
-    data0[0, :, :, :] = dd0.copy()
-    del aa, dd0
@@ -42,6 +42,7 @@
 #  For MIRI subarray exposures, omit the refpix step.
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 
 import numpy as np
@@ -50,6 +51,7 @@ from scipy import stats
 from stdatamodels.jwst.datamodels import dqflags
 
 from ..lib import pipe_utils, reffile_utils
+from ..lib.dtype_policy import working_dtype
 from .irs2_subtract_reference import make_irs2_mask
 from .optimized_convolution import make_kernels, apply_conv_kernel
 
@@ -105,6 +107,11 @@ IRS2_reference_sections = {'0': {'top': (2044, 2048, 0, 640),
 
 NRS_edgeless_subarrays = ['SUB512', 'SUB512S', 'SUB32']
 
+# Maximum number of groups corrected together for NIR full frame data.
+# This bounds the memory used by the detector-oriented working copy.
+
+NIR_GROUP_BATCH_SIZE = 10
+
 #
 # MIR Reference section dictionaries are zero indexed and specify the values
 # to be used in the following slice:
@@ -283,6 +290,73 @@ class Dataset:
 
         return mean
 
+    def sigma_clip_groups(self, data, dq, low=3.0, high=3.0):
+        """Calculate the clipped mean for each group in a stack of groups
+
+        This gives the same values as calling `sigma_clip` on each group in
+        turn.  The clipping iterations are done with array operations on all
+        groups that have the same number of remaining pixels.
+
+        Parameters:
+        -----------
+
+        data: NDArray
+            Array of pixels to be sigma-clipped, with the group index as
+            the first axis
+
+        dq: NDArray
+            DQ array for a single group of data
+
+        low: float
+            lower clipping boundary, in standard deviations from the mean (default=3.0)
+
+        high: float
+            upper clipping boundary, in standard deviations from the mean (default=3.0)
+
+        Returns:
+        --------
+
+        means: list
+            clipped mean of data for each group, or None for all groups if
+            there are no good pixels
+
+        """
+        ngroups = data.shape[0]
+        good = np.bitwise_and(dq, dqflags.pixel['DO_NOT_USE']) == 0
+        if not good.any():
+            return [None] * ngroups
+        values = data[:, good]
+        means = [None] * ngroups
+        #
+        # Groups with zero variance are handled by the single group routine
+        zero_std = np.std(values, axis=1, dtype=np.float64) == 0.0
+        for group in np.flatnonzero(zero_std):
+            means[group] = self.sigma_clip(data[group], dq, low, high)
+        #
+        # Clip all groups with the same number of remaining pixels together,
+        # until no more pixels are rejected
+        keep = np.ones(values.shape, dtype=bool)
+        active = np.flatnonzero(~zero_std)
+        while active.size > 0:
+            sizes = keep[active].sum(axis=1)
+            remaining = []
+            for size in np.unique(sizes):
+                rows = active[sizes == size]
+                clipped = values[rows][keep[rows]].reshape(rows.size, size)
+                c_std = clipped.std(axis=1)
+                c_mean = clipped.mean(axis=1)
+                critlower = c_mean - c_std * low
+                critupper = c_mean + c_std * high
+                keep[rows] &= ((values[rows] >= critlower[:, np.newaxis]) &
+                               (values[rows] <= critupper[:, np.newaxis]))
+                converged = keep[rows].sum(axis=1) == size
+                for group, mean in zip(rows[converged], c_mean[converged]):
+                    means[group] = mean
+                remaining.append(rows[~converged])
+            active = np.concatenate(remaining)
+
+        return means
+
     def get_pixeldq(self):
         """Get the properly sized version of the pixeldq array from the
         input model.
@@ -538,6 +612,103 @@ class NIRDataset(Dataset):
             self.reference_sections = NIR_reference_sections
             self.irs2_odd_mask = None
 
+        # Number of integrations to correct concurrently
+        self.nthreads = 1
+
+        # Floating point precision of the working group buffers
+        self.dtype_policy = 'default'
+
+    def DMS_to_detector_array(self, data):
+        """Transform an array from DMS to detector orientation.
+
+        Parameters
+        ----------
+        data : NDArray
+            Array with the image axes as the last two axes
+
+        Returns
+        -------
+        data : NDArray
+            View of the input in detector orientation
+        """
+        return data
+
+    def detector_to_DMS_array(self, data):
+        """Transform an array from detector to DMS orientation.
+
+        Parameters
+        ----------
+        data : NDArray
+            Array with the image axes as the last two axes
+
+        Returns
+        -------
+        data : NDArray
+            View of the input in DMS orientation
+        """
+        return data
+
+    def DMS_to_detector(self, integration, group):
+        self.get_group(integration, group)
+        self.group = self.DMS_to_detector_array(self.group)
+
+    def detector_to_DMS(self, integration, group):
+        self.group = self.detector_to_DMS_array(self.group)
+        self.restore_group(integration, group)
+
+    def DMS_to_detector_dq(self):
+        # pixeldq only has to be done once
+        self.pixeldq = self.DMS_to_detector_array(self.pixeldq)
+
+    def get_group_block(self, integration, start, stop, dtype):
+        """Get a properly sized copy of a range of groups, in detector orientation
+
+        Parameters
+        ----------
+        integration : int
+            Index of the integration from which to extract the groups
+
+        start, stop : int
+            Range of group indices to extract
+
+        dtype : numpy dtype
+            Data type of the working copy
+
+        Returns
+        -------
+        block : NDArray
+            3-D array of the groups in detector coordinates
+        """
+        block = np.zeros((stop - start,) + self.full_shape, dtype=dtype)
+        if self.is_subarray:
+            block[:, self.rowstart:self.rowstop, self.colstart:self.colstop] = \
+                self.input_model.data[integration, start:stop]
+        else:
+            block[:] = self.input_model.data[integration, start:stop]
+        return self.DMS_to_detector_array(block)
+
+    def restore_group_block(self, integration, start, block):
+        """Replace input model data with a processed range of groups
+
+        Parameters
+        ----------
+        integration : int
+            Index of the integration to update
+
+        start : int
+            Index of the first group to update
+
+        block : NDArray
+            3-D array of processed groups in detector coordinates
+        """
+        block = self.detector_to_DMS_array(block)
+        stop = start + block.shape[0]
+        if self.is_subarray:
+            self.input_model.data[integration, start:stop] = \
+                block[:, self.rowstart:self.rowstop, self.colstart:self.colstop]
+        else:
+            self.input_model.data[integration, start:stop] = block
+
     def make_irs2_odd_mask(self, input_model, scipix_n_default=16, refpix_r_default=4):
         """
         Make an odd pixel mask for IRS2 mode.
@@ -651,7 +822,8 @@ class NIRDataset(Dataset):
         Parameters
         ----------
         group : NDArray
-            The group that is being processed
+            The group that is being processed, or a stack of groups
+            with the group index as the first axis
 
         amplifier: string ['A'|'B'|'C'|'D']
             String corresponding to the amplifier being processed
@@ -675,10 +847,10 @@ class NIRDataset(Dataset):
         # handle interleaved pixels if needed
         if self.is_irs2:
             odd_mask = self.irs2_odd_mask[colstart:colstop]
-            oddref = group[rowstart:rowstop, colstart:colstop][:, odd_mask]
+            oddref = group[..., rowstart:rowstop, colstart:colstop][..., odd_mask]
             odddq = self.pixeldq[rowstart:rowstop, colstart:colstop][:, odd_mask]
         else:
-            oddref = group[rowstart:rowstop, colstart:colstop:2]
+            oddref = group[..., rowstart:rowstop, colstart:colstop:2]
             odddq = self.pixeldq[rowstart:rowstop, colstart:colstop:2]
 
         return oddref, odddq
@@ -697,7 +869,8 @@ class NIRDataset(Dataset):
         ----------
 
         group : NDArray
-            The group that is being processed
+            The group that is being processed, or a stack of groups
+            with the group index as the first axis
 
         amplifier: string ['A'|'B'|'C'|'D']
             String corresponding to the amplifier being processed
@@ -720,12 +893,12 @@ class NIRDataset(Dataset):
         # handle interleaved pixels if needed
         if self.is_irs2:
             even_mask = ~self.irs2_odd_mask[colstart:colstop]
-            evenref = group[rowstart:rowstop, colstart:colstop][:, even_mask]
+            evenref = group[..., rowstart:rowstop, colstart:colstop][..., even_mask]
             evendq = self.pixeldq[rowstart:rowstop, colstart:colstop][:, even_mask]
         else:
             # Even columns start on the second column
             colstart = colstart + 1
-            evenref = group[rowstart:rowstop, colstart:colstop:2]
+            evenref = group[..., rowstart:rowstop, colstart:colstop:2]
             evendq = self.pixeldq[rowstart:rowstop, colstart:colstop:2]
 
         return evenref, evendq
@@ -872,6 +1045,54 @@ class NIRDataset(Dataset):
                     refpix[amplifier][top_bottom] = refvalues
         return refpix
 
+    def get_refvalues_groups(self, groups):
+        """Get the reference pixel values for each group in a stack of groups
+
+        The clipped means for each amplifier, odd and even columns and
+        top and bottom reference pixels are computed for all groups at once.
+
+        Parameters:
+        -----------
+
+        groups: NDArray
+            Groups being processed, with the group index as the first axis
+
+        Returns:
+        --------
+
+        refpix: list
+            List with one dictionary per group, in the format returned by
+            `get_refvalues`
+
+        """
+        ngroups = groups.shape[0]
+        refpix = [{} for _ in range(ngroups)]
+        for amplifier in self.amplifiers:
+            for group in range(ngroups):
+                refpix[group][amplifier] = {'odd': {}, 'even': {}}
+            for top_bottom in ('top', 'bottom'):
+                if self.odd_even_columns:
+                    ref, dq = self.collect_odd_refpixels(groups, amplifier, top_bottom)
+                    odd = self.sigma_clip_groups(ref, dq)
+                    ref, dq = self.collect_even_refpixels(groups, amplifier, top_bottom)
+                    even = self.sigma_clip_groups(ref, dq)
+                    if odd[0] is None or even[0] is None:
+                        self.bad_reference_pixels = True
+                    for group in range(ngroups):
+                        refpix[group][amplifier]['odd'][top_bottom] = odd[group]
+                        refpix[group][amplifier]['even'][top_bottom] = even[group]
+                else:
+                    rowstart, rowstop, colstart, colstop = \
+                        self.reference_sections[amplifier][top_bottom]
+                    ref = groups[:, rowstart:rowstop, colstart:colstop]
+                    dq = self.pixeldq[rowstart:rowstop, colstart:colstop]
+                    means = self.sigma_clip_groups(ref, dq)
+                    if means[0] is None:
+                        self.bad_reference_pixels = True
+                    for group in range(ngroups):
+                        refpix[group][amplifier][top_bottom] = means[group]
+        return refpix
+
     def do_top_bottom_correction(self, group, refvalues):
         """Do the top/bottom correction
 
@@ -973,7 +1194,8 @@ class NIRDataset(Dataset):
         -----------
 
         data: NDArray
-            input data array
+            input data array; the rows are the second-to-last axis, so
+            a stack of 2-d arrays can be extended at once
 
         smoothing_length: integer (should be odd, will be converted if not)
             smoothing length.  Amount by which the input array is extended is
@@ -989,16 +1211,16 @@ class NIRDataset(Dataset):
 
         """
 
-        nrows, ncols = data.shape
+        nrows, ncols = data.shape[-2:]
         if smoothing_length % 2 == 0:
             log.info("Smoothing length must be odd, adding 1")
             smoothing_length = smoothing_length + 1
         newheight = nrows + smoothing_length - 1
-        reflected = np.zeros((newheight, ncols), dtype=data.dtype)
+        reflected = np.zeros(data.shape[:-2] + (newheight, ncols), dtype=data.dtype)
         bufsize = smoothing_length // 2
-        reflected[bufsize:bufsize + nrows] = data[:]
-        reflected[:bufsize] = data[bufsize:0:-1]
-        reflected[-(bufsize):] = data[-2:-(bufsize + 2):-1]
+        reflected[..., bufsize:bufsize + nrows, :] = data
+        reflected[..., :bufsize, :] = data[..., bufsize:0:-1, :]
+        reflected[..., -(bufsize):, :] = data[..., -2:-(bufsize + 2):-1, :]
         return reflected
 
     def median_filter(self, data, dq, smoothing_length):
@@ -1040,6 +1262,58 @@ class NIRDataset(Dataset):
                 result[i] = np.median(window)
         return result
 
+    def median_filter_groups(self, data, dq, smoothing_length):
+        """Median filter a stack of groups, as `median_filter` does for one group.
+
+        All windows of all groups are sorted at once; the median is then
+        picked out according to the number of good pixels in each window,
+        which is the same for all groups.
+
+        Parameters:
+        -----------
+
+        data: NDArray
+            input 3-d science array, with the group index as the first axis
+
+        dq: NDArray
+            input 2-d dq array
+
+        smoothing_length: integer (should be odd)
+            height of box within which the median value is calculated
+
+        Returns:
+        --------
+
+        result: NDArray
+            2-d array of the median filtered data for each group
+        """
+        ngroups, nrows, ncols = data.shape
+        augmented_data = self.create_reflected(data, smoothing_length)
+        augmented_dq = self.create_reflected(dq, smoothing_length)
+        windows = np.lib.stride_tricks.sliding_window_view(
+            augmented_data, smoothing_length, axis=1)[:, :nrows]
+        windows = windows.reshape(ngroups, nrows, ncols * smoothing_length)
+        dqwindows = np.lib.stride_tricks.sliding_window_view(
+            augmented_dq, smoothing_length, axis=0)[:nrows]
+        dqwindows = dqwindows.reshape(nrows, ncols * smoothing_length)
+        good = np.bitwise_and(dqwindows, dqflags.pixel['DO_NOT_USE']) == 0
+        ngood = good.sum(axis=1)
+        #
+        # Sort bad pixels to the end of each window
+        windows = np.where(good, windows, np.nan)
+        has_nan = np.isnan(windows).sum(axis=2) > ncols * smoothing_length - ngood
+        windows.sort(axis=2)
+        lower = np.take_along_axis(
+            windows, (np.maximum(ngood - 1, 0) // 2)[np.newaxis, :, np.newaxis], axis=2)[..., 0]
+        upper = np.take_along_axis(
+            windows, (ngood // 2)[np.newaxis, :, np.newaxis], axis=2)[..., 0]
+        median = np.where(ngood % 2 == 1, lower, (lower + upper) / 2)
+        result = median.astype(np.float64)
+        #
+        # Windows with no good pixels, or with NaNs in good pixels, are NaN
+        result[has_nan | (ngood == 0)] = np.nan
+        return result
+
     def calculate_side_ref_signal(self, group, colstart, colstop):
         """Calculate the reference pixel signal from the side reference pixels
         by running a box up the side reference pixels and calculating the running
@@ -1195,6 +1469,57 @@ class NIRDataset(Dataset):
             corrected_group = self.apply_side_correction(group, sidegroup)
         return corrected_group
 
+    def get_conv_kernels(self):
+        """Make the optimized convolution kernels, if they are to be used
+
+        Returns:
+        --------
+
+        kernels: list or None
+            Left and right kernels, or None if the running median is to be
+            used for the side reference pixel correction
+
+        """
+        if self.refpix_algorithm != 'sirs' or self.sirs_kernel_model is None:
+            return None
+        kernels = make_kernels(self.sirs_kernel_model,
+                               self.input_model.meta.instrument.detector,
+                               self.gaussmooth,
+                               self.halfwidth)
+        if kernels is None:
+            log.info('The REFPIX step will use the running median')
+        return kernels
+
+    def do_side_correction_groups(self, groups, kernels=None):
+        """Do the side reference pixel correction for a stack of groups
+
+        Parameters:
+        -----------
+
+        groups: NDArray
+            Groups being processed, with the group index as the first axis.
+            The groups are corrected in place.
+
+        kernels: list or None
+            Optimized convolution kernels from `get_conv_kernels`; if None,
+            the running median is used
+
+        """
+        if kernels is not None:
+            for group in range(groups.shape[0]):
+                groups[group] = apply_conv_kernel(groups[group], kernels,
+                                                  sigreject=self.sigreject)
+            return
+
+        smoothing_length = self.side_smoothing_length
+        left = self.median_filter_groups(groups[:, :, 0:4],
+                                         self.pixeldq[:, 0:4], smoothing_length)
+        right = self.median_filter_groups(groups[:, :, 2044:2048],
+                                          self.pixeldq[:, 2044:2048], smoothing_length)
+        for group in range(groups.shape[0]):
+            combined = self.combine_with_NaNs(left[group], right[group])
+            groups[group] = groups[group] - self.side_gain * combined[:, np.newaxis]
+
     def do_corrections(self):
         if self.is_subarray:
             if self.noutputs == 4:
@@ -1213,27 +1538,82 @@ class NIRDataset(Dataset):
         #  First transform pixeldq array to detector coordinates
         self.DMS_to_detector_dq()
 
-        for integration in range(self.nints):
-            for group in range(self.ngroups):
-                #
-                # Get the reference values from the top and bottom reference
-                # pixels
-                #
-                self.DMS_to_detector(integration, group)
-                thisgroup = self.group
-                refvalues = self.get_refvalues(thisgroup)
-                self.do_top_bottom_correction(thisgroup, refvalues)
-                if self.use_side_ref_pixels:
-                    corrected_group = self.do_side_correction(thisgroup)
-                    self.group = corrected_group
-                else:
-                    self.group = thisgroup
-                #
-                #  Now transform back from detector to DMS coordinates.
-                self.detector_to_DMS(integration, group)
+        kernels = None
+        if self.use_side_ref_pixels:
+            kernels = self.get_conv_kernels()
+
+        #
+        # The groups are worked on in the data type of the group buffer left
+        # by any previous correction.  The side correction promotes the
+        # buffer to float64, so all groups after the first are worked on in
+        # float64, unless the float32 dtype policy is in effect.
+        if self.group is not None:
+            first_dtype = self.group.dtype
+        else:
+            first_dtype = self.input_model.data.dtype
+        if self.use_side_ref_pixels:
+            dtype = working_dtype(self.dtype_policy, first_dtype)
+        else:
+            dtype = first_dtype
+
+        def correct_integration(integration):
+            start = 0
+            if integration == 0 and first_dtype != dtype:
+                self.correct_groups(integration, 0, 1, first_dtype, kernels)
+                start = 1
+            for batch_start in range(start, self.ngroups, NIR_GROUP_BATCH_SIZE):
+                batch_stop = min(batch_start + NIR_GROUP_BATCH_SIZE, self.ngroups)
+                self.correct_groups(integration, batch_start, batch_stop, dtype, kernels)
+
+        nthreads = min(self.nthreads, self.nints)
+        if nthreads > 1:
+            log.debug(f'Correcting integrations using {nthreads} threads')
+            with ThreadPoolExecutor(max_workers=nthreads) as executor:
+                # Consume the results so that exceptions are raised here
+                list(executor.map(correct_integration, range(self.nints)))
+        else:
+            for integration in range(self.nints):
+                correct_integration(integration)
+
+        #
+        # Leave a group buffer of the working data type for any later
+        # correction, e.g. of the zero frame
+        self.group = np.zeros(self.full_shape, dtype=dtype)
         log.setLevel(logging.INFO)
         return
 
+    def correct_groups(self, integration, start, stop, dtype, kernels=None):
+        """Correct a range of groups in an integration
+
+        Parameters:
+        -----------
+
+        integration: int
+            Index of the integration
+
+        start, stop: int
+            Range of group indices to correct
+
+        dtype: numpy dtype
+            Data type in which to do the correction
+
+        kernels: list or None
+            Optimized convolution kernels for the side correction
+
+        """
+        groups = self.get_group_block(integration, start, stop, dtype)
+        #
+        # Get the reference values from the top and bottom reference
+        # pixels
+        refvalues = self.get_refvalues_groups(groups)
+        for group in range(groups.shape[0]):
+            self.do_top_bottom_correction(groups[group], refvalues[group])
+        if self.use_side_ref_pixels:
+            self.do_side_correction_groups(groups, kernels)
+        #
+        #  Now transform back from detector to DMS coordinates.
+        self.restore_group_block(integration, start, groups)
+
     def do_subarray_corrections(self):
         """Do corrections for subarray.  Reference pixel value calculated
         separately for odd and even columns if odd_even_columns is True,
@@ -1300,303 +1680,212 @@ class NIRDataset(Dataset):
 class NRS1Dataset(NIRDataset):
     """For NRS1 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NRS1 is just flipped over the line X=Y
-        self.get_group(integration, group)
-        self.group = np.swapaxes(self.group, 0, 1)
+        return np.swapaxes(data, -2, -1)
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = np.swapaxes(self.group, 0, 1)
-        self.restore_group(integration, group)
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = np.swapaxes(self.pixeldq, 0, 1)
+        return np.swapaxes(data, -2, -1)
 
 
 class NRS2Dataset(NIRDataset):
     """NRS2 Data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NRS2 is flipped over the line Y=X, then rotated 180 degrees
-        self.get_group(integration, group)
-        self.group = np.swapaxes(self.group, 0, 1)[::-1, ::-1]
+        return np.swapaxes(data, -2, -1)[..., ::-1, ::-1]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = np.swapaxes(self.pixeldq, 0, 1)[::-1, ::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # The inverse is to rotate 180 degrees, then flip over the line Y=X
-        self.group = np.swapaxes(self.group[::-1, ::-1], 0, 1)
-        self.restore_group(integration, group)
+        return np.swapaxes(data[..., ::-1, ::-1], -2, -1)
 
 
 class NRCA1Dataset(NIRDataset):
     """For NRCA1 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NRCA1 is just flipped in X
-        self.get_group(integration, group)
-        self.group = self.group[:, ::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[:, ::-1]
+        return data[..., ::-1]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = self.group[:, ::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1]
 
 
 class NRCA2Dataset(NIRDataset):
     """For NRCA2 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NRCA2 is just flipped in Y
-        self.get_group(integration, group)
-        self.group = self.group[::-1]
+        return data[..., ::-1, :]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = self.group[::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1, :]
 
 
 class NRCA3Dataset(NIRDataset):
     """For NRCA3 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NRCA3 is just flipped in X
-        self.get_group(integration, group)
-        self.group = self.group[:, ::-1]
+        return data[..., ::-1]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[:, ::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = self.group[:, ::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1]
 
 
 class NRCA4Dataset(NIRDataset):
     """For NRCA4 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NRCA4 is just flipped in Y
-        self.get_group(integration, group)
-        self.group = self.group[::-1]
+        return data[..., ::-1, :]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = self.group[::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1, :]
 
 
 class NRCALONGDataset(NIRDataset):
     """For NRCALONG data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NRCALONG is just flipped in X
-        self.get_group(integration, group)
-        self.group = self.group[:, ::-1]
+        return data[..., ::-1]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[:, ::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = self.group[:, ::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1]
 
 
 class NRCB1Dataset(NIRDataset):
     """For NRCB1 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NRCB1 is just flipped in Y
-        self.get_group(integration, group)
-        self.group = self.group[::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[::-1]
+        return data[..., ::-1, :]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = self.group[::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1, :]
 
 
 class NRCB2Dataset(NIRDataset):
     """For NRCB2 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NRCB2 is just flipped in X
-        self.get_group(integration, group)
-        self.group = self.group[:, ::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[:, ::-1]
+        return data[..., ::-1]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = self.group[:, ::-1]
-        self.restore_group(integration, group)
-        # self.pixeldq = self.pixeldq[:, ::-1]
+        return data[..., ::-1]
 
 
 class NRCB3Dataset(NIRDataset):
     """For NRCB3 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NRCB3 is just flipped in Y
-        self.get_group(integration, group)
-        self.group = self.group[::-1]
+        return data[..., ::-1, :]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = self.group[::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1, :]
 
 
 class NRCB4Dataset(NIRDataset):
     """For NRCB4 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NRCB4 is just flipped in X
-        self.get_group(integration, group)
-        self.group = self.group[:, ::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[:, ::-1]
+        return data[..., ::-1]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = self.group[:, ::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1]
 
 
 class NRCBLONGDataset(NIRDataset):
     """For NRCBLONG data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NRCBLONG is just flipped in Y
-        self.get_group(integration, group)
-        self.group = self.group[::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[::-1]
+        return data[..., ::-1, :]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = self.group[::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1, :]
 
 
 class NIRISSDataset(NIRDataset):
     """For NIRISS data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # NIRISS has a 180 degree rotation followed by a flip across the line
         # X=Y
-        self.get_group(integration, group)
-        self.group = np.swapaxes(self.group[::-1, ::-1], 0, 1)
+        return np.swapaxes(data[..., ::-1, ::-1], -2, -1)
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = np.swapaxes(self.pixeldq[::-1, ::-1], 0, 1)
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip and rotate back
-        self.group = np.swapaxes(self.group, 0, 1)[::-1, ::-1]
-        self.restore_group(integration, group)
+        return np.swapaxes(data, -2, -1)[..., ::-1, ::-1]
 
 
 class GUIDER1Dataset(NIRDataset):
     """For GUIDER1 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # GUIDER1 is flipped in X and Y
-        self.get_group(integration, group)
-        self.group = self.group[::-1, ::-1]
+        return data[..., ::-1, ::-1]
 
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[::-1, ::-1]
-
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = self.group[::-1, ::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1, ::-1]
 
 
 class GUIDER2Dataset(NIRDataset):
     """For GUIDER2 data"""
 
-    def DMS_to_detector(self, integration, group):
+    def DMS_to_detector_array(self, data):
         #
         # GUIDER2 is just flipped in X
-        self.get_group(integration, group)
-        self.group = self.group[:, ::-1]
-
-    def DMS_to_detector_dq(self):
-        # pixeldq only has to be done once
-        self.pixeldq = self.pixeldq[:, ::-1]
+        return data[..., ::-1]
 
-    def detector_to_DMS(self, integration, group):
+    def detector_to_DMS_array(self, data):
         #
         # Just flip back
-        self.group = self.group[:, ::-1]
-        self.restore_group(integration, group)
+        return data[..., ::-1]
 
 
 class MIRIDataset(Dataset):
@@ -2133,7 +2422,9 @@ def correct_model(input_model, odd_even_columns,
                   use_side_ref_pixels,
                   side_smoothing_length, side_gain,
                   odd_even_rows,
-                  conv_kernel_params):
+                  conv_kernel_params,
+                  nthreads=1,
+                  dtype_policy='default'):
     """Wrapper to do Reference Pixel Correction on a JWST Model.
     Performs the correction on the datamodel
 
@@ -2166,6 +2457,13 @@ def correct_model(input_model, odd_even_columns,
     conv_kernel_params : dict
         Dictionary containing the parameters needed for the optimized convolution kernel
 
+    nthreads : int
+        Number of integrations to correct concurrently (NIR full frame only)
+
+    dtype_policy : str
+        If "float32", the side reference pixel correction works on the
+        groups in float32 rather than float64 (NIR full frame only)
+
     """
     if input_model.meta.instrument.name == 'MIRI':
         if reffile_utils.is_subarray(input_model):
@@ -2183,6 +2481,9 @@ def correct_model(input_model, odd_even_columns,
     if input_dataset is None:
         status = SUBARRAY_DOESNTFIT
         return status
+    if isinstance(input_dataset, NIRDataset):
+        input_dataset.nthreads = nthreads
+        input_dataset.dtype_policy = dtype_policy
     input_dataset.log_parameters()
     reference_pixel_correction(input_dataset)
 
@@ -2,6 +2,7 @@ from stdatamodels.jwst import datamodels
 
 from ..stpipe import Step
 from ..lib import pipe_utils
+from ..lib.dtype_policy import get_dtype_policy
 from . import reference_pixels
 from . import irs2_subtract_reference
 
@@ -29,6 +30,8 @@ class RefPixStep(Step):
         sigreject = float(default=4.0) # Number of sigmas to reject as outliers
         gaussmooth = float(default=1.0) # Width of Gaussian smoothing kernel to use as a low-pass filter
         halfwidth = integer(default=30) # Half-width of convolution kernel to build
+        maximum_cores = string(default='1') # Number of integrations to correct in parallel threads. Can be an integer, 'half', 'quarter', or 'all'
+        dtype_policy = option("default", "float32", default="default") # Keep NIR side pixel correction intermediates in float32
     """
 
     reference_file_types = ['refpix']
@@ -49,6 +52,12 @@ class RefPixStep(Step):
             # Work on a copy
             result = input_model.copy()
 
+            # Number of integrations to correct concurrently
+            nthreads = pipe_utils.compute_num_cores(self.maximum_cores,
+                                                    result.data.shape[0])
+            if nthreads > 1:
+                self.log.info(f'Correcting integrations using {nthreads} threads')
+
             if pipe_utils.is_irs2(result):
 
                 # Flag bad reference pixels first
@@ -64,7 +73,8 @@ class RefPixStep(Step):
                     reference_pixels.correct_model(
                         result, self.odd_even_columns, self.use_side_ref_pixels,
                         self.side_smoothing_length, self.side_gain, self.odd_even_rows,
-                        conv_kernel_params)
+                        conv_kernel_params, nthreads=nthreads,
+                        dtype_policy=get_dtype_policy(self))
 
                 # Now that values are updated, replace bad reference pixels
                 irs2_subtract_reference.flag_bad_refpix(result, replace_only=True)
@@ -85,7 +95,8 @@ class RefPixStep(Step):
 
                 # Apply the IRS2 correction scheme
                 result = irs2_subtract_reference.correct_model(
-                    result, irs2_model, preserve_refpix=self.preserve_irs2_refpix)
+                    result, irs2_model, preserve_refpix=self.preserve_irs2_refpix,
+                    nthreads=nthreads)
 
                 if result.meta.cal_step.refpix != 'SKIPPED':
                     result.meta.cal_step.refpix = 'COMPLETE'
@@ -117,7 +128,9 @@ class RefPixStep(Step):
                                                         self.side_smoothing_length,
                                                         self.side_gain,
                                                         self.odd_even_rows,
-                                                        conv_kernel_params)
+                                                        conv_kernel_params,
+                                                        nthreads=nthreads,
+                                                        dtype_policy=get_dtype_policy(self))
 
                 if status == reference_pixels.REFPIX_OK:
                     result.meta.cal_step.refpix = 'COMPLETE'
@@ -0,0 +1,171 @@
+"""Check the batched IRS2 correction against the original group-by-group algorithm"""
+import numpy as np
+import pytest
+from scipy.ndimage import convolve1d
+
+from jwst.refpix import irs2_subtract_reference as irs2
+
+
+def legacy_fft_interp_norm(dd0, mask0, row, hnorm, hnorm1, ny, ngroups, aa, n_iter_norm):
+    mm = np.zeros((ny, row), dtype=np.int8)
+    mm[:, hnorm1] = mask0[:, hnorm]
+    hm = (mm != 0)
+    for j in range(ngroups):
+        dd = dd0[j, :, :].copy()
+        p = dd.flatten()
+        for it in range(n_iter_norm):
+            pp = np.fft.fft(p)
+            pp *= aa
+            p[:] = np.fft.ifft(pp).real
+            p[hm.ravel()] = dd[hm]
+        dd0[j, :, :] = p.reshape((ny, row))
+
+
+def legacy_remove_slopes(data0, ngroups, ny, row):
+    time_arr = np.arange(ny * row, dtype=np.float32).reshape((ny, row))
+    time_arr -= time_arr.mean(dtype=np.float64)
+    row4plus4 = np.array([0, 1, 2, 3, 2044, 2045, 2046, 2047], dtype=np.intp)
+
+    ab_3 = np.zeros((2, ngroups, 5), dtype=np.float32)
+    for i in range(5):
+        for k in range(ngroups):
+            mask = (data0[i, k, row4plus4, :] != 0.)
+            (intercept, slope) = irs2.ols_line(time_arr[row4plus4, :][mask],
+                                               data0[i, k, row4plus4, :][mask])
+            ab_3[0, k, i] = intercept
+            ab_3[1, k, i] = slope
+
+    for i in range(5):
+        for k in range(ngroups):
+            weight = (data0[i, k, :, :] != 0.).astype(np.int8)
+            data0[i, k, :, :] -= (ab_3[0, k, i] + time_arr * ab_3[1, k, i]) * weight
+
+
+def legacy_replace_bad_pixels(data0, ngroups, ny, row):
+    w_ind = np.arange(1, 32, dtype=np.float32) / 32.
+    w = np.sin(w_ind * np.pi)
+    for jj in range(ngroups):
+        dat = data0[0, jj, :, :].reshape(row * ny)
+        mask = (dat != 0.).astype(np.float32)
+        numerator = convolve1d(dat, w, mode='wrap')
+        denominator = convolve1d(mask, w, mode='wrap')
+        div_zero = (denominator == 0.)
+        numerator = np.where(div_zero, 0., numerator)
+        denominator = np.where(div_zero, 1., denominator)
+        dat = (numerator / denominator).reshape(ny, row)
+        mask = mask.reshape(ny, row)
+        data0[0, jj, :, :] += dat * (1. - mask)
+
+
+def legacy_fft_filter(ny, row, scipix_n, refpix_r, pad):
+    elen = 110000 // (scipix_n + refpix_r + 2)
+    blen = (512 + 512 // scipix_n * (refpix_r + 2) + pad) // \
+        (scipix_n + refpix_r + 2) * ny // 2 - elen // 2
+    temp_a1 = (np.cos(np.arange(elen, dtype=np.float64) * np.pi / float(elen)) + 1.) / 2.
+    temp_a2 = np.concatenate((np.ones(blen), temp_a1, np.zeros(row * ny // 2 - 2 * blen - 2 * elen),
+                              temp_a1[::-1], np.ones(blen)))
+    roll_a2 = np.roll(temp_a2, -1)
+    return np.concatenate((temp_a2, roll_a2[::-1]))
+
+
+@pytest.fixture
+def time_ordered_data():
+    """Time-ordered data for 5 sectors, 3 groups, with zeroed gaps"""
+    rng = np.random.default_rng(17)
+    ngroups, ny, row = 3, 2048, 40
+    data0 = rng.normal(0, 10, size=(5, ngroups, ny, row)).astype(np.float32)
+    data0[..., 20:24] = 0.
+    data0[1, 2, 2045, 5] = 0.
+    data0[0, 1, 100:110, :] = 0.
+    return data0
+
+
+def test_sector_indices():
+    hnorm, href, hnorm1, href1, unpad = irs2.sector_indices(16, 4)
+    assert len(hnorm) == len(hnorm1) == 512
+    assert len(href) == len(href1) == 128
+    assert hnorm1[-1] == 703
+    np.testing.assert_array_equal(unpad, np.sort(np.concatenate([hnorm1, href1])))
+
+    # The cached arrays are shared, so they must not be modified
+    assert irs2.sector_indices(16, 4)[0] is hnorm
+    with pytest.raises(ValueError):
+        hnorm[0] = 1
+
+
+def test_make_fft_filter():
+    ny, row = 2048, 712
+    aa = irs2.make_fft_filter(ny, row, 16, 4, 8)
+    full = legacy_fft_filter(ny, row, 16, 4, 8)
+
+    np.testing.assert_array_equal(aa, full[:ny * row // 2 + 1])
+    np.testing.assert_array_equal(full[1:], full[:0:-1])
+
+
+@pytest.mark.parametrize('n', [64, 63])
+def test_hermitian_part(n):
+    """The real part of a complex product of transforms needs only real transforms."""
+    rng = np.random.default_rng(5)
+    data = rng.normal(size=(3, n))
+    refout = rng.normal(size=(3, n))
+    alpha = (rng.normal(size=n) + 1j * rng.normal(size=n)).astype(np.complex64)
+    beta = (rng.normal(size=n) + 1j * rng.normal(size=n)).astype(np.complex64)
+
+    expected = np.fft.ifft(np.fft.fft(data) * beta + alpha * np.fft.fft(refout)).real
+    result = np.fft.irfft(np.fft.rfft(data) * irs2.hermitian_part(beta)
+                          + irs2.hermitian_part(alpha) * np.fft.rfft(refout), n=n)
+
+    np.testing.assert_allclose(result, expected, atol=1e-12)
+
+
+def test_fft_interp_norm():
+    rng = np.random.default_rng(8)
+    ngroups, ny, row = 3, 4, 712
+    hnorm, _, hnorm1, _, _ = irs2.sector_indices(16, 4)
+    dd0 = rng.normal(0, 10, size=(ngroups, ny, row)).astype(np.float32)
+    mask0 = np.ones((ny, 640), dtype=np.int64)
+    mask0[1, 100:200] = 0
+
+    # Symmetric low pass filter
+    nfft = ny * row
+    freq = np.abs(np.fft.fftfreq(nfft))
+    aa = np.clip(1.5 - 10 * freq, 0., 1.)
+
+    expected = dd0.copy()
+    legacy_fft_interp_norm(expected, mask0, row, hnorm, hnorm1, ny, ngroups, aa, 3)
+    irs2.fft_interp_norm(dd0, mask0, row, hnorm, hnorm1, ny, ngroups, aa, 3)
+
+    np.testing.assert_allclose(dd0, expected, rtol=1e-5, atol=1e-5)
+
+
+def test_ols_line():
+    rng = np.random.default_rng(2)
+    x = np.arange(50, dtype=np.float32) - 25.
+    y = (3. + 0.5 * x + rng.normal(size=(4, 50))).astype(np.float32)
+
+    intercepts, slopes = irs2.ols_line(x, y)
+    for i in range(4):
+        intercept, slope = irs2.ols_line(x, y[i])
+        assert intercepts[i] == intercept
+        assert slopes[i] == slope
+    np.testing.assert_allclose(slopes, 0.5, atol=0.1)
+
+    assert irs2.ols_line(np.array([]), np.array([])) == (0., 0.)
+
+
+def test_remove_slopes(time_ordered_data):
+    expected = time_ordered_data.copy()
+    _, ngroups, ny, row = expected.shape
+    legacy_remove_slopes(expected, ngroups, ny, row)
+    irs2.remove_slopes(time_ordered_data, ngroups, ny, row)
+
+    np.testing.assert_array_equal(time_ordered_data, expected)
+
+
+def test_replace_bad_pixels(time_ordered_data):
+    expected = time_ordered_data.copy()
+    _, ngroups, ny, row = expected.shape
+    legacy_replace_bad_pixels(expected, ngroups, ny, row)
+    irs2.replace_bad_pixels(time_ordered_data, ngroups, ny, row)
+
+    np.testing.assert_array_equal(time_ordered_data, expected)
@@ -999,3 +999,75 @@ def test_preserve_refpix(detector, irs2, preserve):
         assert out.data.shape == (1, ngroups, xsize, xsize)
         assert out.err.shape == (1, ngroups, xsize, xsize)
         assert out.pixeldq.shape == (xsize, xsize)
+
+
+def test_sigma_clip_groups(setup_cube):
+    """Test that the clipped means for a stack of groups match those for single groups."""
+    input_model = setup_cube('NIRCAM', 'NRCA1', 5, 2048, 2048)
+    dataset = NIRDataset(input_model, True, True, 11, 1.0, conv_kernel_params)
+
+    rng = np.random.default_rng(12)
+    data = rng.normal(100, 5, size=(5, 4, 256)).astype(np.float32)
+    data[1, 2, 10] = 1000.
+    data[2, :, 30:40] = -500.
+    data[3] = 42.
+    dq = np.zeros((4, 256), dtype=np.uint32)
+    dq[0, :20] = dqflags.pixel['DO_NOT_USE']
+
+    means = dataset.sigma_clip_groups(data, dq)
+    expected = [dataset.sigma_clip(data[group], dq) for group in range(5)]
+    assert means == expected
+    assert [type(mean) for mean in means] == [type(mean) for mean in expected]
+
+    dq[:] = dqflags.pixel['DO_NOT_USE']
+    assert dataset.sigma_clip_groups(data, dq) == [None] * 5
+
+
+@pytest.mark.parametrize('smoothing_length', [11, 4])
+def test_median_filter_groups(setup_cube, smoothing_length):
+    """Test that the side signal for a stack of groups matches that for single groups."""
+    input_model = setup_cube('NIRCAM', 'NRCA1', 3, 2048, 2048)
+    dataset = NIRDataset(input_model, True, True, smoothing_length, 1.0, conv_kernel_params)
+
+    rng = np.random.default_rng(3)
+    data = rng.normal(100, 5, size=(3, 200, 4)).astype(np.float32)
+    data[1, 50, 2] = np.nan
+    dq = np.zeros((200, 4), dtype=np.uint32)
+    dq[20:24, 1:3] = dqflags.pixel['DO_NOT_USE']
+    dq[100:120] = dqflags.pixel['DO_NOT_USE']
+
+    result = dataset.median_filter_groups(data, dq, smoothing_length)
+    for group in range(3):
+        expected = dataset.median_filter(data[group], dq, smoothing_length)
+        np.testing.assert_array_equal(result[group], expected)
+    assert np.isnan(result[1, 50])
+
+
+@pytest.mark.parametrize('odd_even_columns, nthreads', [(True, 1), (False, 2)])
+def test_group_batches_match_single_groups(setup_cube, odd_even_columns, nthreads):
+    """Test that correcting batches of groups gives the same result as one group at a time."""
+    input_model = setup_cube('NIRCAM', 'NRCA2', 3, 2048, 2048)
+    rng = np.random.default_rng(5)
+    input_model.data = rng.normal(
+        1000, 10, size=(2, 3, 2048, 2048)).astype(np.float32)
+    input_model.data += rng.normal(0, 20, size=(2, 3, 2048, 1)).astype(np.float32)
+    input_model.pixeldq[:4, 100:110] = dqflags.pixel['DO_NOT_USE']
+    input_model.pixeldq[300:320, :4] = dqflags.pixel['DO_NOT_USE']
+    expected_model = input_model.copy()
+
+    # Correct one group at a time
+    dataset = create_dataset(expected_model, odd_even_columns, True, 11, 1.0, False,
+                             conv_kernel_params)
+    dataset.DMS_to_detector_dq()
+    for integration in range(2):
+        for group in range(3):
+            dataset.DMS_to_detector(integration, group)
+            refvalues = dataset.get_refvalues(dataset.group)
+            dataset.do_top_bottom_correction(dataset.group, refvalues)
+            dataset.group = dataset.do_side_correction(dataset.group)
+            dataset.detector_to_DMS(integration, group)
+
+    correct_model(input_model, odd_even_columns, True, 11, 1.0, False,
+                  conv_kernel_params, nthreads=nthreads)
+
+    np.testing.assert_array_equal(input_model.data, expected_model.data)
@@ -4,7 +4,7 @@ from stdatamodels.jwst import datamodels
 from stdatamodels.jwst.datamodels import MultiSlitModel, ImageModel
 
 from jwst.datamodels import ModelContainer, ModelLibrary
-from jwst.lib.pipe_utils import match_nans_and_flags
+from jwst.lib.pipe_utils import map_slits, match_nans_and_flags
 from jwst.lib.wcs_utils import get_wavelengths
 
 from . import resample_spec, ResampleStep
@@ -42,6 +42,7 @@ class ResampleSpecStep(Step):
         single = boolean(default=False)  # Resample each input to its own output grid
         blendheaders = boolean(default=True)  # Blend metadata from inputs into output
         in_memory = boolean(default=True)  # Keep images in memory
+        maximum_cores = string(default='1')  # Number of sources to resample in parallel threads. Can be an integer, 'half', 'quarter', or 'all'
     """
 
     def process(self, input):
@@ -103,9 +104,10 @@ class ResampleSpecStep(Step):
 
         # populate the result wavelength attribute for MultiSlitModel
         if isinstance(result, MultiSlitModel):
-            for slit_idx, slit in enumerate(result.slits):
-                wl_array = get_wavelengths(result.slits[slit_idx])
-                result.slits[slit_idx].wavelength = wl_array
+            def set_wavelength(slit):
+                slit.wavelength = get_wavelengths(slit)
+
+            map_slits(set_wavelength, result.slits, self.maximum_cores)
         else:
             # populate the result wavelength attribute for SlitModel
             wl_array = get_wavelengths(result)
@@ -132,8 +134,9 @@ class ResampleSpecStep(Step):
 
         result.update(input_models[0])
 
-        pscale_ratio = None
-        for container in containers.values():
+        # Each source is resampled independently, possibly in parallel
+        # threads; the slits are then added in the order of the sources.
+        def resample_source(container):
             # Make sure all input models have consistent NaN and DO_NOT_USE values
             for model in container:
                 match_nans_and_flags(model)
@@ -142,17 +145,23 @@ class ResampleSpecStep(Step):
 
             library = ModelLibrary(container, on_disk=False)
             drizzled_library = resamp.do_drizzle(library)
+            slits = []
             with drizzled_library:
                 for i, model in enumerate(drizzled_library):
                     self.update_slit_metadata(model)
                     update_s_region_spectral(model)
-                    result.slits.append(model)
+                    slits.append(model)
                     drizzled_library.shelve(model, i, modify=False)
-            del library, drizzled_library
+            return slits, resamp.pscale_ratio
+
+        pscale_ratio = None
+        for slits, source_pscale_ratio in map_slits(resample_source, containers.values(),
+                                                    self.maximum_cores):
+            result.slits.extend(slits)
 
             # Keep the first computed pixel scale ratio for storage
             if self.pixel_scale is not None and pscale_ratio is None:
-                pscale_ratio = resamp.pscale_ratio
+                pscale_ratio = source_pscale_ratio
 
         if self.pixel_scale is None or pscale_ratio is None:
             result.meta.resample.pixel_scale_ratio = self.pixel_scale_ratio
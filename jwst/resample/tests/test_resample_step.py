@@ -621,6 +621,20 @@ def test_pixel_scale_ratio_spec_nirspec(nirspec_cal, ratio, units):
     result3.close()
 
 
+def test_nirspec_maximum_cores(nirspec_cal):
+    """Check that resampling the sources in parallel threads gives the same results"""
+    result1 = ResampleSpecStep.call(nirspec_cal)
+    result2 = ResampleSpecStep.call(nirspec_cal, maximum_cores='all')
+
+    assert [slit.name for slit in result2.slits] == [slit.name for slit in result1.slits]
+    for slit1, slit2 in zip(result1.slits, result2.slits):
+        np.testing.assert_array_equal(slit2.data, slit1.data)
+        np.testing.assert_array_equal(slit2.wavelength, slit1.wavelength)
+
+    result1.close()
+    result2.close()
+
+
 def test_weight_type(nircam_rate, tmp_cwd):
     """Check that weight_type of exptime and ivm work"""
     im1 = AssignWcsStep.call(nircam_rate, sip_approx=False)
@@ -22,7 +22,7 @@ NO_SAT_CHECK = dqflags.pixel['NO_SAT_CHECK']
 ATOD_LIMIT = 65535.  # Hard DN limit of 16-bit A-to-D converter
 
 
-def flag_saturation(output_model, ref_model, n_pix_grow_sat, use_readpatt):
+def flag_saturation(output_model, ref_model, n_pix_grow_sat, use_readpatt, ref_file=None):
     """
     Short Summary
     -------------
@@ -44,6 +44,10 @@ def flag_saturation(output_model, ref_model, n_pix_grow_sat, use_readpatt):
     use_readpatt : bool
         Use grouped read pattern information to assist with flagging
 
+    ref_file : str, optional
+        Path of the saturation reference file, used to cache the subarray
+        extracted from it
+
     Returns
     -------
     output_model : `~jwst.datamodels.RampModel`
@@ -51,32 +55,14 @@ def flag_saturation(output_model, ref_model, n_pix_grow_sat, use_readpatt):
         the GROUPDQ array
     """
 
-    ngroups = output_model.meta.exposure.ngroups
-    nframes = output_model.meta.exposure.nframes
-
     gdq = output_model.groupdq
     pdq = output_model.pixeldq
     data = output_model.data
 
     zframe = output_model.zeroframe if output_model.meta.exposure.zero_frame else None
 
-    # Extract subarray from saturation reference file, if necessary
-    if reffile_utils.ref_matches_sci(output_model, ref_model):
-        sat_thresh = ref_model.data
-        sat_dq = ref_model.dq
-    else:
-        log.info('Extracting reference file subarray to match science data')
-        ref_sub_model = reffile_utils.get_subarray_model(output_model, ref_model)
-        sat_thresh = ref_sub_model.data.copy()
-        sat_dq = ref_sub_model.dq.copy()
-        ref_sub_model.close()
-
-    # Enable use of read_pattern specific treatment if selected
-    if use_readpatt:
-        read_pattern = [[x + 1 + groupstart * nframes for x in range(nframes)] for groupstart in range(ngroups)]
-        log.info(f"Using read_pattern with nframes {nframes}")
-    else:
-        read_pattern=None
+    sat_thresh, sat_dq = get_saturation_thresholds(output_model, ref_model, ref_file=ref_file)
+    read_pattern = get_read_pattern(output_model, use_readpatt)
 
     gdq_new, pdq_new, zframe = flag_saturated_pixels(
         data, gdq, pdq, sat_thresh, sat_dq, ATOD_LIMIT, dqflags.pixel,
@@ -94,7 +80,73 @@ def flag_saturation(output_model, ref_model, n_pix_grow_sat, use_readpatt):
     return output_model
 
 
-def irs2_flag_saturation(output_model, ref_model, n_pix_grow_sat, use_readpatt):
+def get_saturation_thresholds(output_model, ref_model, ref_file=None):
+    """
+    Get the saturation thresholds and DQ matching the science data.
+
+    Parameters
+    ----------
+    output_model : `~jwst.datamodels.RampModel`
+        The input science data
+
+    ref_model : `~jwst.datamodels.SaturationModel`
+        Saturation reference file data model
+
+    ref_file : str, optional
+        Path of the saturation reference file, used to cache the subarray
+        extracted from it
+
+    Returns
+    -------
+    sat_thresh : ndarray
+        Saturation threshold image
+
+    sat_dq : ndarray
+        Saturation reference DQ image
+    """
+    # Extract subarray from saturation reference file, if necessary
+    if reffile_utils.ref_matches_sci(output_model, ref_model):
+        sat_thresh = ref_model.data
+        sat_dq = ref_model.dq
+    else:
+        log.info('Extracting reference file subarray to match science data')
+        ref_sub_model = reffile_utils.get_subarray_model(output_model, ref_model,
+                                                         ref_file=ref_file)
+        sat_thresh = ref_sub_model.data.copy()
+        sat_dq = ref_sub_model.dq.copy()
+        ref_sub_model.close()
+
+    return sat_thresh, sat_dq
+
+
+def get_read_pattern(output_model, use_readpatt):
+    """
+    Get the frames read in each group, for grouped read pattern flagging.
+
+    Parameters
+    ----------
+    output_model : `~jwst.datamodels.RampModel`
+        The input science data
+
+    use_readpatt : bool
+        Use grouped read pattern information to assist with flagging
+
+    Returns
+    -------
+    read_pattern : list of list of int or None
+        One-indexed frame numbers in each group, or None if
+        ``use_readpatt`` is not set.
+    """
+    if not use_readpatt:
+        return None
+
+    ngroups = output_model.meta.exposure.ngroups
+    nframes = output_model.meta.exposure.nframes
+    log.info(f"Using read_pattern with nframes {nframes}")
+    return [[x + 1 + groupstart * nframes for x in range(nframes)] for groupstart in range(ngroups)]
+
+
+def irs2_flag_saturation(output_model, ref_model, n_pix_grow_sat, use_readpatt, ref_file=None):
     """
     Short Summary
     -------------
@@ -119,6 +171,10 @@ def irs2_flag_saturation(output_model, ref_model, n_pix_grow_sat, use_readpatt):
     use_readpatt : bool
         Use grouped read pattern information to assist with flagging
 
+    ref_file : str, optional
+        Path of the saturation reference file, used to cache the subarray
+        extracted from it
+
     Returns
     -------
     output_model : `~jwst.datamodels.RampModel`
@@ -151,7 +207,8 @@ def irs2_flag_saturation(output_model, ref_model, n_pix_grow_sat, use_readpatt):
         sat_dq = ref_model.dq
     else:
         log.info('Extracting reference file subarray to match science data')
-        ref_sub_model = reffile_utils.get_subarray_model(output_model, ref_model)
+        ref_sub_model = reffile_utils.get_subarray_model(output_model, ref_model,
+                                                         ref_file=ref_file)
         sat_thresh = ref_sub_model.data.copy()
         sat_dq = ref_sub_model.dq.copy()
         ref_sub_model.close()
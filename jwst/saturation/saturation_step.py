@@ -47,9 +47,11 @@ class SaturationStep(Step):
 
             # Do the saturation check
             if pipe_utils.is_irs2(result):
-                result = saturation.irs2_flag_saturation(result, ref_model, self.n_pix_grow_sat, self.use_readpatt)
+                result = saturation.irs2_flag_saturation(result, ref_model, self.n_pix_grow_sat, self.use_readpatt,
+                                                         ref_file=self.ref_name)
             else:
-                result = saturation.flag_saturation(result, ref_model, self.n_pix_grow_sat, self.use_readpatt)
+                result = saturation.flag_saturation(result, ref_model, self.n_pix_grow_sat, self.use_readpatt,
+                                                    ref_file=self.ref_name)
             result.meta.cal_step.saturation = 'COMPLETE'
 
             # Cleanup
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""Inspect or clear the step result cache
+
+Step results are cached when the ``step_cache_dir`` step or pipeline
+parameter is set.
+
+% step_cache ~/.cache/jwst_steps
+
+% step_cache ~/.cache/jwst_steps --clear
+
+"""
+import argparse
+import os
+
+from jwst.stpipe.step_cache import StepCache
+
+
+# Begin execution
+def main():
+    parser = argparse.ArgumentParser(
+        description='List or clear the cached step results.'
+    )
+
+    parser.add_argument(
+        'cache_dir', type=str,
+        help='Directory of the step result cache, as given by step_cache_dir.'
+    )
+    parser.add_argument(
+        '--clear', action='store_true',
+        help='Remove all the cached results.'
+    )
+    parser.add_argument(
+        '--max-size', type=float, default=None,
+        help='Evict the least recently used results to reduce the cache to this size, in GB.'
+    )
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.cache_dir):
+        parser.error(f'{args.cache_dir} is not a directory')
+    cache = StepCache(args.cache_dir)
+
+    if args.clear:
+        count = len(cache.entries())
+        cache.clear()
+        print(f'Removed {count} cached results from {cache.cache_dir}')
+        return
+
+    if args.max_size is not None:
+        cache.max_size = args.max_size * 1024**3
+        cache.evict()
+
+    entries = cache.entries()
+    for path in entries:
+        print(f'{cache.entry_size(path) / 1024**2:10.1f} MB  {os.path.basename(path)}')
+    print(f'{len(entries)} cached results, {cache.size() / 1024**3:.2f} GB in {cache.cache_dir}')
+
+
+if __name__ == '__main__':
+    main()
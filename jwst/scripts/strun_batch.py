@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+"""Run a pipeline on many associations in one session
+
+The pipeline and CRDS are set up once, and the associations are then run
+in parallel worker processes, each association in its own process.
+
+% strun_batch calwebb_spec2 jw*_spec2_*_asn.json --nproc 8 --timeout 3600
+
+% strun_batch jwst.pipeline.Image2Pipeline --asn-list todo.txt \
+    --config image2.asdf --output-dir out --summary summary.json
+
+"""
+import argparse
+import os
+import sys
+
+from stpipe.utilities import import_class, resolve_step_class_alias
+
+from jwst.stpipe import Step
+from jwst.stpipe.batch import run_batch, write_summary
+
+
+# Begin execution
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Run a pipeline on each of a list of associations, in parallel processes.'
+    )
+
+    parser.add_argument(
+        'pipeline', type=str,
+        help='Pipeline class or alias, such as calwebb_spec2 or jwst.pipeline.Spec2Pipeline.'
+    )
+    parser.add_argument(
+        'asn_files', type=str, nargs='*',
+        help='Association files.'
+    )
+    parser.add_argument(
+        '--asn-list', type=str, default=None,
+        help='File listing association files, one per line.'
+    )
+    parser.add_argument(
+        '--config', type=str, default=None,
+        help='Parameter file of the pipeline.'
+    )
+    parser.add_argument(
+        '--output-dir', type=str, default=None,
+        help='Directory of the products; by default, that of each association.'
+    )
+    parser.add_argument(
+        '--nproc', type=int, default=1,
+        help='Number of associations processed at the same time.'
+    )
+    parser.add_argument(
+        '--timeout', type=float, default=None,
+        help='Time limit of each association, in seconds.'
+    )
+    parser.add_argument(
+        '--log-dir', type=str, default=None,
+        help='Directory for the log of each association.'
+    )
+    parser.add_argument(
+        '--summary', type=str, default=None,
+        help='Write the outcome of each association to this JSON file.'
+    )
+    parser.add_argument(
+        '--no-prefetch', action='store_true',
+        help='Do not look up the reference files of all association members before each run.'
+    )
+
+    args = parser.parse_args(args)
+
+    asn_files = list(args.asn_files)
+    if args.asn_list is not None:
+        with open(args.asn_list) as asn_list:
+            asn_files.extend(line.strip() for line in asn_list
+                             if line.strip() and not line.startswith('#'))
+    if not asn_files:
+        parser.error('no association files given')
+    missing = [asn_file for asn_file in asn_files if not os.path.isfile(asn_file)]
+    if missing:
+        parser.error(f'association files not found: {", ".join(missing)}')
+
+    try:
+        pipeline_class = import_class(resolve_step_class_alias(args.pipeline), Step)
+    except (ImportError, TypeError, ValueError) as err:
+        parser.error(f'{args.pipeline} is not a step or pipeline: {err}')
+
+    options = {}
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+        options['output_dir'] = args.output_dir
+    if args.log_dir is not None:
+        os.makedirs(args.log_dir, exist_ok=True)
+
+    jobs = run_batch(pipeline_class, asn_files, config_file=args.config, options=options,
+                     nproc=args.nproc, timeout=args.timeout, log_dir=args.log_dir,
+                     prefetch=not args.no_prefetch)
+
+    for job in jobs:
+        line = f'{job.status:8s} {job.wall_time:9.1f} s  {job.asn_file}'
+        if job.status != 'ok':
+            line += f'  ({job.error.splitlines()[-1]})'
+        print(line)
+    failed = sum(job.status != 'ok' for job in jobs)
+    print(f'{len(jobs) - failed} of {len(jobs)} associations processed')
+
+    if args.summary is not None:
+        write_summary(jobs, args.summary, pipeline_class)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
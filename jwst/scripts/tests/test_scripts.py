@@ -15,6 +15,8 @@ SCRIPTS = [
     'set_telescope_pointing.py',
     'set_velocity_aberration',
     'set_velocity_aberration.py',
+    'step_cache',
+    'strun_batch',
     'v1_calculate',
     'verify_install_requires',
     'world_coords',
@@ -1,130 +1,160 @@
-from .ami.ami_analyze_step import AmiAnalyzeStep
-from .ami.ami_average_step import AmiAverageStep
-from .ami.ami_normalize_step import AmiNormalizeStep
-from .assign_mtwcs.assign_mtwcs_step import AssignMTWcsStep
-from .assign_wcs.assign_wcs_step import AssignWcsStep
-from .background.background_step import BackgroundStep
-from .badpix_selfcal.badpix_selfcal_step import BadpixSelfcalStep
-from .barshadow.barshadow_step import BarShadowStep
-from .charge_migration.charge_migration_step import ChargeMigrationStep
-from .clean_flicker_noise.clean_flicker_noise_step import CleanFlickerNoiseStep
-from .combine_1d.combine_1d_step import Combine1dStep
-from .coron.stack_refs_step import StackRefsStep
-from .coron.align_refs_step import AlignRefsStep
-from .coron.klip_step import KlipStep
-from .coron.hlsp_step import HlspStep
-from .cube_build.cube_build_step import CubeBuildStep
-from .cube_skymatch.cube_skymatch_step import CubeSkyMatchStep
-from .dark_current.dark_current_step import DarkCurrentStep
-from .dq_init.dq_init_step import DQInitStep
-from .emicorr.emicorr_step import EmiCorrStep
-from .extract_1d.extract_1d_step import Extract1dStep
-from .extract_2d.extract_2d_step import Extract2dStep
-from .firstframe.firstframe_step import FirstFrameStep
-from .flatfield.flat_field_step import FlatFieldStep
-from .fringe.fringe_step import FringeStep
-from .gain_scale.gain_scale_step import GainScaleStep
-from .group_scale.group_scale_step import GroupScaleStep
-from .guider_cds.guider_cds_step import GuiderCdsStep
-from .imprint.imprint_step import ImprintStep
-from .ipc.ipc_step import IPCStep
-from .jump.jump_step import JumpStep
-from .lastframe.lastframe_step import LastFrameStep
-from .linearity.linearity_step import LinearityStep
-from .master_background.master_background_step import MasterBackgroundStep
-from .master_background.master_background_mos_step import MasterBackgroundMosStep
-from .mrs_imatch.mrs_imatch_step import MRSIMatchStep
-from .msaflagopen.msaflagopen_step import MSAFlagOpenStep
-from .nsclean.nsclean_step import NSCleanStep
-from .outlier_detection.outlier_detection_step import OutlierDetectionStep
-from .pathloss.pathloss_step import PathLossStep
-from .persistence.persistence_step import PersistenceStep
-from .photom.photom_step import PhotomStep
-from .pixel_replace.pixel_replace_step import PixelReplaceStep
-from .ramp_fitting.ramp_fit_step import RampFitStep
-from .refpix.refpix_step import RefPixStep
-from .resample.resample_step import ResampleStep
-from .resample.resample_spec_step import ResampleSpecStep
-from .reset.reset_step import ResetStep
-from .residual_fringe.residual_fringe_step import ResidualFringeStep
-from .rscd.rscd_step import RscdStep
-from .saturation.saturation_step import SaturationStep
-from .skymatch.skymatch_step import SkyMatchStep
-from .source_catalog.source_catalog_step import SourceCatalogStep
-from .spectral_leak.spectral_leak_step import SpectralLeakStep
-from .srctype.srctype_step import SourceTypeStep
-from .straylight.straylight_step import StraylightStep
-from .superbias.superbias_step import SuperBiasStep
-from .tso_photometry.tso_photometry_step import TSOPhotometryStep
-from .tweakreg.tweakreg_step import TweakRegStep
-from .wavecorr.wavecorr_step import WavecorrStep
-from .wfs_combine.wfs_combine_step import WfsCombineStep
-from .wfss_contam.wfss_contam_step import WfssContamStep
-from .white_light.white_light_step import WhiteLightStep
+"""
+Step classes of the package, imported on first access.
 
+Importing this module does not import the steps, so that running a single
+step, or a pipeline, only imports the modules it needs.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING
 
-__all__ = [
-    "AmiAnalyzeStep",
-    "AmiAverageStep",
-    "AmiNormalizeStep",
-    "AssignMTWcsStep",
-    "AssignWcsStep",
-    "BackgroundStep",
-    "BadpixSelfcalStep",
-    "BarShadowStep",
-    "Combine1dStep",
-    "StackRefsStep",
-    "AlignRefsStep",
-    "KlipStep",
-    "HlspStep",
-    "CleanFlickerNoiseStep",
-    "CubeBuildStep",
-    "CubeSkyMatchStep",
-    "DarkCurrentStep",
-    "DQInitStep",
-    "EmiCorrStep",
-    "Extract1dStep",
-    "Extract2dStep",
-    "FirstFrameStep",
-    "FlatFieldStep",
-    "FringeStep",
-    "GainScaleStep",
-    "GroupScaleStep",
-    "GuiderCdsStep",
-    "ImprintStep",
-    "IPCStep",
-    "JumpStep",
-    "LastFrameStep",
-    "LinearityStep",
-    "MasterBackgroundStep",
-    "MasterBackgroundMosStep",
-    "MRSIMatchStep",
-    "MSAFlagOpenStep",
-    "NSCleanStep",
-    "OutlierDetectionStep",
-    "PathLossStep",
-    "PersistenceStep",
-    "PhotomStep",
-    "PixelReplaceStep",
-    "RampFitStep",
-    "RefPixStep",
-    "ResampleStep",
-    "ResampleSpecStep",
-    "ResetStep",
-    "ResidualFringeStep",
-    "RscdStep",
-    "SaturationStep",
-    "SkyMatchStep",
-    "SourceCatalogStep",
-    "SourceTypeStep",
-    "SpectralLeakStep",
-    "StraylightStep",
-    "SuperBiasStep",
-    "TSOPhotometryStep",
-    "ChargeMigrationStep",
-    "TweakRegStep",
-    "WavecorrStep",
-    "WfsCombineStep",
-    "WfssContamStep",
-    "WhiteLightStep",
-]
+# Step class names, with the modules defining them, relative to jwst, and the
+# step aliases
+_STEP_MODULES = {
+    "AmiAnalyzeStep": ("ami.ami_analyze_step", "ami_analyze"),
+    "AmiAverageStep": ("ami.ami_average_step", "ami_average"),
+    "AmiNormalizeStep": ("ami.ami_normalize_step", "ami_normalize"),
+    "AssignMTWcsStep": ("assign_mtwcs.assign_mtwcs_step", "assign_mtwcs"),
+    "AssignWcsStep": ("assign_wcs.assign_wcs_step", "assign_wcs"),
+    "BackgroundStep": ("background.background_step", "background"),
+    "BadpixSelfcalStep": ("badpix_selfcal.badpix_selfcal_step", "badpix_selfcal"),
+    "BarShadowStep": ("barshadow.barshadow_step", "barshadow"),
+    "ChargeMigrationStep": ("charge_migration.charge_migration_step", "charge_migration"),
+    "CleanFlickerNoiseStep": ("clean_flicker_noise.clean_flicker_noise_step", "clean_flicker_noise"),
+    "Combine1dStep": ("combine_1d.combine_1d_step", "combine_1d"),
+    "StackRefsStep": ("coron.stack_refs_step", "stack_refs"),
+    "AlignRefsStep": ("coron.align_refs_step", "align_refs"),
+    "KlipStep": ("coron.klip_step", "klip"),
+    "HlspStep": ("coron.hlsp_step", "hlsp"),
+    "CubeBuildStep": ("cube_build.cube_build_step", "cube_build"),
+    "CubeSkyMatchStep": ("cube_skymatch.cube_skymatch_step", "cube_skymatch"),
+    "DarkCurrentStep": ("dark_current.dark_current_step", "dark_current"),
+    "DQInitStep": ("dq_init.dq_init_step", "dq_init"),
+    "EmiCorrStep": ("emicorr.emicorr_step", "emicorr"),
+    "Extract1dStep": ("extract_1d.extract_1d_step", "extract_1d"),
+    "Extract2dStep": ("extract_2d.extract_2d_step", "extract_2d"),
+    "FirstFrameStep": ("firstframe.firstframe_step", "firstframe"),
+    "FlatFieldStep": ("flatfield.flat_field_step", "flat_field"),
+    "FringeStep": ("fringe.fringe_step", "fringe"),
+    "GainScaleStep": ("gain_scale.gain_scale_step", "gain_scale"),
+    "GroupScaleStep": ("group_scale.group_scale_step", "group_scale"),
+    "GuiderCdsStep": ("guider_cds.guider_cds_step", "guider_cds"),
+    "ImprintStep": ("imprint.imprint_step", "imprint"),
+    "IPCStep": ("ipc.ipc_step", "ipc"),
+    "JumpStep": ("jump.jump_step", "jump"),
+    "LastFrameStep": ("lastframe.lastframe_step", "lastframe"),
+    "LinearityStep": ("linearity.linearity_step", "linearity"),
+    "MasterBackgroundStep": ("master_background.master_background_step", "master_background"),
+    "MasterBackgroundMosStep": ("master_background.master_background_mos_step", "master_background_mos"),
+    "MRSIMatchStep": ("mrs_imatch.mrs_imatch_step", "mrs_imatch"),
+    "MSAFlagOpenStep": ("msaflagopen.msaflagopen_step", "msa_flagging"),
+    "NSCleanStep": ("nsclean.nsclean_step", "nsclean"),
+    "OutlierDetectionStep": ("outlier_detection.outlier_detection_step", "outlier_detection"),
+    "PathLossStep": ("pathloss.pathloss_step", "pathloss"),
+    "PersistenceStep": ("persistence.persistence_step", "persistence"),
+    "PhotomStep": ("photom.photom_step", "photom"),
+    "PixelReplaceStep": ("pixel_replace.pixel_replace_step", "pixel_replace"),
+    "RampFitStep": ("ramp_fitting.ramp_fit_step", "ramp_fit"),
+    "RefPixStep": ("refpix.refpix_step", "refpix"),
+    "ResampleStep": ("resample.resample_step", "resample"),
+    "ResampleSpecStep": ("resample.resample_spec_step", "resample_spec"),
+    "ResetStep": ("reset.reset_step", "reset"),
+    "ResidualFringeStep": ("residual_fringe.residual_fringe_step", "residual_fringe"),
+    "RscdStep": ("rscd.rscd_step", "rscd"),
+    "SaturationStep": ("saturation.saturation_step", "saturation"),
+    "SkyMatchStep": ("skymatch.skymatch_step", "skymatch"),
+    "SourceCatalogStep": ("source_catalog.source_catalog_step", "source_catalog"),
+    "SpectralLeakStep": ("spectral_leak.spectral_leak_step", "spectral_leak"),
+    "SourceTypeStep": ("srctype.srctype_step", "srctype"),
+    "StraylightStep": ("straylight.straylight_step", "straylight"),
+    "SuperBiasStep": ("superbias.superbias_step", "superbias"),
+    "TSOPhotometryStep": ("tso_photometry.tso_photometry_step", "tso_photometry"),
+    "TweakRegStep": ("tweakreg.tweakreg_step", "tweakreg"),
+    "WavecorrStep": ("wavecorr.wavecorr_step", "wavecorr"),
+    "WfsCombineStep": ("wfs_combine.wfs_combine_step", "calwebb_wfs-image3"),
+    "WfssContamStep": ("wfss_contam.wfss_contam_step", "wfss_contam"),
+    "WhiteLightStep": ("white_light.white_light_step", "white_light"),
+}
+
+# Static analysis sees the classes, which are imported lazily at runtime; the
+# redundant aliases mark them as re-exported
+if TYPE_CHECKING:
+    from .ami.ami_analyze_step import AmiAnalyzeStep as AmiAnalyzeStep
+    from .ami.ami_average_step import AmiAverageStep as AmiAverageStep
+    from .ami.ami_normalize_step import AmiNormalizeStep as AmiNormalizeStep
+    from .assign_mtwcs.assign_mtwcs_step import AssignMTWcsStep as AssignMTWcsStep
+    from .assign_wcs.assign_wcs_step import AssignWcsStep as AssignWcsStep
+    from .background.background_step import BackgroundStep as BackgroundStep
+    from .badpix_selfcal.badpix_selfcal_step import BadpixSelfcalStep as BadpixSelfcalStep
+    from .barshadow.barshadow_step import BarShadowStep as BarShadowStep
+    from .charge_migration.charge_migration_step import ChargeMigrationStep as ChargeMigrationStep
+    from .clean_flicker_noise.clean_flicker_noise_step import CleanFlickerNoiseStep as CleanFlickerNoiseStep
+    from .combine_1d.combine_1d_step import Combine1dStep as Combine1dStep
+    from .coron.stack_refs_step import StackRefsStep as StackRefsStep
+    from .coron.align_refs_step import AlignRefsStep as AlignRefsStep
+    from .coron.klip_step import KlipStep as KlipStep
+    from .coron.hlsp_step import HlspStep as HlspStep
+    from .cube_build.cube_build_step import CubeBuildStep as CubeBuildStep
+    from .cube_skymatch.cube_skymatch_step import CubeSkyMatchStep as CubeSkyMatchStep
+    from .dark_current.dark_current_step import DarkCurrentStep as DarkCurrentStep
+    from .dq_init.dq_init_step import DQInitStep as DQInitStep
+    from .emicorr.emicorr_step import EmiCorrStep as EmiCorrStep
+    from .extract_1d.extract_1d_step import Extract1dStep as Extract1dStep
+    from .extract_2d.extract_2d_step import Extract2dStep as Extract2dStep
+    from .firstframe.firstframe_step import FirstFrameStep as FirstFrameStep
+    from .flatfield.flat_field_step import FlatFieldStep as FlatFieldStep
+    from .fringe.fringe_step import FringeStep as FringeStep
+    from .gain_scale.gain_scale_step import GainScaleStep as GainScaleStep
+    from .group_scale.group_scale_step import GroupScaleStep as GroupScaleStep
+    from .guider_cds.guider_cds_step import GuiderCdsStep as GuiderCdsStep
+    from .imprint.imprint_step import ImprintStep as ImprintStep
+    from .ipc.ipc_step import IPCStep as IPCStep
+    from .jump.jump_step import JumpStep as JumpStep
+    from .lastframe.lastframe_step import LastFrameStep as LastFrameStep
+    from .linearity.linearity_step import LinearityStep as LinearityStep
+    from .master_background.master_background_step import MasterBackgroundStep as MasterBackgroundStep
+    from .master_background.master_background_mos_step import MasterBackgroundMosStep as MasterBackgroundMosStep
+    from .mrs_imatch.mrs_imatch_step import MRSIMatchStep as MRSIMatchStep
+    from .msaflagopen.msaflagopen_step import MSAFlagOpenStep as MSAFlagOpenStep
+    from .nsclean.nsclean_step import NSCleanStep as NSCleanStep
+    from .outlier_detection.outlier_detection_step import OutlierDetectionStep as OutlierDetectionStep
+    from .pathloss.pathloss_step import PathLossStep as PathLossStep
+    from .persistence.persistence_step import PersistenceStep as PersistenceStep
+    from .photom.photom_step import PhotomStep as PhotomStep
+    from .pixel_replace.pixel_replace_step import PixelReplaceStep as PixelReplaceStep
+    from .ramp_fitting.ramp_fit_step import RampFitStep as RampFitStep
+    from .refpix.refpix_step import RefPixStep as RefPixStep
+    from .resample.resample_step import ResampleStep as ResampleStep
+    from .resample.resample_spec_step import ResampleSpecStep as ResampleSpecStep
+    from .reset.reset_step import ResetStep as ResetStep
+    from .residual_fringe.residual_fringe_step import ResidualFringeStep as ResidualFringeStep
+    from .rscd.rscd_step import RscdStep as RscdStep
+    from .saturation.saturation_step import SaturationStep as SaturationStep
+    from .skymatch.skymatch_step import SkyMatchStep as SkyMatchStep
+    from .source_catalog.source_catalog_step import SourceCatalogStep as SourceCatalogStep
+    from .spectral_leak.spectral_leak_step import SpectralLeakStep as SpectralLeakStep
+    from .srctype.srctype_step import SourceTypeStep as SourceTypeStep
+    from .straylight.straylight_step import StraylightStep as StraylightStep
+    from .superbias.superbias_step import SuperBiasStep as SuperBiasStep
+    from .tso_photometry.tso_photometry_step import TSOPhotometryStep as TSOPhotometryStep
+    from .tweakreg.tweakreg_step import TweakRegStep as TweakRegStep
+    from .wavecorr.wavecorr_step import WavecorrStep as WavecorrStep
+    from .wfs_combine.wfs_combine_step import WfsCombineStep as WfsCombineStep
+    from .wfss_contam.wfss_contam_step import WfssContamStep as WfssContamStep
+    from .white_light.white_light_step import WhiteLightStep as WhiteLightStep
+
+
+__all__ = list(_STEP_MODULES)
+
+
+def __getattr__(name):
+    try:
+        module, _ = _STEP_MODULES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    step_class = getattr(import_module(f"jwst.{module}"), name)
+    globals()[name] = step_class
+    return step_class
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,349 @@
+"""
+Run a pipeline on many associations in one session.
+
+The pipeline class, the modules of its steps and the CRDS configuration
+are loaded once before worker processes are forked: each association then
+runs in its own process, which starts with all of these in memory. Each
+worker first looks up, and downloads if needed, the references of all the
+members of its association, so that the lookups are spread over the
+workers. A process that fails, crashes or runs out of time only affects its
+own association.
+
+Forking is not available on Windows, where the associations are run in
+freshly started processes instead, without the preloaded state.
+"""
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import pkgutil
+import platform
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from multiprocessing.connection import wait
+
+from stdatamodels.jwst import datamodels
+from stpipe import crds_client
+
+from jwst import __version__
+from .perf_report import resource_usage
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ["BatchJob", "prefetch_references", "preload", "run_batch", "write_summary"]
+
+
+class BatchJob:
+    """
+    One association processed by `run_batch`.
+
+    Parameters
+    ----------
+    asn_file : str
+        Path of the association.
+
+    log_file : str or None
+        File receiving the log of the pipeline run, if any.
+    """
+
+    def __init__(self, asn_file, log_file=None):
+        self.asn_file = asn_file
+        self.log_file = log_file
+        self.status = 'pending'
+        self.error = None
+        self.exitcode = None
+        self.wall_time = None
+        self.max_rss = None
+        self.process = None
+        self._connection = None
+        self._outcome = None
+        self._start = None
+
+    def to_dict(self):
+        """The outcome of the job, as a dict."""
+        return {
+            'asn_file': self.asn_file,
+            'status': self.status,
+            'wall_time': self.wall_time,
+            'max_rss': self.max_rss,
+            'exitcode': self.exitcode,
+            'error': self.error,
+            'log_file': self.log_file,
+        }
+
+
+def _import_step_modules(step_class):
+    """Import the modules of the package of a step, for those imported on first use."""
+    package = step_class.__module__.rpartition('.')[0]
+    try:
+        module = importlib.import_module(package)
+    except ImportError:
+        return
+    for info in pkgutil.iter_modules(getattr(module, '__path__', []), f'{package}.'):
+        if info.name.rpartition('.')[2] in ('tests', 'regtest'):
+            continue
+        try:
+            importlib.import_module(info.name)
+        except Exception as err:
+            log.debug(f"Not preloading {info.name}: {err}")
+
+
+def _make_pipeline(pipeline_class, config_file=None):
+    if config_file is not None:
+        return pipeline_class.from_config_file(config_file)
+    return pipeline_class()
+
+
+def preload(pipeline_class, config_file=None):
+    """
+    Load what all runs of a pipeline need, before forking workers.
+
+    Parameters
+    ----------
+    pipeline_class : type
+        The pipeline, or step, class.
+
+    config_file : str, optional
+        Parameter file of the pipeline.
+    """
+    _make_pipeline(pipeline_class, config_file)
+    for step_class in {pipeline_class, *getattr(pipeline_class, 'step_defs', {}).values()}:
+        _import_step_modules(step_class)
+
+    try:
+        log.info(f"Using CRDS context {crds_client.get_context_used('jwst')}")
+    except (Exception, SystemExit) as err:
+        # CRDS exits when it can reach neither its server nor a cache
+        log.warning(f"CRDS not available: {err}")
+
+
+def prefetch_references(pipeline_class, asn_file, config_file=None):
+    """
+    Look up the references of all members of an association.
+
+    The references are downloaded to the CRDS cache if needed. Each member
+    is opened in turn; members shared by several products are looked up
+    once.
+
+    Parameters
+    ----------
+    pipeline_class : type
+        The pipeline, or step, class.
+
+    asn_file : str
+        The association.
+
+    config_file : str, optional
+        Parameter file of the pipeline.
+    """
+    # Prevent circular import
+    from ..associations import load_asn
+
+    pipeline = _make_pipeline(pipeline_class, config_file)
+    precache = getattr(pipeline, '_precache_references_impl', None)
+    if precache is None or not getattr(pipeline, 'prefetch_references', False):
+        return
+
+    try:
+        with open(asn_file) as asn_fh:
+            asn = load_asn(asn_fh)
+    except Exception as err:
+        log.warning(f"Reference files of {asn_file} not prefetched: {err}")
+        return
+    asn_dir = os.path.dirname(os.path.abspath(asn_file))
+    members = {os.path.join(asn_dir, member['expname']): None
+               for product in asn['products'] for member in product['members']}
+    for member in members:
+        try:
+            with datamodels.open(member) as model:
+                precache(model)
+        except (Exception, SystemExit) as err:
+            log.warning(f"Reference files of {member} not prefetched: {err}")
+
+
+def _run_job(pipeline_class, asn_file, config_file, options, log_file, prefetch, connection):
+    """Run the pipeline on one association, in a worker process."""
+    if log_file is not None:
+        handler = logging.FileHandler(log_file, mode='w')
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        logging.getLogger().addHandler(handler)
+    if prefetch:
+        prefetch_references(pipeline_class, asn_file, config_file)
+    if config_file is not None:
+        options = {**options, 'config_file': config_file}
+    try:
+        pipeline_class.call(asn_file, **options)
+        outcome = ('ok', None)
+    except BaseException as err:
+        # CRDS exits on fatal errors
+        outcome = ('failed', ''.join(traceback.format_exception_only(type(err), err)).strip())
+        log.error(traceback.format_exc())
+    connection.send((*outcome, resource_usage()['max_rss']))
+    connection.close()
+
+
+def _start_job(context, job, pipeline_class, config_file, options, prefetch):
+    receiver, sender = context.Pipe(duplex=False)
+    job.process = context.Process(
+        target=_run_job,
+        args=(pipeline_class, job.asn_file, config_file, options, job.log_file, prefetch,
+              sender),
+        name=f"batch-{os.path.basename(job.asn_file)}",
+    )
+    job._start = time.perf_counter()
+    job.process.start()
+    sender.close()
+    job._connection = receiver
+    job.status = 'running'
+    log.info(f"Started {job.asn_file} (pid {job.process.pid})")
+
+
+def _receive_outcome(job):
+    """Read the outcome sent by the worker, or note that it exited without one."""
+    try:
+        job._outcome = job._connection.recv()
+    except EOFError:
+        job._outcome = ('crashed', None, None)
+
+
+def _finish_job(job, timed_out=False):
+    if timed_out:
+        job.process.terminate()
+    job.process.join()
+    job.wall_time = time.perf_counter() - job._start
+    job.exitcode = job.process.exitcode
+    if timed_out:
+        job.status = 'timeout'
+        job.error = f"Exceeded the time limit after {job.wall_time:.0f} s"
+    else:
+        if job._outcome is None:
+            _receive_outcome(job)
+        job.status, job.error, job.max_rss = job._outcome
+        if job.status == 'crashed':
+            job.error = f"Worker exited with code {job.exitcode}"
+    job._connection.close()
+    job.process = job._connection = None
+
+    message = f"Finished {job.asn_file}: {job.status} in {job.wall_time:.1f} s"
+    if job.status == 'ok':
+        log.info(message)
+    else:
+        log.error(f"{message}: {job.error}")
+
+
+def run_batch(pipeline_class, asn_files, config_file=None, options=None, nproc=1,
+              timeout=None, log_dir=None, prefetch=True):
+    """
+    Run a pipeline on each of a list of associations, in worker processes.
+
+    Parameters
+    ----------
+    pipeline_class : type
+        The pipeline, or step, class.
+
+    asn_files : list of str
+        The associations, each processed by one run of the pipeline.
+
+    config_file : str, optional
+        Parameter file of the pipeline.
+
+    options : dict, optional
+        Parameters of the pipeline, as given to `stpipe.Step.call`,
+        such as ``output_dir`` or ``steps``.
+
+    nproc : int
+        Number of associations processed at the same time.
+
+    timeout : float, optional
+        Time limit of each association, in seconds. Workers running longer
+        are terminated.
+
+    log_dir : str, optional
+        Directory receiving the log of each association, named after the
+        association with a ``.log`` extension.
+
+    prefetch : bool
+        Look up, and download if needed, the references of all the members
+        of each association, in its worker, before running the pipeline.
+
+    Returns
+    -------
+    jobs : list of `BatchJob`
+        The outcome of each association, in the order given.
+    """
+    options = dict(options or {})
+    jobs = []
+    for asn_file in asn_files:
+        log_file = None
+        if log_dir is not None:
+            name = os.path.splitext(os.path.basename(asn_file))[0]
+            log_file = os.path.join(log_dir, f"{name}.log")
+        jobs.append(BatchJob(asn_file, log_file))
+
+    method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+    if method == 'fork':
+        preload(pipeline_class, config_file)
+    context = multiprocessing.get_context(method)
+
+    pending = deque(jobs)
+    running = []
+    while pending or running:
+        while pending and len(running) < max(1, nproc):
+            job = pending.popleft()
+            _start_job(context, job, pipeline_class, config_file, options, prefetch)
+            running.append(job)
+
+        now = time.perf_counter()
+        wait_time = None
+        if timeout is not None:
+            wait_time = max(0., min(job._start + timeout - now for job in running))
+        # Read outcomes as they come, so that no worker blocks on a full pipe
+        wait([job.process.sentinel for job in running]
+             + [job._connection for job in running if job._outcome is None],
+             timeout=wait_time)
+
+        now = time.perf_counter()
+        for job in list(running):
+            if job._outcome is None and job._connection.poll():
+                _receive_outcome(job)
+            timed_out = timeout is not None and now - job._start > timeout
+            if timed_out or not job.process.is_alive():
+                _finish_job(job, timed_out=timed_out and job.process.is_alive())
+                running.remove(job)
+    return jobs
+
+
+def write_summary(jobs, path, pipeline_class):
+    """
+    Write the outcome of a batch as a JSON file.
+
+    Parameters
+    ----------
+    jobs : list of `BatchJob`
+        The jobs, as returned by `run_batch`.
+
+    path : str
+        Path of the summary.
+
+    pipeline_class : type
+        The pipeline run.
+    """
+    counts = {}
+    for job in jobs:
+        counts[job.status] = counts.get(job.status, 0) + 1
+    summary = {
+        'jwst_version': __version__,
+        'python_version': platform.python_version(),
+        'host': platform.node(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'pipeline': f"{pipeline_class.__module__}.{pipeline_class.__qualname__}",
+        'units': {'time': 's', 'memory': 'bytes'},
+        'counts': counts,
+        'jobs': [job.to_dict() for job in jobs],
+    }
+    with open(path, 'w') as summary_file:
+        json.dump(summary, summary_file, indent=2)
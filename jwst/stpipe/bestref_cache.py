@@ -0,0 +1,139 @@
+"""
+Memoized CRDS best reference lookups.
+
+Steps look up their reference files for each input, and in a batch run
+most lookups repeat one already made: exposures of the same detector and
+configuration select the same files. The results of the stpipe lookups
+are kept for the life of the process, keyed by the CRDS context, the
+reference type and the values of the parameters the CRDS rules for that
+type select on. Any other change to the input metadata, such as its file
+name, still gives the same key.
+
+`clear_bestref_cache` forgets all results, for instance after changing
+the CRDS context or updating the CRDS cache in a long running process.
+"""
+import logging
+import threading
+from collections import OrderedDict
+
+from crds.core import rmap as crds_rmap
+from crds.core import utils as crds_utils
+from stpipe import crds_client
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ["bestref_cache_stats", "clear_bestref_cache", "get_reference_file", "has_references"]
+
+# Best references found, in least recently used order.  Entries are dropped
+# once there are more than BESTREF_CACHE_SIZE of them; 0 disables the cache.
+BESTREF_CACHE_SIZE = 10000
+_bestref_cache = OrderedDict()
+_bestref_cache_lock = threading.Lock()
+bestref_cache_stats = {'hits': 0, 'misses': 0}
+
+
+def _selection_parameters(parameters, reference_file_type, context):
+    """Parameters the CRDS rules for a reference type select on.
+
+    All parameters are returned if the rules of the context are not in
+    the local CRDS cache.
+    """
+    try:
+        pmap = crds_rmap.get_cached_mapping(context)
+        header = crds_utils.condition_header(parameters)
+        instrument = pmap.get_instrument(header)
+        return pmap.get_imap(instrument).get_rmap(reference_file_type).minimize_header(header)
+    except Exception as err:
+        log.debug(f"Selection parameters of {reference_file_type} not known: {err}")
+        return parameters
+
+
+def _bestref_key(parameters, reference_file_type, observatory):
+    """Make the cache key of a best reference lookup, or None if it can not be cached."""
+    try:
+        context = crds_client.get_context_used(observatory)
+    except Exception:
+        return None
+    selection = _selection_parameters(parameters, reference_file_type, context)
+    return (observatory, context, reference_file_type.lower(),
+            tuple(sorted((str(key).lower(), repr(value)) for key, value in selection.items())))
+
+
+def get_reference_file(parameters, reference_file_type, observatory, lookup):
+    """Find a best reference file, reusing the result of an earlier lookup.
+
+    Parameters
+    ----------
+    parameters : dict
+        Parameters used by CRDS to compute best references, from
+        ``DataModel.get_crds_parameters``.
+
+    reference_file_type : str
+        Reference file type.
+
+    observatory : str
+        CRDS observatory code.
+
+    lookup : callable
+        Called without arguments to look up the reference in CRDS, when it
+        was not found before.
+
+    Returns
+    -------
+    result : object
+        The value returned by ``lookup``, now or for an earlier call with
+        the same key.
+    """
+    key = _bestref_key(parameters, reference_file_type, observatory) if BESTREF_CACHE_SIZE > 0 else None
+    if key is None:
+        return lookup()
+
+    with _bestref_cache_lock:
+        if key in _bestref_cache:
+            _bestref_cache.move_to_end(key)
+            bestref_cache_stats['hits'] += 1
+            return _bestref_cache[key]
+        bestref_cache_stats['misses'] += 1
+
+    result = lookup()
+    with _bestref_cache_lock:
+        _bestref_cache[key] = result
+        while len(_bestref_cache) > BESTREF_CACHE_SIZE:
+            _bestref_cache.popitem(last=False)
+    return result
+
+
+def has_references(parameters, reference_file_types, observatory):
+    """Whether the best references of all types were found before.
+
+    Parameters
+    ----------
+    parameters : dict
+        Parameters used by CRDS to compute best references, from
+        ``DataModel.get_crds_parameters``.
+
+    reference_file_types : list of str
+        Reference file types.
+
+    observatory : str
+        CRDS observatory code.
+
+    Returns
+    -------
+    bool
+        True if a lookup of every type would be found in the cache.
+    """
+    if BESTREF_CACHE_SIZE == 0:
+        return False
+    keys = [_bestref_key(parameters, reftype, observatory) for reftype in reference_file_types]
+    with _bestref_cache_lock:
+        return all(key is not None and key in _bestref_cache for key in keys)
+
+
+def clear_bestref_cache():
+    """Forget all best references found and reset the cache statistics."""
+    with _bestref_cache_lock:
+        _bestref_cache.clear()
+        bestref_cache_stats['hits'] = 0
+        bestref_cache_stats['misses'] = 0
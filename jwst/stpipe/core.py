@@ -1,10 +1,14 @@
 """
 JWST-specific Step and Pipeline base classes.
 """
+from collections.abc import Sequence
 from functools import wraps
 import logging
+import os
 import warnings
 
+from crds.core.exceptions import CrdsLookupError
+
 from stdatamodels.jwst.datamodels import JwstDataModel
 from stdatamodels.jwst import datamodels
 from stpipe import crds_client
@@ -12,19 +16,38 @@ from stpipe import Step
 from stpipe import Pipeline
 
 from jwst import __version_commit__, __version__
+from ..lib.dtype_policy import cast_float32, get_dtype_policy
 from ..lib.suffix import remove_suffix
+from . import bestref_cache
+from .perf_report import PerfRecord, write_report
+from .step_cache import StepCache, hash_model
 
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
+# Parameters that do not change the result of a step
+_UNCACHED_PARS = (
+    'pre_hooks', 'post_hooks', 'output_file', 'output_dir', 'output_ext',
+    'output_use_model', 'output_use_index', 'save_results', 'suffix',
+    'search_output_file', 'input_dir', 'step_cache_dir', 'step_cache_size',
+    'perf_report',
+)
+
 
 class JwstStep(Step):
 
     spec = """
     output_ext = string(default='.fits')  # Output file type
+    step_cache_dir = string(default=None)  # Directory caching step results, or None for no caching
+    step_cache_size = float(default=10.0)  # Maximum size of the step result cache, in GB
+    perf_report = boolean(default=False)  # Write a JSON report of the time and resources used by each step
     """
 
+    # Parameters, besides the ``save_*`` flags and output file names, that
+    # make the step write files besides its result when set
+    side_product_pars = ()
+
     @classmethod
     def _datamodels_open(cls, init, **kwargs):
         return datamodels.open(init, **kwargs)
@@ -79,7 +102,14 @@ class JwstStep(Step):
         return asn
 
     def finalize_result(self, result, reference_files_used):
+        record = getattr(self, '_perf_record', None)
+        if record is not None:
+            record.reference_files = len(reference_files_used)
+
         if isinstance(result, JwstDataModel):
+            if get_dtype_policy(self) == 'float32':
+                cast_float32(result)
+
             result.meta.calibration_software_revision = __version_commit__ or 'RELEASE'
             result.meta.calibration_software_version = __version__
 
@@ -96,13 +126,202 @@ class JwstStep(Step):
     def remove_suffix(self, name):
         return remove_suffix(name)
 
+    def get_step_cache(self):
+        """Get the cache of step results, if enabled.
+
+        A step uses its own ``step_cache_dir`` if set, and otherwise that of
+        its pipeline.
+
+        Returns
+        -------
+        cache : `~jwst.stpipe.step_cache.StepCache` or None
+            The cache, or None if results are not cached.
+        """
+        for obj in (self, self.parent):
+            cache_dir = getattr(obj, 'step_cache_dir', None)
+            if cache_dir is not None:
+                return StepCache(cache_dir, max_size=obj.step_cache_size * 1024**3)
+        return None
+
+    def step_cache_key(self, *args, **kwargs):
+        """Make the key identifying the result of running the step.
+
+        The key is a hash of the input data, the parameters of the step,
+        the reference files it would use, and the jwst version.
+
+        Parameters naming existing files are identified by the file
+        modification time and size, as well as its path.
+
+        Returns
+        -------
+        key : str or None
+            The key, or None if the result can not be cached: the step is
+            a pipeline, is skipped, has hooks or saves products besides its
+            result, or its input is not a single data model or FITS or ASDF
+            file.
+        """
+        if isinstance(self, Pipeline) or self.skip or self.pre_hooks or self.post_hooks:
+            return None
+        if self.saves_side_products():
+            # A cached result would skip writing them
+            return None
+        if len(args) != 1 or kwargs:
+            return None
+
+        input_data = args[0]
+        if isinstance(input_data, JwstDataModel):
+            input_id = hash_model(input_data)
+        elif (isinstance(input_data, (str, os.PathLike))
+              and os.path.splitext(input_data)[1] in ('.fits', '.asdf')
+              and os.path.isfile(input_data)):
+            input_id = _file_id(input_data)
+        else:
+            input_id = None
+        if input_id is None:
+            return None
+
+        parameters = {}
+        for name, value in self.get_pars(full_spec=True).items():
+            if name in _UNCACHED_PARS:
+                continue
+            if isinstance(value, str) and value and os.path.isfile(value):
+                value = _file_id(value)
+            parameters[name] = value
+        parameters['dtype_policy'] = get_dtype_policy(self)
+
+        # Resolve the reference files without recording them as used
+        reference_files_used = list(self._reference_files_used)
+        reference_files = []
+        try:
+            for reftype in self.reference_file_types:
+                override = self.get_ref_override(reftype)
+                if override is None:
+                    try:
+                        filename = os.path.basename(self.get_reference_file(input_data, reftype))
+                    except CrdsLookupError:
+                        filename = 'N/A'
+                elif isinstance(override, (str, os.PathLike)):
+                    filename = _file_id(override) if os.path.isfile(override) else str(override)
+                else:
+                    # reference data models given directly
+                    return None
+                reference_files.append((reftype, filename))
+        except Exception as err:
+            log.debug(f"Results of {self.name} not cached: {err}")
+            return None
+        finally:
+            self._reference_files_used = reference_files_used
+
+        step_class = f"{type(self).__module__}.{type(self).__qualname__}"
+        version = f"{__version__}+{__version_commit__}"
+        return StepCache.make_key(step_class, input_id, parameters, reference_files, version)
+
+    def saves_side_products(self):
+        """Whether the step is set to write files besides its result.
+
+        These are requested by the ``save_*`` parameters, other than
+        ``save_results``, the parameters of type ``output_file``, and those
+        listed in ``side_product_pars``.
+        """
+        spec = self.load_spec_file()
+        for name, value in self.get_pars(full_spec=True).items():
+            if name in _UNCACHED_PARS or not value:
+                continue
+            if (name.startswith('save_') or name in self.side_product_pars
+                    or str(spec.get(name, '')).startswith('output_file')):
+                return True
+        return False
+
+    def get_reference_file(self, input_file, reference_file_type):
+        """Get a reference file from CRDS.
+
+        As `stpipe.Step.get_reference_file`, but best references found in
+        CRDS are remembered for the life of the process; see
+        `~jwst.stpipe.bestref_cache`.
+        """
+        if self.get_ref_override(reference_file_type) is not None:
+            return super().get_reference_file(input_file, reference_file_type)
+
+        def lookup():
+            reference_file = super(JwstStep, self).get_reference_file(input_file, reference_file_type)
+            return reference_file, self._reference_files_used[-1]
+
+        with self.open_model(input_file) as model:
+            parameters = model.get_crds_parameters()
+            observatory = model.crds_observatory
+        nused = len(self._reference_files_used)
+        reference_file, used = bestref_cache.get_reference_file(
+            parameters, reference_file_type, observatory, lookup)
+        # Found in the cache: record the reference as stpipe did when it was looked up
+        if len(self._reference_files_used) == nused:
+            self._reference_files_used.append(used)
+            crds_client.check_reference_open(reference_file)
+        return reference_file
+
     @wraps(Step.run)
     def run(self, *args, **kwargs):
-        result = super().run(*args, **kwargs)
+        bestref_stats = dict(bestref_cache.bestref_cache_stats)
+
+        # Record the resources used if requested for this step or its pipeline
+        parent_record = getattr(self.parent, '_perf_record', None)
+        record = None
+        if self.perf_report or parent_record is not None:
+            record = PerfRecord(self.name, type(self).__name__)
+        self._perf_record = record
+
+        try:
+            cache = self.get_step_cache()
+            key = self.step_cache_key(*args, **kwargs) if cache is not None else None
+            result = cache.get(key) if key is not None else None
+            if result is not None:
+                self.log.info(f"Step {self.name} result loaded from the step cache")
+                if record is not None:
+                    record.cached = True
+                if self.save_results:
+                    self.save_model(result)
+            else:
+                result = super().run(*args, **kwargs)
+                if key is not None:
+                    cache.put(key, result)
+        finally:
+            self._perf_record = None
+            if record is not None:
+                record.stop()
+                if parent_record is not None:
+                    parent_record.steps.append(record)
+
+        if record is not None and parent_record is None:
+            self.write_perf_report(record, result)
         if not self.parent:
+            hits, misses = (bestref_cache.bestref_cache_stats[name] - bestref_stats[name]
+                            for name in ('hits', 'misses'))
+            if hits + misses > 0:
+                log.info(f"Best reference lookups: {hits + misses}, "
+                         f"{100 * hits / (hits + misses):.0f}% found in the cache")
             log.info(f"Results used jwst version: {__version__}")
         return result
 
+    def write_perf_report(self, record, result):
+        """Write the performance report next to the products.
+
+        Parameters
+        ----------
+        record : `~jwst.stpipe.perf_report.PerfRecord`
+            The record of this step and its substeps.
+
+        result : object
+            The result of the step, used to name the report.
+        """
+        if isinstance(result, Sequence) and len(result) > 0:
+            result = result[0]
+        basepath = result.meta.filename if isinstance(result, JwstDataModel) else None
+        try:
+            path = self.make_output_path(basepath=basepath, suffix='perf', ext='json')
+        except Exception:
+            path = self.make_output_path(basepath=self.name, suffix='perf', ext='json')
+        write_report(record, path)
+        self.log.info(f"Performance report written to {path}")
+
     @wraps(Step.__call__)
     def __call__(self, *args, **kwargs):
         if not self.parent:
@@ -117,10 +336,35 @@ class JwstStep(Step):
         return super().__call__(*args, **kwargs)
 
 
+def _file_id(path):
+    """Identify a file by its path, modification time and size."""
+    stat = os.stat(path)
+    return repr((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+
+
 # JwstPipeline needs to inherit from Pipeline, but also
 # be a subclass of JwstStep so that it will pass checks
 # when constructing a pipeline using JwstStep class methods.
 class JwstPipeline(Pipeline, JwstStep):
     def finalize_result(self, result, reference_files_used):
+        record = getattr(self, '_perf_record', None)
+        if record is not None:
+            record.reference_files = len(reference_files_used)
+
         if isinstance(result, JwstDataModel):
             log.info(f"Results used CRDS context: {crds_client.get_context_used(result.crds_observatory)}")
+
+    def _precache_references_impl(self, model):
+        """Find and cache the reference files of all steps for ``model``.
+
+        As `stpipe.Pipeline._precache_references_impl`, skipped when the best
+        references of all types were already found for the steps; see
+        `~jwst.stpipe.bestref_cache`.
+        """
+        fetch_types = [reftype for reftype in self.reference_file_types
+                       if self.get_ref_override(reftype) is None]
+        if fetch_types and bestref_cache.has_references(
+                model.get_crds_parameters(), fetch_types, model.crds_observatory):
+            self.log.info(f"Reference files for dataset {model.meta.filename!r} already found")
+            return
+        super()._precache_references_impl(model)
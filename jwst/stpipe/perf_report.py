@@ -0,0 +1,152 @@
+"""
+Time and resources used by steps and pipelines.
+
+When the ``perf_report`` parameter of a step or pipeline is set, each step
+run records its wall and CPU time, the increase of the peak resident
+memory of the process, the bytes read and written, and the number of
+reference files used. The records of steps run by a pipeline are nested
+in the record of the pipeline, and the whole tree is written as a JSON file
+next to the products.
+"""
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from jwst import __version__
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ["PerfRecord", "resource_usage", "write_report"]
+
+
+def _max_rss():
+    """Peak resident memory of the process, in bytes."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def _io_counters():
+    """Bytes read and written by the process."""
+    try:
+        with open('/proc/self/io') as io_file:
+            counters = dict(line.split(':') for line in io_file)
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        pass
+    if resource is None:
+        return None, None
+    # Only blocks actually read from or written to disk, in 512 byte units
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_inblock * 512, usage.ru_oublock * 512
+
+
+def resource_usage():
+    """Snapshot of the resources used by the process so far.
+
+    Returns
+    -------
+    usage : dict
+        Wall clock and CPU times in seconds, peak resident memory and
+        bytes read and written; None where not available on the platform.
+    """
+    read_bytes, write_bytes = _io_counters()
+    return {
+        'wall_time': time.perf_counter(),
+        'cpu_time': time.process_time(),
+        'max_rss': _max_rss(),
+        'read_bytes': read_bytes,
+        'write_bytes': write_bytes,
+    }
+
+
+def _difference(end, start):
+    if end is None or start is None:
+        return None
+    return end - start
+
+
+class PerfRecord:
+    """
+    Time and resources used by one run of a step.
+
+    The measurement starts when the record is created and ends with `stop`.
+
+    Parameters
+    ----------
+    name : str
+        Name of the step.
+
+    step_class : str
+        Class of the step.
+    """
+
+    def __init__(self, name, step_class):
+        self.name = name
+        self.step_class = step_class
+        self.reference_files = 0
+        self.cached = False
+        self.steps = []
+        self.metrics = {}
+        self._start = resource_usage()
+
+    def stop(self):
+        """End the measurement."""
+        end = resource_usage()
+        self.metrics = {
+            'wall_time': end['wall_time'] - self._start['wall_time'],
+            'cpu_time': end['cpu_time'] - self._start['cpu_time'],
+            # increase of the high-water mark, not of the current memory
+            'peak_rss_delta': _difference(end['max_rss'], self._start['max_rss']),
+            'read_bytes': _difference(end['read_bytes'], self._start['read_bytes']),
+            'write_bytes': _difference(end['write_bytes'], self._start['write_bytes']),
+        }
+        log.debug(f"Step {self.name} took {self.metrics['wall_time']:.2f} s, "
+                  f"{self.metrics['cpu_time']:.2f} s of CPU time")
+
+    def to_dict(self):
+        """The record and those of its substeps, as a dict."""
+        return {
+            'name': self.name,
+            'class': self.step_class,
+            **self.metrics,
+            'reference_files': self.reference_files,
+            'cached': self.cached,
+            'steps': [step.to_dict() for step in self.steps],
+        }
+
+
+def write_report(record, path):
+    """Write the record of a step or pipeline run as a JSON file.
+
+    Parameters
+    ----------
+    record : `PerfRecord`
+        The record of the top-level step.
+
+    path : str
+        Path of the report.
+    """
+    report = {
+        'jwst_version': __version__,
+        'python_version': platform.python_version(),
+        'host': platform.node(),
+        'cpu_count': os.cpu_count(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'units': {'time': 's', 'memory': 'bytes', 'io': 'bytes'},
+        'run': record.to_dict(),
+    }
+    with open(path, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
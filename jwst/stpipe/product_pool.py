@@ -0,0 +1,204 @@
+"""
+Process the products of an association in parallel processes.
+
+Level 2 pipelines process each product of their association independently.
+`process_products` runs them in forked worker processes, at most
+``ncores`` at a time and, optionally, within a memory budget shared by the
+products in progress. Each worker returns its result through a temporary
+file, which the main process reads back into memory; the results are
+returned in the order of the products, whatever the order in which they
+complete.
+
+Forking is required, since the products are processed by functions of the
+pipeline that are not pickled. Forking a process running other threads
+may leave locks held by those threads locked in the worker, so it is only
+done when the main process runs a single thread. Otherwise, where forking
+is not available, or with one core, the products are processed one at a
+time in the main process.
+"""
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import traceback
+from multiprocessing.connection import wait
+
+from stdatamodels.jwst import datamodels
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ["PRODUCT_MEMORY_FACTOR", "estimate_product_memory", "process_products"]
+
+# Memory used to process a product, relative to the size of its input files
+PRODUCT_MEMORY_FACTOR = 8
+
+
+def estimate_product_memory(product):
+    """
+    Estimate the memory needed to process a product.
+
+    Parameters
+    ----------
+    product : dict
+        A Level 2 association product.
+
+    Returns
+    -------
+    nbytes : int
+        `PRODUCT_MEMORY_FACTOR` times the size of the member files, or of
+        the arrays of the member models.
+    """
+    nbytes = 0
+    for member in product['members']:
+        expname = member['expname']
+        if isinstance(expname, datamodels.JwstDataModel):
+            nbytes += sum(array.nbytes for array in expname.instance.values()
+                          if hasattr(array, 'nbytes'))
+        elif isinstance(expname, (str, os.PathLike)) and os.path.isfile(expname):
+            nbytes += os.path.getsize(expname)
+    return PRODUCT_MEMORY_FACTOR * nbytes
+
+
+def _run_product(process, result_path, connection):
+    """Process one product in a worker process and report the outcome."""
+    try:
+        result = process()
+        if isinstance(result, datamodels.JwstDataModel):
+            filename = result.meta.filename
+            result.save(result_path)
+            outcome = ('ok', result_path, filename, None)
+        else:
+            outcome = ('ok', None, None, None)
+    except BaseException as err:
+        outcome = ('error', err, None, traceback.format_exc())
+    try:
+        connection.send(outcome)
+    except Exception:
+        # the exception can not be pickled
+        error = RuntimeError(f"{type(outcome[1]).__name__}: {outcome[1]}")
+        connection.send(('error', error, None, outcome[3]))
+    connection.close()
+
+
+def _open_result(path, filename):
+    """Read a result into memory, so that its file can be removed."""
+    with datamodels.open(path) as model:
+        result = model.copy()
+    result.meta.filename = filename
+    return result
+
+
+def _process_serial(processes):
+    """Process the products one at a time in the main process."""
+    outcomes = []
+    for process in processes:
+        try:
+            outcomes.append((process(), None, None))
+        except Exception as err:
+            outcomes.append((None, err, traceback.format_exc()))
+    return outcomes
+
+
+def process_products(processes, ncores=1, memory_budget=None, estimates=None):
+    """
+    Process products in parallel worker processes.
+
+    Parameters
+    ----------
+    processes : list of callable
+        Functions processing one product each, without arguments, and
+        returning a data model or None. Each is run in a process forked
+        when it starts, so it sees the state of the main process at that
+        time. They are run in the main process instead if it runs other
+        threads.
+
+    ncores : int
+        Maximum number of products processed at the same time.
+
+    memory_budget : float, optional
+        Maximum total memory, in bytes, of the products processed at the
+        same time, according to ``estimates``. A product is started alone
+        if it does not fit.
+
+    estimates : list of int, optional
+        Memory needed by each product, in bytes.
+
+    Returns
+    -------
+    outcomes : list of tuple
+        For each product, in order, ``(result, None, None)`` or, if it
+        failed, ``(None, exception, traceback)``, with the traceback as text.
+    """
+    if ncores <= 1 or len(processes) <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return _process_serial(processes)
+
+    threads = [thread.name for thread in threading.enumerate()
+               if thread is not threading.current_thread()]
+    if threads:
+        log.warning(f"Processing the products one at a time: forking is not safe "
+                    f"while other threads run ({', '.join(threads)})")
+        return _process_serial(processes)
+
+    if estimates is None or memory_budget is None:
+        estimates = [0] * len(processes)
+        memory_budget = None
+    context = multiprocessing.get_context('fork')
+    outcomes = [None] * len(processes)
+    pending = list(range(len(processes)))
+    running = {}
+
+    with tempfile.TemporaryDirectory(prefix='jwst_products_') as temp_dir:
+        while pending or running:
+            # Start the next products, in order, while cores and memory allow
+            while pending and len(running) < ncores:
+                index = pending[0]
+                in_use = sum(estimates[i] for i in running)
+                if (running and memory_budget is not None
+                        and in_use + estimates[index] > memory_budget):
+                    break
+                pending.pop(0)
+                receiver, sender = context.Pipe(duplex=False)
+                worker = context.Process(
+                    target=_run_product,
+                    args=(processes[index], os.path.join(temp_dir, f"product_{index}.fits"),
+                          sender),
+                )
+                worker.start()
+                sender.close()
+                running[index] = (worker, receiver, [])
+                log.debug(f"Started product {index + 1} of {len(processes)} (pid {worker.pid})")
+
+            # Read the outcomes as they come, so that no worker blocks on a full pipe
+            wait([worker.sentinel for worker, _, _ in running.values()]
+                 + [receiver for _, receiver, received in running.values() if not received])
+            for index, (worker, receiver, received) in list(running.items()):
+                if not received and receiver.poll():
+                    try:
+                        received.append(receiver.recv())
+                    except EOFError:
+                        received.append(None)
+                if worker.is_alive():
+                    continue
+                worker.join()
+                if not received and receiver.poll():
+                    try:
+                        received.append(receiver.recv())
+                    except EOFError:
+                        pass
+                receiver.close()
+                del running[index]
+
+                outcome = received[0] if received else None
+                if outcome is None:
+                    error = RuntimeError(f"Worker processing product {index + 1} exited "
+                                         f"with code {worker.exitcode}")
+                    outcomes[index] = (None, error, str(error))
+                elif outcome[0] == 'error':
+                    outcomes[index] = (None, outcome[1], outcome[3])
+                elif outcome[1] is None:
+                    outcomes[index] = (None, None, None)
+                else:
+                    outcomes[index] = (_open_result(outcome[1], outcome[2]), None, None)
+    return outcomes
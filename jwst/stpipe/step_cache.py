@@ -0,0 +1,244 @@
+#
+#  On-disk cache of step results
+#
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+
+import numpy as np
+from stdatamodels.jwst import datamodels
+from stdatamodels.jwst.datamodels import JwstDataModel
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+__all__ = ["StepCache", "hash_model"]
+
+# Metadata that changes without the data changing
+_VOLATILE_META = ("date",)
+
+# Entries added to the tree by ASDF when a model is read from a file
+_ASDF_ENTRIES = ("asdf_library", "history")
+
+
+def _update_hash(digest, value, path=()):
+    """Add a node of a model tree to a hash, returning False if not hashable."""
+    if isinstance(value, dict):
+        for key in sorted(value, key=str):
+            if path == ("meta",) and key in _VOLATILE_META:
+                continue
+            if path == () and key in _ASDF_ENTRIES:
+                continue
+            digest.update(repr(key).encode())
+            if not _update_hash(digest, value[key], path + (key,)):
+                return False
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            if not _update_hash(digest, item, path):
+                return False
+    elif isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype.str}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).view(np.uint8).data)
+    elif value is None or isinstance(value, (str, bytes, bool, int, float, np.generic)):
+        digest.update(repr(value).encode())
+    else:
+        # e.g. WCS objects and tables
+        try:
+            digest.update(pickle.dumps(value, protocol=4))
+        except Exception:
+            return False
+    return True
+
+
+def hash_model(model):
+    """Hash the contents of a data model.
+
+    The creation date of the model and the ASDF library and history
+    entries are not included, so that a model has the same hash whether
+    it is computed again or read back from a file.
+
+    Parameters
+    ----------
+    model : `~jwst.datamodels.JwstDataModel`
+        The model to hash.
+
+    Returns
+    -------
+    digest : str or None
+        Hexadecimal digest, or None if the model contains objects that
+        can not be hashed.
+    """
+    digest = hashlib.sha1(type(model).__name__.encode(), usedforsecurity=False)
+    if not _update_hash(digest, model.instance):
+        return None
+    return digest.hexdigest()
+
+
+class StepCache:
+    """
+    Directory of step results, keyed by the step inputs.
+
+    Each entry holds the result of running a step, saved as an ASDF file,
+    for one combination of step class, input data, step parameters,
+    reference files and jwst version. When the total size of the entries
+    exceeds ``max_size``, the least recently used ones are removed.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding the cached results; created if needed.
+
+    max_size : float
+        Maximum total size of the cached results, in bytes.
+    """
+
+    suffix = '_stepresult'
+
+    def __init__(self, cache_dir, max_size=10 * 1024**3):
+        self.cache_dir = os.path.expanduser(os.path.expandvars(cache_dir))
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(step_class, input_id, parameters, reference_files, version):
+        """Make the cache key for a step result.
+
+        Parameters
+        ----------
+        step_class : str
+            Full name of the step class.
+
+        input_id : str
+            Identifier of the input data, such as from `hash_model`.
+
+        parameters : dict
+            Step parameters affecting the result.
+
+        reference_files : list of tuple
+            Reference file types and the files resolved for them.
+
+        version : str
+            Version of the software.
+
+        Returns
+        -------
+        key : str
+            Key usable as a directory name.
+        """
+        ident = (step_class, input_id, sorted(parameters.items()),
+                 sorted(reference_files), version)
+        digest = hashlib.sha1(repr(ident).encode(), usedforsecurity=False).hexdigest()
+        return f'{step_class.split(".")[-1]}_{digest}'
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def get(self, key):
+        """Retrieve a cached step result.
+
+        Parameters
+        ----------
+        key : str
+            Key from `make_key`.
+
+        Returns
+        -------
+        result : `~jwst.datamodels.JwstDataModel` or None
+            The cached result, or None if not found or unreadable.
+        """
+        path = self._path(key)
+        if not os.path.isdir(path):
+            log.debug('No cached result for %s', key)
+            return None
+        try:
+            with open(os.path.join(path, 'info.json')) as info_file:
+                info = json.load(info_file)
+            model_class = getattr(datamodels, info['model_type'])
+            with model_class(os.path.join(path, 'result.asdf')) as cached:
+                result = cached.copy()
+        except Exception as err:
+            log.warning('Could not read cached result %s: %s', path, err)
+            return None
+        result.meta.filename = info['filename']
+
+        # mark as recently used
+        os.utime(path)
+        log.info('Using cached result %s', path)
+        return result
+
+    def put(self, key, result):
+        """Store a step result in the cache, evicting old entries as needed.
+
+        Parameters
+        ----------
+        key : str
+            Key from `make_key`.
+
+        result : `~jwst.datamodels.JwstDataModel`
+            The step result. It is not modified.
+        """
+        if not isinstance(result, JwstDataModel):
+            return
+        path = self._path(key)
+
+        # write to a temporary directory first so that concurrent readers
+        # never see a partial entry
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        os.makedirs(tmp_path, exist_ok=True)
+        try:
+            # to_asdf, unlike save, leaves the file name and date as they are
+            result.to_asdf(os.path.join(tmp_path, 'result.asdf'))
+        except Exception as err:
+            log.warning('Could not cache result of type %s: %s', type(result).__name__, err)
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+        with open(os.path.join(tmp_path, 'info.json'), 'w') as info_file:
+            json.dump({'model_type': type(result).__name__,
+                       'filename': result.meta.filename}, info_file)
+
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Written by another process in the meantime
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+        log.info('Cached result written as %s', path)
+        self.evict()
+
+    def entries(self):
+        """List the cached results, least recently used first."""
+        paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                 if name.endswith(self.suffix)]
+        return sorted(paths, key=os.path.getmtime)
+
+    @staticmethod
+    def entry_size(path):
+        """Size of a cached result, in bytes."""
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+    def size(self):
+        """Total size of the cached results, in bytes."""
+        return sum(self.entry_size(path) for path in self.entries())
+
+    def evict(self):
+        """Remove the least recently used results until within ``max_size``."""
+        paths = self.entries()
+        sizes = [self.entry_size(path) for path in paths]
+        total = sum(sizes)
+        for path, size in zip(paths, sizes):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            log.debug('Evicted cached result %s', path)
+
+    def clear(self):
+        """Remove all cached results."""
+        for path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,134 @@
+"""Test running a pipeline on a batch of associations"""
+import json
+import os
+import time
+
+import pytest
+from stdatamodels.jwst import datamodels
+
+from jwst.scripts import strun_batch
+from jwst.stpipe import Step
+from jwst.stpipe.batch import prefetch_references, run_batch, write_summary
+
+
+class AsnStep(Step):
+    """Act on an association as its "action" entry says"""
+
+    spec = """
+    suffix = string(default='done')
+    """
+
+    def process(self, asn_file):
+        with open(asn_file) as asn:
+            action = json.load(asn)['action']
+        self.log.info(f"Action is {action}")
+        if action == 'fail':
+            raise ValueError('bad association')
+        if action == 'sleep':
+            time.sleep(60)
+        if action == 'crash':
+            os._exit(3)
+        output_dir = self.output_dir or os.path.dirname(asn_file)
+        output = os.path.join(output_dir, f"{os.path.basename(asn_file)}.{self.suffix}")
+        with open(output, 'w') as output_file:
+            output_file.write(action)
+
+
+class PrefetchStep(Step):
+    """Record the models whose references are prefetched"""
+
+    prefetch_references = True
+    prefetched = []
+
+    def _precache_references_impl(self, model):
+        PrefetchStep.prefetched.append(model.meta.filename)
+
+
+@pytest.fixture(autouse=True)
+def no_crds_steppars(monkeypatch):
+    monkeypatch.setenv('STPIPE_DISABLE_CRDS_STEPPARS', 'true')
+
+
+def _write_asns(path, actions):
+    asn_files = []
+    for i, action in enumerate(actions):
+        asn_file = str(path / f"asn{i}.json")
+        with open(asn_file, 'w') as asn:
+            json.dump({'action': action}, asn)
+        asn_files.append(asn_file)
+    return asn_files
+
+
+def test_run_batch(tmp_path):
+    asn_files = _write_asns(tmp_path, ['ok', 'fail', 'crash', 'ok'])
+    log_dir = tmp_path / 'logs'
+    log_dir.mkdir()
+
+    jobs = run_batch(AsnStep, asn_files, options={'suffix': 'out'}, nproc=2,
+                     log_dir=str(log_dir), prefetch=False)
+
+    assert [job.asn_file for job in jobs] == asn_files
+    assert [job.status for job in jobs] == ['ok', 'failed', 'crashed', 'ok']
+    assert 'bad association' in jobs[1].error
+    assert jobs[2].exitcode == 3
+    assert (tmp_path / 'asn0.json.out').read_text() == 'ok'
+    assert (tmp_path / 'asn3.json.out').exists()
+    assert 'Action is fail' in (log_dir / 'asn1.log').read_text()
+
+    summary_file = tmp_path / 'summary.json'
+    write_summary(jobs, str(summary_file), AsnStep)
+    summary = json.loads(summary_file.read_text())
+    assert summary['counts'] == {'ok': 2, 'failed': 1, 'crashed': 1}
+    assert summary['pipeline'].endswith('test_batch.AsnStep')
+    assert summary['jobs'][0]['status'] == 'ok'
+
+
+def test_run_batch_timeout(tmp_path):
+    asn_files = _write_asns(tmp_path, ['sleep', 'ok'])
+
+    start = time.perf_counter()
+    jobs = run_batch(AsnStep, asn_files, nproc=2, timeout=2, prefetch=False)
+
+    assert [job.status for job in jobs] == ['timeout', 'ok']
+    assert time.perf_counter() - start < 30
+
+
+def test_prefetch_references(tmp_path):
+    for name in ['sci1', 'sci2', 'bkg']:
+        model = datamodels.ImageModel((2, 2))
+        model.meta.filename = f'{name}_rate.fits'
+        model.save(str(tmp_path / model.meta.filename))
+    products = [
+        {'name': name, 'members': [{'expname': f'{name}_rate.fits', 'exptype': 'science'},
+                                   {'expname': 'bkg_rate.fits', 'exptype': 'background'}]}
+        for name in ['sci1', 'sci2']
+    ]
+    asn_file = tmp_path / 'spec2_asn.json'
+    asn_file.write_text(json.dumps({
+        'asn_type': 'spec2', 'asn_rule': 'DMSLevel2bBase', 'asn_id': 'a', 'asn_pool': 'pool',
+        'products': products,
+    }))
+
+    PrefetchStep.prefetched = []
+    prefetch_references(PrefetchStep, str(asn_file))
+
+    # every member, once
+    assert PrefetchStep.prefetched == ['sci1_rate.fits', 'bkg_rate.fits', 'sci2_rate.fits']
+
+
+def test_strun_batch(tmp_path, capsys):
+    asn_files = _write_asns(tmp_path, ['ok', 'ok', 'fail'])
+    asn_list = tmp_path / 'asns.txt'
+    asn_list.write_text('\n'.join(asn_files[1:]) + '\n')
+    output_dir = tmp_path / 'out'
+
+    status = strun_batch.main([
+        'jwst.stpipe.tests.test_batch.AsnStep', asn_files[0], '--asn-list', str(asn_list),
+        '--output-dir', str(output_dir), '--nproc', '2', '--no-prefetch',
+        '--summary', str(tmp_path / 'summary.json'),
+    ])
+
+    assert status == 1
+    assert sorted(os.listdir(output_dir)) == ['asn0.json.done', 'asn1.json.done']
+    assert '2 of 3 associations processed' in capsys.readouterr().out
+    assert json.loads((tmp_path / 'summary.json').read_text())['counts'] == {'ok': 2, 'failed': 1}
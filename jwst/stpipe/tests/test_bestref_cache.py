@@ -0,0 +1,139 @@
+"""Test the memoized best reference lookups"""
+import pytest
+from stdatamodels.jwst import datamodels
+from stpipe import crds_client
+
+from jwst.stpipe import Pipeline, Step, bestref_cache
+
+
+class FlatRefStep(Step):
+    """Look up the flat reference file"""
+
+    reference_file_types = ['flat']
+
+    def process(self, input):
+        self.flat = self.get_reference_file(input, 'flat')
+        return input
+
+
+class FlatRefPipeline(Pipeline):
+    """Run the flat reference lookup step"""
+
+    step_defs = {'flat_ref': FlatRefStep}
+
+    def process(self, input):
+        return self.flat_ref.run(input)
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Record the CRDS best reference lookups, selecting on the detector only."""
+    calls = []
+
+    def get_multiple_reference_paths(parameters, reftypes, observatory):
+        calls.append(list(reftypes))
+        detector = parameters['meta.instrument.detector'].lower()
+        return {reftype: f'/crds/jwst_{detector}_{reftype}.fits' for reftype in reftypes}
+
+    def selection_parameters(parameters, reftype, context):
+        return {'META.INSTRUMENT.DETECTOR': parameters['meta.instrument.detector']}
+
+    monkeypatch.setattr(crds_client, 'get_multiple_reference_paths', get_multiple_reference_paths)
+    monkeypatch.setattr(crds_client, 'get_context_used', lambda observatory: 'jwst_0001.pmap')
+    monkeypatch.setattr(crds_client, 'check_reference_open', lambda name: name)
+    monkeypatch.setattr(bestref_cache, '_selection_parameters', selection_parameters)
+    bestref_cache.clear_bestref_cache()
+    yield calls
+    bestref_cache.clear_bestref_cache()
+
+
+def _parameters(detector, filename):
+    return {'meta.instrument.detector': detector, 'meta.filename': filename}
+
+
+def _get_reference_file(detector, filename, reftype):
+    parameters = _parameters(detector, filename)
+    return bestref_cache.get_reference_file(
+        parameters, reftype, 'jwst',
+        lambda: crds_client.get_reference_file(parameters, reftype, 'jwst'))
+
+
+def test_get_reference_file(lookups):
+    assert _get_reference_file('NRCA1', 'a.fits', 'flat') == '/crds/jwst_nrca1_flat.fits'
+    assert _get_reference_file('NRCA1', 'a.fits', 'dark') == '/crds/jwst_nrca1_dark.fits'
+
+    # only the parameters selected on are part of the key
+    assert _get_reference_file('NRCA1', 'b.fits', 'flat') == '/crds/jwst_nrca1_flat.fits'
+    assert _get_reference_file('NRCA2', 'a.fits', 'flat') == '/crds/jwst_nrca2_flat.fits'
+    assert lookups == [['flat'], ['dark'], ['flat']]
+    assert bestref_cache.bestref_cache_stats == {'hits': 1, 'misses': 3}
+
+    assert bestref_cache.has_references(_parameters('NRCA1', 'c.fits'), ['flat', 'dark'], 'jwst')
+    assert not bestref_cache.has_references(_parameters('NRCA2', 'c.fits'), ['flat', 'dark'], 'jwst')
+
+    bestref_cache.clear_bestref_cache()
+    assert bestref_cache.bestref_cache_stats == {'hits': 0, 'misses': 0}
+    _get_reference_file('NRCA1', 'a.fits', 'flat')
+    assert len(lookups) == 4
+
+
+def test_context_change(lookups, monkeypatch):
+    _get_reference_file('NRCA1', 'a.fits', 'flat')
+    monkeypatch.setattr(crds_client, 'get_context_used', lambda observatory: 'jwst_0002.pmap')
+    _get_reference_file('NRCA1', 'a.fits', 'flat')
+    assert len(lookups) == 2
+
+
+def test_cache_size(lookups, monkeypatch):
+    monkeypatch.setattr(bestref_cache, 'BESTREF_CACHE_SIZE', 1)
+    for detector in ('NRCA1', 'NRCA2', 'NRCA1'):
+        _get_reference_file(detector, 'a.fits', 'flat')
+    assert len(lookups) == 3
+
+    monkeypatch.setattr(bestref_cache, 'BESTREF_CACHE_SIZE', 0)
+    bestref_cache.clear_bestref_cache()
+    for _ in range(2):
+        _get_reference_file('NRCA1', 'a.fits', 'flat')
+    assert len(lookups) == 5
+    assert bestref_cache.bestref_cache_stats == {'hits': 0, 'misses': 0}
+    assert not bestref_cache.has_references(_parameters('NRCA1', 'a.fits'), ['flat'], 'jwst')
+
+
+def test_selection_parameters_unknown_context():
+    parameters = _parameters('NRCA1', 'a.fits')
+    assert bestref_cache._selection_parameters(parameters, 'flat',
+                                               'jwst_nonexistent.pmap') == parameters
+
+
+def test_step_get_reference_file(lookups, caplog):
+    model = datamodels.ImageModel((4, 4))
+    model.meta.instrument.name = 'NIRCAM'
+    model.meta.instrument.detector = 'NRCA1'
+    step = FlatRefStep()
+    for _ in range(3):
+        result = step.run(model)
+    assert step.flat == '/crds/jwst_nrca1_flat.fits'
+    assert len(lookups) == 1
+    assert result.meta.ref_file.flat.name == 'crds://jwst_nrca1_flat.fits'
+    assert 'Best reference lookups: 1, 100% found in the cache' in caplog.text
+
+    # overrides are not looked up
+    step = FlatRefStep(override_flat='my_flat.fits')
+    step.run(model)
+    assert step.flat.endswith('my_flat.fits')
+    assert len(lookups) == 1
+
+
+def test_pipeline_prefetch(lookups, caplog):
+    model = datamodels.ImageModel((4, 4))
+    model.meta.instrument.name = 'NIRCAM'
+    model.meta.instrument.detector = 'NRCA1'
+    FlatRefPipeline().run(model)
+    assert lookups == [['flat'], ['flat']]
+
+    # the prefetch is skipped once the step found its reference
+    pipeline = FlatRefPipeline()
+    pipeline.run(model)
+    assert pipeline.flat_ref.flat == '/crds/jwst_nrca1_flat.fits'
+    assert len(lookups) == 2
+    assert "already found" in caplog.text
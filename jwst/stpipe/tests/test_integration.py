@@ -7,6 +7,13 @@ from jwst.stpipe.utilities import NON_STEPS
 import jwst.pipeline
 import jwst.step
 
+# The steps and pipelines are imported on first access; import them all so
+# that they show up as subclasses of Step
+for _name in jwst.step.__all__:
+    getattr(jwst.step, _name)
+for _name in jwst.pipeline.__all__:
+    getattr(jwst.pipeline, _name)
+
 
 def test_get_steps():
     tuples = get_steps()
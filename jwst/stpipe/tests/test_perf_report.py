@@ -0,0 +1,76 @@
+"""Test the step performance reports"""
+import json
+
+import numpy as np
+import pytest
+from stdatamodels.jwst import datamodels
+
+from jwst.stpipe import Pipeline, Step
+from jwst.stpipe.perf_report import PerfRecord, resource_usage
+
+METRICS = ['wall_time', 'cpu_time', 'peak_rss_delta', 'read_bytes', 'write_bytes']
+
+
+class AllocateStep(Step):
+    """Allocate memory and return a copy of the input"""
+
+    def process(self, input):
+        result = input.copy()
+        result.data = result.data + np.ones((1000, 1000), dtype=np.float32).sum()
+        return result
+
+
+class AllocatePipeline(Pipeline):
+    """Run AllocateStep twice"""
+
+    step_defs = {'first': AllocateStep, 'second': AllocateStep}
+
+    def process(self, input):
+        result = self.first.run(input)
+        return self.second.run(result)
+
+
+@pytest.fixture
+def image():
+    model = datamodels.ImageModel(np.zeros((4, 5), dtype=np.float32))
+    model.meta.filename = 'test_rate.fits'
+    return model
+
+
+def test_perf_record():
+    start = resource_usage()
+    assert start['wall_time'] > 0
+
+    record = PerfRecord('step', 'Step')
+    record.stop()
+    report = record.to_dict()
+    for metric in METRICS:
+        assert metric in report
+    assert report['wall_time'] >= 0
+    assert report['steps'] == []
+
+
+def test_step_report(image, tmp_path):
+    AllocateStep.call(image, perf_report=True, output_dir=str(tmp_path))
+
+    with open(tmp_path / 'test_perf.json') as report_file:
+        report = json.load(report_file)
+    assert report['run']['class'] == 'AllocateStep'
+    assert report['run']['cached'] is False
+
+
+def test_pipeline_report(image, tmp_path):
+    AllocatePipeline.call(image, perf_report=True, output_dir=str(tmp_path))
+
+    with open(tmp_path / 'test_perf.json') as report_file:
+        report = json.load(report_file)
+    run = report['run']
+    assert run['class'] == 'AllocatePipeline'
+    assert [step['name'] for step in run['steps']] == ['first', 'second']
+    for step in run['steps']:
+        assert step['wall_time'] <= run['wall_time']
+
+
+def test_no_report(image, tmp_path):
+    AllocateStep.call(image, output_dir=str(tmp_path))
+    assert not list(tmp_path.glob('*_perf.json'))
@@ -0,0 +1,195 @@
+"""Test processing the products of an association in parallel processes"""
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+from stdatamodels.jwst import datamodels
+from stpipe import crds_client
+
+from jwst.assign_wcs.util import NoDataOnDetectorError
+from jwst.pipeline import Image2Pipeline, Spec2Pipeline
+from jwst.stpipe import product_pool
+from jwst.stpipe.product_pool import estimate_product_memory, process_products
+
+
+@pytest.fixture(autouse=True)
+def no_crds(monkeypatch):
+    monkeypatch.setenv('STPIPE_DISABLE_CRDS_STEPPARS', 'true')
+    monkeypatch.setattr(crds_client, 'get_context_used', lambda observatory: 'jwst_0001.pmap')
+
+
+def _make_product(value, delay=0., action='ok'):
+    def process():
+        time.sleep(delay)
+        if action == 'fail':
+            raise ValueError(f'bad product {value}')
+        if action == 'crash':
+            os._exit(3)
+        if action == 'none':
+            return None
+        model = datamodels.ImageModel(np.full((4, 4), value, dtype=np.float32))
+        model.meta.filename = f'product{value}_cal.fits'
+        return model
+    return process
+
+
+def test_process_products():
+    # later products complete first
+    processes = [_make_product(0, 1.), _make_product(1, action='fail'),
+                 _make_product(2, action='crash'), _make_product(3, action='none'),
+                 _make_product(4)]
+    outcomes = process_products(processes, ncores=3)
+
+    results = [result for result, _, _ in outcomes]
+    assert results[0].meta.filename == 'product0_cal.fits'
+    assert np.all(results[0].data == 0)
+    assert np.all(results[4].data == 4)
+    assert results[1:4] == [None, None, None]
+
+    errors = [error for _, error, _ in outcomes]
+    assert errors[0] is None and errors[3] is None and errors[4] is None
+    assert isinstance(errors[1], ValueError)
+    assert 'bad product 1' in outcomes[1][2]
+    assert 'exited with code 3' in str(errors[2])
+
+
+def test_process_products_serial():
+    outcomes = process_products([_make_product(0), _make_product(1, action='fail')], ncores=1)
+    assert outcomes[0][0].meta.filename == 'product0_cal.fits'
+    assert isinstance(outcomes[1][1], ValueError)
+
+
+def test_process_products_threads():
+    """With other threads running, the products are processed in the main process."""
+    pids = []
+
+    def process(value):
+        pids.append(os.getpid())
+        return _make_product(value)()
+
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait)
+    thread.start()
+    try:
+        outcomes = process_products([lambda: process(0), lambda: process(1)], ncores=2)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert pids == [os.getpid()] * 2
+    assert [result.meta.filename for result, _, _ in outcomes] == [
+        'product0_cal.fits', 'product1_cal.fits']
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='Requires /proc')
+def test_results_in_memory():
+    """The results are read, and their temporary files closed, before they are removed."""
+    outcomes = process_products([_make_product(0), _make_product(1)], ncores=2)
+
+    open_files = [os.readlink(f'/proc/self/fd/{fd}') for fd in os.listdir('/proc/self/fd')
+                  if os.path.islink(f'/proc/self/fd/{fd}')]
+    assert not [path for path in open_files if 'jwst_products_' in path]
+    for value, (result, _, _) in enumerate(outcomes):
+        np.testing.assert_array_equal(result.data, value)
+
+
+def test_memory_budget(tmp_path):
+    def process(index):
+        marker = tmp_path / f'running{index}'
+        marker.touch()
+        time.sleep(0.5)
+        running = len(list(tmp_path.glob('running*')))
+        marker.unlink()
+        return datamodels.ImageModel(np.full((2, 2), running, dtype=np.float32))
+
+    processes = [lambda index=index: process(index) for index in range(4)]
+
+    # each product takes all of the budget: one at a time
+    outcomes = process_products(processes, ncores=4, memory_budget=10, estimates=[10] * 4)
+    assert [result.data[0, 0] for result, _, _ in outcomes] == [1, 1, 1, 1]
+
+    # a product larger than the budget still runs, alone
+    outcomes = process_products(processes[:2], ncores=2, memory_budget=10, estimates=[20, 1])
+    assert [result.data[0, 0] for result, _, _ in outcomes] == [1, 1]
+
+    outcomes = process_products(processes, ncores=4)
+    assert max(result.data[0, 0] for result, _, _ in outcomes) > 1
+
+
+def test_estimate_product_memory(tmp_path):
+    path = tmp_path / 'rate.fits'
+    path.write_bytes(b'0' * 2880)
+    model = datamodels.ImageModel(np.zeros((10, 10), dtype=np.float32))
+    product = {'name': 'product', 'members': [
+        {'expname': str(path), 'exptype': 'science'},
+        {'expname': model, 'exptype': 'background'},
+        {'expname': 'missing.fits', 'exptype': 'background'},
+    ]}
+    nbytes = sum(array.nbytes for array in model.instance.values() if hasattr(array, 'nbytes'))
+    assert estimate_product_memory(product) == product_pool.PRODUCT_MEMORY_FACTOR * (2880 + nbytes)
+
+
+def _image_asn(nproducts):
+    models = []
+    for i in range(nproducts):
+        model = datamodels.ImageModel(np.zeros((4, 4), dtype=np.float32))
+        model.meta.filename = f'exp{i}_rate.fits'
+        models.append(model)
+    return models
+
+
+@pytest.mark.parametrize('maximum_cores', ['1', '3'])
+def test_image2_maximum_cores(tmp_path, monkeypatch, maximum_cores):
+    def process_exposure_product(self, product, pool_name, asn_file):
+        model = datamodels.ImageModel(np.zeros((4, 4), dtype=np.float32))
+        index = int(product['name'][3])
+        # complete in reverse order
+        time.sleep(0.3 * (3 - index))
+        model.data[:] = index
+        return model
+
+    monkeypatch.setattr(Image2Pipeline, 'process_exposure_product', process_exposure_product)
+    pipeline = Image2Pipeline(maximum_cores=maximum_cores, save_results=True,
+                              output_dir=str(tmp_path))
+    pipeline.prefetch_references = False
+    results = pipeline.run(_image_asn(3))
+
+    assert [result.data[0, 0] for result in results] == [0, 1, 2]
+    assert [os.path.basename(result.meta.filename) for result in results] == [
+        f'exp{i}_cal.fits' for i in range(3)]
+    assert sorted(os.listdir(tmp_path)) == [f'exp{i}_cal.fits' for i in range(3)]
+
+
+def test_spec2_maximum_cores(tmp_path, monkeypatch):
+    def process_exposure_product(self, product, pool_name, asn_file):
+        index = int(product['name'][3])
+        if index == 1:
+            raise ValueError('bad product')
+        if index == 2:
+            return None
+        model = datamodels.ImageModel(np.full((4, 4), index, dtype=np.float32))
+        model.meta.filename = self.make_output_path(basepath=self.output_file, suffix='cal')
+        return model
+
+    monkeypatch.setattr(Spec2Pipeline, 'process_exposure_product', process_exposure_product)
+    pipeline = Spec2Pipeline(maximum_cores='2', fail_on_exception=False, output_dir=str(tmp_path))
+    pipeline.prefetch_references = False
+    results = pipeline.run(_image_asn(4))
+    assert [result.data[0, 0] for result in results] == [0, 3]
+    assert os.path.basename(results[1].meta.filename) == 'exp3_cal.fits'
+
+    pipeline = Spec2Pipeline(maximum_cores='2', output_dir=str(tmp_path))
+    pipeline.prefetch_references = False
+    with pytest.raises(RuntimeError, match='bad product'):
+        pipeline.run(_image_asn(4))
+
+    def no_data(self, product, pool_name, asn_file):
+        raise NoDataOnDetectorError()
+
+    monkeypatch.setattr(Spec2Pipeline, 'process_exposure_product', no_data)
+    pipeline = Spec2Pipeline(maximum_cores='2', output_dir=str(tmp_path))
+    pipeline.prefetch_references = False
+    with pytest.raises(NoDataOnDetectorError):
+        pipeline.run(_image_asn(2))
@@ -118,6 +118,9 @@ def test_saving_pars(tmp_path):
     with asdf.open(t_path(join('steps', 'jwst_generic_pars-makeliststep_0002.asdf'))) as af:
         original_config = StepConfig.from_asdf(af)
         original_config.parameters["par3"] = False
+        original_config.parameters["step_cache_dir"] = None
+        original_config.parameters["step_cache_size"] = 10.0
+        original_config.parameters["perf_report"] = False
 
     with asdf.open(str(saved_path)) as af:
         config = StepConfig.from_asdf(af)
@@ -142,6 +145,8 @@ def test_saving_pars(tmp_path):
                     'skip': False,
                     'search_output_file': True,
                     'input_dir': '',
+                    'step_cache_size': 10.0,
+                    'perf_report': False,
                     'par1': 0.0,
                     'par2': 'from args',
                     'par3': False,
@@ -192,6 +197,9 @@ def test_export_config(step_obj, expected, tmp_path):
             'suffix': None,
             'search_output_file': True,
             'input_dir': '',
+            'step_cache_dir': None,
+            'step_cache_size': 10.0,
+            'perf_report': False,
             'par1': 0.0,
             'par2': 'from args',
             'par3': False
@@ -214,6 +222,9 @@ def test_export_config(step_obj, expected, tmp_path):
             'suffix': None,
             'search_output_file': True,
             'input_dir': '',
+            'step_cache_dir': None,
+            'step_cache_size': 10.0,
+            'perf_report': False,
             'par1': 'Instantiated',
             'steps': {
                 'make_list': {
@@ -229,6 +240,9 @@ def test_export_config(step_obj, expected, tmp_path):
                     'suffix': None,
                     'search_output_file': True,
                     'input_dir': '',
+                    'step_cache_dir': None,
+                    'step_cache_size': 10.0,
+                    'perf_report': False,
                     'par1': 0.0,
                     'par2': 'sub-instantiated',
                     'par3': False
@@ -251,6 +265,9 @@ def test_export_config(step_obj, expected, tmp_path):
             'suffix': None,
             'search_output_file': True,
             'input_dir': '',
+            'step_cache_dir': None,
+            'step_cache_size': 10.0,
+            'perf_report': False,
             'par1': 'Instantiated',
             'steps': {}
         }),
@@ -0,0 +1,131 @@
+"""Test the step result cache"""
+import os
+
+import numpy as np
+import pytest
+from stdatamodels.jwst import datamodels
+
+from jwst.stpipe import Step
+from jwst.stpipe.step_cache import StepCache, hash_model
+
+
+class ScaleStep(Step):
+    """Multiply the data by a factor, counting the calls to process"""
+
+    spec = """
+    factor = float(default=2.0)
+    weights = string(default='')
+    save_weights = boolean(default=False)
+    """
+
+    calls = 0
+
+    def process(self, input):
+        ScaleStep.calls += 1
+        result = input.copy()
+        result.data *= self.factor
+        return result
+
+
+@pytest.fixture
+def image():
+    model = datamodels.ImageModel(np.arange(20, dtype=np.float32).reshape(4, 5))
+    model.meta.filename = 'test_cal.fits'
+    return model
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    ScaleStep.calls = 0
+
+
+def test_hash_model(image):
+    digest = hash_model(image)
+    assert digest == hash_model(image.copy())
+
+    other = image.copy()
+    other.meta.date = '2000-01-01T00:00:00.000'
+    assert hash_model(other) == digest
+
+    other.data[0, 0] = -1.
+    assert hash_model(other) != digest
+
+
+def test_step_cache(image, tmp_path):
+    cache = StepCache(str(tmp_path))
+    key = StepCache.make_key('jwst.Step', hash_model(image), {'par': 1}, [], '1.0')
+    assert key != StepCache.make_key('jwst.Step', hash_model(image), {'par': 2}, [], '1.0')
+    assert cache.get(key) is None
+
+    cache.put(key, image)
+    result = cache.get(key)
+    assert isinstance(result, datamodels.ImageModel)
+    np.testing.assert_array_equal(result.data, image.data)
+    assert result.meta.filename == image.meta.filename
+    assert hash_model(result) == hash_model(image)
+
+    cache.clear()
+    assert cache.entries() == []
+
+
+def test_step_cache_evict(image, tmp_path):
+    cache = StepCache(str(tmp_path))
+    for par in range(3):
+        cache.put(StepCache.make_key('jwst.Step', 'input', {'par': par}, [], '1.0'), image)
+    assert len(cache.entries()) == 3
+
+    # keep the two most recent entries
+    cache.max_size = cache.size() - 1
+    cache.evict()
+    assert len(cache.entries()) == 2
+
+
+# The steps are run rather than called, so that no parameter reference
+# files are looked up in CRDS
+
+def test_run_cached(image, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+
+    result = ScaleStep(step_cache_dir=cache_dir).run(image)
+    assert ScaleStep.calls == 1
+    assert len(os.listdir(cache_dir)) == 1
+
+    cached = ScaleStep(step_cache_dir=cache_dir).run(image)
+    assert ScaleStep.calls == 1
+    np.testing.assert_array_equal(cached.data, result.data)
+
+    # different parameters or data are computed again
+    ScaleStep(step_cache_dir=cache_dir, factor=3.).run(image)
+    assert ScaleStep.calls == 2
+    image.data[0, 0] = 100.
+    ScaleStep(step_cache_dir=cache_dir).run(image)
+    assert ScaleStep.calls == 3
+
+    # no caching by default
+    ScaleStep().run(image)
+    ScaleStep().run(image)
+    assert ScaleStep.calls == 5
+
+
+def test_run_cached_file_parameter(image, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    weights = tmp_path / 'weights.txt'
+    weights.write_text('1')
+
+    ScaleStep(step_cache_dir=cache_dir, weights=str(weights)).run(image)
+    ScaleStep(step_cache_dir=cache_dir, weights=str(weights)).run(image)
+    assert ScaleStep.calls == 1
+
+    # a file replaced under the same name is a different input
+    weights.write_text('1 2')
+    ScaleStep(step_cache_dir=cache_dir, weights=str(weights)).run(image)
+    assert ScaleStep.calls == 2
+
+
+def test_run_side_products_not_cached(image, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+
+    ScaleStep(step_cache_dir=cache_dir, save_weights=True).run(image)
+    ScaleStep(step_cache_dir=cache_dir, save_weights=True).run(image)
+    assert ScaleStep.calls == 2
+    assert os.listdir(cache_dir) == []
@@ -10,7 +10,7 @@ log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
 
-def do_correction(input_model, bias_model):
+def do_correction(input_model, bias_model, ref_file=None):
     """
     Short Summary
     -------------
@@ -24,6 +24,10 @@ def do_correction(input_model, bias_model):
     bias_model: super-bias model object
         bias data
 
+    ref_file: str, optional
+        path of the superbias reference file, used to cache the
+        subarray extracted from it
+
     Returns
     -------
     output_model: data model object
@@ -31,13 +35,7 @@ def do_correction(input_model, bias_model):
 
     """
 
-    # Check for subarray mode and extract subarray from the
-    # bias reference data if necessary
-    if not reffile_utils.ref_matches_sci(input_model, bias_model):
-        bias_model = reffile_utils.get_subarray_model(input_model, bias_model)
-
-    # Replace NaN's in the superbias with zeros
-    bias_model.data[np.isnan(bias_model.data)] = 0.0
+    bias_model = get_bias_model(input_model, bias_model, ref_file=ref_file)
 
     # Subtract the bias ref image from the science data
     output_model = subtract_bias(input_model, bias_model)
@@ -47,6 +45,40 @@ def do_correction(input_model, bias_model):
     return output_model
 
 
+def get_bias_model(input_model, bias_model, ref_file=None):
+    """
+    Get the superbias matching the science data, with NaN's set to zero.
+
+    Parameters
+    ----------
+    input_model: data model object
+        science data to be corrected
+
+    bias_model: super-bias model object
+        bias data
+
+    ref_file: str, optional
+        path of the superbias reference file, used to cache the
+        subarray extracted from it
+
+    Returns
+    -------
+    bias_model: super-bias model object
+        bias data for the science subarray
+
+    """
+    # Check for subarray mode and extract subarray from the
+    # bias reference data if necessary
+    if not reffile_utils.ref_matches_sci(input_model, bias_model):
+        bias_model = reffile_utils.get_subarray_model(input_model, bias_model,
+                                                      ref_file=ref_file)
+
+    # Replace NaN's in the superbias with zeros
+    bias_model.data[np.isnan(bias_model.data)] = 0.0
+
+    return bias_model
+
+
 def subtract_bias(output, bias):
     """
     Subtracts a superbias image from a science data set, subtracting the
@@ -42,7 +42,7 @@ class SuperBiasStep(Step):
             result = input_model.copy()
 
             # Do the bias subtraction
-            result = bias_sub.do_correction(result, bias_model)
+            result = bias_sub.do_correction(result, bias_model, ref_file=self.bias_name)
             result.meta.cal_step.superbias = 'COMPLETE'
 
             # Cleanup
@@ -2,6 +2,8 @@
 
 import importlib
 import pkgutil
+import subprocess
+import sys
 
 import pytest
 
@@ -27,3 +29,39 @@ MODULES = dependencies(jwst, exclude=["test", "time"])
 )
 def test_module_import(module_name):
     importlib.import_module(module_name)
+
+
+def _import_in_subprocess(statement):
+    """Run a statement in a fresh interpreter, returning the modules loaded."""
+    code = (
+        "import sys\n"
+        f"{statement}\n"
+        "print(' '.join(sys.modules))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            check=True).stdout
+    return set(output.split())
+
+
+@pytest.mark.parametrize("entry_point", ["jwst.step", "jwst.pipeline"])
+def test_entry_point_import_is_lazy(entry_point):
+    """Importing the step and pipeline modules does not import any step"""
+    modules = _import_in_subprocess(f"import {entry_point}")
+    assert not any(module.endswith("_step") for module in modules)
+
+
+def test_pipeline_imports_own_steps():
+    """Getting a pipeline class imports its steps only, not all steps"""
+    modules = _import_in_subprocess(
+        "from jwst.pipeline import Detector1Pipeline")
+    modules_all = _import_in_subprocess(
+        "import jwst.pipeline, jwst.step\n"
+        "[getattr(jwst.step, name) for name in jwst.step.__all__]\n"
+        "[getattr(jwst.pipeline, name) for name in jwst.pipeline.__all__]")
+
+    assert "jwst.ramp_fitting.ramp_fit_step" in modules
+    assert modules < modules_all
+    for module in ["jwst.tweakreg.tweakreg_step", "jwst.resample.resample_step",
+                   "jwst.cube_build.cube_build_step", "tweakwcs", "drizzle"]:
+        assert module in modules_all
+        assert module not in modules
@@ -1,6 +1,7 @@
 #! /usr/bin/env python
 from stdatamodels.jwst import datamodels
 
+from ..lib.reffile_utils import open_reference_model
 from ..stpipe import Step
 from . import wfss_contam
 
@@ -33,7 +34,7 @@ class WfssContamStep(Step):
             # Get the wavelengthrange ref file
             waverange_ref = self.get_reference_file(dm, 'wavelengthrange')
             self.log.info(f'Using WAVELENGTHRANGE reference file {waverange_ref}')
-            waverange_model = datamodels.WavelengthrangeModel(waverange_ref)
+            waverange_model = open_reference_model(waverange_ref, datamodels.WavelengthrangeModel)
 
             # Get the photom ref file
             photom_ref = self.get_reference_file(dm, 'photom')